@@ -19,9 +19,9 @@ import sys
 from pathlib import Path
 
 # Adicionar scripts/ ao path para importar transform_aws_payload
-sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'scripts'))
 
-from transform_aws_payload import load_aws_payload, aggregate_by_device
+from transform_aws_payload import aggregate_aws_payload_streaming
 import pandas as pd
 from datetime import datetime
 import logging
@@ -60,24 +60,19 @@ def main():
     
     start_time = datetime.now()
     
-    # ESTRATÉGIA: Usar transform_aws_payload.py diretamente
-    # Ele já tem o filtro MODE='FIELD' implementado!
-    logger.info("📊 Processando arquivo com transform_aws_payload.py...")
+    # ESTRATÉGIA: Modo streaming do transform_aws_payload.py
+    # Filtro MODE='FIELD' por chunk + estado parcial por device (memória limitada)
+    logger.info("📊 Processando arquivo com transform_aws_payload.py (streaming)...")
     logger.info("   (filtro MODE='FIELD' será aplicado automaticamente)")
     logger.info("")
     
     try:
-        # Carregar e filtrar (MODE já filtrado em load_aws_payload)
-        df_filtered = load_aws_payload(str(INPUT_FILE))
+        df_aggregated, n_messages = aggregate_aws_payload_streaming(str(INPUT_FILE), chunksize=CHUNK_SIZE)
         
-        logger.info(f"✅ Carregamento completo!")
-        logger.info(f"   Mensagens após filtro MODE='FIELD': {len(df_filtered):,}")
+        logger.info(f"✅ Leitura em chunks completa!")
+        logger.info(f"   Mensagens após filtro MODE='FIELD': {n_messages:,}")
         logger.info("")
         
-        # Agregar por device
-        logger.info("📊 Agregando features por device...")
-        df_aggregated = aggregate_by_device(df_filtered)
-        
         logger.info(f"✅ Agregação completa!")
         logger.info(f"   Devices: {len(df_aggregated)}")
         logger.info(f"   Features: {len(df_aggregated.columns)}")
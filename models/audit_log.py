@@ -0,0 +1,317 @@
+"""
+audit_log.py - Audit trail de predições em JSONL (escrita assíncrona)
+
+Uma thread de escrita consome uma fila limitada e grava em lotes em
+logs/predictions/YYYY-MM-DD.jsonl (um arquivo por dia). Quem faz scoring só
+enfileira: nunca espera I/O de disco. Se a fila encher, as entradas são
+descartadas e contadas em `dropped` (o scoring não bloqueia).
+
+Uso:
+    from models.audit_log import AuditLogWriter
+
+    writer = AuditLogWriter('logs/predictions', compress=True)
+    writer.log(device_id, prediction, probability, model_version='v2.0.0')
+    writer.log_many(device_ids, predictions, probabilities)   # lote: 1 item na fila
+    writer.close()
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_DIR = Path(__file__).resolve().parent.parent / 'logs' / 'predictions'
+DEFAULT_QUEUE_SIZE = 10_000      # itens na fila (1 item = 1 predição ou 1 lote)
+DEFAULT_FLUSH_INTERVAL = 1.0     # segundos entre flushes com linhas pendentes
+DEFAULT_FLUSH_LINES = 5_000      # linhas acumuladas que forçam um flush
+DEFAULT_MODEL_VERSION = "v2.0.0"
+
+_STOP = object()
+
+
+def _verdict(prediction):
+    return "CRITICAL" if prediction == 1 else "NORMAL"
+
+
+def json_device_id(value):
+    """
+    device_id serializável (numpy → Python; NaN/None → None; outros tipos → str).
+
+    Usado também pelos logs de divergência do shadow scoring.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return value if isinstance(value, (str, int, float, bool)) else str(value)
+
+
+def _json_device_ids(values):
+    """json_device_id de um array de device_ids (tolist já devolve tipos nativos para int/str/bool)."""
+    if values.dtype.kind in 'iubU':
+        return values.tolist()
+    return [json_device_id(value) for value in values.tolist()]
+
+
+class AuditLogWriter:
+    """
+    Sink JSONL com fila limitada, thread de escrita e rotação diária.
+
+    Cada linha: {"timestamp", "device_id", "prediction" (NORMAL/CRITICAL),
+    "probability" (4 casas), "model_version"}. O arquivo do dia é escolhido
+    pelo timestamp da entrada; ao virar o dia o arquivo anterior é fechado
+    (e comprimido para .jsonl.gz se compress=True).
+    """
+
+    def __init__(
+        self,
+        log_dir=DEFAULT_LOG_DIR,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        flush_lines: int = DEFAULT_FLUSH_LINES,
+        compress: bool = False,
+    ):
+        """
+        Args:
+            log_dir: Diretório dos arquivos YYYY-MM-DD.jsonl
+            queue_size: Itens pendentes antes de descartar (não bloqueia o scoring)
+            flush_interval: Segundos máximos com linhas pendentes em memória
+            flush_lines: Linhas pendentes que forçam escrita imediata
+            compress: Comprime (gzip) os arquivos de dias já fechados
+        """
+        self.log_dir = Path(log_dir)
+        self.flush_interval = flush_interval
+        self.flush_lines = flush_lines
+        self.compress = compress
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.files_compressed = 0
+        self._dropped_lock = threading.Lock()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._file_date = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='prediction-audit-log', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # API (chamada pelas threads de scoring)
+    # ------------------------------------------------------------------
+    def _enqueue(self, item, count):
+        if self._closed:
+            raise RuntimeError("AuditLogWriter já fechado")
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._dropped_lock:
+                first = self.dropped == 0
+                self.dropped += count
+            if first:
+                logger.warning("⚠️  Fila do audit log cheia: descartando entradas (ver AuditLogWriter.dropped)")
+
+    def log(self, device_id, prediction, probability, model_version=DEFAULT_MODEL_VERSION, timestamp=None):
+        """Enfileira uma predição (não bloqueia)."""
+        timestamp = timestamp or datetime.now()
+        self._enqueue(('one', timestamp, json_device_id(device_id), int(prediction), float(probability),
+                       model_version), 1)
+
+    def log_many(self, device_ids, predictions, probabilities, model_version=DEFAULT_MODEL_VERSION,
+                 timestamp=None):
+        """
+        Enfileira um lote como UM item; a serialização acontece na thread de escrita.
+
+        Args:
+            device_ids, predictions, probabilities: Sequências alinhadas (arrays,
+                Series ou listas), uma posição por device
+            model_version: Versão do modelo
+            timestamp: Momento do scoring do lote (default: agora)
+        """
+        device_ids = np.asarray(device_ids)
+        predictions = np.asarray(predictions)
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if not (len(device_ids) == len(predictions) == len(probabilities)):
+            raise ValueError(
+                f"Tamanhos diferentes: {len(device_ids)} device_ids, {len(predictions)} predictions, "
+                f"{len(probabilities)} probabilities"
+            )
+        if len(device_ids) == 0:
+            return
+        timestamp = timestamp or datetime.now()
+        self._enqueue(('many', timestamp, _json_device_ids(device_ids), predictions, probabilities, model_version),
+                      len(device_ids))
+
+    def flush(self, timeout=None):
+        """
+        Espera a fila esvaziar e as linhas chegarem ao disco.
+
+        Returns:
+            True se concluiu dentro do timeout
+        """
+        done = threading.Event()
+        self._queue.put(done, timeout=timeout)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Escreve o que estiver pendente e encerra a thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # ------------------------------------------------------------------
+    # Thread de escrita
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _lines(item):
+        """(data do arquivo, linhas JSON) de um item da fila."""
+        kind, timestamp, device_id, prediction, probability, model_version = item
+        ts = timestamp.isoformat()
+
+        if kind == 'one':
+            entries = [(device_id, prediction, probability)]
+        else:
+            entries = zip(device_id, prediction.tolist(), np.round(probability, 4).tolist())
+
+        lines = [
+            json.dumps({
+                "timestamp": ts,
+                "device_id": d,
+                "prediction": _verdict(p),
+                "probability": round(prob, 4),
+                "model_version": model_version
+            })
+            for d, p, prob in entries
+        ]
+        return timestamp.date(), lines
+
+    def _path(self, date):
+        return self.log_dir / f"{date.isoformat()}.jsonl"
+
+    def _rotate(self, date):
+        """Fecha o arquivo do dia anterior (comprimindo se configurado) e abre o de `date`."""
+        if self._file is not None:
+            self._file.close()
+            if self.compress:
+                self._compress(self._path(self._file_date))
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._path(date), 'a', encoding='utf-8')
+        self._file_date = date
+
+    def _compress(self, path):
+        gz_path = path.with_suffix(path.suffix + '.gz')
+        # Append em .gz existente gera um gzip multi-member (válido para gzip/zcat)
+        with open(path, 'rb') as src, gzip.open(gz_path, 'ab') as dst:
+            shutil.copyfileobj(src, dst)
+        path.unlink()
+        self.files_compressed += 1
+
+    def _write(self, pending):
+        """Grava as linhas pendentes ([(data, linhas)]) e faz flush."""
+        for date, lines in pending:
+            if date != self._file_date:
+                self._rotate(date)
+            self._file.write('\n'.join(lines) + '\n')
+            self.written += len(lines)
+        if self._file is not None:
+            self._file.flush()
+        pending.clear()
+
+    def _error(self, error, message):
+        self.errors += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        logger.exception(message)
+
+    def _run(self):
+        pending = []
+        n_pending = 0
+        last_flush = time.monotonic()
+
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush)) if pending else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            stop = item is _STOP
+            if isinstance(item, tuple):
+                try:
+                    date, lines = self._lines(item)
+                except Exception as e:
+                    # Item inválido: descartado e contado, a thread continua viva
+                    self._error(e, "❌ Falha ao serializar entrada do audit log")
+                else:
+                    # Linhas consecutivas do mesmo dia viram uma escrita
+                    if pending and pending[-1][0] == date:
+                        pending[-1][1].extend(lines)
+                    else:
+                        pending.append((date, lines))
+                    n_pending += len(lines)
+
+            interval_elapsed = time.monotonic() - last_flush >= self.flush_interval
+            if pending and (stop or isinstance(item, threading.Event) or n_pending >= self.flush_lines
+                            or interval_elapsed or item is None):
+                try:
+                    self._write(pending)
+                except Exception as e:
+                    self._error(e, "❌ Falha ao escrever audit log")
+                    pending.clear()
+                n_pending = 0
+                last_flush = time.monotonic()
+
+            if isinstance(item, threading.Event):
+                item.set()
+            if stop:
+                break
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_default_writer = None
+_default_lock = threading.Lock()
+
+
+def get_audit_writer():
+    """Writer padrão do processo (logs/predictions na raiz do projeto), criado sob demanda."""
+    global _default_writer
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = AuditLogWriter()
+            atexit.register(_default_writer.close)
+        return _default_writer
+
+
+def configure_audit_writer(**kwargs):
+    """
+    Substitui o writer padrão (ex.: outro log_dir ou compress=True).
+
+    Args:
+        **kwargs: Argumentos de AuditLogWriter
+
+    Returns:
+        O novo AuditLogWriter
+    """
+    global _default_writer
+    with _default_lock:
+        if _default_writer is not None:
+            _default_writer.close()
+        _default_writer = AuditLogWriter(**kwargs)
+        atexit.register(_default_writer.close)
+        return _default_writer
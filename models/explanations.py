@@ -0,0 +1,236 @@
+"""
+explanations.py - Contribuições SHAP por device (CatBoost ShapValues em lote)
+
+"Top Contributing Features" no Single Predict mostrava a importância GLOBAL
+do modelo: a mesma lista para todo device. Aqui cada device recebe suas
+contribuições SHAP exatas (TreeSHAP nativo do CatBoost):
+
+- Lote: UMA chamada get_feature_importance(type='ShapValues') para todos os
+  devices sem explicação em cache (não uma chamada por device)
+- Mesma entrada do scoring: medianas do imputer aplicadas antes (o modelo
+  explica o que de fato viu); o valor original e a flag de imputação vão
+  junto no top-k
+- Contribuições em log-odds: base_value + soma das contribuições = score
+  bruto do CatBoost (sigmoid → probabilidade)
+- Cache LRU por versão do modelo + hash das features (mesma chave do
+  prediction_cache): reenvio do mesmo device não recalcula
+
+Uso:
+    from models.explanations import ShapExplainer
+
+    explainer = ShapExplainer(model, model_version='v2.0.0')
+    top = explainer.top_contributors(features_df, k=5)     # lista por device
+    summary = explainer.top_contributors_frame(features_df, k=3)   # coluna 'top_features'
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    from models.inference import FastInferenceModel, compile_pipeline
+    from models.prediction_cache import CachedModel, feature_keys
+    from models.scoring_metrics import stage
+except ImportError:  # explanations.py importado direto de models/
+    from inference import FastInferenceModel, compile_pipeline
+    from prediction_cache import CachedModel, feature_keys
+    from scoring_metrics import stage
+
+DEFAULT_TOP_K = 5
+DEFAULT_MAX_ENTRIES = 50_000   # vetores de 30 floats: ~15 MB
+
+
+def explainable_model(model):
+    """
+    FastInferenceModel por trás de um modelo de scoring (medianas + CatBoost).
+
+    Args:
+        model: Pipeline imblearn, FastInferenceModel ou CachedModel
+
+    Returns:
+        FastInferenceModel
+    """
+    if isinstance(model, CachedModel):
+        model = model.model
+    if isinstance(model, FastInferenceModel):
+        return model
+    return compile_pipeline(model)
+
+
+class ExplanationCache:
+    """LRU em memória de vetores SHAP (thread-safe)."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        """Lista alinhada com keys: vetor ou None (miss)."""
+        with self._lock:
+            found = []
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                found.append(vector)
+            hits = sum(vector is not None for vector in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, keys, vectors):
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+        }
+
+
+class ShapExplainer:
+    """
+    Contribuições SHAP por device com cache por versão do modelo + features.
+    """
+
+    def __init__(self, model, model_version, cache_size=DEFAULT_MAX_ENTRIES, thread_count=-1):
+        """
+        Args:
+            model: Pipeline, FastInferenceModel ou CachedModel (o mesmo do scoring)
+            model_version (str): Parte da chave do cache (ex.: model_file_version)
+            cache_size (int): Explicações em memória (0 desliga o cache)
+            thread_count (int): Threads do CatBoost no cálculo (-1 = todos os cores)
+        """
+        self.model = explainable_model(model)
+        self.feature_order = list(self.model.feature_order)
+        self.model_version = f"{model_version}:shap"
+        self.thread_count = thread_count
+        self.cache = ExplanationCache(cache_size) if cache_size > 0 else None
+        self._base_value = None
+
+    @property
+    def base_value(self):
+        """Valor esperado (log-odds) do modelo: ponto de partida das contribuições."""
+        if self._base_value is None:
+            self._shap_batch(np.asarray([self.model.medians], dtype=np.float32))
+        return self._base_value
+
+    def _shap_batch(self, X_imputed):
+        """Uma chamada ShapValues para o lote: (n_devices, n_features) em log-odds."""
+        from catboost import Pool
+
+        with stage('shap'):
+            values = self.model.classifier.get_feature_importance(
+                data=Pool(X_imputed), type='ShapValues', thread_count=self.thread_count
+            )
+        self._base_value = float(values[0, -1])
+        return values[:, :-1]
+
+    def shap_values(self, X):
+        """
+        Contribuições SHAP por device e feature.
+
+        Args:
+            X: DataFrame (qualquer ordem de colunas), dict de 1 device ou array em feature_order
+
+        Returns:
+            np.ndarray float64 (n_devices, n_features) na ordem de feature_order
+        """
+        raw = self.model.to_array(X)
+        values = np.empty(raw.shape, dtype=np.float64)
+        if len(raw) == 0:
+            return values
+
+        if self.cache is None:
+            missing = np.arange(len(raw))
+            keys = None
+        else:
+            keys = feature_keys(raw, self.model_version)
+            cached = self.cache.get_many(keys)
+            missing = np.array([i for i, vector in enumerate(cached) if vector is None], dtype=np.intp)
+            for i, vector in enumerate(cached):
+                if vector is not None:
+                    values[i] = vector
+
+        if len(missing):
+            imputed = np.where(np.isnan(raw[missing]), self.model.medians, raw[missing])
+            computed = self._shap_batch(imputed)
+            values[missing] = computed
+            if self.cache is not None:
+                self.cache.put_many([keys[i] for i in missing], list(computed))
+
+        return values
+
+    def _top_k(self, X, k):
+        """(features, valores originais, contribuições) dos top-k por |contribuição|, arrays (n_devices, k)."""
+        raw = self.model.to_array(X)
+        values = self.shap_values(raw)
+        k = min(k, len(self.feature_order))
+
+        # argpartition + sort só dos k primeiros: O(n_features) por device
+        top = np.argpartition(-np.abs(values), k - 1, axis=1)[:, :k]
+        contributions = np.take_along_axis(values, top, axis=1)
+        order = np.argsort(-np.abs(contributions), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        features = np.asarray(self.feature_order, dtype=object)[top]
+        return features, np.take_along_axis(raw, top, axis=1), np.take_along_axis(contributions, order, axis=1)
+
+    def top_contributors(self, X, k=DEFAULT_TOP_K):
+        """
+        Top-k features por |contribuição| para cada device.
+
+        Returns:
+            Lista (1 por device) de listas de dicts {'feature', 'value' (entrada
+            original), 'imputed' (bool), 'contribution' (log-odds, sinal =
+            direção: + aumenta o risco)}
+        """
+        features, raw_values, contributions = self._top_k(X, k)
+        imputed = np.isnan(raw_values).tolist()
+        raw_values = raw_values.astype(np.float64).tolist()
+
+        return [
+            [
+                {'feature': f, 'value': None if missing else v, 'imputed': missing, 'contribution': c}
+                for f, v, missing, c in zip(*device)
+            ]
+            for device in zip(features.tolist(), raw_values, imputed, contributions.tolist())
+        ]
+
+    def top_contributors_frame(self, X, k=3):
+        """
+        Resumo tabular para lotes: coluna 'top_features' ("feature (+0.84); ...").
+
+        Returns:
+            DataFrame com o índice de X (quando DataFrame)
+        """
+        features, _, contributions = self._top_k(X, k)
+        summary = [
+            '; '.join(f"{f} ({c:+.2f})" for f, c in zip(names, values))
+            for names, values in zip(features.tolist(), contributions.tolist())
+        ]
+        return pd.DataFrame({'top_features': summary}, index=X.index if isinstance(X, pd.DataFrame) else None)
+
+    def stats(self):
+        return {'cache': self.cache.stats() if self.cache is not None else None}
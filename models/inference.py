@@ -1,10 +1,9 @@
-
 """
 inference.py - Funções de Inferência para Modelo de Produção
 CatBoost + SMOTE 0.5 Pipeline
 
 Uso:
-    from inference import load_model, predict_device, predict_batch, log_prediction
+    from inference import load_model, predict_device, predict_batch, score_devices, log_prediction, log_predictions
 
     # Carregar modelo
     pipeline = load_model('models/catboost_pipeline_v2_field_only.pkl')
@@ -14,24 +13,68 @@ Uso:
 
     # Batch prediction
     df_results = predict_batch(df_devices, pipeline)
+
+    # Streaming (memória limitada ao chunk)
+    for scored in predict_batch_stream(iter_feature_chunks('fleet.csv'), pipeline):
+        ...
+
+    # Multi-processo (modelo carregado 1x por worker, ordem preservada)
+    df_results = predict_batch_parallel(df_devices, 'models/catboost_pipeline_v2_field_only.pkl', workers=4)
+
+    # Scoring compartilhado (1 passada no modelo, threshold configurável)
+    scores = score_devices(features_df, pipeline, threshold=0.6)
     
-    # Log prediction (POC exemplo audit trail)
+    # Audit trail (logs/predictions/YYYY-MM-DD.jsonl, escrita em background)
     log_prediction(device_id, result['prediction'], result['probability'])
+    log_predictions(df_results['device_id'], df_results['prediction'], df_results['probability'])
+
+    # Cache de predições (só features novas/alteradas vão ao modelo)
+    from prediction_cache import CachedModel, PredictionCache
+    cached = CachedModel(pipeline, PredictionCache(ttl_seconds=86400), model_version='v2.0.0')
+    scores = score_devices(features_df, cached)
+
+    # Latência por estágio (desligada por default; texto Prometheus)
+    from scoring_metrics import enable_metrics, render_prometheus
+    enable_metrics()
+    print(render_prometheus())
+
+    # Fast path (sem overhead de pandas/sklearn por chamada)
+    fast_model = compile_pipeline(pipeline)
+    probabilities = fast_model.predict_proba_critical(X_float32)
+
+    # Artefato de inferência (.cbm + JSON, sem imblearn/sklearn no load)
+    export_inference_artifact(pipeline, 'models/catboost_v2_field_only_inference')
+    fast_model = load_inference_artifact('models/catboost_v2_field_only_inference')
 """
 
 import joblib
-import pandas as pd
 import json
+import numpy as np
+import pandas as pd
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+try:
+    from models.audit_log import get_audit_writer
+    from models.scoring_metrics import (
+        count_rows, disable_metrics, drain_stages, enable_metrics, get_metrics, merge_stages, stage
+    )
+except ImportError:  # inference.py importado direto de models/
+    from audit_log import get_audit_writer
+    from scoring_metrics import (
+        count_rows, disable_metrics, drain_stages, enable_metrics, get_metrics, merge_stages, stage
+    )
+
 
 def log_prediction(device_id, prediction, probability, model_version="v2.0.0"):
     """
-    POC EXEMPLO - Logging básico de predições para audit trail.
-    
-    Para produção: Expandir com features_hash, execution_time, user_id,
-    structured logging (logs/predictions/YYYY-MM-DD.jsonl), rotation policy.
+    Audit trail de uma predição em logs/predictions/YYYY-MM-DD.jsonl.
+
+    Só enfileira a entrada: a escrita (em lotes, com rotação diária) é feita
+    pela thread do AuditLogWriter padrão (ver models/audit_log.py).
     
     Args:
         device_id (str): ID do dispositivo
@@ -39,20 +82,22 @@ def log_prediction(device_id, prediction, probability, model_version="v2.0.0"):
         probability (float): Probabilidade crítico
         model_version (str): Versão do modelo usado
     """
-    log_entry = {
-        "timestamp": datetime.now().isoformat(),
-        "device_id": device_id,
-        "prediction": "CRITICAL" if prediction == 1 else "NORMAL",
-        "probability": round(probability, 4),
-        "model_version": model_version
-    }
-    
-    # POC: Print to console (produção: save to JSON file)
-    print(f"[AUDIT] {json.dumps(log_entry)}")
-    
-    # Produção: logs_dir = Path("logs/predictions")
-    # with open(logs_dir / f"{datetime.now().strftime('%Y-%m-%d')}.jsonl", "a") as f:
-    #     f.write(json.dumps(log_entry) + "\n")
+    get_audit_writer().log(device_id, prediction, probability, model_version=model_version)
+
+
+def log_predictions(device_ids, predictions, probabilities, model_version="v2.0.0"):
+    """
+    Audit trail de um LOTE de predições (ex.: saída de predict_batch).
+
+    O lote entra na fila como um único item; nada é impresso por device.
+
+    Args:
+        device_ids (array): IDs dos dispositivos
+        predictions (array): Predições 0/1 (mesma ordem)
+        probabilities (array): Probabilidades de CRITICAL (mesma ordem)
+        model_version (str): Versão do modelo usado
+    """
+    get_audit_writer().log_many(device_ids, predictions, probabilities, model_version=model_version)
 
 
 def load_model(model_path):
@@ -70,67 +115,567 @@ def load_model(model_path):
     return pipeline
 
 
-def predict_device(features_dict, pipeline):
+# Regras de decisão compartilhadas (inference, páginas Streamlit e scripts)
+DEFAULT_DECISION_THRESHOLD = 0.5
+RISK_LEVEL_BINS = [0.3, 0.7]           # < 0.3 Low, < 0.7 Medium, senão High
+RISK_LEVELS = ['Low', 'Medium', 'High']
+VERDICTS = np.array(['NORMAL', 'CRITICAL'])
+
+
+def _scores_directly(model):
     """
-    Predição para um ÚNICO device.
+    Modelos com predict_proba_critical (FastInferenceModel, CachedModel): aceitam
+    DataFrame/dict/array e expõem feature_order.
+    """
+    return callable(getattr(type(model), 'predict_proba_critical', None))
+
+
+def predict_critical_proba(model, X):
+    """
+    Probabilidade de CRITICAL (classe 1) com UMA passada imputer+CatBoost.
 
     Args:
-        features_dict (dict): Dicionário com 29 features {feature_name: value}
-        pipeline: Pipeline já carregado
+        model: Pipeline já carregado, FastInferenceModel ou CachedModel
+        X: Features (DataFrame; dict de 1 device também no FastInferenceModel/CachedModel)
 
     Returns:
-        dict com 'prediction' (0/1), 'probability' (0.0-1.0), 'risk_level', 'verdict'
+        np.ndarray com a probabilidade por device
     """
-    # Converter dict para DataFrame
-    df_input = pd.DataFrame([features_dict])
+    if _scores_directly(model):
+        return model.predict_proba_critical(X)
+    if len(X) == 0:
+        return np.empty(0, dtype=np.float64)
+    # Pipeline imblearn: imputer + CatBoost numa chamada só (sem split por estágio)
+    with stage('pipeline'):
+        return np.asarray(model.predict_proba(X))[:, 1]
 
-    # Predição
-    prediction = pipeline.predict(df_input)[0]
-    probability = pipeline.predict_proba(df_input)[0, 1]
 
-    # Risk level
-    if probability < 0.3:
-        risk_level = 'Low'
-    elif probability < 0.7:
-        risk_level = 'Medium'
-    else:
-        risk_level = 'High'
+def derive_outcomes(probabilities, threshold=DEFAULT_DECISION_THRESHOLD):
+    """
+    Deriva prediction, risk_level e verdict das probabilidades (sem nova passada no modelo).
+
+    Args:
+        probabilities (array): Probabilidade de CRITICAL por device
+        threshold (float): Probabilidade mínima para CRITICAL (default: 0.5)
+
+    Returns:
+        dict com arrays 'prediction' (0/1), 'probability', 'risk_level'
+        (Categorical Low/Medium/High) e 'verdict' (NORMAL/CRITICAL)
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    predictions = (probabilities >= threshold).astype(int)
 
     return {
-        'prediction': int(prediction),
-        'probability': float(probability),
-        'risk_level': risk_level,
-        'verdict': 'CRITICAL' if prediction == 1 else 'NORMAL'
+        'prediction': predictions,
+        'probability': probabilities,
+        'risk_level': pd.Categorical.from_codes(
+            np.digitize(probabilities, RISK_LEVEL_BINS), categories=RISK_LEVELS, ordered=True
+        ),
+        'verdict': VERDICTS[predictions],
     }
 
 
-def predict_batch(df_devices, pipeline):
+def score_devices(X, model, threshold=DEFAULT_DECISION_THRESHOLD):
+    """
+    API de scoring compartilhada: probabilidades uma vez + decisões derivadas.
+
+    Args:
+        X (DataFrame): Features (1 row por device)
+        model: Pipeline já carregado ou FastInferenceModel
+        threshold (float): Threshold de decisão (default: 0.5)
+
+    Returns:
+        DataFrame com 'prediction', 'probability', 'risk_level', 'verdict'
+        (mesmo índice de X)
+    """
+    probabilities = predict_critical_proba(model, X)
+    count_rows(len(probabilities))
+    with stage('assemble'):
+        outcomes = derive_outcomes(probabilities, threshold)
+        return pd.DataFrame(outcomes, index=X.index if isinstance(X, pd.DataFrame) else None)
+
+
+def predict_device(features_dict, pipeline, threshold=DEFAULT_DECISION_THRESHOLD):
+    """
+    Predição para um ÚNICO device.
+
+    Args:
+        features_dict (dict): Dicionário com 29 features {feature_name: value}
+        pipeline: Pipeline já carregado (ou FastInferenceModel de compile_pipeline)
+        threshold (float): Threshold de decisão (default: 0.5)
+
+    Returns:
+        dict com 'prediction' (0/1), 'probability' (0.0-1.0), 'risk_level', 'verdict'
+    """
+    if _scores_directly(pipeline):
+        # Fast path / cache: dict → array direto
+        X = features_dict
+    else:
+        # Converter dict para DataFrame
+        with stage('dataframe'):
+            X = pd.DataFrame([features_dict])
+
+    probabilities = predict_critical_proba(pipeline, X)
+    count_rows(1)
+
+    with stage('assemble'):
+        outcomes = derive_outcomes(probabilities, threshold)
+        return {
+            'prediction': int(outcomes['prediction'][0]),
+            'probability': float(outcomes['probability'][0]),
+            'risk_level': str(outcomes['risk_level'][0]),
+            'verdict': str(outcomes['verdict'][0])
+        }
+
+
+def predict_batch(df_devices, pipeline, threshold=DEFAULT_DECISION_THRESHOLD):
     """
     Predição em LOTE para múltiplos devices.
 
     Args:
         df_devices (DataFrame): DataFrame com 29 features (1 row por device)
-        pipeline: Pipeline já carregado
+        pipeline: Pipeline já carregado (ou FastInferenceModel)
+        threshold (float): Threshold de decisão (default: 0.5)
 
     Returns:
         DataFrame original + colunas 'prediction', 'probability', 'risk_level', 'verdict'
     """
-    # Predições
-    predictions = pipeline.predict(df_devices)
-    probabilities = pipeline.predict_proba(df_devices)[:, 1]
-
-    # Risk levels
-    risk_levels = pd.cut(
-        probabilities,
-        bins=[0, 0.3, 0.7, 1.0],
-        labels=['Low', 'Medium', 'High']
-    )
+    # Uma passada no modelo; decisões derivadas das probabilidades
+    scores = score_devices(df_devices, pipeline, threshold)
 
     # Adicionar colunas
-    df_result = df_devices.copy()
-    df_result['prediction'] = predictions
-    df_result['probability'] = probabilities
-    df_result['risk_level'] = risk_levels
-    df_result['verdict'] = df_result['prediction'].map({0: 'NORMAL', 1: 'CRITICAL'})
+    with stage('assemble'):
+        df_result = df_devices.copy()
+        for column in scores.columns:
+            df_result[column] = scores[column]
 
     return df_result
+
+
+# Streaming: devices por chunk (memória limitada ao chunk, não à frota)
+DEFAULT_SCORING_CHUNKSIZE = 50_000
+SCORE_COLUMNS = ['prediction', 'probability', 'risk_level', 'verdict']
+
+
+def model_feature_order(model):
+    """
+    Ordem das features esperada pelo modelo (None se o modelo não expõe).
+
+    Args:
+        model: Pipeline já carregado, FastInferenceModel ou CachedModel
+
+    Returns:
+        list com os nomes das features ou None
+    """
+    if _scores_directly(model):
+        return model.feature_order
+    names = getattr(model, 'feature_names_in_', None)
+    return list(names) if names is not None else None
+
+
+def iter_feature_chunks(source, chunksize=DEFAULT_SCORING_CHUNKSIZE, columns=None):
+    """
+    Itera features por device em chunks de até chunksize linhas.
+
+    Args:
+        source: CSV (.csv), Parquet (arquivo .parquet ou diretório de dataset),
+            DataFrame, ou iterável de DataFrames (repassados como estão)
+        chunksize (int): Devices por chunk (default: 50.000)
+        columns (list): Colunas a ler (default: todas)
+
+    Yields:
+        DataFrame por chunk
+    """
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+        return
+
+    if not isinstance(source, (str, Path)):
+        yield from source
+        return
+
+    path = Path(source)
+    if path.is_dir() or path.suffix == '.parquet':
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(path, format='parquet')
+        for batch in dataset.to_batches(columns=columns, batch_size=chunksize):
+            if batch.num_rows:
+                yield batch.to_pandas()
+        return
+
+    yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+
+def predict_batch_stream(chunks, pipeline, threshold=DEFAULT_DECISION_THRESHOLD, feature_columns=None):
+    """
+    Predição em STREAMING: um chunk scorado por chunk de entrada.
+
+    Mesmo resultado de predict_batch, mas só um chunk fica em memória por vez
+    (o chamador escreve/descarta cada chunk antes de pedir o próximo).
+
+    Args:
+        chunks: Iterável de DataFrames (ver iter_feature_chunks)
+        pipeline: Pipeline já carregado (ou FastInferenceModel)
+        threshold (float): Threshold de decisão (default: 0.5)
+        feature_columns (list): Features enviadas ao modelo, nesta ordem
+            (ausentes viram NaN → mediana). Default: todas as colunas do chunk
+
+    Yields:
+        Chunk original + colunas 'prediction', 'probability', 'risk_level', 'verdict'
+    """
+    for chunk in chunks:
+        X = chunk if feature_columns is None else chunk.reindex(columns=feature_columns)
+        scores = score_devices(X, pipeline, threshold)
+
+        # Cópia rasa: colunas novas sem duplicar as features do chunk
+        scored = chunk.copy(deep=False)
+        for column in SCORE_COLUMNS:
+            scored[column] = scores[column]
+        yield scored
+
+
+# Multi-processo: cada worker carrega o modelo UMA vez (initializer)
+_WORKER_MODEL = None
+
+
+def _init_scoring_worker(model_path, fast, thread_count, metrics):
+    """Initializer do pool: carrega (e compila) o modelo no processo worker."""
+    global _WORKER_MODEL
+    _WORKER_MODEL = load_scorer(model_path, fast=fast, thread_count=thread_count)
+    # Instância própria do worker (com fork, a do pai viria copiada com as medidas dele)
+    disable_metrics()
+    if metrics:
+        enable_metrics()
+
+
+def _score_shard(X, feature_columns):
+    """
+    Probabilidades de um shard no worker (só o array volta pelo IPC), mais os
+    estágios medidos no shard (None com métricas desligadas) para o pai somar.
+    """
+    feature_columns = feature_columns or model_feature_order(_WORKER_MODEL)
+    if feature_columns is not None:
+        X = X.reindex(columns=feature_columns)
+    return predict_critical_proba(_WORKER_MODEL, X), drain_stages()
+
+
+def predict_batch_stream_parallel(chunks, model_path, workers=None, threshold=DEFAULT_DECISION_THRESHOLD,
+                                  feature_columns=None, fast=True, max_in_flight=None):
+    """
+    predict_batch_stream com os chunks scorados em um pool de processos.
+
+    Os chunks são distribuídos entre os workers e devolvidos NA ORDEM de
+    entrada. No máximo max_in_flight chunks ficam pendentes, então a memória
+    continua limitada ao tamanho do chunk.
+
+    Com métricas ligadas (models/scoring_metrics.py) cada worker mede os
+    estágios do modelo e devolve os histogramas junto com o shard; o processo
+    pai soma tudo na própria instância.
+
+    Args:
+        chunks: Iterável de DataFrames (ver iter_feature_chunks)
+        model_path (str): Pipeline .pkl ou artefato de inferência (cada worker carrega uma vez)
+        workers (int): Processos (default: os.cpu_count())
+        threshold (float): Threshold de decisão (default: 0.5)
+        feature_columns (list): Features enviadas ao modelo (default: as do modelo)
+        fast (bool): Worker usa compile_pipeline com 1 thread de CatBoost
+            (evita workers x cores threads disputando a CPU)
+        max_in_flight (int): Chunks pendentes no pool (default: 2 x workers)
+
+    Yields:
+        Chunk original + colunas 'prediction', 'probability', 'risk_level', 'verdict'
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_scoring_worker,
+        initargs=(str(model_path), fast, 1 if fast else -1, get_metrics() is not None),
+    ) as pool:
+        pending = deque()
+        chunks = iter(chunks)
+
+        while True:
+            # Mantém o pool ocupado sem ler o arquivo inteiro
+            while len(pending) < max_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending.append((chunk, pool.submit(_score_shard, chunk, feature_columns)))
+
+            if not pending:
+                break
+
+            chunk, future = pending.popleft()
+            probabilities, stages = future.result()
+            merge_stages(stages)   # estágios do modelo rodam (e são medidos) nos workers
+            count_rows(len(probabilities))
+
+            with stage('assemble'):
+                outcomes = derive_outcomes(probabilities, threshold)
+                scored = chunk.copy(deep=False)
+                for column in SCORE_COLUMNS:
+                    scored[column] = outcomes[column]
+            yield scored
+
+
+def predict_batch_parallel(df_devices, model_path, workers=None, threshold=DEFAULT_DECISION_THRESHOLD,
+                           shard_size=None, fast=True):
+    """
+    predict_batch com os devices divididos em shards entre processos.
+
+    Args:
+        df_devices (DataFrame): Features (1 row por device)
+        model_path (str): Pipeline .pkl (cada worker carrega uma vez)
+        workers (int): Processos (default: os.cpu_count())
+        threshold (float): Threshold de decisão (default: 0.5)
+        shard_size (int): Devices por shard (default: ~4 shards por worker)
+        fast (bool): Worker usa compile_pipeline (ver predict_batch_stream_parallel)
+
+    Returns:
+        DataFrame original + colunas de score, na ordem de entrada
+    """
+    workers = workers or os.cpu_count() or 1
+    if len(df_devices) == 0:
+        return predict_batch(df_devices, load_scorer(model_path, fast=fast), threshold)
+
+    shard_size = shard_size or max(1, -(-len(df_devices) // (4 * workers)))
+    scored = predict_batch_stream_parallel(
+        iter_feature_chunks(df_devices, chunksize=shard_size), model_path,
+        workers=workers, threshold=threshold, fast=fast
+    )
+    return pd.concat(scored)
+
+
+class FastInferenceModel:
+    """
+    Inferência compilada a partir do pipeline (SimpleImputer + SMOTE + CatBoost).
+
+    O pipeline imblearn valida nomes/tipos de features e passa por sklearn em
+    cada chamada de predict e predict_proba; para 1 device esse overhead domina
+    o tempo do CatBoost. Aqui o imputer vira um vetor NumPy de medianas e o
+    CatBoost é chamado direto sobre um array float32 em TRAINING_FEATURE_ORDER.
+    SMOTE não atua na inferência.
+
+    predict/predict_proba aceitam DataFrame, dict (1 device) ou array e têm a
+    mesma interface do pipeline (drop-in em predict_device/predict_batch).
+    """
+
+    def __init__(self, medians, classifier, feature_order, decision_threshold=DEFAULT_DECISION_THRESHOLD,
+                 thread_count=-1):
+        """
+        Args:
+            medians (array): Medianas do SimpleImputer (ordem de feature_order)
+            classifier: CatBoostClassifier treinado
+            feature_order (list): Ordem das features no treino
+            decision_threshold (float): Probabilidade mínima para CRITICAL
+            thread_count (int): Threads do CatBoost por predição (-1 = todos os cores)
+        """
+        self.medians = np.asarray(medians, dtype=np.float32)
+        self.classifier = classifier
+        self.feature_order = list(feature_order)
+        self.decision_threshold = decision_threshold
+        self.thread_count = thread_count
+
+        if len(self.medians) != len(self.feature_order):
+            raise ValueError(
+                f"{len(self.medians)} medianas para {len(self.feature_order)} features"
+            )
+
+    def to_array(self, X):
+        """
+        Converte a entrada para float32 (n_devices, n_features) em feature_order.
+
+        Args:
+            X: DataFrame (colunas nomeadas, qualquer ordem), dict de 1 device ou
+               array já em feature_order
+
+        Returns:
+            np.ndarray float32 (NaN ainda não imputado)
+        """
+        if isinstance(X, dict):
+            missing = [f for f in self.feature_order if f not in X]
+            if missing:
+                raise ValueError(f"Features ausentes: {missing}")
+            return np.array([[X[f] for f in self.feature_order]], dtype=np.float32)
+
+        if isinstance(X, pd.DataFrame):
+            missing = [f for f in self.feature_order if f not in X.columns]
+            if missing:
+                raise ValueError(f"Features ausentes: {missing}")
+            return X[self.feature_order].to_numpy(dtype=np.float32, na_value=np.nan)
+
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.feature_order):
+            raise ValueError(f"Esperado {len(self.feature_order)} features, recebido {X.shape[1]}")
+        return X
+
+    def predict_proba_critical(self, X):
+        """Probabilidade de CRITICAL (classe 1) por device, 1 passada no CatBoost."""
+        with stage('to_array'):
+            X = self.to_array(X)
+        if len(X) == 0:
+            return np.empty(0, dtype=np.float64)
+        with stage('impute'):
+            X = np.where(np.isnan(X), self.medians, X)
+        with stage('catboost'):
+            return self.classifier.predict_proba(X, thread_count=self.thread_count)[:, 1]
+
+    def predict_proba(self, X):
+        """Mesma saída de pipeline.predict_proba: (n_devices, 2)."""
+        probabilities = self.predict_proba_critical(X)
+        return np.column_stack([1 - probabilities, probabilities])
+
+    def predict(self, X):
+        """Label 0/1 derivado da probabilidade (sem segunda passada no modelo)."""
+        return (self.predict_proba_critical(X) >= self.decision_threshold).astype(int)
+
+
+def compile_pipeline(pipeline, decision_threshold=DEFAULT_DECISION_THRESHOLD, feature_order=None, thread_count=-1):
+    """
+    Monta o FastInferenceModel a partir do pipeline carregado por load_model.
+
+    Args:
+        pipeline: Pipeline imblearn (SimpleImputer(median) + SMOTE + CatBoost)
+        decision_threshold (float): Threshold de decisão (default: 0.5)
+        feature_order (list): Ordem das features (default: feature_names_in_
+            do imputer, i.e. TRAINING_FEATURE_ORDER)
+        thread_count (int): Threads do CatBoost por predição (default: -1, todos)
+
+    Returns:
+        FastInferenceModel com as mesmas probabilidades do pipeline
+    """
+    imputer = None
+    for name, step in pipeline.steps[:-1]:
+        if hasattr(step, 'fit_resample'):
+            continue  # SMOTE: só atua no fit
+        if hasattr(step, 'statistics_') and imputer is None:
+            imputer = step
+            continue
+        raise ValueError(f"Step '{name}' não suportado pelo fast path")
+
+    if imputer is None:
+        raise ValueError("Pipeline sem SimpleImputer ajustado")
+    if getattr(imputer, 'add_indicator', False):
+        raise ValueError("SimpleImputer com add_indicator não suportado pelo fast path")
+    if not pd.isna(imputer.missing_values):
+        raise ValueError(f"SimpleImputer com missing_values={imputer.missing_values!r} não suportado")
+    if np.isnan(imputer.statistics_).any():
+        raise ValueError("SimpleImputer com features sem mediana (colunas descartadas no treino)")
+
+    if feature_order is None:
+        if not hasattr(imputer, 'feature_names_in_'):
+            raise ValueError("Pipeline treinado sem nomes de features: informe feature_order")
+        feature_order = imputer.feature_names_in_
+
+    return FastInferenceModel(
+        medians=imputer.statistics_,
+        classifier=pipeline.steps[-1][1],
+        feature_order=feature_order,
+        decision_threshold=decision_threshold,
+        thread_count=thread_count
+    )
+
+
+# Artefato de inferência: CatBoost nativo (.cbm) + medianas/ordem em JSON.
+# Carregar não importa imblearn nem sklearn (nem desserializa o SMOTE).
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_MODEL_FILE = 'model.cbm'
+ARTIFACT_PREPROCESSING_FILE = 'preprocessing.json'
+
+
+def export_inference_artifact(pipeline, output_dir, decision_threshold=DEFAULT_DECISION_THRESHOLD, source_model=None):
+    """
+    Escreve o artefato de inferência a partir do pipeline (ou FastInferenceModel).
+
+    Args:
+        pipeline: Pipeline imblearn carregado por load_model (ou FastInferenceModel)
+        output_dir: Diretório do artefato (model.cbm + preprocessing.json)
+        decision_threshold (float): Threshold gravado no artefato
+        source_model (str): Nome do .pkl de origem (rastreabilidade)
+
+    Returns:
+        Path do diretório do artefato
+    """
+    if isinstance(pipeline, FastInferenceModel):
+        fast_model = pipeline
+    else:
+        fast_model = compile_pipeline(pipeline, decision_threshold=decision_threshold)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fast_model.classifier.save_model(str(output_dir / ARTIFACT_MODEL_FILE), format='cbm')
+
+    preprocessing = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'source_model': source_model,
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'decision_threshold': decision_threshold,
+        'feature_order': fast_model.feature_order,
+        'medians': fast_model.medians.tolist(),
+    }
+    with open(output_dir / ARTIFACT_PREPROCESSING_FILE, 'w') as f:
+        json.dump(preprocessing, f, indent=2)
+
+    print(f"✅ Artefato de inferência salvo em: {output_dir}")
+    return output_dir
+
+
+def load_inference_artifact(artifact_dir, thread_count=-1):
+    """
+    Carrega o artefato de inferência como FastInferenceModel (só catboost).
+
+    Args:
+        artifact_dir: Diretório com model.cbm + preprocessing.json
+        thread_count (int): Threads do CatBoost por predição (-1 = todos os cores)
+
+    Returns:
+        FastInferenceModel com as mesmas probabilidades do pipeline de origem
+    """
+    from catboost import CatBoostClassifier
+
+    artifact_dir = Path(artifact_dir)
+    with open(artifact_dir / ARTIFACT_PREPROCESSING_FILE, 'r') as f:
+        preprocessing = json.load(f)
+
+    if preprocessing.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(
+            f"Artefato {artifact_dir} com format_version={preprocessing.get('format_version')!r} "
+            f"(esperado {ARTIFACT_FORMAT_VERSION})"
+        )
+
+    classifier = CatBoostClassifier()
+    classifier.load_model(str(artifact_dir / ARTIFACT_MODEL_FILE), format='cbm')
+
+    return FastInferenceModel(
+        medians=preprocessing['medians'],
+        classifier=classifier,
+        feature_order=preprocessing['feature_order'],
+        decision_threshold=preprocessing.get('decision_threshold', DEFAULT_DECISION_THRESHOLD),
+        thread_count=thread_count
+    )
+
+
+def load_scorer(model_path, fast=False, thread_count=-1):
+    """
+    Carrega o modelo para scoring a partir de um .pkl ou de um artefato de inferência.
+
+    Args:
+        model_path: Pipeline .pkl ou diretório do artefato (export_inference_artifact)
+        fast (bool): Compila o pipeline .pkl (artefatos já são o fast path)
+        thread_count (int): Threads do CatBoost no fast path
+
+    Returns:
+        Pipeline ou FastInferenceModel
+    """
+    model_path = Path(model_path)
+    if model_path.is_dir():
+        return load_inference_artifact(model_path, thread_count=thread_count)
+
+    model = load_model(model_path)
+    return compile_pipeline(model, thread_count=thread_count) if fast else model
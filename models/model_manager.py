@@ -0,0 +1,415 @@
+"""
+model_manager.py - Modelo ativo do registry com hot reload e troca atômica
+
+Processos de longa duração (Streamlit, scoring_service.py) carregavam um
+caminho fixo uma única vez: trocar o modelo exigia reiniciar o processo.
+O ModelManager lê models/registry.json, carrega o modelo com status
+"active" e observa o arquivo (mtime/tamanho, polling numa thread):
+
+- Mudança no registry → o novo modelo é carregado e aquecido (lote de
+  amostra, que também popula o cache de predições da nova versão) na
+  thread do watcher, fora do caminho das requisições
+- Troca atômica: uma única atribuição do ModelHandle. Cada requisição pega
+  o handle UMA vez (manager.current()) e termina no modelo em que começou;
+  o modelo antigo é liberado quando a última requisição solta a referência
+- Falha no load/warm-up → o modelo atual continua servindo (last_error)
+- shadows=True: as entradas com status "shadow" também são carregadas e
+  recarregadas com o registry (manager.shadow_handles()); falha em um
+  shadow nunca afeta o modelo ativo
+
+Uso:
+    from models.model_manager import ModelManager
+
+    manager = ModelManager('models/registry.json', warmup_data=features_df).start()
+    handle = manager.current()
+    scores = score_devices(X, handle.model, handle.decision_threshold)
+    manager.stop()
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from models.inference import DEFAULT_DECISION_THRESHOLD, load_scorer, model_feature_order, predict_critical_proba
+    from models.prediction_cache import CachedModel, model_file_version
+except ImportError:  # model_manager.py importado direto de models/
+    from inference import DEFAULT_DECISION_THRESHOLD, load_scorer, model_feature_order, predict_critical_proba
+    from prediction_cache import CachedModel, model_file_version
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_REGISTRY_PATH = PROJECT_ROOT / 'models' / 'registry.json'
+DEFAULT_POLL_INTERVAL = 5.0   # segundos entre verificações do registry
+DEFAULT_WARMUP_ROWS = 256     # linhas do lote sintético quando não há warmup_data
+
+
+@dataclass(frozen=True)
+class ModelHandle:
+    """Modelo carregado + identificação; imutável (trocado inteiro no swap)."""
+
+    model: object
+    model_id: str
+    version: str
+    model_path: Path
+    model_version: str          # hash dos arquivos (chave do cache de predições)
+    feature_order: list
+    decision_threshold: float = DEFAULT_DECISION_THRESHOLD
+    metadata: dict = field(default_factory=dict)
+    loaded_at: str = None
+    warmup_seconds: float = 0.0
+
+    def summary(self):
+        return {
+            'model_id': self.model_id,
+            'version': self.version,
+            'model_path': str(self.model_path),
+            'model_version': self.model_version,
+            'decision_threshold': self.decision_threshold,
+            'loaded_at': self.loaded_at,
+            'warmup_seconds': round(self.warmup_seconds, 4),
+        }
+
+
+def active_registry_entry(registry):
+    """
+    Entrada com status "active" do registry.
+
+    Raises:
+        ValueError: Nenhum modelo ativo
+    """
+    for entry in registry.get('models', []):
+        if entry.get('status') == 'active':
+            return entry
+    raise ValueError("Registry sem modelo com status 'active'")
+
+
+def shadow_registry_entries(registry):
+    """Entradas com status "shadow" (candidatos scorados em paralelo ao ativo)."""
+    return [entry for entry in registry.get('models', []) if entry.get('status') == 'shadow']
+
+
+def resolve_model_path(entry, base_dir=PROJECT_ROOT, prefer_artifact=True):
+    """
+    Caminho a carregar: artefato de inferência (se existir e prefer_artifact) ou .pkl.
+
+    Args:
+        entry (dict): Entrada do registry
+        base_dir: Raiz dos caminhos relativos do registry
+        prefer_artifact (bool): Usa inference_artifact_path quando disponível
+    """
+    base_dir = Path(base_dir)
+    artifact = entry.get('inference_artifact_path')
+    if prefer_artifact and artifact and (base_dir / artifact).is_dir():
+        return base_dir / artifact
+    return base_dir / entry['model_path']
+
+
+def _read_json(path):
+    if path is None or not Path(path).exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def load_model_handle(model_path, model_id=None, version=None, metadata=None, fast=True, cache=None,
+                      warmup_data=None, warmup_rows=DEFAULT_WARMUP_ROWS):
+    """
+    Carrega e aquece um modelo (bloqueante; chamado fora do caminho das requisições).
+
+    Args:
+        model_path: Pipeline .pkl ou diretório do artefato de inferência
+        model_id, version: Identificação (default: nome do arquivo / "unknown")
+        metadata (dict): Metadata do modelo (decision_threshold, feature_importance, ...)
+        fast (bool): Compila pipelines .pkl (compile_pipeline)
+        cache (PredictionCache): Cache compartilhado; o modelo vira CachedModel
+        warmup_data (DataFrame): Features de amostra; aquece o modelo e o cache
+        warmup_rows (int): Linhas de NaN (imputadas) quando não há warmup_data
+
+    Returns:
+        ModelHandle
+    """
+    model_path = Path(model_path)
+    metadata = metadata or {}
+    model = load_scorer(model_path, fast=fast)
+
+    feature_order = model_feature_order(model)
+    if feature_order is None:
+        raise ValueError("Modelo não expõe a ordem das features (feature_names_in_)")
+    feature_order = list(feature_order)
+
+    version_hash = model_file_version(model_path)
+    served = CachedModel(model, cache, version_hash) if cache is not None else model
+
+    start = time.perf_counter()
+    if warmup_data is not None and len(warmup_data):
+        # Amostra real passa pelo cache: a nova versão já começa com essas entradas
+        sample = warmup_data.reindex(columns=feature_order)
+        probabilities = predict_critical_proba(served, sample)
+    else:
+        sample = pd.DataFrame(np.full((warmup_rows, len(feature_order)), np.nan), columns=feature_order)
+        probabilities = predict_critical_proba(model, sample)   # NaN repetido não vai ao cache
+    if not np.all(np.isfinite(probabilities)):
+        raise ValueError("Warm-up produziu probabilidades inválidas")
+    warmup_seconds = time.perf_counter() - start
+
+    return ModelHandle(
+        model=served,
+        model_id=model_id or model_path.name,
+        version=version or 'unknown',
+        model_path=model_path,
+        model_version=version_hash,
+        feature_order=feature_order,
+        # Metadata do registry; senão o threshold gravado no artefato de inferência
+        decision_threshold=metadata.get('decision_threshold',
+                                        getattr(model, 'decision_threshold', DEFAULT_DECISION_THRESHOLD)),
+        metadata=metadata,
+        loaded_at=datetime.now().isoformat(timespec='seconds'),
+        warmup_seconds=warmup_seconds,
+    )
+
+
+class ModelManager:
+    """
+    Modelo ativo do registry com reload em background e troca atômica.
+
+    Thread-safe: current() é uma leitura de atributo; o watcher é a única
+    thread que carrega modelos.
+    """
+
+    def __init__(
+        self,
+        registry_path=DEFAULT_REGISTRY_PATH,
+        model_path=None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        fast: bool = True,
+        prefer_artifact: bool = True,
+        cache=None,
+        warmup_data=None,
+        warmup_rows: int = DEFAULT_WARMUP_ROWS,
+        base_dir=None,
+        shadows: bool = False,
+    ):
+        """
+        Args:
+            registry_path: models/registry.json (None = modelo fixo em model_path, sem watcher)
+            model_path: Modelo fixo quando registry_path=None
+            poll_interval: Segundos entre verificações do registry
+            fast: Compila pipelines .pkl (compile_pipeline)
+            prefer_artifact: Usa inference_artifact_path do registry quando existir
+            cache (PredictionCache): Cache compartilhado entre versões (chave inclui a versão)
+            warmup_data (DataFrame): Lote de amostra do warm-up (ex.: devices recentes)
+            warmup_rows: Linhas sintéticas do warm-up sem warmup_data
+            base_dir: Raiz dos caminhos relativos do registry (default: raiz do projeto)
+            shadows: Carrega também os modelos com status "shadow" (requer registry_path)
+        """
+        if registry_path is None and model_path is None:
+            raise ValueError("Informe registry_path ou model_path")
+        if shadows and registry_path is None:
+            raise ValueError("Modelos shadow exigem registry_path")
+
+        self.registry_path = Path(registry_path) if registry_path is not None else None
+        self.model_path = Path(model_path) if model_path is not None else None
+        self.poll_interval = poll_interval
+        self.fast = fast
+        self.prefer_artifact = prefer_artifact
+        self.cache = cache
+        self.warmup_data = warmup_data
+        self.warmup_rows = warmup_rows
+        self.base_dir = Path(base_dir) if base_dir is not None else PROJECT_ROOT
+        self.shadows = shadows
+
+        self.swaps = 0
+        self.failed_loads = 0
+        self.last_error = None
+        self.last_check = None
+
+        self._handle = None
+        self._deployed = None          # identificação do que está servindo
+        self._shadows = ()
+        self._shadow_deployed = {}     # identificação → ModelHandle dos shadows carregados
+        self._registry_stat = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Leitura (caminho das requisições)
+    # ------------------------------------------------------------------
+    @property
+    def ready(self):
+        return self._handle is not None
+
+    def current(self):
+        """
+        Handle do modelo ativo; use o mesmo handle durante toda a requisição.
+
+        Raises:
+            RuntimeError: Nenhum modelo carregado ainda
+        """
+        handle = self._handle
+        if handle is None:
+            raise RuntimeError("Nenhum modelo carregado (ModelManager.start/reload)")
+        return handle
+
+    def shadow_handles(self):
+        """Handles dos modelos shadow (tupla, possivelmente vazia)."""
+        return self._shadows
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+    def _target(self):
+        """(model_path, model_id, version, metadata) do que deveria estar servindo."""
+        if self.registry_path is None:
+            return self.model_path, None, None, {}
+
+        return self._entry_target(active_registry_entry(_read_json(self.registry_path)))
+
+    def _entry_target(self, entry):
+        model_path = resolve_model_path(entry, self.base_dir, self.prefer_artifact)
+        metadata_path = entry.get('metadata_path')
+        metadata = _read_json(self.base_dir / metadata_path) if metadata_path else {}
+        return model_path, entry.get('model_id'), entry.get('version'), metadata
+
+    def reload(self, force=False):
+        """
+        Carrega o modelo ativo (e os shadows) se mudou e troca o handle (bloqueante).
+
+        Args:
+            force (bool): Recarrega mesmo sem mudança
+
+        Returns:
+            True se o modelo ativo foi trocado
+        """
+        with self._reload_lock:
+            self.last_check = datetime.now().isoformat(timespec='seconds')
+            swapped = self._reload_active(force)
+            if self.shadows:
+                self._reload_shadows(force)
+            return swapped
+
+    def _reload_active(self, force):
+        try:
+            model_path, model_id, version, metadata = self._target()
+            deployed = (model_id, version, str(model_path), model_file_version(model_path))
+            if not force and deployed == self._deployed:
+                return False
+
+            handle = load_model_handle(
+                model_path, model_id=model_id, version=version, metadata=metadata, fast=self.fast,
+                cache=self.cache, warmup_data=self.warmup_data, warmup_rows=self.warmup_rows
+            )
+        except Exception as e:
+            self.failed_loads += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            if self._handle is None:
+                raise
+            logger.exception("❌ Falha ao carregar o novo modelo; mantendo %s", self._handle.version)
+            return False
+
+        previous = self._handle
+        self._handle = handle          # troca atômica
+        self._deployed = deployed
+        self.last_error = None
+        if previous is not None:
+            self.swaps += 1
+            logger.info(f"🔄 Modelo trocado: {previous.model_id} {previous.version} → "
+                        f"{handle.model_id} {handle.version}")
+        else:
+            logger.info(f"✅ Modelo carregado: {handle.model_id} {handle.version} ({handle.model_path.name})")
+        return True
+
+    def _reload_shadows(self, force):
+        """
+        Recarrega os shadows do registry; os que não mudaram mantêm o handle.
+
+        Sem cache de predições (não disputam o LRU do modelo ativo). Um shadow
+        que falha fica de fora até a próxima mudança no registry.
+        """
+        try:
+            entries = shadow_registry_entries(_read_json(self.registry_path))
+        except Exception as e:
+            self.failed_loads += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("❌ Falha ao ler os modelos shadow do registry")
+            return
+
+        loaded = {}
+        for entry in entries:
+            try:
+                model_path, model_id, version, metadata = self._entry_target(entry)
+                deployed = (model_id, version, str(model_path), model_file_version(model_path))
+                handle = None if force else self._shadow_deployed.get(deployed)
+                if handle is None:
+                    handle = load_model_handle(
+                        model_path, model_id=model_id, version=version, metadata=metadata, fast=self.fast,
+                        warmup_data=self.warmup_data, warmup_rows=self.warmup_rows
+                    )
+                    logger.info(f"👥 Shadow carregado: {handle.model_id} {handle.version} ({handle.model_path.name})")
+                loaded[deployed] = handle
+            except Exception as e:
+                self.failed_loads += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("❌ Falha ao carregar o shadow %s", entry.get('model_id'))
+
+        self._shadows = tuple(loaded.values())   # troca atômica
+        self._shadow_deployed = loaded
+
+    def _registry_changed(self):
+        try:
+            stat = self.registry_path.stat()
+        except FileNotFoundError:
+            return False
+        signature = (stat.st_mtime_ns, stat.st_size)
+        changed = signature != self._registry_stat
+        self._registry_stat = signature
+        return changed
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            if self._registry_changed():
+                self.reload()
+
+    def start(self, watch=True):
+        """
+        Carrega o modelo ativo (bloqueante) e inicia o watcher do registry.
+
+        Returns:
+            self (encadeável)
+        """
+        if self.registry_path is not None:
+            self._registry_changed()   # registra o mtime atual antes do primeiro load
+        if self._handle is None:
+            self.reload()
+        if watch and self.registry_path is not None and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name='model-registry-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        return {
+            'active': self._handle.summary() if self._handle is not None else None,
+            'shadows': [handle.summary() for handle in self._shadows],
+            'registry': str(self.registry_path) if self.registry_path is not None else None,
+            'swaps': self.swaps,
+            'failed_loads': self.failed_loads,
+            'last_error': self.last_error,
+            'last_check': self.last_check,
+            'watching': self._thread is not None,
+        }
@@ -0,0 +1,324 @@
+"""
+prediction_cache.py - Cache de predições por versão do modelo + hash das features
+
+Devices inativos reenviam o mesmo vetor de 30 features entre execuções e o
+Single Predict recebe o mesmo formulário várias vezes: a probabilidade não
+muda enquanto o modelo e as features forem os mesmos. A chave é
+blake2b(versão do modelo + vetor float64 em feature_order); o valor é só a
+probabilidade (prediction/risk_level/verdict são derivados com o threshold
+da chamada).
+
+- Memória: LRU (max_entries) + TTL (ttl_seconds)
+- Disco (opcional): SQLite, sobrevive entre execuções (scoring noturno)
+- Contadores: hits (memória/disco), misses, evictions, expirations
+
+Uso:
+    from models.prediction_cache import CachedModel, PredictionCache, model_file_version
+
+    cache = PredictionCache(max_entries=100_000, ttl_seconds=7 * 86400, disk_path='cache/predictions.sqlite')
+    model = CachedModel(pipeline, cache, model_file_version('models/catboost_pipeline_v2_field_only.pkl'))
+    scores = score_devices(features_df, model)     # só os misses vão ao modelo
+    cache.stats()
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from models.inference import DEFAULT_DECISION_THRESHOLD, model_feature_order, predict_critical_proba
+    from models.scoring_metrics import stage
+except ImportError:  # prediction_cache.py importado direto de models/
+    from inference import DEFAULT_DECISION_THRESHOLD, model_feature_order, predict_critical_proba
+    from scoring_metrics import stage
+
+DEFAULT_MAX_ENTRIES = 100_000
+SQLITE_MAX_PARAMS = 900  # Limite de parâmetros por SELECT ... IN (...)
+
+
+def model_file_version(model_path, length=16):
+    """
+    Versão do modelo derivada do conteúdo do .pkl (muda a cada retreino).
+
+    Args:
+        model_path: Caminho do modelo (.pkl ou diretório do artefato de inferência)
+        length: Caracteres hex da versão
+
+    Returns:
+        str com o hash do(s) arquivo(s)
+    """
+    model_path = Path(model_path)
+    files = sorted(p for p in model_path.rglob('*') if p.is_file()) if model_path.is_dir() else [model_path]
+
+    digest = hashlib.blake2b(digest_size=16)
+    for path in files:
+        digest.update(path.relative_to(model_path).as_posix().encode() if model_path.is_dir() else b'')
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:length]
+
+
+def feature_keys(X, model_version):
+    """
+    Chave de cache por device.
+
+    Args:
+        X (array): (n_devices, n_features) já em feature_order
+        model_version (str): Versão do modelo
+
+    Returns:
+        list de bytes (16 bytes por device)
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    # Forma canônica: -0.0 → 0.0 e um único padrão de bits para NaN
+    X = np.where(np.isnan(X), np.nan, X + 0.0)
+
+    base = hashlib.blake2b(str(model_version).encode(), digest_size=16)
+    keys = []
+    for row in X:
+        digest = base.copy()
+        digest.update(row.tobytes())
+        keys.append(digest.digest())
+    return keys
+
+
+class PredictionCache:
+    """
+    Cache de probabilidades em dois níveis (memória LRU/TTL + SQLite opcional).
+
+    Thread-safe: o serviço HTTP e as páginas Streamlit chamam de várias threads.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=None, disk_path=None, clock=time.time):
+        """
+        Args:
+            max_entries (int): Entradas em memória (LRU acima disso)
+            ttl_seconds (float): Validade de uma entrada (None = sem expiração)
+            disk_path: Arquivo SQLite do nível em disco (None = só memória)
+            clock: Fonte de tempo (epoch em segundos; TTL vale entre execuções)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if disk_path is not None:
+            disk_path = Path(disk_path)
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(disk_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key BLOB PRIMARY KEY, probability REAL NOT NULL, stored_at REAL NOT NULL)"
+            )
+            if ttl_seconds is not None:
+                self._db.execute("DELETE FROM predictions WHERE stored_at < ?", (self.clock() - ttl_seconds,))
+            self._db.commit()
+
+    def _expired(self, stored_at, now):
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def _remember(self, key, probability, stored_at):
+        """Insere em memória como mais recente, removendo o LRU se passar do limite."""
+        self._memory[key] = (probability, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_lookup(self, keys, now):
+        """{key: (probability, stored_at)} das chaves válidas no SQLite."""
+        found = {}
+        for start in range(0, len(keys), SQLITE_MAX_PARAMS):
+            block = keys[start:start + SQLITE_MAX_PARAMS]
+            rows = self._db.execute(
+                f"SELECT key, probability, stored_at FROM predictions WHERE key IN ({','.join('?' * len(block))})",
+                block
+            )
+            for key, probability, stored_at in rows:
+                if self._expired(stored_at, now):
+                    self.expirations += 1
+                else:
+                    found[bytes(key)] = (probability, stored_at)
+        return found
+
+    def get_many(self, keys):
+        """
+        Busca as probabilidades de uma lista de chaves.
+
+        Returns:
+            (probabilities, found): arrays alinhados com keys; found=False nos misses
+        """
+        probabilities = np.zeros(len(keys), dtype=np.float64)
+        found = np.zeros(len(keys), dtype=bool)
+        now = self.clock()
+
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                entry = self._memory.get(key)
+                if entry is not None and self._expired(entry[1], now):
+                    del self._memory[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    missing.append(i)
+                    continue
+                self._memory.move_to_end(key)
+                probabilities[i] = entry[0]
+                found[i] = True
+
+            if missing and self._db is not None:
+                on_disk = self._disk_lookup([keys[i] for i in missing], now)
+                still_missing = []
+                for i in missing:
+                    entry = on_disk.get(keys[i])
+                    if entry is None:
+                        still_missing.append(i)
+                        continue
+                    probabilities[i] = entry[0]
+                    found[i] = True
+                    self._remember(keys[i], *entry)
+                    self.disk_hits += 1
+                missing = still_missing
+
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        return probabilities, found
+
+    def put_many(self, keys, probabilities):
+        """Guarda probabilidades (memória e, se configurado, disco)."""
+        now = self.clock()
+        probabilities = [float(p) for p in probabilities]
+
+        with self._lock:
+            for key, probability in zip(keys, probabilities):
+                self._remember(key, probability, now)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO predictions (key, probability, stored_at) VALUES (?, ?, ?)",
+                    [(key, probability, now) for key, probability in zip(keys, probabilities)]
+                )
+                self._db.commit()
+
+    def clear(self):
+        """Remove todas as entradas (memória e disco); contadores mantidos."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'memory_entries': len(self._memory),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'disk': self._db is not None,
+        }
+
+
+class CachedModel:
+    """
+    Modelo com cache na frente: só os devices sem entrada válida vão ao modelo.
+
+    Mesma interface do FastInferenceModel (predict_proba_critical, predict_proba,
+    predict, feature_order): funciona em score_devices, predict_device,
+    predict_batch e no serviço HTTP.
+    """
+
+    def __init__(self, model, cache, model_version, decision_threshold=DEFAULT_DECISION_THRESHOLD):
+        """
+        Args:
+            model: Pipeline já carregado ou FastInferenceModel
+            cache (PredictionCache): Cache compartilhado
+            model_version (str): Parte da chave (ex.: model_file_version(model_path))
+            decision_threshold (float): Threshold de predict()
+        """
+        feature_order = model_feature_order(model)
+        if feature_order is None:
+            raise ValueError("Modelo não expõe a ordem das features (feature_names_in_)")
+
+        self.model = model
+        self.cache = cache
+        self.model_version = str(model_version)
+        self.feature_order = list(feature_order)
+        self.decision_threshold = decision_threshold
+
+    def to_array(self, X):
+        """DataFrame, dict (1 device) ou array → float64 (n_devices, n_features) em feature_order."""
+        if isinstance(X, dict):
+            missing = [f for f in self.feature_order if f not in X]
+            if missing:
+                raise ValueError(f"Features ausentes: {missing}")
+            return np.array([[X[f] for f in self.feature_order]], dtype=np.float64)
+
+        if isinstance(X, pd.DataFrame):
+            missing = [f for f in self.feature_order if f not in X.columns]
+            if missing:
+                raise ValueError(f"Features ausentes: {missing}")
+            return X[self.feature_order].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.feature_order):
+            raise ValueError(f"Esperado {len(self.feature_order)} features, recebido {X.shape[1]}")
+        return X
+
+    def predict_proba_critical(self, X):
+        """Probabilidade de CRITICAL; misses são scorados em UMA chamada ao modelo."""
+        with stage('to_array'):
+            X = self.to_array(X)
+        if len(X) == 0:
+            return np.empty(0, dtype=np.float64)
+
+        with stage('cache_lookup'):
+            keys = feature_keys(X, self.model_version)
+            probabilities, found = self.cache.get_many(keys)
+
+        if not found.all():
+            miss = np.flatnonzero(~found)
+            scored = predict_critical_proba(self.model, pd.DataFrame(X[miss], columns=self.feature_order))
+            probabilities[miss] = scored
+            self.cache.put_many([keys[i] for i in miss], scored)
+
+        return probabilities
+
+    def predict_proba(self, X):
+        """Mesma saída de pipeline.predict_proba: (n_devices, 2)."""
+        probabilities = self.predict_proba_critical(X)
+        return np.column_stack([1 - probabilities, probabilities])
+
+    def predict(self, X):
+        """Label 0/1 derivado da probabilidade (cacheada)."""
+        return (self.predict_proba_critical(X) >= self.decision_threshold).astype(int)
@@ -0,0 +1,324 @@
+"""
+scoring_metrics.py - Latência por estágio e throughput do scoring (formato Prometheus)
+
+O scoring passa por estágios com custos bem diferentes: montar o DataFrame,
+coagir tipos (check_feature_types), converter para array, imputar,
+CatBoost e montar o resultado. Cada estágio é envolvido por
+`with stage('nome'):` e alimenta um histograma de latência; score_devices e
+predict_device contam devices e chamadas.
+
+- Desligado (default): stage() devolve um timer nulo compartilhado e
+  count_rows() retorna na hora; sem alocação nem relógio (~0.1 µs/estágio)
+- Ligado: enable_metrics() (ou SCORING_METRICS=1 no ambiente)
+- Exportação: render_prometheus() (texto 0.0.4), snapshot() (dict com
+  p50/p95 estimados) e serve_metrics() (GET /metrics numa thread)
+- Multi-processo: drain_stages() no worker devolve os histogramas
+  acumulados (e zera); merge_stages() soma no processo pai
+
+Uso:
+    from models.scoring_metrics import enable_metrics, render_prometheus, serve_metrics
+
+    metrics = enable_metrics()
+    scores = score_devices(X, model)
+    print(render_prometheus())
+    serve_metrics(port=9108)            # endpoint opcional para o Prometheus
+"""
+
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Limites (s) dos buckets: 50 µs (1 device no fast path) até 10 s (lotes grandes)
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_METRICS_PORT = 9108
+
+# Estágios instrumentados (na ordem do caminho de scoring)
+STAGES = ('dataframe', 'coerce', 'to_array', 'cache_lookup', 'impute', 'catboost', 'pipeline', 'assemble', 'shap')
+
+
+class Histogram:
+    """Histograma de latência com buckets fixos (não cumulativos internamente)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)   # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def state(self):
+        """(contagens por bucket, soma, total): serializável, para merge entre processos."""
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def merge(self, counts, total, count):
+        """Soma o estado de outro histograma com os mesmos buckets."""
+        with self._lock:
+            self.counts = [a + b for a, b in zip(self.counts, counts)]
+            self.sum += total
+            self.count += count
+
+    def cumulative(self):
+        """[(limite, contagem acumulada)] incluindo +Inf."""
+        with self._lock:
+            counts = list(self.counts)
+        total, result = 0, []
+        for bound, count in zip(self.bounds + (float('inf'),), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q):
+        """Quantil estimado por interpolação linear dentro do bucket (como histogram_quantile)."""
+        buckets = self.cumulative()
+        total = buckets[-1][1]
+        if total == 0:
+            return None
+        rank = q * total
+        lower, previous = 0.0, 0
+        for bound, cumulative in buckets:
+            if cumulative >= rank:
+                if bound == float('inf'):
+                    return lower
+                in_bucket = cumulative - previous
+                return lower + (bound - lower) * ((rank - previous) / in_bucket if in_bucket else 0.0)
+            lower, previous = bound, cumulative
+        return lower
+
+
+class _StageTimer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """Timer do modo desligado: um único objeto, sem relógio."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class ScoringMetrics:
+    """Histogramas por estágio + contadores de devices/chamadas."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.rows = 0
+        self.calls = 0
+        self.started_at = time.time()
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self._stages.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(name, Histogram(self.buckets))
+        return histogram
+
+    def stage(self, name):
+        return _StageTimer(self.histogram(name))
+
+    def count_rows(self, n):
+        with self._lock:
+            self.rows += n
+            self.calls += 1
+
+    def _stage_items(self):
+        with self._lock:
+            items = list(self._stages.items())
+        return sorted(items, key=lambda item: _stage_rank(item[0]))
+
+    def drain_stages(self):
+        """{estágio: Histogram.state()} e zera os estágios (worker → processo pai)."""
+        with self._lock:
+            stages, self._stages = self._stages, {}
+        return {name: histogram.state() for name, histogram in stages.items()}
+
+    def merge_stages(self, stages):
+        """Soma estágios exportados por drain_stages (mesmos buckets)."""
+        for name, state in stages.items():
+            self.histogram(name).merge(*state)
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+            self.rows = 0
+            self.calls = 0
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """
+        Resumo em dict: por estágio count/total/mean/p50/p95 (s) e a fração do
+        tempo instrumentado; devices, chamadas e devices/s de tempo de scoring.
+        """
+        stages = {}
+        for name, histogram in self._stage_items():
+            stages[name] = {
+                'count': histogram.count,
+                'total_seconds': histogram.sum,
+                'mean_seconds': histogram.sum / histogram.count if histogram.count else 0.0,
+                'p50_seconds': histogram.quantile(0.5),
+                'p95_seconds': histogram.quantile(0.95),
+            }
+        instrumented = sum(s['total_seconds'] for s in stages.values())
+        for s in stages.values():
+            s['share'] = s['total_seconds'] / instrumented if instrumented else 0.0
+        return {
+            'rows': self.rows,
+            'calls': self.calls,
+            'instrumented_seconds': instrumented,
+            'rows_per_second': self.rows / instrumented if instrumented else 0.0,
+            'stages': stages,
+        }
+
+    def render_prometheus(self, prefix='scoring'):
+        """Texto no formato de exposição do Prometheus (0.0.4)."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Latência por estágio do scoring",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for name, histogram in self._stage_items():
+            for bound, cumulative in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {histogram.sum!r}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+        lines += [
+            f"# HELP {prefix}_rows_total Devices scorados",
+            f"# TYPE {prefix}_rows_total counter",
+            f"{prefix}_rows_total {self.rows}",
+            f"# HELP {prefix}_calls_total Chamadas de scoring (lotes ou devices únicos)",
+            f"# TYPE {prefix}_calls_total counter",
+            f"{prefix}_calls_total {self.calls}",
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def _stage_rank(name):
+    return (STAGES.index(name), name) if name in STAGES else (len(STAGES), name)
+
+
+# ----------------------------------------------------------------------
+# Instância do processo (None = desligado)
+# ----------------------------------------------------------------------
+_ACTIVE = None
+
+
+def stage(name):
+    """Context manager que mede um estágio; no-op compartilhado se desligado."""
+    metrics = _ACTIVE
+    if metrics is None:
+        return _NULL_TIMER
+    return metrics.stage(name)
+
+
+def count_rows(n):
+    """Conta n devices scorados em uma chamada (no-op se desligado)."""
+    metrics = _ACTIVE
+    if metrics is not None:
+        metrics.count_rows(n)
+
+
+def drain_stages():
+    """Estágios medidos desde a última chamada (None se desligado); ver merge_stages."""
+    metrics = _ACTIVE
+    return metrics.drain_stages() if metrics is not None else None
+
+
+def merge_stages(stages):
+    """Soma estágios medidos em outro processo (no-op se desligado ou sem estágios)."""
+    metrics = _ACTIVE
+    if metrics is not None and stages:
+        metrics.merge_stages(stages)
+
+
+def enable_metrics(buckets=DEFAULT_BUCKETS):
+    """Liga a instrumentação (mantém a instância se já ligada)."""
+    global _ACTIVE
+    if _ACTIVE is None:
+        _ACTIVE = ScoringMetrics(buckets)
+    return _ACTIVE
+
+
+def disable_metrics():
+    global _ACTIVE
+    _ACTIVE = None
+
+
+def get_metrics():
+    """ScoringMetrics ativo ou None."""
+    return _ACTIVE
+
+
+def render_prometheus():
+    """Exposição Prometheus da instância ativa ('' se desligado)."""
+    return _ACTIVE.render_prometheus() if _ACTIVE is not None else ''
+
+
+def serve_metrics(host='127.0.0.1', port=DEFAULT_METRICS_PORT):
+    """
+    Endpoint GET /metrics numa thread daemon (liga a instrumentação).
+
+    Para processos sem servidor HTTP próprio (Streamlit, score_fleet);
+    o scoring_service.py expõe /metrics na própria porta.
+
+    Returns:
+        ThreadingHTTPServer (server.server_address tem a porta efetiva;
+        server.shutdown() encerra)
+    """
+    enable_metrics()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0].rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='scoring-metrics', daemon=True).start()
+    return server
+
+
+if os.environ.get('SCORING_METRICS') == '1':
+    enable_metrics()
@@ -0,0 +1,293 @@
+"""
+shadow_scoring.py - Scoring shadow: candidatos scorados na mesma matriz do modelo ativo
+
+Avaliar um candidato (ex.: v2.1 contra o v2 em produção) exigia scripts
+separados que recarregavam CSVs, refaziam features e rescoravam tudo. Aqui
+os modelos com status "shadow" no registry recebem exatamente a matriz de
+features que o modelo ativo acabou de scorar:
+
+- Matriz preparada UMA vez (pelo caminho principal); cada shadow só faz
+  reindex se a ordem das features dele for diferente
+- Fora do caminho da resposta: submit() só enfileira (fila limitada, sem
+  bloquear; fila cheia → lote descartado e contado em `dropped`). Uma
+  thread de fundo scora os shadows, opcionalmente em paralelo (threads; o
+  CatBoost libera o GIL)
+- Divergências em logs/shadow/YYYY-MM-DD.jsonl: decisão diferente
+  (NORMAL ↔ CRITICAL, shadows decididos no threshold usado pelo modelo
+  ativo) ou |Δ probabilidade| >= probability_tolerance
+- stats(): por shadow, devices comparados, taxa de decisões trocadas,
+  Δ probabilidade média/máxima e latência
+
+Uso:
+    from models.shadow_scoring import ShadowScorer
+
+    shadow = ShadowScorer(manager.shadow_handles, parallel=True)
+    scores = score_devices(X, handle.model, threshold)      # resposta
+    shadow.submit(X, scores, handle, device_ids, threshold)  # O(1), não espera
+    shadow.close()
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from models.audit_log import json_device_id
+    from models.inference import derive_outcomes, predict_critical_proba
+except ImportError:  # shadow_scoring.py importado direto de models/
+    from audit_log import json_device_id
+    from inference import derive_outcomes, predict_critical_proba
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_DIR = Path(__file__).resolve().parent.parent / 'logs' / 'shadow'
+DEFAULT_QUEUE_SIZE = 100                   # lotes pendentes (1 lote = 1 chamada do caminho principal)
+DEFAULT_PROBABILITY_TOLERANCE = 0.1        # |Δ probabilidade| que conta como divergência
+
+_STOP = object()
+
+
+def model_key(handle):
+    """Identificação de um modelo nos logs e no stats ('model_id@version')."""
+    return f"{handle.model_id}@{handle.version}"
+
+
+def score_models(X, handles, parallel=False, executor=None, threshold=None):
+    """
+    Scora vários modelos na MESMA matriz de features.
+
+    Args:
+        X (DataFrame): Features (qualquer ordem de colunas; reindex só quando necessário)
+        handles: ModelHandles (models/model_manager.py)
+        parallel (bool): Um modelo por thread
+        executor (ThreadPoolExecutor): Pool reutilizado (default: criado para a chamada)
+        threshold (float): Threshold de decisão comum (default: decision_threshold de cada handle)
+
+    Returns:
+        dict model_key → {'prediction', 'probability', 'seconds'} (arrays alinhados com X)
+    """
+    columns = list(X.columns)
+
+    def score_one(handle):
+        start = time.perf_counter()
+        features = X if handle.feature_order == columns else X.reindex(columns=handle.feature_order)
+        probabilities = predict_critical_proba(handle.model, features)
+        outcomes = derive_outcomes(probabilities, handle.decision_threshold if threshold is None else threshold)
+        return model_key(handle), {
+            'prediction': outcomes['prediction'],
+            'probability': outcomes['probability'],
+            'seconds': time.perf_counter() - start,
+        }
+
+    if not parallel or len(handles) < 2:
+        return dict(score_one(handle) for handle in handles)
+    if executor is not None:
+        return dict(executor.map(score_one, handles))
+    with ThreadPoolExecutor(max_workers=len(handles), thread_name_prefix='shadow-model') as pool:
+        return dict(pool.map(score_one, handles))
+
+
+class _ShadowStats:
+    """Acumuladores de comparação de um shadow contra o modelo ativo."""
+
+    __slots__ = ('batches', 'devices', 'flips', 'disagreements', 'abs_diff_sum', 'max_abs_diff', 'seconds')
+
+    def __init__(self):
+        self.batches = 0
+        self.devices = 0
+        self.flips = 0
+        self.disagreements = 0
+        self.abs_diff_sum = 0.0
+        self.max_abs_diff = 0.0
+        self.seconds = 0.0
+
+    def summary(self):
+        return {
+            'batches': self.batches,
+            'devices': self.devices,
+            'decision_flips': self.flips,
+            'flip_rate': self.flips / self.devices if self.devices else 0.0,
+            'disagreements': self.disagreements,
+            'mean_abs_probability_diff': self.abs_diff_sum / self.devices if self.devices else 0.0,
+            'max_abs_probability_diff': self.max_abs_diff,
+            'mean_batch_seconds': self.seconds / self.batches if self.batches else 0.0,
+        }
+
+
+class ShadowScorer:
+    """
+    Fila + thread de fundo que scora os shadows e registra divergências.
+
+    Thread-safe: submit() pode ser chamado de qualquer thread de scoring.
+    """
+
+    def __init__(
+        self,
+        shadows,
+        log_dir=DEFAULT_LOG_DIR,
+        parallel: bool = False,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        probability_tolerance: float = DEFAULT_PROBABILITY_TOLERANCE,
+    ):
+        """
+        Args:
+            shadows: ModelHandles dos shadows, ou callable que os devolve a cada
+                lote (ex.: manager.shadow_handles, acompanha o hot reload)
+            log_dir: Diretório dos JSONL de divergências (None = só stats)
+            parallel: Scora os shadows em threads paralelas
+            queue_size: Lotes pendentes antes de descartar (não bloqueia o scoring)
+            probability_tolerance: |Δ probabilidade| registrado mesmo sem troca de decisão
+        """
+        self._shadows = shadows if callable(shadows) else (lambda handles=tuple(shadows): handles)
+        self.log_dir = Path(log_dir) if log_dir is not None else None
+        self.parallel = parallel
+        self.probability_tolerance = probability_tolerance
+
+        self.submitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._executor = ThreadPoolExecutor(thread_name_prefix='shadow-model') if parallel else None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='shadow-scoring', daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # API (caminho principal: só enfileira)
+    # ------------------------------------------------------------------
+    def submit(self, X, scores, handle, device_ids=None, threshold=None):
+        """
+        Enfileira um lote já scorado pelo modelo ativo (não bloqueia).
+
+        Args:
+            X (DataFrame): Matriz usada pelo modelo ativo (não deve ser alterada depois)
+            scores (DataFrame): Saída de score_devices do modelo ativo
+            handle (ModelHandle): Modelo ativo que gerou scores
+            device_ids: Identificação por device (default: índice de X)
+            threshold: Threshold com que scores foi decidido (default:
+                handle.decision_threshold); os shadows são decididos no mesmo
+                threshold, senão thresholds diferentes viram trocas de decisão
+
+        Returns:
+            True se enfileirado, False se descartado (fila cheia ou sem shadows)
+        """
+        if self._closed:
+            raise RuntimeError("ShadowScorer já fechado")
+        if not self._shadows():
+            return False
+        device_ids = np.asarray(X.index if device_ids is None else device_ids, dtype=object)
+        threshold = handle.decision_threshold if threshold is None else threshold
+        item = (datetime.now(), X, model_key(handle), threshold, np.asarray(scores['prediction']),
+                np.asarray(scores['probability'], dtype=np.float64), device_ids)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.dropped == 0:
+                logger.warning("⚠️  Fila do shadow scoring cheia: descartando lotes (ver ShadowScorer.dropped)")
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def flush(self, timeout=None):
+        """Espera os lotes já enfileirados serem scorados e registrados."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._stats_lock:
+            models = {key: stats.summary() for key, stats in self._stats.items()}
+        return {
+            'shadows': [model_key(handle) for handle in self._shadows()],
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'parallel': self.parallel,
+            'probability_tolerance': self.probability_tolerance,
+            'models': models,
+        }
+
+    # ------------------------------------------------------------------
+    # Thread de fundo
+    # ------------------------------------------------------------------
+    def _compare(self, item):
+        """Scora os shadows no lote e devolve as linhas de divergência."""
+        timestamp, X, primary, threshold, predictions, probabilities, device_ids = item
+        handles = self._shadows()
+        results = score_models(X, handles, self.parallel, self._executor, threshold)
+
+        lines = []
+        for key, result in results.items():
+            diff = result['probability'] - probabilities
+            abs_diff = np.abs(diff)
+            flipped = result['prediction'] != predictions
+            disagree = flipped | (abs_diff >= self.probability_tolerance)
+
+            with self._stats_lock:
+                stats = self._stats.setdefault(key, _ShadowStats())
+                stats.batches += 1
+                stats.devices += len(diff)
+                stats.flips += int(flipped.sum())
+                stats.disagreements += int(disagree.sum())
+                stats.abs_diff_sum += float(abs_diff.sum())
+                stats.max_abs_diff = max(stats.max_abs_diff, float(abs_diff.max(initial=0.0)))
+                stats.seconds += result['seconds']
+
+            for i in np.flatnonzero(disagree):
+                lines.append(json.dumps({
+                    'timestamp': timestamp.isoformat(timespec='seconds'),
+                    'device_id': json_device_id(device_ids[i]),
+                    'primary_model': primary,
+                    'shadow_model': key,
+                    'primary_prediction': int(predictions[i]),
+                    'shadow_prediction': int(result['prediction'][i]),
+                    'primary_probability': round(float(probabilities[i]), 4),
+                    'shadow_probability': round(float(result['probability'][i]), 4),
+                    'probability_diff': round(float(diff[i]), 4),
+                    'decision_flip': bool(flipped[i]),
+                }))
+        return timestamp, lines
+
+    def _write(self, timestamp, lines):
+        if not lines or self.log_dir is None:
+            return
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.log_dir / f"{timestamp:%Y-%m-%d}.jsonl", 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            try:
+                self._write(*self._compare(item))
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("❌ Erro no shadow scoring")
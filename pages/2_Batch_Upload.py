@@ -9,7 +9,8 @@ from pathlib import Path
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.model_loader import load_pipeline
+from utils.model_loader import get_model_manager, load_explainer
+from models.inference import score_devices
 from utils.preprocessing import (
     validate_features, 
     check_feature_types,
@@ -104,7 +105,9 @@ if uploaded_file is not None:
             with st.spinner(get_text('batch', 'predicting', lang).format(count=len(df))):
                 # Load model
                 try:
-                    model = load_pipeline()
+                    active_model = get_model_manager().current()
+                    model = active_model.model
+                    threshold = active_model.decision_threshold
                 except Exception as e:
                     st.error(f"❌ Error loading model: {e}")
                     st.stop()
@@ -114,22 +117,22 @@ if uploaded_file is not None:
                 
                 # Predict
                 try:
-                    predictions = model.predict(features_df)
-                    probabilities = model.predict_proba(features_df)[:, 1]
+                    # Single pass: prediction/risk_level/verdict derived from probabilities
+                    scores = score_devices(features_df, model, threshold=threshold)
                     
                     # Add results to dataframe
                     results_df = df.copy()
-                    results_df['prediction'] = predictions
-                    results_df['probability'] = probabilities
-                    results_df['risk_level'] = pd.cut(
-                        probabilities,
-                        bins=[0, 0.3, 0.7, 1.0],
-                        labels=['Low', 'Medium', 'High']
-                    )
-                    results_df['verdict'] = results_df['prediction'].map({
-                        0: 'NORMAL',
-                        1: 'CRITICAL'
-                    })
+                    for column in scores.columns:
+                        results_df[column] = scores[column].to_numpy()
+                    
+                    # Per-device top-3 SHAP contributors: one batched call for the whole file
+                    # (an explanation failure keeps the predictions, with empty top_features)
+                    try:
+                        explainer = load_explainer(active_model.model_version, model)
+                        results_df['top_features'] = explainer.top_contributors_frame(features_df, k=3)['top_features'].to_numpy()
+                    except Exception as e:
+                        results_df['top_features'] = ''
+                        st.warning(f"⚠️ Per-device explanations unavailable ({e}) - predictions shown without top features")
                     
                     # Store in session state
                     st.session_state['batch_results'] = results_df
@@ -208,7 +211,7 @@ if 'batch_results' in st.session_state:
     
     # Display table
     st.dataframe(
-        filtered_df[['device_id', 'prediction', 'probability', 'risk_level', 'verdict']] if 'device_id' in filtered_df.columns else filtered_df[['prediction', 'probability', 'risk_level', 'verdict']],
+        filtered_df[['device_id', 'prediction', 'probability', 'risk_level', 'verdict', 'top_features']] if 'device_id' in filtered_df.columns else filtered_df[['prediction', 'probability', 'risk_level', 'verdict', 'top_features']],
         use_container_width=True,
         height=400
     )
@@ -231,7 +234,7 @@ if 'batch_results' in st.session_state:
         critical_df = results_df[results_df['prediction'] == 1].sort_values('probability', ascending=False).head(10)
         
         st.dataframe(
-            critical_df[['device_id', 'probability', 'risk_level']] if 'device_id' in critical_df.columns else critical_df[['probability', 'risk_level']],
+            critical_df[['device_id', 'probability', 'risk_level', 'top_features']] if 'device_id' in critical_df.columns else critical_df[['probability', 'risk_level', 'top_features']],
             use_container_width=True
         )
 
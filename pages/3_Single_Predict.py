@@ -2,8 +2,22 @@
 Page 3: Single Prediction - Individual Device Assessment
 """
 import streamlit as st
-import pandas as pd
 import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.model_loader import get_model_manager, load_explainer
+from utils.visualization import create_metric_gauge
+from utils.preprocessing import TRAINING_FEATURE_ORDER
+from utils.translations import get_text, get_language_from_session
+from models.inference import predict_device
+
+# Get language
+lang = get_language_from_session(st.session_state)
+
 # Header
 st.title(get_text('single', 'title', lang))
 st.markdown(get_text('single', 'subtitle', lang))
@@ -12,9 +26,12 @@ st.markdown("---")
 
 # Load model and metadata
 try:
-    model = load_pipeline()
-    metadata = load_metadata()
+    # Snapshot of the active model: a hot reload mid-run doesn't change it
+    active_model = get_model_manager().current()
+    model = active_model.model
+    metadata = active_model.metadata
     feature_importance = metadata.get('feature_importance', {})
+    threshold = active_model.decision_threshold
 except Exception as e:
     st.error(f"❌ Error loading model: {e}")
     st.stop()
@@ -143,24 +160,13 @@ if submitted:
     st.markdown("---")
     st.subheader(get_text('single', 'result_title', lang))
     
-    # Create DataFrame from features
-    features_df = pd.DataFrame([features])
-    
-    # Predict
+    # Predict (single pass: prediction/risk_level derived from the probability)
     try:
-        prediction = model.predict(features_df)[0]
-        probability = model.predict_proba(features_df)[0, 1]
-        
-        # Determine risk level
-        if probability < 0.3:
-            risk_level = "Low"
-            risk_color = "green"
-        elif probability < 0.7:
-            risk_level = "Medium"
-            risk_color = "orange"
-        else:
-            risk_level = "High"
-            risk_color = "red"
+        ordered_features = {name: features[name] for name in TRAINING_FEATURE_ORDER}
+        result = predict_device(ordered_features, model, threshold=threshold)
+        prediction = result['prediction']
+        probability = result['probability']
+        risk_level = result['risk_level']
         
         # Display results
         col1, col2, col3 = st.columns(3)
@@ -176,7 +182,7 @@ if submitted:
             st.metric(
                 "Failure Probability",
                 f"{probability:.1%}",
-                delta=f"{(probability - 0.5):.1%} vs threshold"
+                delta=f"{(probability - threshold):.1%} vs threshold"
             )
         
         with col3:
@@ -218,7 +224,7 @@ if submitted:
             st.success(f"""
             **✅ NORMAL DEVICE**
             
-            This device shows **{probability:.1%}** probability of critical failure - below the 50% threshold.
+            This device shows **{probability:.1%}** probability of critical failure - below the {threshold:.0%} threshold.
             
             **Risk Level:** {risk_level}
             
@@ -228,11 +234,27 @@ if submitted:
             - ℹ️ Review if probability increases above 30% (Medium risk)
             """)
         
-        # Feature contributions (top 5 most important features in this prediction)
+        # Feature contributions (per-device SHAP: top 5 for THIS prediction)
         st.markdown("---")
         st.markdown("### 🔍 Top Contributing Features")
         
-        if feature_importance:
+        try:
+            explainer = load_explainer(active_model.model_version, model)
+            contributors = explainer.top_contributors(ordered_features, k=5)[0]
+        except Exception as e:
+            contributors = None
+            st.warning(f"⚠️ Per-device explanation unavailable ({e}) - showing global importance")
+        
+        if contributors:
+            st.caption(get_text('single', 'top_features_help', lang))
+            for contributor in contributors:
+                direction = "🔺 raises" if contributor['contribution'] > 0 else "🔻 lowers"
+                value = "missing → median" if contributor['imputed'] else f"{contributor['value']:.2f}"
+                st.markdown(
+                    f"- **{contributor['feature']}**: {value} "
+                    f"({direction} risk, SHAP {contributor['contribution']:+.2f} log-odds)"
+                )
+        elif feature_importance:
             # Get top 5 features by importance
             top_features = sorted(
                 feature_importance.items(),
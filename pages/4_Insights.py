@@ -10,7 +10,8 @@ from pathlib import Path
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.model_loader import load_pipeline, load_metadata
+from utils.model_loader import get_model_manager, load_metadata
+from models.inference import predict_critical_proba, derive_outcomes
 from utils.visualization import (
     plot_feature_importance,
     plot_confusion_matrix,
@@ -215,14 +216,16 @@ try:
     if st.button("🧪 Test Model on Synthetic Data"):
         with st.spinner("Running predictions on synthetic data..."):
             try:
-                model = load_pipeline()
+                active_model = get_model_manager().current()
+                model = active_model.model
                 
                 # Extract features (29 columns, exclude metadata)
                 feature_cols = [col for col in synthetic_df.columns if col in features_list or col.startswith(('optical', 'temp', 'battery', 'snr', 'rsrp', 'rsrq', 'total', 'max'))]
                 features_df = synthetic_df[feature_cols]
                 
-                predictions = model.predict(features_df)
-                probabilities = model.predict_proba(features_df)[:, 1]
+                # Single pass: labels derived from the probabilities
+                probabilities = predict_critical_proba(model, features_df)
+                predictions = derive_outcomes(probabilities, threshold=active_model.decision_threshold)['prediction']
                 
                 # Calculate metrics
                 synthetic_recall = predictions.sum() / len(predictions)
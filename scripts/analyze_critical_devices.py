@@ -13,6 +13,7 @@ Devices analisados:
 Dataset: payload_aws_BORA_transformed_v2.csv (640 devices, 31 colunas)
 """
 
+import sys
 import pandas as pd
 import numpy as np
 import joblib
@@ -20,6 +21,8 @@ from pathlib import Path
 
 # Configuração
 PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from models.inference import predict_critical_proba, derive_outcomes
 CSV_PATH = PROJECT_ROOT / "payloads_processed" / "payload_aws_BORA_transformed_v2.csv"
 MODEL_PATH = PROJECT_ROOT / "models" / "catboost_pipeline_v2_field_only.pkl"
 
@@ -140,14 +143,13 @@ def predict_device(model, df, device_id):
     # Extrair features na ordem correta
     X = device_row[FEATURES_ORDER].values
     
-    # Predição
-    prob = model.predict_proba(X)[0, 1]  # Probabilidade de classe 1 (crítico)
-    pred = model.predict(X)[0]  # Classe predita (0 ou 1)
+    # Predição (1 passada: classe derivada da probabilidade)
+    outcomes = derive_outcomes(predict_critical_proba(model, X))
     
     return {
-        'predicted_prob': prob,
-        'predicted_class': pred,
-        'risk_level': 'CRITICAL' if prob >= 0.5 else 'NORMAL'
+        'predicted_prob': outcomes['probability'][0],  # Probabilidade de classe 1 (crítico)
+        'predicted_class': outcomes['prediction'][0],  # Classe predita (0 ou 1)
+        'risk_level': outcomes['verdict'][0]
     }
 
 
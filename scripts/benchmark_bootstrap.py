@@ -0,0 +1,154 @@
+"""
+Benchmark do bootstrap das estatísticas de drift (drift_bootstrap.py).
+
+OBJETIVO: Medir o motor de reamostragem (contagens por device, ECDFs de um
+         bloco de reamostras por cumsum 2-D, blocos num pool de processos)
+         contra o loop serial equivalente (reamostrar linhas e chamar
+         compute_ks_statistics a cada reamostra), para segmentos pequenos
+         com as 29 features.
+
+MEDIDAS:
+- Tempo do loop serial vs motor vetorizado (1 processo) vs pool
+  (--jobs processos) por tamanho de segmento
+- Determinismo: mesma seed → reamostras idênticas com 1 ou N processos
+- Concordância: KS/Wasserstein de uma reamostra do motor vs
+  compute_ks_statistics nas mesmas linhas reamostradas
+
+Uso:
+    python scripts/benchmark_bootstrap.py
+    python scripts/benchmark_bootstrap.py --sizes 200 1000 5000 --resamples 1000 --jobs 4 \\
+        --output reports/benchmark_bootstrap.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+import drift_bootstrap
+from benchmark_drift import make_fleet
+from drift_bootstrap import BOOTSTRAP_METRICS, bootstrap_drift_statistics
+from drift_monitor import ALL_FEATURES, compute_ks_statistics
+
+DEFAULT_SIZES = [200, 1000, 5000]
+DEFAULT_RESAMPLES = 1000
+
+
+def serial_bootstrap(reference, production, n_resamples, seed=0):
+    """Loop anterior: uma chamada de compute_ks_statistics por reamostra."""
+    rng = np.random.default_rng(seed)
+    samples = {metric: np.empty((n_resamples, len(ALL_FEATURES))) for metric in BOOTSTRAP_METRICS}
+    for i in range(n_resamples):
+        ref = reference.iloc[rng.integers(0, len(reference), len(reference))]
+        prod = production.iloc[rng.integers(0, len(production), len(production))]
+        results = compute_ks_statistics(ref, prod)
+        for metric in BOOTSTRAP_METRICS:
+            samples[metric][i] = [results[f][metric] for f in ALL_FEATURES]
+    return samples
+
+
+def agreement(reference, production):
+    """Maior |Δ| entre o motor e compute_ks_statistics numa reamostra (KS e Wasserstein/std)."""
+    state = drift_bootstrap._prepare(reference, production, ALL_FEATURES, drift_bootstrap.DEFAULT_BIN_QUANTILES)
+    seed_sequence = np.random.SeedSequence(1)
+    drift_bootstrap._init_worker(state)
+    block = drift_bootstrap._bootstrap_block((seed_sequence, 1))
+    drift_bootstrap._init_worker(None)
+
+    rng = np.random.default_rng(seed_sequence)
+    ref_counts = drift_bootstrap._device_counts(rng, 1, len(reference))[0]
+    prod_counts = drift_bootstrap._device_counts(rng, 1, len(production))[0]
+    exact = compute_ks_statistics(reference.iloc[np.repeat(np.arange(len(reference)), ref_counts)],
+                                  production.iloc[np.repeat(np.arange(len(production)), prod_counts)])
+    return {
+        metric: max(abs(exact[f][metric] - block[metric][0, j]) for j, f in enumerate(ALL_FEATURES))
+        for metric in ('ks_statistic', 'wasserstein_std')
+    }
+
+
+def benchmark_size(size, n_resamples, jobs, serial_max):
+    reference = make_fleet(size, 0)
+    production = make_fleet(max(size // 2, 2), 1, shift=0.2)
+
+    row = {'devices': size, 'production_devices': len(production), 'resamples': n_resamples}
+
+    start = time.perf_counter()
+    single = bootstrap_drift_statistics(reference, production, n_resamples=n_resamples, n_jobs=1)
+    row['vectorized_seconds'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pooled = bootstrap_drift_statistics(reference, production, n_resamples=n_resamples, n_jobs=jobs)
+    row['pool_seconds'] = time.perf_counter() - start
+    row['deterministic'] = all(
+        np.array_equal(single.samples[m], pooled.samples[m], equal_nan=True) for m in BOOTSTRAP_METRICS
+    ) and np.array_equal(single.permutation_p_values, pooled.permutation_p_values, equal_nan=True)
+
+    if size <= serial_max:
+        start = time.perf_counter()
+        serial_bootstrap(reference, production, n_resamples)
+        row['serial_seconds'] = time.perf_counter() - start
+        row['speedup'] = row['serial_seconds'] / row['vectorized_seconds']
+
+    row['max_abs_diff'] = agreement(reference, production)
+    return row
+
+
+def print_report(report):
+    print("\n" + "=" * 78)
+    print(f"BOOTSTRAP DE DRIFT ({len(ALL_FEATURES)} features, {report['jobs']} processos no pool, "
+          f"{os.cpu_count()} CPUs)")
+    print("=" * 78)
+    print(f"{'devices':>8} {'reamostras':>10} {'serial (s)':>11} {'vetor. (s)':>11} {'pool (s)':>9} "
+          f"{'speedup':>8} {'determ.':>8}")
+    for row in report['results']:
+        serial = f"{row['serial_seconds']:.2f}" if 'serial_seconds' in row else '-'
+        speedup = f"{row['speedup']:.1f}x" if 'speedup' in row else '-'
+        print(f"{row['devices']:>8,} {row['resamples']:>10,} {serial:>11} {row['vectorized_seconds']:>11.2f} "
+              f"{row['pool_seconds']:>9.2f} {speedup:>8} {str(row['deterministic']):>8}")
+    for row in report['results']:
+        diffs = ', '.join(f"{k}={v:.1e}" for k, v in row['max_abs_diff'].items())
+        print(f"   {row['devices']:,} devices, max |Δ| vs compute_ks_statistics: {diffs}")
+    print("=" * 78)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark do bootstrap das estatísticas de drift')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Devices de referência por segmento (produção: metade) (default: 200 1000 5000)')
+    parser.add_argument('--resamples', type=int, default=DEFAULT_RESAMPLES, help='Reamostras (default: 1000)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Processos do pool (default: CPUs)')
+    parser.add_argument('--serial-max', type=int, default=1000,
+                        help='Maior segmento medido também com o loop serial (default: 1000)')
+    parser.add_argument('--output', default=None, help='JSON de saída com os resultados')
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore')
+
+    results = []
+    for size in args.sizes:
+        print(f"   {size:,} devices...")
+        results.append(benchmark_size(size, args.resamples, args.jobs, args.serial_max))
+
+    report = {'generated_at': datetime.now().isoformat(), 'jobs': args.jobs, 'cpus': os.cpu_count(),
+              'results': results}
+    print_report(report)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Resultados salvos: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark das explicações SHAP por device (models/explanations.py).
+
+OBJETIVO: Medir quanto custa explicar 1, 1.000 e 100.000 devices com o
+         ShapValues nativo do CatBoost em lote, com e sem cache, e quanto
+         o lote ganha sobre uma chamada por device.
+
+MEDIDAS:
+- Frio: cache vazio, devices distintos (1 chamada ShapValues para o lote)
+- Quente: mesmo lote de novo (tudo do cache; só hash + top-k)
+- Por device (lotes até --loop-max): uma chamada ShapValues por device
+- Paridade: base_value + soma das contribuições = score bruto do CatBoost
+
+Uso:
+    python scripts/benchmark_explanations.py
+    python scripts/benchmark_explanations.py --sizes 1 1000 100000 --top-k 5 \\
+        --output reports/benchmark_explanations.json
+"""
+
+import argparse
+import json
+import sys
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODEL_PATH = PROJECT_ROOT / "models" / "catboost_v2_field_only_inference"
+TEST_DATA_PATH = PROJECT_ROOT / "data" / "device_features_test_stratified.csv"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+from models.explanations import DEFAULT_TOP_K, ShapExplainer
+from models.inference import load_scorer
+from models.prediction_cache import model_file_version
+
+DEFAULT_SIZES = [1, 1_000, 100_000]
+
+
+def make_devices(X, n, seed=0):
+    """n devices distintos (amostra com ruído mínimo: nenhum hit acidental no cache)."""
+    rng = np.random.default_rng(seed)
+    devices = X.sample(n, replace=True, random_state=seed).reset_index(drop=True)
+    return devices + rng.normal(0, 1e-3, devices.shape)
+
+
+def check_additivity(explainer, X):
+    """max |base + Σ contribuições − score bruto| (deve ser ~1e-12)."""
+    model = explainer.model
+    raw = model.to_array(X)
+    imputed = np.where(np.isnan(raw), model.medians, raw)
+    expected = model.classifier.predict(imputed, prediction_type='RawFormulaVal')
+    contributions = explainer.shap_values(raw)
+    return float(np.abs(explainer.base_value + contributions.sum(axis=1) - expected).max())
+
+
+def benchmark_size(explainer, X, size, top_k, loop_max):
+    """Frio / quente / por device para um tamanho de lote."""
+    devices = make_devices(X, size, seed=size)
+    explainer.cache.clear()
+
+    start = time.perf_counter()
+    explainer.top_contributors(devices, top_k)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    explainer.top_contributors(devices, top_k)
+    warm = time.perf_counter() - start
+
+    row = {
+        'devices': size,
+        'cold_seconds': cold,
+        'cold_us_per_device': cold / size * 1e6,
+        'warm_seconds': warm,
+        'warm_us_per_device': warm / size * 1e6,
+    }
+
+    if size <= loop_max:
+        uncached = ShapExplainer(explainer.model, 'loop', cache_size=0)
+        rows = list(explainer.model.to_array(devices))
+        start = time.perf_counter()
+        for device in rows:
+            uncached.top_contributors(device, top_k)
+        loop = time.perf_counter() - start
+        row['per_device_loop_seconds'] = loop
+        row['batch_speedup'] = loop / cold
+    return row
+
+
+def print_report(report):
+    print("\n" + "=" * 70)
+    print(f"EXPLICAÇÕES SHAP (top-{report['top_k']}, {report['model']})")
+    print("=" * 70)
+    print(f"{'devices':>9} {'frio (s)':>10} {'µs/device':>10} {'quente (s)':>11} {'µs/device':>10} {'vs loop':>9}")
+    for row in report['results']:
+        speedup = f"{row['batch_speedup']:.1f}x" if 'batch_speedup' in row else '-'
+        print(f"{row['devices']:>9,} {row['cold_seconds']:>10.3f} {row['cold_us_per_device']:>10.0f} "
+              f"{row['warm_seconds']:>11.3f} {row['warm_us_per_device']:>10.0f} {speedup:>9}")
+    print(f"\n   Aditividade: max |base + Σφ − score| = {report['additivity_error']:.2e}")
+    print("=" * 70)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark das explicações SHAP por device')
+    parser.add_argument('--model', default=str(MODEL_PATH), help='Artefato de inferência ou pipeline .pkl')
+    parser.add_argument('--data', default=str(TEST_DATA_PATH), help='CSV com features por device')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Devices por lote (default: 1 1000 100000)')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help=f'Features por device (default: {DEFAULT_TOP_K})')
+    parser.add_argument('--loop-max', type=int, default=1_000,
+                        help='Maior lote medido também com 1 chamada por device (default: 1000)')
+    parser.add_argument('--output', default=None, help='JSON de saída com os resultados')
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore')
+
+    print("\n[1/3] Loading model...")
+    model = load_scorer(args.model, fast=True)
+    explainer = ShapExplainer(model, model_file_version(args.model), cache_size=max(args.sizes))
+
+    print("\n[2/3] Loading features...")
+    X = pd.read_csv(args.data).reindex(columns=explainer.feature_order)
+    print(f"   ✓ {len(X)} devices, {X.shape[1]} features")
+
+    print("\n[3/3] Explaining...")
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'model': Path(args.model).name,
+        'top_k': args.top_k,
+        'additivity_error': check_additivity(explainer, X),
+        'results': [benchmark_size(explainer, X, size, args.top_k, args.loop_max) for size in args.sizes],
+    }
+
+    print_report(report)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Resultados salvos: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
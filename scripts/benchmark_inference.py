@@ -0,0 +1,309 @@
+"""
+Benchmark de latência: pipeline (pandas/sklearn) vs fast path compilado.
+
+OBJETIVO: Medir o overhead de predict_device/predict_batch com o pipeline
+         imblearn (DataFrame de 1 linha + predict + predict_proba) contra o
+         FastInferenceModel (medianas NumPy + CatBoost direto em float32).
+
+MEDIDAS:
+- Single device: latência por chamada (média, p50, p95, p99 em µs)
+- Batch: tempo e devices/s para lotes de 1, 100, 1.000 e 10.000 devices
+- Paridade: diferença máxima de probabilidade e concordância de labels
+- Multi-processo (--workers): predict_batch_parallel com 1, 2, 4 e 8 workers
+  sobre --parallel-devices devices, speedup vs 1 worker
+- Estágios (--stages): tempo médio e fração por estágio (to_array, impute,
+  catboost, assemble) em cada lote, via models/scoring_metrics.py, e o
+  custo da instrumentação ligada/desligada por predict_device
+
+Uso:
+    python scripts/benchmark_inference.py
+    python scripts/benchmark_inference.py --n-single 1000 --batch-sizes 1 1000 100000 \\
+        --output reports/benchmark_inference.json
+    python scripts/benchmark_inference.py --workers 1 2 4 8 --parallel-devices 1000000
+    python scripts/benchmark_inference.py --stages
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Paths
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODEL_PATH = PROJECT_ROOT / "models" / "catboost_pipeline_v2_field_only.pkl"
+TEST_DATA_PATH = PROJECT_ROOT / "data" / "device_features_test_stratified.csv"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+from models.inference import compile_pipeline, load_model, predict_batch, predict_batch_parallel, predict_device
+from models.scoring_metrics import disable_metrics, enable_metrics, stage
+
+DEFAULT_BATCH_SIZES = [1, 100, 1_000, 10_000]
+DEFAULT_WORKERS = [1, 2, 4, 8]
+
+
+def load_features(data_path, feature_order):
+    """Features em TRAINING_FEATURE_ORDER (features ausentes no CSV viram NaN → mediana)."""
+    df = pd.read_csv(data_path)
+    missing = [f for f in feature_order if f not in df.columns]
+    if missing:
+        print(f"   ⚠️  Features ausentes em {Path(data_path).name} (imputadas): {', '.join(missing)}")
+    return df.reindex(columns=feature_order)
+
+
+def latency_stats(timings_s):
+    """Estatísticas de latência em µs."""
+    us = np.asarray(timings_s) * 1e6
+    return {
+        'mean_us': float(us.mean()),
+        'p50_us': float(np.percentile(us, 50)),
+        'p95_us': float(np.percentile(us, 95)),
+        'p99_us': float(np.percentile(us, 99)),
+    }
+
+
+def time_calls(fn, inputs, warmup=5):
+    """Tempo de cada chamada fn(x) para x em inputs."""
+    for x in inputs[:warmup]:
+        fn(x)
+    timings = []
+    for x in inputs:
+        start = time.perf_counter()
+        fn(x)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def benchmark_single(X, pipeline, fast_model, n_single):
+    """Latência por device: predict_device(pipeline) vs predict_device(fast) vs array direto."""
+    rows = X.sample(n_single, replace=True, random_state=42).reset_index(drop=True)
+    dicts = rows.to_dict(orient='records')
+    arrays = list(rows.to_numpy(dtype=np.float32))
+
+    return {
+        'pipeline_predict_device': latency_stats(time_calls(lambda d: predict_device(d, pipeline), dicts)),
+        'fast_predict_device': latency_stats(time_calls(lambda d: predict_device(d, fast_model), dicts)),
+        'fast_float32_array': latency_stats(time_calls(fast_model.predict_proba_critical, arrays)),
+    }
+
+
+def benchmark_batch(X, pipeline, fast_model, batch_sizes, repeat):
+    """Tempo por lote: predict_batch(pipeline) vs predict_batch(fast) vs array direto."""
+    results = []
+    for size in batch_sizes:
+        batch = X.sample(size, replace=True, random_state=size).reset_index(drop=True)
+        array = batch.to_numpy(dtype=np.float32)
+
+        row = {'batch_size': size}
+        for name, fn in [
+            ('pipeline_predict_batch', lambda: predict_batch(batch, pipeline)),
+            ('fast_predict_batch', lambda: predict_batch(batch, fast_model)),
+            ('fast_float32_array', lambda: fast_model.predict_proba_critical(array)),
+        ]:
+            seconds = min(time_calls(lambda _: fn(), [None] * repeat, warmup=1))
+            row[name] = {'seconds': seconds, 'devices_per_sec': size / seconds}
+        results.append(row)
+    return results
+
+
+def benchmark_workers(X, fast_model, model_path, workers_list, n_devices):
+    """Escala do predict_batch_parallel (tempo inclui subir o pool e carregar o modelo)."""
+    batch = X.sample(n_devices, replace=True, random_state=0).reset_index(drop=True)
+    reference = fast_model.predict_proba_critical(batch)
+
+    results = []
+    for workers in workers_list:
+        start = time.perf_counter()
+        scored = predict_batch_parallel(batch, model_path, workers=workers)
+        seconds = time.perf_counter() - start
+        results.append({
+            'workers': workers,
+            'seconds': seconds,
+            'devices_per_sec': n_devices / seconds,
+            'max_abs_probability_diff': float(np.abs(scored['probability'].to_numpy() - reference).max()),
+        })
+
+    for row in results:
+        row['speedup'] = results[0]['seconds'] / row['seconds']
+    return results
+
+
+def benchmark_stages(X, fast_model, batch_sizes, repeat, n_single):
+    """
+    Onde o tempo vai: estágios do predict_batch(fast) por lote e overhead da instrumentação.
+
+    Returns:
+        dict com 'overhead' (custo de um estágio desligado em ns; µs p50 de
+        predict_device desligado/ligado) e 'by_batch' (µs por lote e fração
+        de cada estágio por tamanho de lote)
+    """
+    dicts = X.sample(n_single, replace=True, random_state=42).to_dict(orient='records')
+    single = lambda d: predict_device(d, fast_model)
+
+    disable_metrics()
+    n_null = 1_000_000
+    start = time.perf_counter()
+    for _ in range(n_null):
+        with stage('catboost'):
+            pass
+    disabled_stage_ns = (time.perf_counter() - start) / n_null * 1e9
+
+    disabled = latency_stats(time_calls(single, dicts))
+    metrics = enable_metrics()
+    enabled = latency_stats(time_calls(single, dicts))
+
+    by_batch = []
+    for size in batch_sizes:
+        batch = X.sample(size, replace=True, random_state=size).reset_index(drop=True)
+        predict_batch(batch, fast_model)   # warm-up fora da medida
+        metrics.reset()
+        for _ in range(repeat):
+            predict_batch(batch, fast_model)
+        snapshot = metrics.snapshot()
+        by_batch.append({
+            'batch_size': size,
+            'rows_per_second': snapshot['rows_per_second'],
+            'stages': {
+                name: {'per_batch_us': stats['total_seconds'] / repeat * 1e6, 'share': stats['share']}
+                for name, stats in snapshot['stages'].items()
+            },
+        })
+    disable_metrics()
+
+    return {
+        'overhead': {
+            'disabled_stage_ns': disabled_stage_ns,
+            'disabled_p50_us': disabled['p50_us'],
+            'enabled_p50_us': enabled['p50_us'],
+            'enabled_overhead_us': enabled['p50_us'] - disabled['p50_us'],
+        },
+        'by_batch': by_batch,
+    }
+
+
+def check_parity(X, pipeline, fast_model):
+    """Fast path deve reproduzir as probabilidades e labels do pipeline."""
+    pipeline_proba = pipeline.predict_proba(X)[:, 1]
+    fast_proba = fast_model.predict_proba_critical(X)
+    return {
+        'devices': int(len(X)),
+        'max_abs_probability_diff': float(np.abs(pipeline_proba - fast_proba).max()),
+        'label_agreement': float((np.asarray(pipeline.predict(X)).astype(int) == fast_model.predict(X)).mean()),
+    }
+
+
+def print_report(report):
+    """Resumo no console."""
+    print("\n" + "=" * 70)
+    print("SINGLE DEVICE (µs por chamada)")
+    print("=" * 70)
+    print(f"{'caminho':<28} {'média':>10} {'p50':>10} {'p95':>10} {'p99':>10}")
+    for name, stats in report['single'].items():
+        print(f"{name:<28} {stats['mean_us']:>10.0f} {stats['p50_us']:>10.0f} "
+              f"{stats['p95_us']:>10.0f} {stats['p99_us']:>10.0f}")
+    speedup = report['single']['pipeline_predict_device']['p50_us'] / report['single']['fast_predict_device']['p50_us']
+    print(f"\n   Speedup predict_device (p50): {speedup:.1f}x")
+
+    print("\n" + "=" * 70)
+    print("BATCH (devices/s)")
+    print("=" * 70)
+    print(f"{'lote':>8} {'pipeline':>16} {'fast':>16} {'fast array':>16}")
+    for row in report['batch']:
+        print(f"{row['batch_size']:>8,} {row['pipeline_predict_batch']['devices_per_sec']:>16,.0f} "
+              f"{row['fast_predict_batch']['devices_per_sec']:>16,.0f} "
+              f"{row['fast_float32_array']['devices_per_sec']:>16,.0f}")
+
+    if report.get('workers'):
+        print("\n" + "=" * 70)
+        print(f"MULTI-PROCESSO ({report['parallel_devices']:,} devices, {report['cpu_count']} CPUs)")
+        print("=" * 70)
+        print(f"{'workers':>8} {'tempo (s)':>12} {'devices/s':>16} {'speedup':>10}")
+        for row in report['workers']:
+            print(f"{row['workers']:>8} {row['seconds']:>12.2f} {row['devices_per_sec']:>16,.0f} "
+                  f"{row['speedup']:>9.2f}x")
+
+    if report.get('stages'):
+        stages = report['stages']
+        print("\n" + "=" * 70)
+        print("ESTÁGIOS predict_batch(fast) (µs por lote, % do tempo instrumentado)")
+        print("=" * 70)
+        for row in stages['by_batch']:
+            parts = ', '.join(f"{name} {s['per_batch_us']:,.0f} ({s['share']:.0%})" for name, s in row['stages'].items())
+            print(f"{row['batch_size']:>8,}: {parts}")
+        overhead = stages['overhead']
+        print(f"\n   Estágio desligado: {overhead['disabled_stage_ns']:.0f} ns; predict_device p50: "
+              f"{overhead['disabled_p50_us']:.0f} µs desligado, {overhead['enabled_p50_us']:.0f} µs ligado")
+
+    parity = report['parity']
+    print("\n" + "=" * 70)
+    print(f"PARIDADE ({parity['devices']} devices): max |Δp| = {parity['max_abs_probability_diff']:.2e}, "
+          f"labels iguais = {parity['label_agreement']:.1%}")
+    print("=" * 70)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de latência: pipeline vs fast path compilado')
+    parser.add_argument('--model', default=str(MODEL_PATH), help='Pipeline .pkl')
+    parser.add_argument('--data', default=str(TEST_DATA_PATH), help='CSV com features por device')
+    parser.add_argument('--n-single', type=int, default=500, help='Chamadas single-device medidas (default: 500)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES,
+                        help='Tamanhos de lote (default: 1 100 1000 10000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetições por lote (melhor tempo, default: 5)')
+    parser.add_argument('--workers', type=int, nargs='*', default=[],
+                        help='Workers para medir predict_batch_parallel (ex.: 1 2 4 8; default: não mede)')
+    parser.add_argument('--parallel-devices', type=int, default=200_000,
+                        help='Devices no benchmark multi-processo (default: 200000)')
+    parser.add_argument('--stages', action='store_true',
+                        help='Mede o tempo por estágio (scoring_metrics) e o custo da instrumentação')
+    parser.add_argument('--output', default=None, help='JSON de saída com os resultados')
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore')
+
+    print("\n[1/4] Loading pipeline...")
+    pipeline = load_model(args.model)
+    fast_model = compile_pipeline(pipeline)
+
+    print("\n[2/4] Loading features...")
+    X = load_features(args.data, fast_model.feature_order)
+    print(f"   ✓ {len(X)} devices, {X.shape[1]} features")
+
+    print("\n[3/4] Parity + single-device latency...")
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'model': Path(args.model).name,
+        'parity': check_parity(X, pipeline, fast_model),
+        'single': benchmark_single(X, pipeline, fast_model, args.n_single),
+    }
+
+    print("\n[4/4] Batch throughput...")
+    report['batch'] = benchmark_batch(X, pipeline, fast_model, args.batch_sizes, args.repeat)
+
+    if args.workers:
+        print(f"\n      Multi-processo: {args.workers} workers...")
+        report['cpu_count'] = os.cpu_count()
+        report['parallel_devices'] = args.parallel_devices
+        report['workers'] = benchmark_workers(X, fast_model, args.model, args.workers, args.parallel_devices)
+
+    if args.stages:
+        print("\n      Estágios do scoring...")
+        report['stages'] = benchmark_stages(X, fast_model, args.batch_sizes, args.repeat, args.n_single)
+
+    print_report(report)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Resultados salvos: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
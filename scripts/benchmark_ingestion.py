@@ -0,0 +1,285 @@
+"""
+Benchmark de ingestão: load_aws_payload + aggregate_by_device em escala.
+
+PROBLEMA:
+- Não há medida de como a transformação escala com o tamanho do export; uma
+  regressão de tempo ou memória só aparece quando o job noturno falha
+
+SOLUÇÃO:
+- Gera payloads sintéticos (generate_synthetic_payload.py) de 1M / 10M / 100M
+  linhas, reaproveitados entre execuções em --workdir
+- Cada caso (tamanho x modo) roda em um processo novo: tempo de parede,
+  linhas/s e pico de RSS do processo (sem contaminação entre casos)
+- Modos: batch (load_aws_payload + aggregate_by_device), streaming (chunks)
+  e parquet (dataset particionado + pushdown)
+- --baseline compara com um JSON anterior e sai com código 1 se linhas/s cair
+  ou o pico de RSS subir mais que --max-regression
+
+Uso:
+    python scripts/benchmark_ingestion.py --output reports/benchmark_ingestion.json
+    python scripts/benchmark_ingestion.py --sizes 1000000 --modes batch streaming \\
+        --baseline reports/benchmark_ingestion.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import platform
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from queue import Empty
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from generate_synthetic_payload import write_synthetic_payload
+from transform_aws_payload import DEFAULT_CHUNKSIZE
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [1_000_000, 10_000_000, 100_000_000]
+MODES = ['batch', 'streaming', 'parquet']
+MESSAGES_PER_DEVICE = 100
+RESULT_POLL_SECONDS = 5.0   # intervalo para checar se o processo do caso ainda está vivo
+
+
+def _peak_rss_mb():
+    """Pico de RSS do processo atual em MB (None se a plataforma não expõe)."""
+    # Linux: VmHWM é do address space atual (ru_maxrss herda o pico do pai no exec)
+    status = Path('/proc/self/status')
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reporta em bytes, demais Unix em KB
+    return peak / (1024 ** 2) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_case(mode: str, input_path: str, chunksize: int, queue):
+    """Executa um caso no processo filho e devolve as medidas pela queue."""
+    logging.disable(logging.CRITICAL)
+    try:
+        from transform_aws_payload import (
+            aggregate_aws_payload_streaming,
+            aggregate_by_device,
+            load_aws_payload,
+        )
+
+        start = time.perf_counter()
+        if mode == 'batch':
+            df_features = aggregate_by_device(load_aws_payload(input_path))
+        elif mode == 'streaming':
+            df_features, _ = aggregate_aws_payload_streaming(input_path, chunksize=chunksize)
+        else:
+            from payload_parquet_cache import load_aws_payload_parquet
+            df_features = aggregate_by_device(load_aws_payload_parquet(input_path))
+        seconds = time.perf_counter() - start
+
+        queue.put({'seconds': seconds, 'devices': len(df_features), 'peak_rss_mb': _peak_rss_mb()})
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def measure_case(mode: str, input_path, chunksize: int = DEFAULT_CHUNKSIZE) -> Dict:
+    """Roda um caso em um processo novo (spawn) e coleta tempo + pico de RSS."""
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_case, args=(mode, str(input_path), chunksize, queue))
+    process.start()
+    return _collect_result(process, queue)
+
+
+def _collect_result(process, queue, poll_seconds: float = RESULT_POLL_SECONDS) -> Dict:
+    """
+    Espera o resultado do caso sem travar se o filho morrer (ex: OOM kill):
+    filho encerrado sem resultado vira {'error', 'exitcode'}.
+    """
+    while True:
+        try:
+            result = queue.get(timeout=poll_seconds)
+            break
+        except Empty:
+            if process.is_alive():
+                continue
+            try:
+                result = queue.get(timeout=poll_seconds)   # enviado logo antes de sair
+            except Empty:
+                result = {'error': f"processo do caso terminou sem resultado (exitcode {process.exitcode})",
+                          'exitcode': process.exitcode}
+            break
+    process.join()
+    return result
+
+
+def ensure_payload(workdir: Path, n_rows: int, fmt: str, seed: int = 42, regenerate: bool = False) -> Path:
+    """Gera (ou reaproveita) o payload sintético de n_rows linhas."""
+    n_devices = max(1, n_rows // MESSAGES_PER_DEVICE)
+    suffix = '.csv' if fmt == 'csv' else '_parquet'
+    path = workdir / f"synthetic_{n_rows}_s{seed}{suffix}"
+
+    if path.exists() and not regenerate:
+        logger.info(f"♻️  Reaproveitando {path}")
+        return path
+
+    if fmt == 'parquet' and path.exists():
+        shutil.rmtree(path)
+
+    write_synthetic_payload(path, n_devices, MESSAGES_PER_DEVICE, seed=seed, fmt=fmt)
+    return path
+
+
+def run_benchmark(
+    sizes: List[int],
+    modes: List[str],
+    workdir,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    seed: int = 42,
+    regenerate: bool = False,
+) -> List[Dict]:
+    """
+    Mede cada combinação tamanho x modo.
+
+    Returns:
+        Lista de dicts com 'mode', 'rows', 'seconds', 'rows_per_sec',
+        'peak_rss_mb' e 'devices' (ou 'error')
+    """
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    results = []
+    generated = set()
+
+    for n_rows in sizes:
+        for mode in modes:
+            fmt = 'parquet' if mode == 'parquet' else 'csv'
+            # batch e streaming leem o mesmo CSV: regera no máximo uma vez
+            input_path = ensure_payload(workdir, n_rows, fmt, seed=seed,
+                                        regenerate=regenerate and (n_rows, fmt) not in generated)
+            generated.add((n_rows, fmt))
+
+            logger.info(f"⏱️  {mode} @ {n_rows:,} linhas...")
+            measured = measure_case(mode, input_path, chunksize)
+            result = {'mode': mode, 'rows': n_rows, **measured}
+
+            if 'error' in measured:
+                logger.error(f"❌ {mode} @ {n_rows:,}: {measured['error']}")
+            else:
+                result['rows_per_sec'] = n_rows / measured['seconds']
+                logger.info(f"   {result['rows_per_sec']:,.0f} linhas/s, pico RSS {measured['peak_rss_mb'] or 0:,.0f} MB")
+            results.append(result)
+
+    return results
+
+
+def compare_with_baseline(results: List[Dict], baseline: List[Dict], max_regression: float = 0.2) -> List[str]:
+    """
+    Compara com um benchmark anterior (mesmo modo e tamanho).
+
+    Returns:
+        Lista de regressões (vazia se nenhuma métrica piorou mais que max_regression)
+    """
+    previous = {(r['mode'], r['rows']): r for r in baseline if 'error' not in r}
+    regressions = []
+
+    for r in results:
+        old = previous.get((r['mode'], r['rows']))
+        if old is None:
+            continue
+        if 'error' in r:
+            regressions.append(f"{r['mode']} @ {r['rows']:,}: falhou ({r['error']})")
+            continue
+
+        if r['rows_per_sec'] < old['rows_per_sec'] * (1 - max_regression):
+            regressions.append(
+                f"{r['mode']} @ {r['rows']:,}: linhas/s {old['rows_per_sec']:,.0f} → {r['rows_per_sec']:,.0f}"
+            )
+        if r.get('peak_rss_mb') and old.get('peak_rss_mb') and \
+                r['peak_rss_mb'] > old['peak_rss_mb'] * (1 + max_regression):
+            regressions.append(
+                f"{r['mode']} @ {r['rows']:,}: pico RSS {old['peak_rss_mb']:,.0f} → {r['peak_rss_mb']:,.0f} MB"
+            )
+
+    return regressions
+
+
+def print_results(results: List[Dict]):
+    """Tabela de resultados."""
+    print("\n" + "="*72)
+    print(f"{'modo':<10} {'linhas':>13} {'tempo (s)':>10} {'linhas/s':>14} {'pico RSS (MB)':>14} {'devices':>8}")
+    print("-"*72)
+    for r in results:
+        if 'error' in r:
+            print(f"{r['mode']:<10} {r['rows']:>13,} {'ERRO: ' + r['error']}")
+            continue
+        rss = f"{r['peak_rss_mb']:,.0f}" if r['peak_rss_mb'] is not None else 'n/d'
+        print(f"{r['mode']:<10} {r['rows']:>13,} {r['seconds']:>10.2f} {r['rows_per_sec']:>14,.0f} {rss:>14} {r['devices']:>8,}")
+    print("="*72)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark de ingestão (linhas/s e pico de RSS) com payloads AWS sintéticos'
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Tamanhos em linhas (default: 1M 10M 100M)')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=['batch', 'streaming'],
+                        help='Modos de ingestão (default: batch streaming)')
+    parser.add_argument('--workdir', default='payloads_synthetic',
+                        help='Diretório dos payloads sintéticos (default: payloads_synthetic)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f'Linhas por chunk no modo streaming (default: {DEFAULT_CHUNKSIZE})')
+    parser.add_argument('--seed', type=int, default=42, help='Seed dos payloads (default: 42)')
+    parser.add_argument('--regenerate', action='store_true', help='Regera os payloads mesmo se existirem')
+    parser.add_argument('--output', default=None, help='JSON de saída com os resultados')
+    parser.add_argument('--baseline', default=None, help='JSON de um benchmark anterior para comparação')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Piora relativa tolerada vs baseline (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.sizes, args.modes, args.workdir,
+                            chunksize=args.chunksize, seed=args.seed, regenerate=args.regenerate)
+    print_results(results)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'chunksize': args.chunksize,
+            'results': results,
+        }
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"💾 Resultados salvos: {output_path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+        regressions = compare_with_baseline(results, baseline, args.max_regression)
+        if regressions:
+            logger.error(f"❌ {len(regressions)} regressão(ões) vs {args.baseline}:")
+            for message in regressions:
+                logger.error(f"   - {message}")
+            return 1
+        logger.info(f"✅ Sem regressões vs {args.baseline} (tolerância {args.max_regression:.0%})")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Store persistente e incremental de agregados por device (payloads append-only).
+
+PROBLEMA:
+- transform_aws_to_model_format recalcula as features de TODO o histórico a cada
+  execução, mesmo quando só chegou um dia de mensagens novas
+
+SOLUÇÃO:
+- Guarda em disco o estado parcial mergeable por device (mesmas colunas de
+  compute_partial_aggregates em transform_aws_payload.py)
+- Cada arquivo novo é lido em streaming e mergeado no estado: só os devices
+  presentes no arquivo mudam
+- Watermark (ledger de arquivos ingeridos, chaveado pelo caminho absoluto):
+  o mesmo arquivo nunca é ingerido duas vezes
+- Estado e watermark são gravados juntos num único os.replace (watermark nos
+  metadados do parquet): um crash nunca deixa o estado com um arquivo que o
+  watermark não lista (o que faria suas mensagens serem contadas em dobro)
+- Refresh noturno custa tempo proporcional às mensagens novas, não ao histórico
+
+Layout do store:
+    <store_dir>/partial_aggregates.parquet   estado parcial (1 linha por device)
+                                             + watermark nos metadados do schema
+
+Uso:
+    python scripts/device_aggregate_store.py \\
+        --store data/device_store \\
+        --input payloads_aws/ \\
+        --output payloads_processed/device_store_transformed.csv
+"""
+
+import argparse
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from transform_aws_payload import (
+    DEFAULT_CHUNKSIZE,
+    REQUIRED_FEATURES,
+    compute_partial_aggregates,
+    finalize_partial_aggregates,
+    iter_aws_payload_chunks,
+    merge_partial_aggregates,
+    validate_output,
+)
+
+logger = logging.getLogger(__name__)
+
+STATE_FILENAME = 'partial_aggregates.parquet'
+WATERMARK_METADATA_KEY = b'device_store_watermark'
+
+
+def _file_identity(filepath: Path) -> Dict:
+    """Identidade barata do arquivo (sem reler o conteúdo)."""
+    stat = filepath.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _atomic_write(path: Path, write_fn):
+    """Escreve em arquivo temporário e troca atomicamente (os.replace)."""
+    tmp_path = path.with_name(path.name + '.tmp')
+    write_fn(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _watermark_key(filepath: Path) -> str:
+    """Chave do watermark: caminho absoluto (arquivos homônimos em diretórios diferentes)."""
+    return str(filepath.resolve())
+
+
+def load_watermark(store_dir) -> Dict[str, Dict]:
+    """
+    Carrega o ledger de arquivos ingeridos (metadados do parquet de estado).
+
+    Returns:
+        {caminho_absoluto: {'size', 'mtime_ns', 'messages', 'devices', 'ingested_at'}}
+    """
+    state_path = Path(store_dir) / STATE_FILENAME
+    if not state_path.exists():
+        return {}
+    metadata = pq.read_schema(state_path).metadata or {}
+    return json.loads(metadata[WATERMARK_METADATA_KEY])['files']
+
+
+def load_state(store_dir) -> pd.DataFrame:
+    """Carrega o estado parcial por device (None se o store está vazio)."""
+    state_path = Path(store_dir) / STATE_FILENAME
+    if not state_path.exists() or not pq.read_schema(state_path).names:
+        return None  # Sem arquivo, ou só watermark (nenhum arquivo ingerido tinha linhas)
+    return pd.read_parquet(state_path)
+
+
+def _save(store_dir: Path, state: pd.DataFrame, watermark: Dict[str, Dict]):
+    """Persiste estado + watermark num único arquivo (um só os.replace: os dois avançam juntos)."""
+    store_dir.mkdir(parents=True, exist_ok=True)
+    # Sem estado (arquivos sem linhas): tabela sem colunas, só para gravar o watermark
+    table = pa.table({}) if state is None else pa.Table.from_pandas(state, preserve_index=False)
+    payload = json.dumps({'updated_at': datetime.now().isoformat(), 'files': watermark})
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), WATERMARK_METADATA_KEY: payload})
+
+    _atomic_write(store_dir / STATE_FILENAME, lambda p: pq.write_table(table, p))
+
+
+def ingest_payload_file(store_dir, filepath, chunksize: int = DEFAULT_CHUNKSIZE) -> Dict:
+    """
+    Ingere um CSV AWS no store (se ainda não foi ingerido).
+
+    Args:
+        store_dir: Diretório do store
+        filepath: CSV AWS raw
+        chunksize: Linhas por chunk na leitura streaming
+
+    Returns:
+        dict com 'file', 'status' ('ingested', 'skipped' ou 'changed'),
+        'messages' e 'devices_touched'
+    """
+    store_dir = Path(store_dir)
+    filepath = Path(filepath)
+    watermark = load_watermark(store_dir)
+    identity = _file_identity(filepath)
+    key = _watermark_key(filepath)
+
+    previous = watermark.get(key)
+    if previous is not None:
+        if previous['size'] == identity['size'] and previous['mtime_ns'] == identity['mtime_ns']:
+            logger.info(f"⏭️  {filepath.name} já ingerido em {previous['ingested_at']} - ignorando")
+            return {'file': filepath.name, 'status': 'skipped', 'messages': 0, 'devices_touched': 0}
+
+        # Append-only: a contribuição antiga não pode ser removida do estado
+        logger.error(
+            f"❌ {filepath.name} mudou desde a ingestão ({previous['size']} → {identity['size']} bytes). "
+            "Renomeie o arquivo com as mensagens novas ou reconstrua o store."
+        )
+        return {'file': filepath.name, 'status': 'changed', 'messages': 0, 'devices_touched': 0}
+
+    logger.info(f"📥 Ingerindo {filepath.name} no store {store_dir}...")
+
+    file_partial = None
+    n_messages = 0
+    for chunk in iter_aws_payload_chunks(str(filepath), chunksize=chunksize):
+        n_messages += len(chunk)
+        file_partial = merge_partial_aggregates(file_partial, compute_partial_aggregates(chunk))
+
+    devices_touched = 0 if file_partial is None else len(file_partial)
+    state = merge_partial_aggregates(load_state(store_dir), file_partial)
+
+    watermark[key] = {
+        **identity,
+        'messages': int(n_messages),
+        'devices': int(devices_touched),
+        'ingested_at': datetime.now().isoformat(),
+    }
+    _save(store_dir, state, watermark)
+
+    logger.info(f"✅ {filepath.name}: {n_messages:,} mensagens, {devices_touched} devices atualizados")
+
+    return {
+        'file': filepath.name,
+        'status': 'ingested',
+        'messages': int(n_messages),
+        'devices_touched': int(devices_touched),
+    }
+
+
+def ingest_directory(store_dir, input_dir, chunksize: int = DEFAULT_CHUNKSIZE) -> List[Dict]:
+    """Ingere todos os CSVs de input_dir ainda não presentes no watermark."""
+    csv_files = sorted(Path(input_dir).glob('*.csv'))
+    if not csv_files:
+        logger.warning(f"⚠️  Nenhum CSV encontrado em {input_dir}")
+    return [ingest_payload_file(store_dir, f, chunksize=chunksize) for f in csv_files]
+
+
+def store_features(store_dir) -> pd.DataFrame:
+    """
+    Features por device a partir do estado persistido.
+
+    days_since_last_message é recalculado em relação a agora.
+    """
+    state = load_state(store_dir)
+    if state is None:
+        raise FileNotFoundError(f"❌ Store vazio: {Path(store_dir) / STATE_FILENAME}")
+    return finalize_partial_aggregates(state)
+
+
+def rebuild_store(store_dir, input_files, chunksize: int = DEFAULT_CHUNKSIZE) -> List[Dict]:
+    """Recria o store do zero (ex: depois de um arquivo ingerido ter mudado)."""
+    store_dir = Path(store_dir)
+    (store_dir / STATE_FILENAME).unlink(missing_ok=True)
+    return [ingest_payload_file(store_dir, f, chunksize=chunksize) for f in input_files]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Atualiza o store incremental de agregados por device com payloads AWS novos'
+    )
+    parser.add_argument('--store', required=True, help='Diretório do store persistente')
+    parser.add_argument('--input', default='payloads_aws', help='Diretório com CSVs AWS raw (default: payloads_aws)')
+    parser.add_argument('--output', default=None, help='CSV de saída com device_id + 30 features (opcional)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f'Linhas por chunk na leitura (default: {DEFAULT_CHUNKSIZE})')
+    parser.add_argument('--rebuild', action='store_true', help='Descarta o store e reingere todos os arquivos')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        results = rebuild_store(args.store, sorted(Path(args.input).glob('*.csv')), chunksize=args.chunksize)
+    else:
+        results = ingest_directory(args.store, args.input, chunksize=args.chunksize)
+
+    ingested = [r for r in results if r['status'] == 'ingested']
+    logger.info(f"📊 {len(ingested)} arquivo(s) novo(s), "
+                f"{sum(r['messages'] for r in ingested):,} mensagens, "
+                f"{len(results) - len(ingested)} ignorado(s)")
+
+    if args.output:
+        df_features = store_features(args.store)
+        validate_output(df_features)
+        output_file = Path(args.output)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        df_features[['device_id'] + REQUIRED_FEATURES].to_csv(output_file, index=False)
+        logger.info(f"💾 Salvo: {output_file} ({len(df_features)} devices)")
+
+
+if __name__ == '__main__':
+    main()
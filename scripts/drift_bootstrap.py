@@ -0,0 +1,354 @@
+"""
+Drift Bootstrap - Resampled confidence intervals for drift statistics
+
+Per-segment fleets are small, so asymptotic KS p-values are unreliable and
+a single KS/PSI value says nothing about its own noise. This module
+resamples devices and recomputes every drift statistic of
+compute_ks_statistics (KS, PSI, Wasserstein/std, Jensen-Shannon), giving
+percentile confidence intervals per feature, intervals for the lifecycle
+scores of detect_lifecycle_drift, and permutation p-values for KS.
+
+- Devices are resampled jointly (all features of a device together), so
+  the lifecycle score (max KS over proxy features) keeps the features'
+  correlation
+- Vectorized: a bootstrap resample is a vector of per-device counts; for a
+  block of resamples the ECDFs of every resample at the merged distinct
+  values are cumulative sums of those counts in sorted order (one 2-D
+  cumsum + gather per feature, no re-sorting)
+- Blocks fan out across a process pool; block i always uses the i-th
+  child of SeedSequence(seed), so results do not depend on the number of
+  workers
+- A ReferenceProfile reference is kept fixed (only production devices are
+  resampled) and has no permutation p-values (no reference rows)
+
+Usage:
+    python scripts/drift_monitor.py --reference ... --production ... \\
+        --output reports/drift_weekly/ --bootstrap 1000
+
+    distribution = bootstrap_drift_statistics(reference, production, n_resamples=1000, n_jobs=4)
+    add_confidence_intervals(ks_results, distribution)
+    lifecycle = detect_lifecycle_drift(ks_results, bootstrap=distribution)
+
+Author: Data Science Team
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from drift_monitor import (
+    ALL_FEATURES,
+    DEFAULT_BIN_QUANTILES,
+    ReferenceProfile,
+    _distinct_ends,
+    _js_rows,
+    _psi_rows,
+    bin_edges_from_sorted,
+    ecdf_distances_from_sorted,
+    sort_columns,
+)
+
+DEFAULT_BOOTSTRAP_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+BOOTSTRAP_BLOCK_SIZE = 100              # resamples per block (one pool task)
+BOOTSTRAP_BLOCK_ELEMENTS = 4_000_000    # cap on resamples x devices per block (memory)
+BOOTSTRAP_METRICS = ('ks_statistic', 'psi', 'wasserstein_std', 'js_divergence')
+
+
+@dataclass(frozen=True)
+class BootstrapDistribution:
+    """Resampled drift statistics: one row per resample, one column per feature."""
+
+    features: List[str]
+    samples: Dict[str, np.ndarray]       # metric -> (n_resamples, n_features)
+    permutation_p_values: np.ndarray     # KS permutation p-value per feature (NaN: profile reference)
+    n_resamples: int
+    seed: int
+
+    def interval(self, metric: str, confidence: float = DEFAULT_CONFIDENCE) -> np.ndarray:
+        """Percentile interval per feature: float64 array (2, n_features) of (low, high)."""
+        alpha = (1 - confidence) / 2
+        samples = self.samples[metric]
+        result = np.full((2, samples.shape[1]), np.nan)
+        valid = ~np.all(np.isnan(samples), axis=0)
+        if valid.any():
+            result[:, valid] = np.nanquantile(samples[:, valid], [alpha, 1 - alpha], axis=0)
+        return result
+
+
+# ----------------------------------------------------------------------
+# Per-feature layout (built once, shared by every block)
+# ----------------------------------------------------------------------
+def _sorted_rows(df: pd.DataFrame, features: List[str]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Per feature: (sorted non-NaN values, device row of each value)."""
+    values = df[features].to_numpy(dtype=np.float64)
+    columns = []
+    for j in range(len(features)):
+        rows = np.flatnonzero(~np.isnan(values[:, j]))
+        order = np.argsort(values[rows, j], kind='stable')
+        columns.append((values[rows[order], j], rows[order]))
+    return columns
+
+
+def _prepare(
+    reference: Union[pd.DataFrame, ReferenceProfile],
+    production: pd.DataFrame,
+    features: List[str],
+    bin_quantiles
+) -> Dict:
+    """Positions of the merged grid and bin edges in each sorted column."""
+    prod_columns = _sorted_rows(production, features)
+    if isinstance(reference, ReferenceProfile):
+        ref_sorted, ref_n, _, _, ref_stds = reference.columns(features)
+        ref_columns = [(ref_sorted[:ref_n[j], j], None) for j in range(len(features))]
+        ref_devices = 0
+    else:
+        ref_columns = _sorted_rows(reference, features)
+        ref_devices = len(reference)
+        ref_stds = None
+
+    stored = np.full((max(len(c[0]) for c in ref_columns), len(features)), np.nan, order='F')
+    for j, (values, _) in enumerate(ref_columns):
+        stored[:len(values), j] = values
+    edges = bin_edges_from_sorted(stored, np.array([len(c[0]) for c in ref_columns]), bin_quantiles)
+
+    layout = []
+    for j in range(len(features)):
+        ref_values, ref_rows = ref_columns[j]
+        prod_values, prod_rows = prod_columns[j]
+        grid = np.union1d(ref_values, prod_values)
+
+        pooled = None
+        if ref_rows is not None and len(ref_values) and len(prod_values):
+            # Permutation layout: pooled devices (reference rows first, then production)
+            pooled_values = np.concatenate([ref_values, prod_values])
+            order = np.argsort(pooled_values, kind='stable')
+            pooled = {
+                'rows': np.concatenate([ref_rows, prod_rows + ref_devices])[order],
+                'ends': _distinct_ends(pooled_values[order]),
+            }
+
+        center = ref_values.mean() if len(ref_values) else 0.0
+        layout.append({
+            'ref_rows': ref_rows,
+            'prod_rows': prod_rows,
+            'ref_centered': ref_values - center,
+            # Fixed profile: exact std of all reference rows, as in compute_ks_statistics
+            # (stored values may be a quantile sketch); None = std of each resample
+            'ref_std': None if ref_stds is None else float(ref_stds[j]),
+            'grid_widths': np.diff(grid),
+            'ref_grid': np.searchsorted(ref_values, grid, side='right'),
+            'prod_grid': np.searchsorted(prod_values, grid, side='right'),
+            'ref_edges': np.searchsorted(ref_values, edges[j], side='right'),
+            'prod_edges': np.searchsorted(prod_values, edges[j], side='right'),
+            'empty': len(ref_values) == 0 or len(prod_values) == 0,
+            'pooled': pooled,
+        })
+    return {'layout': layout, 'ref_devices': ref_devices, 'prod_devices': len(production)}
+
+
+# ----------------------------------------------------------------------
+# Blocks (run in the pool workers)
+# ----------------------------------------------------------------------
+_STATE = None
+
+
+def _init_worker(state: Dict):
+    global _STATE
+    _STATE = state
+
+
+def _device_counts(rng: np.random.Generator, block: int, devices: int) -> np.ndarray:
+    """Bootstrap counts per device for `block` resamples: (block, devices)."""
+    draws = rng.integers(0, devices, size=(block, devices))
+    offsets = (np.arange(block) * devices)[:, None]
+    return np.bincount((draws + offsets).ravel(), minlength=block * devices).reshape(block, devices)
+
+
+def _cumulative(weights: np.ndarray) -> np.ndarray:
+    """Row-wise cumulative weights with a leading zero column."""
+    return np.concatenate([np.zeros((len(weights), 1)), np.cumsum(weights, axis=1)], axis=1)
+
+
+def _bootstrap_block(task: Tuple[np.random.SeedSequence, int]) -> Dict[str, np.ndarray]:
+    """Drift statistics of `block` resamples: metric -> (block, n_features)."""
+    seed_sequence, block = task
+    state = _STATE
+    rng = np.random.default_rng(seed_sequence)
+    ref_counts = (_device_counts(rng, block, state['ref_devices'])
+                  if state['ref_devices'] else None)
+    prod_counts = _device_counts(rng, block, state['prod_devices'])
+
+    layout = state['layout']
+    out = {metric: np.full((block, len(layout)), np.nan) for metric in BOOTSTRAP_METRICS}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for j, feature in enumerate(layout):
+            if feature['empty']:
+                continue
+            ref_weights = (ref_counts[:, feature['ref_rows']] if ref_counts is not None
+                           else np.ones((1, len(feature['ref_centered']))))
+            ref_cum = _cumulative(ref_weights)
+            prod_cum = _cumulative(prod_counts[:, feature['prod_rows']])
+            ref_total, prod_total = ref_cum[:, -1:], prod_cum[:, -1:]
+
+            gaps = ref_cum[:, feature['ref_grid']] / ref_total - prod_cum[:, feature['prod_grid']] / prod_total
+            abs_gaps = np.abs(gaps)
+            out['ks_statistic'][:, j] = abs_gaps.max(axis=1)
+            wasserstein = abs_gaps[:, :-1] @ feature['grid_widths']
+
+            ref_std = feature['ref_std']
+            if ref_std is None:
+                centered = feature['ref_centered']
+                s1, s2 = ref_weights @ centered, ref_weights @ (centered * centered)
+                n = ref_total[:, 0]
+                ref_std = np.sqrt((s2 - s1 * s1 / n) / (n - 1))
+            out['wasserstein_std'][:, j] = np.where(ref_std > 0, wasserstein / ref_std, np.nan)
+
+            expected = np.diff(np.concatenate(
+                [np.zeros_like(ref_total), ref_cum[:, feature['ref_edges']], ref_total], axis=1), axis=1) / ref_total
+            actual = np.diff(np.concatenate(
+                [np.zeros_like(prod_total), prod_cum[:, feature['prod_edges']], prod_total], axis=1), axis=1) / prod_total
+            out['psi'][:, j] = _psi_rows(expected, actual)
+            out['js_divergence'][:, j] = _js_rows(expected, actual)
+    return out
+
+
+def _permutation_block(task: Tuple[np.random.SeedSequence, int]) -> np.ndarray:
+    """KS of `block` random reference/production splits of the pooled devices: (block, n_features)."""
+    seed_sequence, block = task
+    state = _STATE
+    rng = np.random.default_rng(seed_sequence)
+    n_ref, total = state['ref_devices'], state['ref_devices'] + state['prod_devices']
+    is_ref = rng.permuted(np.tile(np.arange(total), (block, 1)), axis=1) < n_ref
+
+    layout = state['layout']
+    out = np.full((block, len(layout)), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for j, feature in enumerate(layout):
+            pooled = feature['pooled']
+            if pooled is None:
+                continue
+            ref_cum = np.cumsum(is_ref[:, pooled['rows']], axis=1)
+            ref_n = ref_cum[:, -1:]
+            prod_n = len(pooled['rows']) - ref_n
+            ends = pooled['ends']
+            gaps = ref_cum[:, ends] / ref_n - (ends + 1 - ref_cum[:, ends]) / prod_n
+            out[:, j] = np.abs(gaps).max(axis=1)
+    return out
+
+
+# ----------------------------------------------------------------------
+# Public API
+# ----------------------------------------------------------------------
+def _blocks(n_resamples: int, block_size: int, seed_sequence: np.random.SeedSequence) -> List[Tuple]:
+    sizes = [block_size] * (n_resamples // block_size)
+    if n_resamples % block_size:
+        sizes.append(n_resamples % block_size)
+    return list(zip(seed_sequence.spawn(len(sizes)), sizes))
+
+
+def _run_blocks(function, tasks: List[Tuple], state: Dict, n_jobs: int) -> List:
+    if n_jobs <= 1 or len(tasks) < 2:
+        _init_worker(state)
+        try:
+            return [function(task) for task in tasks]
+        finally:
+            _init_worker(None)
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks)),
+                             initializer=_init_worker, initargs=(state,)) as pool:
+        return list(pool.map(function, tasks))
+
+
+def bootstrap_drift_statistics(
+    reference: Union[pd.DataFrame, ReferenceProfile],
+    production: pd.DataFrame,
+    features: List[str] = None,
+    n_resamples: int = DEFAULT_BOOTSTRAP_RESAMPLES,
+    seed: int = 0,
+    n_jobs: int = 1,
+    permutations: bool = True,
+    bin_quantiles=DEFAULT_BIN_QUANTILES
+) -> BootstrapDistribution:
+    """
+    Bootstrap distribution of every drift statistic, and KS permutation p-values.
+
+    Args:
+        reference: Training/reference data or its ReferenceProfile (kept fixed)
+        production: Production batch data
+        features: Features to resample (default: ALL_FEATURES, or the profile's features)
+        n_resamples: Bootstrap resamples (and permutations)
+        seed: Root seed; the same seed gives the same result for any n_jobs
+        n_jobs: Worker processes (1 = in-process; None = all CPUs)
+        permutations: Also compute KS permutation p-values (DataFrame reference only)
+        bin_quantiles: PSI/JS bin edges, as in compute_ks_statistics
+
+    Returns:
+        BootstrapDistribution
+    """
+    if isinstance(reference, ReferenceProfile):
+        features = list(reference.features if features is None else features)
+    else:
+        features = list(ALL_FEATURES if features is None else features)
+    n_jobs = (os.cpu_count() or 1) if n_jobs is None else n_jobs
+
+    state = _prepare(reference, production, features, bin_quantiles)
+    devices = state['ref_devices'] + state['prod_devices']
+    block_size = max(1, min(BOOTSTRAP_BLOCK_SIZE, BOOTSTRAP_BLOCK_ELEMENTS // max(devices, 1)))
+    bootstrap_seed, permutation_seed = np.random.SeedSequence(seed).spawn(2)
+
+    blocks = _run_blocks(_bootstrap_block, _blocks(n_resamples, block_size, bootstrap_seed), state, n_jobs)
+    samples = {metric: np.concatenate([block[metric] for block in blocks]) for metric in BOOTSTRAP_METRICS}
+
+    p_values = np.full(len(features), np.nan)
+    if permutations and state['ref_devices']:
+        permuted = np.concatenate(
+            _run_blocks(_permutation_block, _blocks(n_resamples, block_size, permutation_seed), state, n_jobs)
+        )
+        ref_sorted, ref_n = sort_columns(reference, features)
+        prod_sorted, prod_n = sort_columns(production, features)
+        observed = ecdf_distances_from_sorted(ref_sorted, ref_n, prod_sorted, prod_n)[0]
+        # Tolerance: the same split computed through two paths can differ in the last bit
+        exceed = np.sum(permuted >= observed - 1e-12, axis=0)
+        p_values = np.where(np.isnan(observed), np.nan, (exceed + 1) / (n_resamples + 1))
+
+    return BootstrapDistribution(
+        features=features,
+        samples=samples,
+        permutation_p_values=p_values,
+        n_resamples=n_resamples,
+        seed=seed,
+    )
+
+
+def add_confidence_intervals(
+    ks_results: Dict[str, Dict],
+    distribution: BootstrapDistribution,
+    confidence: float = DEFAULT_CONFIDENCE
+) -> Dict[str, Dict]:
+    """
+    Add bootstrap intervals to compute_ks_statistics results (in place).
+
+    Each feature gains 'confidence_intervals' ({metric: [low, high]}) and
+    'permutation_p_value' (None without reference rows).
+
+    Returns:
+        ks_results
+    """
+    intervals = {metric: distribution.interval(metric, confidence) for metric in BOOTSTRAP_METRICS}
+    for j, feature in enumerate(distribution.features):
+        if feature not in ks_results:
+            continue
+        p_value = distribution.permutation_p_values[j]
+        ks_results[feature]['confidence_intervals'] = {
+            metric: [None if np.isnan(v) else float(v) for v in interval[:, j]]
+            for metric, interval in intervals.items()
+        }
+        ks_results[feature]['permutation_p_value'] = None if np.isnan(p_value) else float(p_value)
+    return ks_results
@@ -0,0 +1,167 @@
+"""
+Exporta o artefato de inferência (sem SMOTE) e mede o cold start vs o .pkl.
+
+PROBLEMA:
+- catboost_pipeline_v2_field_only.pkl é o pipeline imblearn inteiro: o
+  SMOTE (que só atua no treino) é desserializado e o load importa imblearn
+  e sklearn em todo processo que faz scoring (serviço, workers, Streamlit)
+- O pickle fica preso à versão do sklearn do treino (SimpleImputer 1.6.1)
+
+SOLUÇÃO:
+- Artefato em diretório: model.cbm (formato nativo do CatBoost) +
+  preprocessing.json (medianas do imputer, ordem das features, threshold)
+- load_inference_artifact monta o FastInferenceModel só com catboost
+- Paridade verificada no export (mesmas probabilidades do pipeline compilado)
+- --benchmark: tempo de cold start (import + load + 1ª predição) e pico de
+  RSS em processos novos, joblib.load(.pkl) vs artefato
+
+Uso:
+    python scripts/export_inference_artifact.py
+    python scripts/export_inference_artifact.py --output models/catboost_v2_field_only_inference \\
+        --benchmark --repeat 5 --report reports/cold_start.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODEL_PATH = PROJECT_ROOT / "models" / "catboost_pipeline_v2_field_only.pkl"
+ARTIFACT_DIR = PROJECT_ROOT / "models" / "catboost_v2_field_only_inference"
+TEST_DATA_PATH = PROJECT_ROOT / "data" / "device_features_test_stratified.csv"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+from models.inference import compile_pipeline, export_inference_artifact, load_inference_artifact, load_model
+
+# Executado em um interpretador novo: import + load + 1ª predição
+COLD_START_CODE = '''
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import numpy as np
+if {mode!r} == 'pickle':
+    import joblib
+    from models.inference import compile_pipeline
+    model = compile_pipeline(joblib.load({path!r}))
+else:
+    from models.inference import load_inference_artifact
+    model = load_inference_artifact({path!r})
+loaded = time.perf_counter()
+model.predict_proba_critical(np.zeros((1, len(model.feature_order)), dtype=np.float32))
+ready = time.perf_counter()
+rss = None
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmHWM:'):
+            rss = int(line.split()[1]) / 1024
+print(json.dumps({{
+    'load_seconds': loaded - start,
+    'ready_seconds': ready - start,
+    'peak_rss_mb': rss,
+    'imports_imblearn': 'imblearn' in sys.modules,
+    'imports_sklearn': 'sklearn' in sys.modules,
+}}))
+'''
+
+
+def check_parity(pipeline, artifact_model, X):
+    """Probabilidades do artefato vs pipeline compilado (mesmas medianas + CatBoost)."""
+    expected = compile_pipeline(pipeline).predict_proba_critical(X)
+    result = artifact_model.predict_proba_critical(X)
+    return float(np.abs(expected - result).max())
+
+
+def measure_cold_start(mode, path, repeat=3):
+    """
+    Cold start em `repeat` processos novos.
+
+    Args:
+        mode: 'pickle' (joblib.load + compile_pipeline) ou 'artifact'
+        path: .pkl ou diretório do artefato
+        repeat: Processos medidos (mediana)
+
+    Returns:
+        dict com medianas de load/ready (s), pico de RSS (MB) e módulos importados
+    """
+    code = COLD_START_CODE.format(root=str(PROJECT_ROOT), mode=mode, path=str(path))
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    peaks = [r['peak_rss_mb'] for r in runs if r['peak_rss_mb'] is not None]
+    return {
+        'mode': mode,
+        'load_seconds': statistics.median(r['load_seconds'] for r in runs),
+        'ready_seconds': statistics.median(r['ready_seconds'] for r in runs),
+        'peak_rss_mb': statistics.median(peaks) if peaks else None,
+        'imports_imblearn': runs[0]['imports_imblearn'],
+        'imports_sklearn': runs[0]['imports_sklearn'],
+    }
+
+
+def print_cold_start(results):
+    """Tabela pickle vs artefato."""
+    print("\n" + "=" * 70)
+    print("COLD START (processo novo: import + load + 1ª predição)")
+    print("=" * 70)
+    print(f"{'modo':<10} {'load (s)':>10} {'pronto (s)':>11} {'pico RSS (MB)':>14} {'imblearn':>9} {'sklearn':>8}")
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else 'n/d'
+        print(f"{r['mode']:<10} {r['load_seconds']:>10.2f} {r['ready_seconds']:>11.2f} {rss:>14} "
+              f"{str(r['imports_imblearn']):>9} {str(r['imports_sklearn']):>8}")
+    print("=" * 70)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Exporta o artefato de inferência (.cbm + JSON) do pipeline .pkl')
+    parser.add_argument('--model', default=str(MODEL_PATH), help='Pipeline .pkl de origem')
+    parser.add_argument('--output', default=str(ARTIFACT_DIR), help='Diretório do artefato')
+    parser.add_argument('--threshold', type=float, default=0.5, help='Threshold de decisão gravado (default: 0.5)')
+    parser.add_argument('--data', default=str(TEST_DATA_PATH), help='CSV para checar paridade')
+    parser.add_argument('--benchmark', action='store_true', help='Mede cold start pickle vs artefato')
+    parser.add_argument('--repeat', type=int, default=3, help='Processos por modo no benchmark (default: 3)')
+    parser.add_argument('--report', default=None, help='JSON de saída do benchmark')
+    args = parser.parse_args(argv)
+
+    print("\n[1/3] Loading pipeline...")
+    pipeline = load_model(args.model)
+
+    print("\n[2/3] Exporting artifact...")
+    export_inference_artifact(pipeline, args.output, decision_threshold=args.threshold,
+                              source_model=Path(args.model).name)
+    artifact_model = load_inference_artifact(args.output)
+
+    X = pd.read_csv(args.data).reindex(columns=artifact_model.feature_order)
+    max_diff = check_parity(pipeline, artifact_model, X)
+    print(f"   ✓ Paridade ({len(X)} devices): max |Δp| = {max_diff:.2e}")
+    if max_diff > 1e-9:
+        print("   ❌ Artefato diverge do pipeline")
+        return 1
+
+    if args.benchmark:
+        print("\n[3/3] Cold start benchmark...")
+        results = [measure_cold_start('pickle', args.model, args.repeat),
+                   measure_cold_start('artifact', args.output, args.repeat)]
+        print_cold_start(results)
+
+        if args.report:
+            report_path = Path(args.report)
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(report_path, 'w') as f:
+                json.dump({'generated_at': datetime.now().isoformat(), 'results': results}, f, indent=2)
+            print(f"\n💾 Resultados salvos: {report_path}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+Gerador de payloads AWS sintéticos (MESSAGE-LEVEL) para testes de escala.
+
+PROBLEMA:
+- Não há como medir como load_aws_payload + aggregate_by_device escalam: os
+  exports reais são poucos, grandes e não podem sair do ambiente AWS
+
+SOLUÇÃO:
+- Gera CSV (ou dataset Parquet particionado) no mesmo formato do export AWS:
+  device_id (IMEI), f_cnt, @timestamp ISO8601, eyon_metadata.decoded_payload.*,
+  MODE (FACTORY/FIELD) e colunas extras não usadas pela agregação
+- Configurável: número de devices, mensagens por device, taxa de NaN e fração
+  de mensagens FACTORY (início do ciclo de vida de cada device)
+- Escrita em blocos de devices: memória limitada ao bloco, mesmo para 100M linhas
+- Determinístico por seed
+
+Uso:
+    python scripts/generate_synthetic_payload.py --devices 10000 --messages-per-device 100 \\
+        --output payloads_synthetic/payload_1M.csv
+    python scripts/generate_synthetic_payload.py --devices 10000 --messages-per-device 100 \\
+        --format parquet --output payloads_synthetic/parquet_1M/
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from transform_aws_payload import AWS_COLUMN_MAPPING, HAS_PYARROW, TIMESTAMP_COL
+
+logger = logging.getLogger(__name__)
+
+MODE_COL = 'eyon_metadata.decoded_payload.mode'
+FIRST_IMEI = 861275072000000
+
+# (média da frota, desvio entre devices, ruído por mensagem)
+SENSOR_PROFILES = {
+    'optical': (-20.0, 4.0, 1.5),
+    'temp': (40.0, 12.0, 3.0),
+    'battery': (3.4, 0.3, 0.05),
+    'snr': (10.0, 4.0, 2.0),
+    'rsrp': (-90.0, 8.0, 3.0),
+    'rsrq': (-10.0, 2.0, 1.0),
+}
+
+# Colunas do export que a agregação não usa (exercitam o column pruning)
+EXTRA_COLUMNS = {
+    'msg_type': lambda rng, n: rng.choice([6, 43], n),
+    'project_name': lambda rng, n: np.full(n, 'eyon-fttx'),
+    'eyon_metadata.gateway.name': lambda rng, n: rng.choice(['gw-poa-01', 'gw-poa-02', 'gw-cwb-01'], n),
+    'eyon_metadata.decoded_payload.firmware': lambda rng, n: rng.choice(['1.0.3', '1.1.0'], n),
+}
+
+DEFAULT_BLOCK_ROWS = 2_000_000
+
+
+def generate_payload_frame(
+    n_devices: int,
+    messages_per_device: int,
+    nan_rate: float = 0.05,
+    factory_fraction: float = 0.1,
+    seed: int = 42,
+    first_device: int = 0,
+    start: str = '2025-09-01',
+    days: int = 60,
+) -> pd.DataFrame:
+    """
+    Gera um bloco de mensagens AWS raw.
+
+    Args:
+        n_devices: Devices no bloco
+        messages_per_device: Mensagens por device
+        nan_rate: Fração de leituras de sensor ausentes (NaN)
+        factory_fraction: Fração inicial das mensagens de cada device em MODE=FACTORY
+        seed: Seed do bloco
+        first_device: Índice do primeiro device (IDs contínuos entre blocos)
+        start: Início da janela de mensagens
+        days: Duração da janela de mensagens
+
+    Returns:
+        DataFrame no formato do export AWS (mensagens embaralhadas no tempo)
+    """
+    rng = np.random.default_rng(seed)
+    n_rows = n_devices * messages_per_device
+
+    device_idx = np.repeat(np.arange(n_devices), messages_per_device)
+    position = np.tile(np.arange(messages_per_device), n_devices)
+
+    # Timestamps crescentes por device: f_cnt acompanha a ordem das mensagens
+    offsets = np.sort(rng.integers(0, days * 86400, (n_devices, messages_per_device)), axis=1).ravel()
+    timestamps = np.datetime64(start, 'ms') + offsets.astype('timedelta64[s]')
+
+    mode = np.where(position < int(round(factory_fraction * messages_per_device)), 'FACTORY', 'FIELD')
+
+    columns = {
+        'device_id': FIRST_IMEI + first_device + device_idx,
+        AWS_COLUMN_MAPPING['frame_count']: position + rng.integers(0, 1000, n_devices)[device_idx],
+        TIMESTAMP_COL: np.datetime_as_string(timestamps, unit='ms', timezone='UTC'),
+        MODE_COL: mode,
+    }
+
+    for sensor, (fleet_mean, device_std, noise_std) in SENSOR_PROFILES.items():
+        baseline = rng.normal(fleet_mean, device_std, n_devices)[device_idx]
+        values = (baseline + rng.normal(0, noise_std, n_rows)).astype(np.float32)
+        values[rng.random(n_rows) < nan_rate] = np.nan
+        columns[AWS_COLUMN_MAPPING[sensor]] = values
+
+    for name, make in EXTRA_COLUMNS.items():
+        columns[name] = make(rng, n_rows)
+
+    # Export AWS vem ordenado por tempo, não por device
+    order = np.argsort(offsets, kind='stable')
+    return pd.DataFrame(columns).iloc[order].reset_index(drop=True)
+
+
+def _device_blocks(n_devices: int, messages_per_device: int, block_rows: int):
+    """(primeiro device, devices no bloco) com até block_rows linhas por bloco."""
+    devices_per_block = max(1, block_rows // max(1, messages_per_device))
+    for first in range(0, n_devices, devices_per_block):
+        yield first, min(devices_per_block, n_devices - first)
+
+
+def write_synthetic_payload(
+    output,
+    n_devices: int,
+    messages_per_device: int,
+    nan_rate: float = 0.05,
+    factory_fraction: float = 0.1,
+    seed: int = 42,
+    fmt: str = 'csv',
+    block_rows: int = DEFAULT_BLOCK_ROWS,
+) -> int:
+    """
+    Escreve um payload sintético em blocos de devices.
+
+    Args:
+        output: CSV de saída (fmt='csv') ou raiz do dataset Parquet (fmt='parquet')
+        n_devices, messages_per_device, nan_rate, factory_fraction, seed:
+            ver generate_payload_frame
+        fmt: 'csv' ou 'parquet' (dataset particionado date/mode, mesmo layout
+            de payload_parquet_cache.py)
+        block_rows: Linhas geradas por bloco (limita a memória)
+
+    Returns:
+        Número de linhas escritas
+    """
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f"❌ Formato inválido: {fmt} (use 'csv' ou 'parquet')")
+
+    output = Path(output)
+    n_rows = 0
+    csv_writer = None
+
+    if HAS_PYARROW:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+    if fmt == 'csv':
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.unlink(missing_ok=True)
+    else:
+        import pyarrow.parquet as pq
+        from payload_parquet_cache import PARTITION_COLS, _normalize_chunk
+        output.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"🧪 Gerando {n_devices:,} devices x {messages_per_device:,} mensagens → {output} ({fmt})")
+
+    for i, (first, count) in enumerate(_device_blocks(n_devices, messages_per_device, block_rows)):
+        block = generate_payload_frame(
+            count, messages_per_device,
+            nan_rate=nan_rate, factory_fraction=factory_fraction,
+            seed=seed + i, first_device=first
+        )
+
+        if fmt == 'csv' and HAS_PYARROW:
+            # Writer do Arrow: ~10x mais rápido que DataFrame.to_csv
+            table = pa.Table.from_pandas(block, preserve_index=False)
+            if csv_writer is None:
+                csv_writer = pa_csv.CSVWriter(str(output), table.schema)
+            csv_writer.write_table(table)
+        elif fmt == 'csv':
+            block.to_csv(output, mode='a', header=(i == 0), index=False)
+        else:
+            table = pa.Table.from_pandas(_normalize_chunk(block, MODE_COL), preserve_index=False)
+            pq.write_to_dataset(
+                table, output,
+                partition_cols=PARTITION_COLS,
+                basename_template=f"synthetic-{i}-{{i}}.parquet",
+            )
+
+        n_rows += len(block)
+
+    if csv_writer is not None:
+        csv_writer.close()
+
+    logger.info(f"✅ {n_rows:,} linhas escritas")
+    return n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Gera payloads AWS sintéticos (CSV ou Parquet) para benchmarks de ingestão'
+    )
+    parser.add_argument('--devices', type=int, default=10_000, help='Número de devices (default: 10000)')
+    parser.add_argument('--messages-per-device', type=int, default=100,
+                        help='Mensagens por device (default: 100)')
+    parser.add_argument('--nan-rate', type=float, default=0.05,
+                        help='Fração de leituras de sensor ausentes (default: 0.05)')
+    parser.add_argument('--factory-fraction', type=float, default=0.1,
+                        help='Fração de mensagens FACTORY por device (default: 0.1)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed (default: 42)')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Formato de saída (default: csv)')
+    parser.add_argument('--block-rows', type=int, default=DEFAULT_BLOCK_ROWS,
+                        help=f'Linhas por bloco de geração (default: {DEFAULT_BLOCK_ROWS})')
+    parser.add_argument('--output', required=True, help='CSV de saída ou diretório do dataset Parquet')
+    args = parser.parse_args()
+
+    write_synthetic_payload(
+        args.output, args.devices, args.messages_per_device,
+        nan_rate=args.nan_rate, factory_fraction=args.factory_fraction,
+        seed=args.seed, fmt=args.format, block_rows=args.block_rows
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Load test do serviço de scoring (scoring_service.py).
+
+OBJETIVO: Medir throughput e latência do /predict sob concorrência e o
+         efeito do micro-batching (tamanho médio dos lotes em /stats).
+
+MEDIDAS:
+- Requisições/s e latência por requisição (média, p50, p95, p99 em ms)
+- Erros (status != 200)
+- Lotes do micro-batcher no período (requisições por chamada ao modelo)
+
+Uso:
+    python scripts/scoring_service.py --port 8080 --fast &
+    python scripts/load_test_scoring_service.py --port 8080 --concurrency 64 --requests 5000
+    python scripts/load_test_scoring_service.py --endpoint batch --batch-size 500 --requests 200 \\
+        --output reports/load_test_scoring.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+TEST_DATA_PATH = PROJECT_ROOT / "data" / "device_features_test_stratified.csv"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+from utils.preprocessing import TRAINING_FEATURE_ORDER
+
+
+class ScoringClient:
+    """Cliente HTTP/1.1 mínimo com conexão keep-alive (uma requisição por vez)."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, payload=None):
+        """
+        Envia uma requisição JSON.
+
+        Returns:
+            (status, payload JSON da resposta; str para respostas em texto)
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self._writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await self._writer.drain()
+
+        head = (await self._reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        status = int(head[0].split(' ')[1])
+        headers = {k.strip().lower(): v.strip() for k, v in (line.split(':', 1) for line in head[1:] if ':' in line)}
+        data = await self._reader.readexactly(int(headers.get('content-length', 0)))
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        if not data:
+            return status, None
+        if headers.get('content-type', '').startswith('application/json'):
+            return status, json.loads(data)
+        return status, data.decode()   # /metrics: texto Prometheus
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def load_device_payloads(data_path=TEST_DATA_PATH, n_devices=None, seed=42):
+    """Features por device no formato do /predict (NaN → null)."""
+    if data_path is not None and Path(data_path).exists():
+        df = pd.read_csv(data_path).reindex(columns=TRAINING_FEATURE_ORDER)
+    else:
+        rng = np.random.default_rng(seed)
+        df = pd.DataFrame(rng.normal(size=(n_devices or 1000, len(TRAINING_FEATURE_ORDER))),
+                          columns=TRAINING_FEATURE_ORDER)
+
+    df = df.astype(object).where(df.notna(), None)
+    return [
+        {'device_id': str(i), 'features': features}
+        for i, features in enumerate(df.to_dict(orient='records'))
+    ]
+
+
+def latency_stats(latencies_s):
+    """Estatísticas de latência em ms."""
+    ms = np.asarray(latencies_s) * 1000
+    if len(ms) == 0:
+        return {'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    return {
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+    }
+
+
+async def run_load_test(host, port, devices, n_requests, concurrency, endpoint='single', batch_size=100):
+    """
+    Dispara n_requests requisições com `concurrency` conexões em paralelo.
+
+    Args:
+        host, port: Endereço do serviço
+        devices: Payloads de device (load_device_payloads)
+        n_requests: Total de requisições
+        concurrency: Conexões simultâneas
+        endpoint: 'single' (/predict) ou 'batch' (/predict/batch)
+        batch_size: Devices por requisição no endpoint batch
+
+    Returns:
+        dict com requests, errors, seconds, requests_per_sec, devices_per_sec,
+        latência e estatísticas do micro-batcher no período
+    """
+    stats_client = ScoringClient(host, port)
+    _, stats_before = await stats_client.request('GET', '/stats')
+
+    latencies = []
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal errors, next_request
+        client = ScoringClient(host, port)
+        try:
+            while next_request < n_requests:
+                i = next_request
+                next_request += 1
+                if endpoint == 'single':
+                    path, payload = '/predict', devices[i % len(devices)]
+                else:
+                    start_idx = (i * batch_size) % len(devices)
+                    batch = [devices[(start_idx + j) % len(devices)] for j in range(batch_size)]
+                    path, payload = '/predict/batch', {'devices': batch}
+
+                start = time.perf_counter()
+                status, _ = await client.request('POST', path, payload)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors += 1
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+
+    _, stats_after = await stats_client.request('GET', '/stats')
+    await stats_client.close()
+
+    batches = stats_after['batches'] - stats_before['batches']
+    batched_requests = stats_after['requests'] - stats_before['requests']
+    devices_per_request = 1 if endpoint == 'single' else batch_size
+
+    return {
+        'endpoint': endpoint,
+        'requests': n_requests,
+        'concurrency': concurrency,
+        'errors': errors,
+        'seconds': seconds,
+        'requests_per_sec': n_requests / seconds,
+        'devices_per_sec': n_requests * devices_per_request / seconds,
+        'latency': latency_stats(latencies),
+        'micro_batches': batches,
+        'mean_micro_batch_size': batched_requests / batches if batches else 0.0,
+    }
+
+
+def print_report(result):
+    """Resumo no console."""
+    latency = result['latency']
+    print("\n" + "=" * 70)
+    print(f"LOAD TEST /{'predict' if result['endpoint'] == 'single' else 'predict/batch'} "
+          f"({result['requests']:,} requisições, {result['concurrency']} conexões)")
+    print("=" * 70)
+    print(f"   Requisições/s: {result['requests_per_sec']:,.0f}  (devices/s: {result['devices_per_sec']:,.0f})")
+    print(f"   Latência (ms): média {latency['mean_ms']:.2f}, p50 {latency['p50_ms']:.2f}, "
+          f"p95 {latency['p95_ms']:.2f}, p99 {latency['p99_ms']:.2f}")
+    print(f"   Erros: {result['errors']}")
+    if result['endpoint'] == 'single':
+        print(f"   Micro-batches: {result['micro_batches']:,} "
+              f"(média {result['mean_micro_batch_size']:.1f} requisições por chamada ao modelo)")
+    print("=" * 70)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test do serviço HTTP de scoring')
+    parser.add_argument('--host', default='127.0.0.1', help='Host do serviço (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='Porta do serviço (default: 8080)')
+    parser.add_argument('--requests', type=int, default=2000, help='Total de requisições (default: 2000)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Conexões simultâneas (default: 32)')
+    parser.add_argument('--endpoint', choices=['single', 'batch'], default='single',
+                        help='/predict (single) ou /predict/batch (default: single)')
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help='Devices por requisição no endpoint batch (default: 100)')
+    parser.add_argument('--data', default=str(TEST_DATA_PATH),
+                        help='CSV com features por device (default: test set; sintético se ausente)')
+    parser.add_argument('--output', default=None, help='JSON de saída com os resultados')
+    args = parser.parse_args(argv)
+
+    devices = load_device_payloads(args.data)
+    result = asyncio.run(run_load_test(
+        args.host, args.port, devices, args.requests, args.concurrency,
+        endpoint=args.endpoint, batch_size=args.batch_size
+    ))
+    print_report(result)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w') as f:
+            json.dump({'generated_at': datetime.now().isoformat(), **result}, f, indent=2)
+        print(f"\n💾 Resultados salvos: {output_path}")
+
+    return 1 if result['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -35,6 +35,7 @@ from sklearn.metrics import (
     f1_score,
     classification_report
 )
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -44,6 +45,8 @@ warnings.filterwarnings('ignore')
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+from models.inference import predict_critical_proba, derive_outcomes
 MODEL_PATH = BASE_DIR / 'models' / 'catboost_pipeline_v2_field_only.pkl'
 FIELD_ONLY_PATH = BASE_DIR / 'data' / 'device_features_with_telemetry_field_only.csv'
 ORIGINAL_PATH = BASE_DIR / 'data' / 'device_features_with_telemetry.csv'
@@ -216,7 +219,7 @@ def load_model_and_predict(X_test):
     print(f"   └─ Pipeline steps: {[name for name, _ in model.steps]}")
     
     print(f"\n🎯 Generating predictions for {len(X_test)} test devices...")
-    y_proba = model.predict_proba(X_test)[:, 1]
+    y_proba = predict_critical_proba(model, X_test)
     
     print(f"   ├─ Probability range: [{y_proba.min():.3f}, {y_proba.max():.3f}]")
     print(f"   ├─ Mean probability: {y_proba.mean():.3f}")
@@ -241,7 +244,7 @@ def calculate_metrics(y_test, y_proba, threshold=0.50):
     print("="*80)
     
     # Convert probabilities to predictions
-    y_pred = (y_proba >= threshold).astype(int)
+    y_pred = derive_outcomes(y_proba, threshold)['prediction']
     
     # Confusion matrix
     tn, fp, fn, tp = confusion_matrix(y_test, y_pred).ravel()
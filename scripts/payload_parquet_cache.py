@@ -0,0 +1,223 @@
+"""
+Cache colunar (Parquet/Arrow) dos payloads AWS raw.
+
+PROBLEMA:
+- load_aws_payload faz pd.read_csv completo de exports largos (dezenas de colunas
+  eyon_metadata.*), mas só ~10 colunas são usadas na agregação
+- Cada execução re-parseia o texto CSV inteiro
+
+SOLUÇÃO:
+- Conversão (uma vez por arquivo): CSV → dataset Parquet particionado por
+  date=YYYY-MM-DD / mode=FIELD|FACTORY (hive)
+- Leitura: só as colunas do PayloadSchema (column pruning) e filtro
+  MODE='FIELD' empurrado para o scan (partition pruning: arquivos FACTORY nem
+  são abertos)
+- transform_aws_to_model_format aceita o diretório do dataset como input
+
+Tipos no dataset:
+- device_id (e variações): string
+- sensores e frame count: float64
+- @timestamp: timestamp
+- demais colunas: string (schema estável entre chunks/arquivos)
+
+Uso:
+    python scripts/payload_parquet_cache.py --input payloads_aws/ --output payloads_parquet/
+    python scripts/transform_aws_payload.py --parquet payloads_parquet/
+"""
+
+import argparse
+import logging
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from transform_aws_payload import (
+    AWS_COLUMN_MAPPING,
+    DEFAULT_CHUNKSIZE,
+    DEVICE_ID_CANDIDATES,
+    FRAME_COUNT_CANDIDATES,
+    MODE_CANDIDATES,
+    TIMESTAMP_COL,
+    _first_present,
+    _log_mode_column,
+    _log_mode_filter,
+    resolve_payload_schema,
+)
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLS = ['date', 'mode']
+
+# Colunas numéricas conhecidas (sensores + frame count)
+NUMERIC_COLUMNS = [
+    AWS_COLUMN_MAPPING[sensor] for sensor in ['optical', 'temp', 'battery', 'snr', 'rsrp', 'rsrq']
+] + FRAME_COUNT_CANDIDATES
+
+
+def _normalize_chunk(chunk: pd.DataFrame, mode_col: str) -> pd.DataFrame:
+    """Tipos fixos por coluna + colunas de partição (date, mode)."""
+    chunk = chunk.copy()
+
+    for col in chunk.columns:
+        if col in NUMERIC_COLUMNS:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype('float64')
+        elif col != TIMESTAMP_COL and col != mode_col:
+            chunk[col] = chunk[col].astype('string')
+
+    if TIMESTAMP_COL in chunk.columns:
+        chunk[TIMESTAMP_COL] = pd.to_datetime(chunk[TIMESTAMP_COL], errors='coerce')
+        chunk['date'] = chunk[TIMESTAMP_COL].dt.strftime('%Y-%m-%d').astype('string')
+    else:
+        chunk['date'] = pd.Series(pd.NA, index=chunk.index, dtype='string')
+
+    # MODE vira a coluna de partição 'mode' (nome canônico de MODE_CANDIDATES)
+    if mode_col:
+        chunk['mode'] = chunk.pop(mode_col).astype('string')
+    else:
+        chunk['mode'] = pd.Series(pd.NA, index=chunk.index, dtype='string')
+
+    return chunk
+
+
+def convert_csv_to_parquet(csv_path, dataset_dir, chunksize: int = DEFAULT_CHUNKSIZE) -> int:
+    """
+    Converte um CSV AWS raw para o dataset Parquet particionado (append).
+
+    Args:
+        csv_path: CSV AWS raw
+        dataset_dir: Raiz do dataset (criado se não existir)
+        chunksize: Linhas por chunk na leitura do CSV
+
+    Returns:
+        Número de linhas escritas
+    """
+    csv_path = Path(csv_path)
+    dataset_dir = Path(dataset_dir)
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+
+    header = pd.read_csv(csv_path, nrows=0).columns.tolist()
+    mode_col = _first_present(MODE_CANDIDATES, header)
+    string_cols = [c for c in DEVICE_ID_CANDIDATES + MODE_CANDIDATES if c in header]
+
+    logger.info(f"📦 Convertendo {csv_path.name} → {dataset_dir} (Parquet, partição date/mode)...")
+
+    n_rows = 0
+    with pd.read_csv(csv_path, chunksize=chunksize, dtype={c: str for c in string_cols}) as reader:
+        for chunk in reader:
+            table = pa.Table.from_pandas(_normalize_chunk(chunk, mode_col), preserve_index=False)
+            pq.write_to_dataset(
+                table,
+                dataset_dir,
+                partition_cols=PARTITION_COLS,
+                basename_template=f"{csv_path.stem}-{n_rows}-{{i}}.parquet",
+            )
+            n_rows += len(chunk)
+
+    logger.info(f"✅ {csv_path.name}: {n_rows:,} linhas convertidas")
+    return n_rows
+
+
+def open_payload_dataset(dataset_dir) -> ds.Dataset:
+    """
+    Abre o dataset com schema unificado entre arquivos (exports com colunas
+    diferentes convivem no mesmo dataset; colunas ausentes viram null).
+    """
+    dataset = ds.dataset(str(dataset_dir), format='parquet', partitioning='hive')
+    schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+    if not schemas:
+        raise ValueError(f"❌ Dataset Parquet vazio: {dataset_dir}")
+
+    unified = pa.unify_schemas(schemas + [dataset.partitioning.schema])
+    return ds.dataset(str(dataset_dir), schema=unified, format='parquet', partitioning='hive')
+
+
+def _scan_spec(dataset: ds.Dataset, field_only: bool):
+    """Resolve o PayloadSchema do dataset e monta projeção + filtro."""
+    schema = resolve_payload_schema(dataset.schema.names)
+    _log_mode_column(schema)
+
+    wanted = [schema.device_col, schema.frame_col, schema.timestamp_col]
+    wanted += [col for _, col in schema.sensor_cols]
+    columns = [c for c in dict.fromkeys(wanted) if c]
+
+    scan_filter = None
+    if field_only and schema.mode_col:
+        scan_filter = ds.field(schema.mode_col) == 'FIELD'
+
+    return columns, scan_filter, schema.mode_col
+
+
+def load_aws_payload_parquet(dataset_dir, field_only: bool = True) -> pd.DataFrame:
+    """
+    Equivalente a load_aws_payload lendo do dataset Parquet.
+
+    Lê apenas as colunas mapeadas e aplica MODE='FIELD' no scan.
+    """
+    logger.info(f"📂 Lendo dataset Parquet {dataset_dir}...")
+    dataset = open_payload_dataset(dataset_dir)
+    columns, scan_filter, mode_col = _scan_spec(dataset, field_only)
+
+    df = dataset.to_table(columns=columns, filter=scan_filter).to_pandas()
+    logger.info(f"✅ Carregado: {len(df):,} linhas, {len(columns)} colunas (de {len(dataset.schema.names)})")
+
+    if scan_filter is not None:
+        _log_mode_filter(dataset.count_rows(), len(df))
+
+    return df
+
+
+def iter_aws_payload_parquet_batches(dataset_dir, batch_size: int = DEFAULT_CHUNKSIZE, field_only: bool = True):
+    """
+    Versão streaming de load_aws_payload_parquet (memória limitada ao batch).
+
+    Yields:
+        DataFrame com até batch_size mensagens FIELD
+    """
+    dataset = open_payload_dataset(dataset_dir)
+    columns, scan_filter, mode_col = _scan_spec(dataset, field_only)
+
+    remaining = 0
+    for batch in dataset.to_batches(columns=columns, filter=scan_filter, batch_size=batch_size):
+        if batch.num_rows == 0:
+            continue
+        remaining += batch.num_rows
+        yield batch.to_pandas()
+
+    if scan_filter is not None:
+        _log_mode_filter(dataset.count_rows(), remaining)
+
+
+def convert_directory(input_dir, dataset_dir, chunksize: int = DEFAULT_CHUNKSIZE) -> List[dict]:
+    """Converte todos os CSVs de input_dir para o dataset."""
+    results = []
+    for csv_file in sorted(Path(input_dir).glob('*.csv')):
+        results.append({'input': csv_file.name, 'rows': convert_csv_to_parquet(csv_file, dataset_dir, chunksize)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Converte payloads AWS CSV para dataset Parquet particionado (date/mode)'
+    )
+    parser.add_argument('--input', default='payloads_aws', help='CSV ou diretório com CSVs AWS raw (default: payloads_aws)')
+    parser.add_argument('--output', default='payloads_parquet', help='Raiz do dataset Parquet (default: payloads_parquet)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f'Linhas por chunk na conversão (default: {DEFAULT_CHUNKSIZE})')
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    if input_path.is_dir():
+        results = convert_directory(input_path, args.output, args.chunksize)
+    else:
+        results = [{'input': input_path.name, 'rows': convert_csv_to_parquet(input_path, args.output, args.chunksize)}]
+
+    for r in results:
+        logger.info(f"   - {r['input']}: {r['rows']:,} linhas")
+
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,7 @@ MÉTRICAS ESPERADAS v2 (baseline threshold 0.50):
 CRITÉRIO SUCESSO: Reproduzir métricas v2 com precisão decimal.
 """
 
+import sys
 import pandas as pd
 import joblib
 from pathlib import Path
@@ -26,6 +27,8 @@ from sklearn.metrics import recall_score, precision_score, f1_score, roc_auc_sco
 
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from models.inference import predict_critical_proba, derive_outcomes
 MODEL_PATH = PROJECT_ROOT / "models" / "catboost_pipeline_v2_field_only.pkl"
 TEST_DATA_PATH = PROJECT_ROOT / "data" / "device_features_test_stratified.csv"
 
@@ -65,8 +68,8 @@ def validate_reproducibility():
     
     # Make predictions
     print("\n[3/4] Running inference on test set...")
-    y_pred = pipeline.predict(X_test)
-    y_proba = pipeline.predict_proba(X_test)[:, 1]
+    y_proba = predict_critical_proba(pipeline, X_test)
+    y_pred = derive_outcomes(y_proba)['prediction']
     print("   ✓ Predictions completed")
     
     # Calculate metrics
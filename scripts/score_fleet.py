@@ -0,0 +1,207 @@
+"""
+Scoring de frota em streaming: arquivo de features por device → arquivo de predições.
+
+PROBLEMA:
+- predict_batch exige a frota inteira em memória e ainda faz df.copy() antes
+  de adicionar as 4 colunas de score: o pico de memória cresce com o número
+  de devices
+
+SOLUÇÃO:
+- Lê o arquivo de features em chunks (CSV ou Parquet), scora cada chunk com
+  predict_batch_stream e escreve o chunk antes de ler o próximo: memória
+  constante, limitada a --chunksize devices
+- Saída CSV (append) ou Parquet (ParquetWriter, um row group por chunk),
+  escolhida pela extensão do arquivo de saída
+- --workers N: chunks scorados em um pool de N processos (modelo carregado
+  uma vez por worker), escritos na ordem de entrada
+- --cache-db: cache de predições em SQLite entre execuções (devices com as
+  mesmas features da noite anterior não vão ao modelo)
+- Reporta throughput em devices/s
+
+Uso:
+    python scripts/score_fleet.py --input payloads_processed/fleet_features.csv \\
+        --output reports/fleet_scores.csv
+    python scripts/score_fleet.py --input fleet_features.parquet --output fleet_scores.parquet \\
+        --chunksize 100000 --threshold 0.6 --fast
+    python scripts/score_fleet.py --input fleet_features.csv --output fleet_scores.csv --workers 4 --fast
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODEL_PATH = PROJECT_ROOT / "models" / "catboost_pipeline_v2_field_only.pkl"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+from models.inference import (
+    DEFAULT_DECISION_THRESHOLD,
+    DEFAULT_SCORING_CHUNKSIZE,
+    iter_feature_chunks,
+    load_scorer,
+    model_feature_order,
+    predict_batch_stream,
+    predict_batch_stream_parallel,
+)
+from models.prediction_cache import CachedModel, PredictionCache, model_file_version
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreWriter:
+    """Escreve chunks scorados em CSV (append) ou Parquet (um row group por chunk)."""
+
+    def __init__(self, output):
+        self.output = Path(output)
+        self.is_parquet = self.output.suffix == '.parquet'
+        self._parquet_writer = None
+        self._wrote_header = False
+
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        self.output.unlink(missing_ok=True)
+
+    def write(self, chunk):
+        if not self.is_parquet:
+            chunk.to_csv(self.output, mode='a', header=not self._wrote_header, index=False)
+            self._wrote_header = True
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._parquet_writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            self._parquet_writer = pq.ParquetWriter(str(self.output), table.schema)
+        else:
+            table = pa.Table.from_pandas(chunk, schema=self._parquet_writer.schema, preserve_index=False)
+        self._parquet_writer.write_table(table)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def score_file(
+    input_path,
+    output_path,
+    model,
+    chunksize: int = DEFAULT_SCORING_CHUNKSIZE,
+    threshold: float = DEFAULT_DECISION_THRESHOLD,
+    workers: int = 1,
+    fast: bool = False,
+):
+    """
+    Scora um arquivo de features por device, chunk a chunk.
+
+    Args:
+        input_path: CSV ou Parquet (arquivo ou diretório de dataset) com features
+        output_path: CSV ou .parquet de saída (entrada + colunas de score)
+        model: Pipeline já carregado ou FastInferenceModel (workers=1), ou
+            caminho do .pkl (workers > 1: cada worker carrega o modelo)
+        chunksize: Devices por chunk
+        threshold: Threshold de decisão
+        workers: Processos de scoring (1 = no processo atual)
+        fast: Workers usam compile_pipeline (só com workers > 1)
+
+    Returns:
+        dict com 'devices', 'chunks', 'critical', 'seconds' e 'devices_per_sec'
+    """
+    chunk_iter = iter_feature_chunks(input_path, chunksize=chunksize)
+    if workers > 1:
+        feature_order = None  # Cada worker alinha o chunk às features do seu modelo
+        scored_chunks = predict_batch_stream_parallel(chunk_iter, model, workers=workers,
+                                                      threshold=threshold, fast=fast)
+    else:
+        feature_order = model_feature_order(model)
+        scored_chunks = predict_batch_stream(chunk_iter, model, threshold=threshold,
+                                             feature_columns=feature_order)
+
+    writer = ScoreWriter(output_path)
+    devices = chunks = critical = 0
+    missing_reported = False
+
+    start = time.perf_counter()
+    try:
+        for scored in scored_chunks:
+            if feature_order is not None and not missing_reported:
+                missing = [f for f in feature_order if f not in scored.columns]
+                if missing:
+                    logger.warning(f"⚠️  Features ausentes (imputadas pela mediana): {', '.join(missing)}")
+                missing_reported = True
+
+            writer.write(scored)
+            devices += len(scored)
+            chunks += 1
+            critical += int(scored['prediction'].sum())
+            logger.info(f"   chunk {chunks}: {devices:,} devices")
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - start
+
+    return {
+        'devices': devices,
+        'chunks': chunks,
+        'critical': critical,
+        'seconds': seconds,
+        'devices_per_sec': devices / seconds if seconds > 0 else float('inf'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Scoring em streaming de um arquivo de features por device (memória constante)'
+    )
+    parser.add_argument('--input', required=True, help='CSV ou Parquet com features por device')
+    parser.add_argument('--output', required=True, help='Arquivo de saída (.csv ou .parquet)')
+    parser.add_argument('--model', default=str(MODEL_PATH),
+                        help='Pipeline .pkl ou diretório do artefato de inferência')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_SCORING_CHUNKSIZE,
+                        help=f'Devices por chunk (default: {DEFAULT_SCORING_CHUNKSIZE})')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_DECISION_THRESHOLD,
+                        help=f'Threshold de decisão (default: {DEFAULT_DECISION_THRESHOLD})')
+    parser.add_argument('--fast', action='store_true',
+                        help='Usa o fast path compilado (compile_pipeline) em vez do pipeline')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processos de scoring (default: 1, no processo atual)')
+    parser.add_argument('--cache-db', default=None,
+                        help='SQLite do cache de predições entre execuções (só com --workers 1)')
+    parser.add_argument('--cache-ttl', type=float, default=7 * 24 * 3600,
+                        help='Validade das entradas do cache em segundos (default: 7 dias)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.cache_db and args.workers > 1:
+        parser.error('--cache-db requer --workers 1')
+
+    cache = None
+    if args.workers > 1:
+        model = args.model
+    else:
+        model = load_scorer(args.model, fast=args.fast)
+        if args.cache_db:
+            # Memória limitada ao chunk; o nível em disco guarda a frota inteira
+            cache = PredictionCache(max_entries=args.chunksize, ttl_seconds=args.cache_ttl, disk_path=args.cache_db)
+            model = CachedModel(model, cache, model_file_version(args.model))
+
+    logger.info(f"🚀 Scoring {args.input} → {args.output} "
+                f"(chunks de {args.chunksize:,}, {args.workers} worker(s))")
+    stats = score_file(args.input, args.output, model, chunksize=args.chunksize,
+                       threshold=args.threshold, workers=args.workers, fast=args.fast)
+
+    logger.info(
+        f"✅ {stats['devices']:,} devices em {stats['seconds']:.2f}s "
+        f"({stats['devices_per_sec']:,.0f} devices/s), {stats['critical']:,} CRITICAL"
+    )
+    if cache is not None:
+        cache_stats = cache.stats()
+        logger.info(f"♻️  Cache: {cache_stats['hits']:,} hits, {cache_stats['misses']:,} misses "
+                    f"({cache_stats['hit_rate']:.1%})")
+        cache.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
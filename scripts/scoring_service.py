@@ -0,0 +1,499 @@
+"""
+Serviço HTTP local de scoring (asyncio, sem dependências extras).
+
+PROBLEMA:
+- Scoring só via Streamlit ou importando models/inference.py em scripts
+  avulsos: cada consumidor carrega o modelo de novo e cada device é uma
+  chamada separada ao CatBoost
+
+SOLUÇÃO:
+- Modelo carregado UMA vez no startup (.pkl, opcionalmente compilado, ou
+  artefato de inferência .cbm) e aquecido com uma predição antes de ficar pronto
+- Endpoints JSON:
+    GET  /health          processo no ar
+    GET  /ready           200 quando o modelo está carregado (503 antes)
+    GET  /stats           contadores do micro-batcher
+    GET  /metrics         latência por estágio + devices scorados (Prometheus, com --metrics)
+    POST /predict         {"device_id": ..., "features": {...}} → 1 device
+    POST /predict/batch   {"devices": [{"device_id": ..., "features": {...}}, ...]}
+- Micro-batching: requisições /predict concorrentes que chegam dentro da
+  janela --max-wait-ms são agrupadas (até --max-batch-size) em UMA chamada
+  vetorizada do modelo; o scoring roda em thread para não bloquear o loop
+- Cache de predições (models/prediction_cache.py) na frente do modelo:
+  features repetidas não chamam o CatBoost (--cache-size 0 desliga,
+  --cache-db adiciona o nível em disco); hits/misses em /stats
+- --registry: modelo ativo de models/registry.json com hot reload
+  (models/model_manager.py). Um deploy no registry carrega e aquece o novo
+  modelo em background e troca atomicamente; requisições em andamento
+  terminam no modelo antigo, sem reiniciar o serviço
+- --shadow (com --registry): os modelos com status "shadow" do registry
+  são scorados na mesma matriz de features de cada lote, numa thread de
+  fundo (models/shadow_scoring.py); divergências em logs/shadow/ e em
+  /stats, sem latência extra na resposta
+
+Uso:
+    python scripts/scoring_service.py --port 8080 --fast
+    python scripts/scoring_service.py --port 8080 --registry models/registry.json
+    python scripts/scoring_service.py --port 8080 --registry --shadow --shadow-parallel
+    curl -s localhost:8080/predict -d '{"device_id": "861275072000001", "features": {...}}'
+    python scripts/load_test_scoring_service.py --port 8080 --concurrency 64 --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODEL_PATH = PROJECT_ROOT / "models" / "catboost_pipeline_v2_field_only.pkl"
+
+sys.path.insert(0, str(PROJECT_ROOT))
+from models.inference import DEFAULT_DECISION_THRESHOLD, score_devices
+from models.model_manager import DEFAULT_POLL_INTERVAL, ModelManager
+from models.prediction_cache import DEFAULT_MAX_ENTRIES, PredictionCache
+from models.scoring_metrics import PROMETHEUS_CONTENT_TYPE, enable_metrics, get_metrics, render_prometheus, stage
+from models.shadow_scoring import DEFAULT_LOG_DIR as SHADOW_LOG_DIR
+from models.shadow_scoring import DEFAULT_PROBABILITY_TOLERANCE, ShadowScorer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_WAIT_MS = 5.0
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+HTTP_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+
+class RequestError(Exception):
+    """Erro de requisição com status HTTP (vira resposta JSON {'error': ...})."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    """
+    Agrupa requisições concorrentes de 1 device em lotes.
+
+    O primeiro item de um lote espera no máximo max_wait_ms por outros; o lote
+    fecha antes se chegar a max_batch_size. score_fn recebe a lista de itens e
+    devolve a lista de resultados na mesma ordem (roda em thread).
+    """
+
+    def __init__(self, score_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item):
+        """Enfileira um item e espera o resultado do lote em que ele cair."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """Primeiro item + o que chegar dentro da janela (até max_batch_size)."""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Esvazia o que já está na fila sem esperar
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.score_fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.requests += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+
+class ScoringService:
+    """Modelo pré-carregado (ModelManager) + rotas HTTP + micro-batcher."""
+
+    def __init__(
+        self,
+        model_path=MODEL_PATH,
+        threshold: float = None,
+        fast: bool = False,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        cache_size: int = DEFAULT_MAX_ENTRIES,
+        cache_ttl: float = None,
+        cache_db=None,
+        registry=None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        metrics: bool = False,
+        shadow: bool = False,
+        shadow_parallel: bool = False,
+        shadow_log_dir=SHADOW_LOG_DIR,
+        shadow_tolerance: float = DEFAULT_PROBABILITY_TOLERANCE,
+    ):
+        self.model_path = Path(model_path)
+        # None: threshold do modelo servido (decision_threshold do registry/artefato)
+        self.threshold = threshold
+        self.fast = fast
+        self.cache = PredictionCache(cache_size, ttl_seconds=cache_ttl, disk_path=cache_db) if cache_size > 0 else None
+        # registry=None: modelo fixo em model_path (sem watcher)
+        self.manager = ModelManager(
+            registry, model_path=self.model_path, poll_interval=poll_interval, fast=fast, cache=self.cache,
+            shadows=shadow
+        )
+        # Shadows: mesma matriz de cada lote, scorada fora do caminho da resposta
+        self.shadow = ShadowScorer(
+            self.manager.shadow_handles, log_dir=shadow_log_dir, parallel=shadow_parallel,
+            probability_tolerance=shadow_tolerance
+        ) if shadow else None
+        self.ready = False
+        if metrics:
+            enable_metrics()
+        self.batcher = MicroBatcher(self.score_records, max_batch_size, max_wait_ms)
+        self._server = None
+
+    # ------------------------------------------------------------------
+    # Modelo
+    # ------------------------------------------------------------------
+    def load(self):
+        """Carrega, compila (opcional) e aquece o modelo; inicia o watcher do registry (bloqueante)."""
+        handle = self.manager.start().current()
+        self.ready = True
+        logger.info(f"✅ Modelo pronto ({len(handle.feature_order)} features, "
+                    f"threshold {self.decision_threshold(handle)})")
+
+    def decision_threshold(self, handle):
+        """--threshold explícito ou o decision_threshold do handle (acompanha o hot reload)."""
+        return handle.decision_threshold if self.threshold is None else self.threshold
+
+    @property
+    def model(self):
+        return self.manager.current().model if self.manager.ready else None
+
+    @property
+    def feature_order(self):
+        return self.manager.current().feature_order if self.manager.ready else None
+
+    def _parse_device(self, payload):
+        """{'device_id': ..., 'features': {...}} (ou as features no nível raiz)."""
+        if not isinstance(payload, dict):
+            raise RequestError(400, "Device deve ser um objeto JSON")
+        features = payload.get('features', payload)
+        if not isinstance(features, dict):
+            raise RequestError(400, "'features' deve ser um objeto JSON")
+
+        missing = [f for f in self.feature_order if f not in features]
+        if missing:
+            raise RequestError(400, f"Features ausentes: {missing}")
+        return {'device_id': payload.get('device_id'), 'features': features}
+
+    def score_records(self, devices):
+        """Uma chamada vetorizada ao modelo para a lista de devices."""
+        # Um handle por lote: um hot reload no meio não mistura modelos
+        handle = self.manager.current()
+        with stage('dataframe'):
+            X = pd.DataFrame.from_records([d['features'] for d in devices], columns=handle.feature_order)
+        with stage('coerce'):
+            X = X.apply(pd.to_numeric, errors='coerce')
+        threshold = self.decision_threshold(handle)
+        scores = score_devices(X, handle.model, threshold)
+        if self.shadow is not None:
+            self.shadow.submit(X, scores, handle, [d['device_id'] for d in devices], threshold)
+
+        results = []
+        for device, prediction, probability, risk_level, verdict in zip(
+            devices, scores['prediction'], scores['probability'], scores['risk_level'], scores['verdict']
+        ):
+            result = {
+                'prediction': int(prediction),
+                'probability': float(probability),
+                'risk_level': str(risk_level),
+                'verdict': str(verdict),
+            }
+            if device['device_id'] is not None:
+                result = {'device_id': device['device_id'], **result}
+            results.append(result)
+        return results
+
+    # ------------------------------------------------------------------
+    # Rotas
+    # ------------------------------------------------------------------
+    async def route(self, method, path, body):
+        """Despacha a requisição; devolve (status, payload JSON)."""
+        path = path.split('?', 1)[0].rstrip('/') or '/'
+
+        if path == '/health':
+            self._require_method(method, 'GET')
+            return 200, {'status': 'ok'}
+        if path == '/ready':
+            self._require_method(method, 'GET')
+            if not self.ready:
+                return 503, {'status': 'loading'}
+            handle = self.manager.current()
+            return 200, {'status': 'ready', 'model': handle.model_path.name, 'model_id': handle.model_id,
+                         'version': handle.version, 'threshold': self.decision_threshold(handle)}
+        if path == '/stats':
+            self._require_method(method, 'GET')
+            stats = self.batcher.stats()
+            stats['cache'] = self.cache.stats() if self.cache is not None else None
+            stats['model'] = self.manager.stats()
+            stats['shadow'] = self.shadow.stats() if self.shadow is not None else None
+            return 200, stats
+        if path == '/metrics':
+            self._require_method(method, 'GET')
+            if get_metrics() is None:
+                raise RequestError(404, "Métricas desligadas (use --metrics)")
+            return 200, render_prometheus()
+
+        if path not in ('/predict', '/predict/batch'):
+            raise RequestError(404, f"Rota não encontrada: {path}")
+        self._require_method(method, 'POST')
+        if not self.ready:
+            raise RequestError(503, "Modelo ainda não carregado")
+
+        try:
+            payload = json.loads(body or b'null')
+        except ValueError:
+            raise RequestError(400, "JSON inválido")
+
+        if path == '/predict':
+            return 200, await self.batcher.submit(self._parse_device(payload))
+
+        devices = payload.get('devices') if isinstance(payload, dict) else payload
+        if not isinstance(devices, list):
+            raise RequestError(400, "Esperado {'devices': [...]}")
+        devices = [self._parse_device(d) for d in devices]
+        if not devices:
+            return 200, {'predictions': []}
+
+        # Lote explícito: já é vetorizado, não passa pelo micro-batcher
+        loop = asyncio.get_running_loop()
+        return 200, {'predictions': await loop.run_in_executor(None, self.score_records, devices)}
+
+    @staticmethod
+    def _require_method(method, expected):
+        if method != expected:
+            raise RequestError(405, f"Use {expected}")
+
+    # ------------------------------------------------------------------
+    # HTTP/1.1 mínimo (keep-alive, Content-Length)
+    # ------------------------------------------------------------------
+    async def _read_request(self, reader):
+        """(method, path, headers, body) ou None se a conexão fechou."""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError:
+            return None
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, path, version = lines[0].split(' ', 2)
+        except ValueError:
+            raise RequestError(400, "Linha de requisição inválida")
+
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0) or 0)
+        if length > MAX_BODY_BYTES:
+            raise RequestError(413, f"Corpo maior que {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), path, headers, version, body
+
+    @staticmethod
+    def _response(status, payload, keep_alive):
+        # str = texto Prometheus (/metrics); o resto é JSON
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), PROMETHEUS_CONTENT_TYPE
+        else:
+            body, content_type = json.dumps(payload).encode(), 'application/json'
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        return head.encode() + body
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, version, body = request
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                    status, payload = await self.route(method, path, body)
+                except RequestError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    logger.exception("❌ Erro no scoring")
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, preload=True):
+        """
+        Abre o socket e carrega o modelo (/health responde durante o load).
+
+        Returns:
+            (host, port) efetivos (port=0 escolhe uma porta livre)
+        """
+        self.batcher.start()
+        self._server = await asyncio.start_server(self.handle_connection, host, port)
+        address = self._server.sockets[0].getsockname()[:2]
+        logger.info(f"🚀 Scoring service em http://{address[0]}:{address[1]}")
+
+        if preload and not self.ready:
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+        return address
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            if hasattr(self._server, 'close_clients'):  # Python 3.13+: wait_closed espera as conexões
+                self._server.close_clients()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batcher.stop()
+        await asyncio.get_running_loop().run_in_executor(None, self.manager.stop)
+        if self.shadow is not None:
+            self.shadow.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        await self.start(host, port)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serviço HTTP local de scoring com micro-batching')
+    parser.add_argument('--model', default=str(MODEL_PATH),
+                        help='Pipeline .pkl ou diretório do artefato de inferência')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Host (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Porta (default: {DEFAULT_PORT})')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='Threshold de decisão (default: decision_threshold do modelo, '
+                             f'{DEFAULT_DECISION_THRESHOLD} sem metadata)')
+    parser.add_argument('--fast', action='store_true', help='Usa o fast path compilado (compile_pipeline)')
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help=f'Máximo de requisições por micro-batch (default: {DEFAULT_MAX_BATCH_SIZE})')
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help=f'Janela de espera do micro-batch em ms (default: {DEFAULT_MAX_WAIT_MS})')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help=f'Entradas do cache de predições em memória, 0 desliga (default: {DEFAULT_MAX_ENTRIES})')
+    parser.add_argument('--cache-ttl', type=float, default=None,
+                        help='Validade das entradas do cache em segundos (default: sem expiração)')
+    parser.add_argument('--cache-db', default=None, help='SQLite do nível em disco do cache (default: só memória)')
+    parser.add_argument('--registry', nargs='?', const=str(PROJECT_ROOT / 'models' / 'registry.json'), default=None,
+                        help='Serve o modelo ativo do registry com hot reload (ignora --model)')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Liga a instrumentação por estágio e expõe GET /metrics (Prometheus)')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f'Segundos entre verificações do registry (default: {DEFAULT_POLL_INTERVAL})')
+    parser.add_argument('--shadow', action='store_true',
+                        help='Scora também os modelos com status "shadow" do registry (requer --registry)')
+    parser.add_argument('--shadow-parallel', action='store_true', help='Um shadow por thread')
+    parser.add_argument('--shadow-log-dir', default=str(SHADOW_LOG_DIR),
+                        help='Diretório dos JSONL de divergências (default: logs/shadow)')
+    parser.add_argument('--shadow-tolerance', type=float, default=DEFAULT_PROBABILITY_TOLERANCE,
+                        help=f'|Δ probabilidade| registrado como divergência (default: {DEFAULT_PROBABILITY_TOLERANCE})')
+    args = parser.parse_args(argv)
+    if args.shadow and args.registry is None:
+        parser.error('--shadow requer --registry')
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    service = ScoringService(
+        args.model, threshold=args.threshold, fast=args.fast,
+        max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+        cache_size=args.cache_size, cache_ttl=args.cache_ttl, cache_db=args.cache_db,
+        registry=args.registry, poll_interval=args.poll_interval, metrics=args.metrics,
+        shadow=args.shadow, shadow_parallel=args.shadow_parallel, shadow_log_dir=args.shadow_log_dir,
+        shadow_tolerance=args.shadow_tolerance
+    )
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        logger.info("👋 Encerrado")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
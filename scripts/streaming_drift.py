@@ -0,0 +1,545 @@
+"""
+Streaming Drift Monitor - Online drift detection over rolling windows
+
+drift_monitor.py compares one static production CSV with the reference.
+This module consumes scored device batches as they arrive and keeps, per
+day and per feature, a mergeable KLL quantile sketch plus running moments
+(count/mean/M2). Raw rows are never retained:
+
+- Daily buckets: one sketch per feature per calendar day; buckets older
+  than the longest window are dropped, so memory is bounded by
+  (days kept) x (features) x O(k) values no matter how many devices
+  stream through
+- Rolling windows: 'daily' (latest day) and 'weekly' (last 7 days) are
+  merges of daily buckets
+- Per window: approximate KS (sketch ECDF vs reference profile), PSI over
+  the reference-quantile bins of drift_monitor, exact means/stds, and the OK/WARNING/CRITICAL
+  status from drift_monitor.classify_drift_status (KS and PSI thresholds, as in batch runs)
+
+Usage:
+    python scripts/drift_monitor.py stream \\
+        --batches data/scored/2025-11-*.csv \\
+        --timestamp-column scored_at \\
+        --output reports/drift_stream.jsonl
+
+    from streaming_drift import StreamingDriftMonitor
+
+    monitor = StreamingDriftMonitor(load_reference_profile(path))
+    statuses = monitor.update(batch_df, timestamp=scored_at)   # {'daily': {...}, 'weekly': {...}}
+
+Author: Data Science Team
+"""
+
+import argparse
+import json
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from drift_monitor import (
+    ALL_FEATURES,
+    DEFAULT_BIN_QUANTILES,
+    DEFAULT_METRIC_THRESHOLDS,
+    DEFAULT_PROFILE_DIR,
+    DEFAULT_REGISTRY_PATH,
+    ReferenceProfile,
+    bin_edges_from_sorted,
+    bin_proportions,
+    build_reference_profile,
+    classify_drift_status,
+    detect_lifecycle_drift,
+    ks_asymptotic_pvalues,
+    population_stability_index,
+    resolve_reference,
+)
+
+DEFAULT_SKETCH_K = 200                       # KLL accuracy parameter (rank error ~ 1.7 / k)
+DEFAULT_WINDOWS = {'daily': 1, 'weekly': 7}  # window name -> days
+
+
+# ----------------------------------------------------------------------
+# KLL sketch
+# ----------------------------------------------------------------------
+class KLLSketch:
+    """
+    Mergeable quantile sketch (KLL, Karnin-Lang-Liberty 2016).
+
+    Level h holds items of weight 2**h. When a level exceeds its capacity
+    (k * (2/3)**depth, at least 2) it is sorted and every other item, from a
+    random offset, is promoted to the next level. Size stays O(k) plus a few
+    items per level; rank error is about 1.7 / k with high probability.
+    """
+
+    def __init__(self, k: int = DEFAULT_SKETCH_K, rng: np.random.Generator = None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = rng if rng is not None else np.random.default_rng()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    @property
+    def size(self) -> int:
+        """Items currently stored."""
+        return sum(len(items) for items in self.levels)
+
+    def update(self, values) -> 'KLLSketch':
+        """Add values (NaN ignored)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """Merge another sketch into this one (in place)."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            if len(items):
+                self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self.levels)):
+                items = self.levels[level]
+                if len(items) <= self._capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Odd count: the largest item stays at this level
+                even = len(items) - len(items) % 2
+                promoted = items[self._rng.integers(2):even:2]
+                self.levels[level] = items[even:]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                compacted = True
+
+    def sorted_items(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(items sorted, cumulative weights): the sketch's weighted ECDF."""
+        if not self.size:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_h), 2 ** h, dtype=np.int64)
+                                  for h, items_h in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def cdf(self, x) -> np.ndarray:
+        """Approximate P(X <= x)."""
+        items, cumulative = self.sorted_items()
+        x = np.asarray(x, dtype=np.float64)
+        if not len(items):
+            return np.full(x.shape, np.nan)
+        idx = np.searchsorted(items, x, side='right')
+        return np.where(idx > 0, cumulative[np.maximum(idx - 1, 0)], 0) / cumulative[-1]
+
+    def quantile(self, q) -> np.ndarray:
+        """Approximate quantiles (lower item at rank q * n)."""
+        items, cumulative = self.sorted_items()
+        q = np.asarray(q, dtype=np.float64)
+        if not len(items):
+            return np.full(q.shape, np.nan)
+        idx = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return items[np.minimum(idx, len(items) - 1)]
+
+
+class RunningMoments:
+    """Count, mean and M2 (sum of squared deviations), mergeable (Chan et al.)."""
+
+    __slots__ = ('n', 'mean', 'm2')
+
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.n, self.mean, self.m2 = n, mean, m2
+
+    def update(self, values) -> 'RunningMoments':
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            mean = values.mean()
+            self.merge(RunningMoments(len(values), mean, float(((values - mean) ** 2).sum())))
+        return self
+
+    def merge(self, other: 'RunningMoments') -> 'RunningMoments':
+        n = self.n + other.n
+        if other.n:
+            delta = other.mean - self.mean
+            self.mean += delta * other.n / n
+            self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+            self.n = n
+        return self
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else np.nan
+
+
+# ----------------------------------------------------------------------
+# Approximate drift statistics (sketch vs reference profile)
+# ----------------------------------------------------------------------
+def ks_against_sketch(reference_sorted: np.ndarray, sketch: KLLSketch) -> float:
+    """
+    KS statistic between exact reference values (sorted, no NaN) and a sketch.
+
+    Both ECDFs are step functions, so the supremum is at a reference value or
+    a sketch item; both sets are evaluated with searchsorted.
+    """
+    items, cumulative = sketch.sorted_items()
+    if not len(items) or not len(reference_sorted):
+        return np.nan
+    n_ref, total = len(reference_sorted), cumulative[-1]
+
+    ref_ends = np.flatnonzero(np.append(reference_sorted[1:] != reference_sorted[:-1], True))
+    ref_values = reference_sorted[ref_ends]
+    idx = np.searchsorted(items, ref_values, side='right')
+    sketch_at_ref = np.where(idx > 0, cumulative[np.maximum(idx - 1, 0)], 0) / total
+    gap_ref = np.abs((ref_ends + 1) / n_ref - sketch_at_ref).max()
+
+    item_ends = np.flatnonzero(np.append(items[1:] != items[:-1], True))
+    ref_at_items = np.searchsorted(reference_sorted, items[item_ends], side='right') / n_ref
+    gap_items = np.abs(cumulative[item_ends] / total - ref_at_items).max()
+
+    return float(max(gap_ref, gap_items))
+
+
+def _proportions_from_cdf(cdf_at_edges: np.ndarray) -> np.ndarray:
+    """Bin proportions from the CDF at inner edges (bins: (-inf, e1], (e1, e2], ..., (e_last, inf))."""
+    return np.diff(np.concatenate([[0.0], cdf_at_edges, [1.0]]))
+
+
+# ----------------------------------------------------------------------
+# Rolling-window monitor
+# ----------------------------------------------------------------------
+class _DayBucket:
+    """Sketches + moments of one day, one entry per feature."""
+
+    def __init__(self, n_features: int, k: int, rng: np.random.Generator):
+        self.devices = 0
+        self.sketches = [KLLSketch(k, rng) for _ in range(n_features)]
+        self.moments = [RunningMoments() for _ in range(n_features)]
+
+    def update(self, values: np.ndarray):
+        self.devices += len(values)
+        for j in range(values.shape[1]):
+            self.sketches[j].update(values[:, j])
+            self.moments[j].update(values[:, j])
+
+
+class StreamingDriftMonitor:
+    """
+    Online drift detection against a reference profile over rolling windows.
+
+    Memory is bounded by the daily buckets kept (the longest window), each
+    holding one KLL sketch per feature: it does not grow with devices.
+    """
+
+    def __init__(
+        self,
+        reference: Union[ReferenceProfile, pd.DataFrame],
+        features: List[str] = None,
+        windows: Dict[str, int] = None,
+        k: int = DEFAULT_SKETCH_K,
+        bin_quantiles=DEFAULT_BIN_QUANTILES,
+        threshold_warning: float = 0.2,
+        threshold_critical: float = 0.4,
+        psi_thresholds: Tuple[float, float] = DEFAULT_METRIC_THRESHOLDS['psi'],
+        seed: int = 0
+    ):
+        """
+        Args:
+            reference: ReferenceProfile (build-reference) or reference DataFrame
+            features: Features monitored (default: the profile's features)
+            windows: Window name -> length in days (default: daily=1, weekly=7)
+            k: KLL accuracy parameter
+            bin_quantiles: Reference quantiles used as PSI bin edges
+            threshold_warning, threshold_critical: KS thresholds (classify_drift_status)
+            psi_thresholds: PSI (warning, critical) thresholds (classify_drift_status)
+            seed: Seed of the sketches' compaction offsets (reproducible runs)
+        """
+        if not isinstance(reference, ReferenceProfile):
+            reference = build_reference_profile(reference, features=features)
+        self.reference = reference
+        self.features = list(reference.features if features is None else features)
+        self.windows = dict(DEFAULT_WINDOWS if windows is None else windows)
+        self.k = k
+        self.threshold_warning = threshold_warning
+        self.threshold_critical = threshold_critical
+        self.psi_thresholds = tuple(psi_thresholds)
+        self.devices_seen = 0
+        self.last_date = None
+        self._rng = np.random.default_rng(seed)
+        self._buckets: Dict[date, _DayBucket] = {}
+
+        # Reference side is fixed: exact values, moments and PSI bins per feature
+        sorted_values, stored_n, self._ref_n, self._ref_means, self._ref_stds = reference.columns(self.features)
+        self._ref_values = [sorted_values[:stored_n[j], j] for j in range(len(self.features))]
+        self._psi_edges = bin_edges_from_sorted(sorted_values, stored_n, bin_quantiles)
+        self._psi_expected = [bin_proportions(values, edges)
+                              for values, edges in zip(self._ref_values, self._psi_edges)]
+
+    @property
+    def retention_days(self) -> int:
+        return max(self.windows.values())
+
+    def memory_items(self) -> int:
+        """Values held by all sketches (constant in the number of devices)."""
+        return sum(sketch.size for bucket in self._buckets.values() for sketch in bucket.sketches)
+
+    def update(
+        self,
+        batch: pd.DataFrame,
+        timestamp: Union[datetime, date, str] = None,
+        evaluate: bool = True
+    ) -> Dict[str, Dict]:
+        """
+        Add a batch of scored devices to the day of `timestamp` (default: now).
+
+        Args:
+            batch: Device features (the monitored feature columns)
+            timestamp: When the batch was scored
+            evaluate: Return the statuses of all windows after the update
+
+        Returns:
+            {window: status dict} (see window_status), or {} if evaluate=False
+        """
+        missing = set(self.features) - set(batch.columns)
+        if missing:
+            raise ValueError(f"Missing required features: {missing}")
+
+        day = pd.Timestamp(timestamp if timestamp is not None else datetime.now()).date()
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = _DayBucket(len(self.features), self.k, self._rng)
+        bucket.update(batch[self.features].to_numpy(dtype=np.float64))
+        self.devices_seen += len(batch)
+
+        if self.last_date is None or day > self.last_date:
+            self.last_date = day
+        # Drop buckets outside the longest window (bounded memory)
+        oldest = self.last_date - timedelta(days=self.retention_days - 1)
+        for old_day in [d for d in self._buckets if d < oldest]:
+            del self._buckets[old_day]
+
+        return self.statuses() if evaluate else {}
+
+    def _window_buckets(self, days: int, end: date) -> List[_DayBucket]:
+        start = end - timedelta(days=days - 1)
+        return [bucket for day, bucket in self._buckets.items() if start <= day <= end]
+
+    def window_results(self, window: str = 'weekly', end: date = None) -> Tuple[Dict[str, Dict], int]:
+        """
+        compute_ks_statistics-style results for a window (approximate KS and PSI).
+
+        Returns:
+            (results per feature, devices in the window)
+        """
+        end = end or self.last_date
+        buckets = self._window_buckets(self.windows[window], end) if end is not None else []
+        devices = sum(bucket.devices for bucket in buckets)
+
+        results = {}
+        for j, feature in enumerate(self.features):
+            sketch = KLLSketch(self.k, self._rng)
+            moments = RunningMoments()
+            for bucket in buckets:
+                sketch.merge(bucket.sketches[j])
+                moments.merge(bucket.moments[j])
+
+            if sketch.n == 0 or self._ref_n[j] == 0:
+                results[feature] = {
+                    'ks_statistic': np.nan,
+                    'p_value': np.nan,
+                    'psi': np.nan,
+                    'reference_mean': np.nan,
+                    'production_mean': np.nan,
+                    'reference_std': np.nan,
+                    'production_std': np.nan,
+                    'error': 'Insufficient data after removing NaN'
+                }
+                continue
+
+            ks = ks_against_sketch(self._ref_values[j], sketch)
+            actual = _proportions_from_cdf(sketch.cdf(self._psi_edges[j]))
+            results[feature] = {
+                'ks_statistic': ks,
+                'p_value': float(ks_asymptotic_pvalues(np.array([ks]), self._ref_n[j:j + 1],
+                                                       np.array([sketch.n]))[0]),
+                'psi': population_stability_index(self._psi_expected[j], actual),
+                'reference_mean': float(self._ref_means[j]),
+                'production_mean': moments.mean,
+                'reference_std': float(self._ref_stds[j]),
+                'production_std': moments.std,
+                'reference_n': int(self._ref_n[j]),
+                'production_n': int(sketch.n),
+                'production_nan_rate': 1 - sketch.n / devices if devices else None,
+            }
+        return results, devices
+
+    def window_status(self, window: str = 'weekly', end: date = None) -> Dict:
+        """
+        Drift status of a window via detect_lifecycle_drift + classify_drift_status.
+
+        Returns:
+            {'window', 'start', 'end', 'devices', 'status', 'alerts',
+             'max_ks_statistic', 'max_psi', 'lifecycle_drift', 'feature_drift'}
+        """
+        end = end or self.last_date
+        results, devices = self.window_results(window, end)
+
+        if devices == 0:
+            status, alerts, lifecycle = 'OK', [], None
+        else:
+            lifecycle = detect_lifecycle_drift(results)
+            status, alerts = classify_drift_status(
+                results, lifecycle, self.threshold_warning, self.threshold_critical,
+                {'psi': self.psi_thresholds}
+            )
+
+        def max_of(key):
+            values = [r[key] for r in results.values() if not np.isnan(r[key])]
+            return max(values) if values else None
+
+        return {
+            'window': window,
+            'start': str(end - timedelta(days=self.windows[window] - 1)) if end else None,
+            'end': str(end) if end else None,
+            'devices': devices,
+            'status': status,
+            'alerts': alerts,
+            'max_ks_statistic': max_of('ks_statistic'),
+            'max_psi': max_of('psi'),
+            'lifecycle_drift': lifecycle,
+            'feature_drift': results,
+        }
+
+    def statuses(self, end: date = None) -> Dict[str, Dict]:
+        """Status of every window ending at `end` (default: latest day seen)."""
+        return {window: self.window_status(window, end) for window in self.windows}
+
+
+# ----------------------------------------------------------------------
+# CLI (drift_monitor.py stream)
+# ----------------------------------------------------------------------
+def iter_batches(
+    paths: Iterable[Union[str, Path]],
+    chunksize: int,
+    timestamp_column: str = None
+) -> Iterable[Tuple[pd.DataFrame, object]]:
+    """
+    (batch, timestamp) from CSV files read in chunks; with a timestamp column
+    each chunk is split by day, otherwise the file's modification time is used.
+    """
+    for path in paths:
+        default_timestamp = datetime.fromtimestamp(Path(path).stat().st_mtime)
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            if timestamp_column is None:
+                yield chunk, default_timestamp
+                continue
+            days = pd.to_datetime(chunk[timestamp_column]).dt.normalize()
+            for day, group in chunk.groupby(days, sort=True):
+                yield group, day
+
+
+def _json_default(value):
+    if isinstance(value, (np.floating, np.integer)):
+        return value.item()
+    if isinstance(value, np.bool_):
+        return bool(value)
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def stream_main(argv: List[str] = None) -> int:
+    """`drift_monitor.py stream`: rolling-window drift over batch files as they are read."""
+    parser = argparse.ArgumentParser(
+        prog='drift_monitor.py stream',
+        description='Online drift detection over rolling daily/weekly windows (constant memory)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Scored batches with a timestamp column, against the active model's profile
+  python scripts/drift_monitor.py stream \\
+      --batches data/scored/2025-11-*.csv \\
+      --timestamp-column scored_at \\
+      --output reports/drift_stream.jsonl
+        """
+    )
+    parser.add_argument('--batches', nargs='+', required=True, help='Batch CSV files, in arrival order')
+    parser.add_argument('--timestamp-column', default=None,
+                        help='Column with the scoring time (default: file modification time)')
+    parser.add_argument('--chunksize', type=int, default=50_000, help='Rows read per batch (default: 50000)')
+    reference_group = parser.add_mutually_exclusive_group()
+    reference_group.add_argument('--reference', help='Reference/training data CSV')
+    reference_group.add_argument('--profile', help='Reference profile built by build-reference')
+    parser.add_argument('--registry', default=str(DEFAULT_REGISTRY_PATH), help='Model registry')
+    parser.add_argument('--model-id', default=None, help='Registry model_id (default: active model)')
+    parser.add_argument('--profile-dir', default=str(DEFAULT_PROFILE_DIR), help='Directory of persisted profiles')
+    parser.add_argument('--sketch-k', type=int, default=DEFAULT_SKETCH_K,
+                        help=f'KLL sketch size parameter (default: {DEFAULT_SKETCH_K})')
+    parser.add_argument('--threshold-warning', type=float, default=0.2, help='KS threshold for WARNING')
+    parser.add_argument('--threshold-critical', type=float, default=0.4, help='KS threshold for CRITICAL')
+    parser.add_argument('--psi-thresholds', type=float, nargs=2, metavar=('WARNING', 'CRITICAL'),
+                        default=DEFAULT_METRIC_THRESHOLDS['psi'], help='PSI thresholds (default: 0.1 0.25)')
+    parser.add_argument('--output', default=None, help='JSONL with the window statuses after each batch')
+    args = parser.parse_args(argv)
+
+    try:
+        reference = resolve_reference(args)
+    except (FileNotFoundError, ValueError) as e:
+        parser.error(str(e))
+
+    monitor = StreamingDriftMonitor(
+        reference, k=args.sketch_k,
+        threshold_warning=args.threshold_warning, threshold_critical=args.threshold_critical,
+        psi_thresholds=args.psi_thresholds
+    )
+
+    output = None
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        output = open(args.output, 'a')
+
+    statuses = {}
+    try:
+        for batch, timestamp in iter_batches(args.batches, args.chunksize, args.timestamp_column):
+            statuses = monitor.update(batch, timestamp)
+            summary = ' | '.join(
+                f"{window}: {s['status']} (max KS {s['max_ks_statistic'] or 0:.3f}, {s['devices']:,} devices)"
+                for window, s in statuses.items()
+            )
+            print(f"[{monitor.last_date}] +{len(batch):,} devices → {summary}")
+            if output is not None:
+                record = {'batch_devices': len(batch), 'devices_seen': monitor.devices_seen,
+                          'memory_items': monitor.memory_items(), 'windows': statuses}
+                output.write(json.dumps(record, default=_json_default) + '\n')
+    finally:
+        if output is not None:
+            output.close()
+
+    print(f"\n✅ {monitor.devices_seen:,} devices streamed, {monitor.memory_items():,} sketch values held")
+    if output is not None:
+        print(f"✅ Window statuses appended to {args.output}")
+
+    final = statuses.get('weekly', next(iter(statuses.values()), None)) if statuses else None
+    if final is None or final['status'] == 'OK':
+        return 0
+    for alert in final['alerts']:
+        print(f"  • {alert}")
+    return 2 if final['status'] == 'CRITICAL' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(stream_main())
@@ -5,6 +5,7 @@ Testa diferentes thresholds de classificação para otimizar precision/recall.
 Objetivo: Encontrar threshold que maximiza precision mantendo recall aceitável.
 """
 
+import sys
 import joblib
 import pandas as pd
 import numpy as np
@@ -15,6 +16,9 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import (precision_score, recall_score, f1_score, 
                              confusion_matrix, precision_recall_curve, auc)
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from models.inference import predict_critical_proba, derive_outcomes
+
 # Configurações
 MODEL_PATH = Path("models/catboost_pipeline_v2_field_only.pkl")
 DATA_PATH = Path("data/device_features_with_telemetry.csv")  # Arquivo original com labels
@@ -96,7 +100,7 @@ def load_model():
 def get_predictions(model, X_test):
     """Gera probabilidades de predição"""
     print("\n🔮 Gerando predições...")
-    probabilities = model.predict_proba(X_test)[:, 1]  # Probabilidade classe positiva
+    probabilities = predict_critical_proba(model, X_test)  # Probabilidade classe positiva
     print(f"✅ Probabilidades geradas para {len(probabilities)} devices")
     print(f"📊 Prob stats: min={probabilities.min():.3f}, max={probabilities.max():.3f}, "
           f"mean={probabilities.mean():.3f}, median={np.median(probabilities):.3f}")
@@ -104,7 +108,7 @@ def get_predictions(model, X_test):
 
 def evaluate_threshold(y_true, probabilities, threshold):
     """Avalia métricas para um threshold específico"""
-    y_pred = (probabilities >= threshold).astype(int)
+    y_pred = derive_outcomes(probabilities, threshold)['prediction']
     
     # Calcular métricas
     precision = precision_score(y_true, y_pred, zero_division=0)
@@ -15,17 +15,45 @@ ATUALIZAÇÃO 13/Nov/2025:
 - Filtro MODE='FIELD': Remove FACTORY (lab testing) entries para evitar lifecycle mixing
 - Feature temporal: days_since_last_message para detectar devices inativos
 
+LEITURA TIPADA:
+- Só as colunas do schema são lidas (usecols) com tipos fixos: float32 para
+  telemetria, int32 para f_cnt, category para device_id/MODE e @timestamp em
+  formato fixo ISO8601 (exports largos de vários GB sem inferência de tipos)
+
+MODO STREAMING (--chunksize N):
+- Lê o CSV em chunks, aplica o filtro FIELD por chunk e acumula estado parcial
+  mergeable por device (count, mean/M2, min, max, thresholds, max f_cnt, último timestamp)
+- Mesmas features do modo padrão, com pico de memória independente do tamanho do arquivo
+- Uso: python scripts/transform_aws_payload.py --chunksize 100000
+
+MODO PARALELO (--workers N [--combine]):
+- Transforma os arquivos de payloads_aws/ em um pool de N processos; resultados
+  e erros por arquivo entram no resumo final
+- --combine reduz os estados parciais de todos os arquivos em um único
+  fleet_combined_transformed.csv (devices com mensagens em vários arquivos)
+
 Baseado em: notebooks/old/02_correlacao_telemetrias_msg6.ipynb
 """
 
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import logging
-from typing import Dict, List
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
 import sys
 from datetime import datetime
 
+try:
+    import pyarrow  # noqa: F401 (engine do pd.read_csv)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -43,7 +71,8 @@ TEMP_THRESHOLD = 70      # °C
 BATTERY_THRESHOLD = 2.5  # V
 
 # MAPEAMENTO DE COLUNAS AWS → Features esperadas
-AWS_COLUMN_MAPPING = {
+# Somente leitura: variações por arquivo (device_id/f_cnt) ficam no PayloadSchema
+AWS_COLUMN_MAPPING = MappingProxyType({
     'optical': 'eyon_metadata.decoded_payload.optical_power_1490nm',
     'temp': 'eyon_metadata.decoded_payload.temperature',
     'battery': 'eyon_metadata.decoded_payload.battery',
@@ -52,7 +81,15 @@ AWS_COLUMN_MAPPING = {
     'rsrq': 'eyon_metadata.decoded_payload.rsrq',
     'frame_count': 'f_cnt',  # ou f_count dependendo do arquivo
     'device_id': 'device_id'  # ou sn_fkw ou identificator_in_network
-}
+})
+
+TIMESTAMP_COL = '@timestamp'  # Coluna padrão AWS
+TIMESTAMP_FORMAT = 'ISO8601'   # Formato fixo do export AWS (sem inferência por linha)
+
+# Tipos na leitura do CSV raw (colunas fora do schema nem são lidas)
+TELEMETRY_DTYPE = 'float32'
+FRAME_COUNT_DTYPE = 'Int32'    # int32 nullable (mensagens sem f_cnt)
+CATEGORY_DTYPE = 'category'    # device_id e MODE: poucos valores, muitas linhas
 
 # Features esperadas (30 features - 29 original + days_since_last_message)
 REQUIRED_FEATURES = [
@@ -76,6 +113,175 @@ REQUIRED_FEATURES = [
 ]
 
 
+# Candidatos (em ordem de preferência) para colunas com nome variável
+DEVICE_ID_CANDIDATES = ['device_id', 'sn_fkw', 'identificator_in_network']
+FRAME_COUNT_CANDIDATES = ['f_cnt', 'f_count', 'eyon_metadata.f_count']
+MODE_CANDIDATES = ['decoded_payload.mode', 'eyon_metadata.decoded_payload.mode', 'mode']
+
+# Sensores agregados: (nome, calcula range?, feature de threshold, regra do threshold)
+SENSOR_AGGREGATIONS = [
+    ('optical', True, 'optical_below_threshold', (np.less, OPTICAL_THRESHOLD)),
+    ('temp', True, 'temp_above_threshold', (np.greater, TEMP_THRESHOLD)),
+    ('battery', False, 'battery_below_threshold', (np.less, BATTERY_THRESHOLD)),
+    ('snr', False, None, None),
+    ('rsrp', False, None, None),
+    ('rsrq', False, None, None),
+]
+
+# Tamanho padrão de chunk para o modo streaming (linhas por leitura)
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def _first_present(candidates: List[str], cols: List[str]):
+    """Primeiro candidato presente nas colunas (ou None)."""
+    for candidate in candidates:
+        if candidate in cols:
+            return candidate
+    return None
+
+
+@dataclass(frozen=True)
+class PayloadSchema:
+    """
+    Colunas resolvidas de UM arquivo de payload (imutável).
+    
+    Substitui a atualização do AWS_COLUMN_MAPPING global: cada arquivo carrega
+    o próprio schema, então transformações concorrentes (threads, Streamlit)
+    não interferem entre si.
+    """
+    device_col: str
+    frame_col: Optional[str]
+    mode_col: Optional[str]
+    timestamp_col: Optional[str]
+    sensor_cols: Tuple[Tuple[str, str], ...]  # (sensor, coluna) presentes
+    
+    def sensor_col(self, sensor: str) -> Optional[str]:
+        """Coluna do sensor neste arquivo (None se ausente)."""
+        return dict(self.sensor_cols).get(sensor)
+
+
+@lru_cache(maxsize=256)
+def _detect_schema(header: Tuple[str, ...]) -> PayloadSchema:
+    """Detecção de colunas, em cache pelo header (arquivos iguais não re-detectam)."""
+    # Device ID
+    device_col = _first_present(DEVICE_ID_CANDIDATES, header)
+    if device_col is None:
+        raise ValueError("❌ Coluna device_id não encontrada! Tentou: device_id, sn_fkw, identificator_in_network")
+    
+    # Frame count
+    frame_col = _first_present(FRAME_COUNT_CANDIDATES, header)
+    
+    logger.info(f"🔍 Colunas identificadas:")
+    logger.info(f"   - Device ID: {device_col}")
+    logger.info(f"   - Frame Count: {frame_col}")
+    
+    return PayloadSchema(
+        device_col=device_col,
+        frame_col=frame_col,
+        mode_col=_first_present(MODE_CANDIDATES, header),
+        timestamp_col=TIMESTAMP_COL if TIMESTAMP_COL in header else None,
+        sensor_cols=tuple(
+            (sensor, AWS_COLUMN_MAPPING[sensor])
+            for sensor, _, _, _ in SENSOR_AGGREGATIONS
+            if AWS_COLUMN_MAPPING[sensor] in header
+        )
+    )
+
+
+def resolve_payload_schema(columns) -> PayloadSchema:
+    """
+    Identifica variações de nomes de colunas (device_id, f_cnt, MODE, ...).
+    
+    Resultado em cache pelo header: arquivos com o mesmo header reutilizam o
+    mesmo PayloadSchema sem re-detecção.
+    """
+    return _detect_schema(tuple(columns))
+
+
+def _log_mode_column(schema: PayloadSchema):
+    """Loga se o filtro MODE='FIELD' será aplicado."""
+    if schema.mode_col:
+        logger.info(f"🔍 MODE column found: {schema.mode_col}")
+    else:
+        logger.warning("⚠️  MODE column not found - skipping MODE filter")
+        logger.warning("     Consider adding MODE column to distinguish FACTORY vs FIELD")
+
+
+def _log_mode_filter(initial_count: int, remaining: int):
+    """Loga o resultado do filtro MODE='FIELD'."""
+    factory_removed = initial_count - remaining
+    factory_pct = (factory_removed / initial_count * 100) if initial_count > 0 else 0
+    
+    logger.info(f"🔧 MODE Filter Applied:")
+    logger.info(f"   - Removed {factory_removed:,} FACTORY+NaN entries ({factory_pct:.1f}%)")
+    logger.info(f"   - Remaining: {remaining:,} FIELD messages ({100-factory_pct:.1f}%)")
+    
+    if factory_removed == 0:
+        logger.warning("⚠️  No FACTORY entries found - all messages already FIELD")
+
+
+def read_payload_header(filepath: str) -> PayloadSchema:
+    """Lê só o header do CSV e resolve o PayloadSchema."""
+    return resolve_payload_schema(pd.read_csv(filepath, nrows=0).columns)
+
+
+def payload_read_options(schema: PayloadSchema) -> Dict:
+    """
+    Argumentos de pd.read_csv para o CSV raw: usecols + mapa de tipos.
+    
+    - telemetria: float32
+    - f_cnt: Int32 (nullable)
+    - device_id, MODE: category
+    - @timestamp: lido como texto e convertido por _parse_timestamps
+    """
+    dtype = {col: TELEMETRY_DTYPE for _, col in schema.sensor_cols}
+    if schema.frame_col:
+        dtype[schema.frame_col] = FRAME_COUNT_DTYPE
+    dtype[schema.device_col] = CATEGORY_DTYPE
+    if schema.mode_col:
+        dtype[schema.mode_col] = CATEGORY_DTYPE
+    
+    usecols = list(dtype)
+    if schema.timestamp_col:
+        usecols.append(schema.timestamp_col)
+    
+    return {'usecols': usecols, 'dtype': dtype}
+
+
+def _numeric_device_categories(devices: pd.Series) -> pd.Series:
+    """
+    Categorias de device_id numéricas quando todos os IDs são números (IMEI),
+    mantendo os mesmos IDs da leitura sem tipos. Só as categorias são
+    convertidas, não as linhas.
+    """
+    categories = devices.cat.categories
+    numeric = pd.to_numeric(categories, errors='coerce')
+    if not numeric.isna().any():
+        if isinstance(numeric.dtype, pd.api.extensions.ExtensionDtype):
+            numeric = numeric.astype(numeric.dtype.numpy_dtype)  # Int64 (engine pyarrow) → int64
+        devices = devices.cat.rename_categories(numeric)
+    return devices.cat.reorder_categories(devices.cat.categories.sort_values())
+
+
+def _parse_timestamps(values: pd.Series) -> pd.Series:
+    """@timestamp com formato fixo; volta para inferência se o export variar."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values  # engine pyarrow já parseia ISO8601
+    try:
+        return pd.to_datetime(values, format=TIMESTAMP_FORMAT)
+    except (ValueError, TypeError):
+        logger.warning(f"⚠️  {TIMESTAMP_COL} fora do formato {TIMESTAMP_FORMAT} - usando inferência")
+        return pd.to_datetime(values, format='mixed')
+
+
+def _apply_payload_types(df: pd.DataFrame, schema: PayloadSchema) -> pd.DataFrame:
+    """Ajustes pós-leitura: IDs numéricos e timestamps parseados."""
+    df[schema.device_col] = _numeric_device_categories(df[schema.device_col])
+    if schema.timestamp_col:
+        df[schema.timestamp_col] = _parse_timestamps(df[schema.timestamp_col])
+    return df
+
+
 def load_aws_payload(filepath: str) -> pd.DataFrame:
     """
     Carrega CSV AWS e identifica colunas disponíveis.
@@ -84,232 +290,420 @@ def load_aws_payload(filepath: str) -> pd.DataFrame:
     - eyon_metadata.decoded_payload.optical_power_1490nm
     - f_cnt ou f_count
     - device_id ou sn_fkw ou identificator_in_network
+    
+    Só as colunas usadas na agregação são lidas, já com tipos compactos
+    (ver payload_read_options).
     """
     logger.info(f"📂 Carregando {filepath}...")
-    df = pd.read_csv(filepath)
+    schema = read_payload_header(filepath)
+    options = payload_read_options(schema)
+    if HAS_PYARROW:
+        options['engine'] = 'pyarrow'  # parser multi-thread (não suporta chunksize)
+    df = _apply_payload_types(pd.read_csv(filepath, **options), schema)
     
     logger.info(f"✅ Carregado: {len(df):,} linhas, {len(df.columns)} colunas")
     
-    # Identificar variações de nomes de colunas
-    cols = df.columns.tolist()
+    _log_mode_column(schema)
     
-    # Device ID
-    device_col = None
-    for candidate in ['device_id', 'sn_fkw', 'identificator_in_network']:
-        if candidate in cols:
-            device_col = candidate
-            break
+    # ⭐ NOVO: Filtrar apenas MODE='FIELD' (production-only)
+    # Remove FACTORY (lab testing) entries para evitar lifecycle mixing
+    if schema.mode_col:
+        initial_count = len(df)
+        df = df[df[schema.mode_col] == 'FIELD'].copy()
+        _log_mode_filter(initial_count, len(df))
     
-    if device_col is None:
-        raise ValueError("❌ Coluna device_id não encontrada! Tentou: device_id, sn_fkw, identificator_in_network")
+    return df
+
+
+def iter_aws_payload_chunks(filepath: str, chunksize: int = DEFAULT_CHUNKSIZE):
+    """
+    Lê CSV AWS em chunks, aplicando o filtro MODE='FIELD' em cada chunk.
     
-    # Frame count
-    frame_col = None
-    for candidate in ['f_cnt', 'f_count', 'eyon_metadata.f_count']:
-        if candidate in cols:
-            frame_col = candidate
-            break
+    Memória limitada ao tamanho do chunk (não ao tamanho do arquivo).
+    Mesma leitura tipada de load_aws_payload.
     
-    logger.info(f"🔍 Colunas identificadas:")
-    logger.info(f"   - Device ID: {device_col}")
-    logger.info(f"   - Frame Count: {frame_col}")
+    Yields:
+        DataFrame com as mensagens FIELD de cada chunk
+    """
+    logger.info(f"📂 Lendo {filepath} em chunks de {chunksize:,} linhas...")
     
-    # Atualizar mapeamento
-    AWS_COLUMN_MAPPING['device_id'] = device_col
-    if frame_col:
-        AWS_COLUMN_MAPPING['frame_count'] = frame_col
+    schema = read_payload_header(filepath)
+    _log_mode_column(schema)
+    mode_col = schema.mode_col
+    initial_count = 0
+    remaining = 0
     
-    # ⭐ NOVO: Filtrar apenas MODE='FIELD' (production-only)
-    # Remove FACTORY (lab testing) entries para evitar lifecycle mixing
-    # Procura por várias nomenclaturas possíveis de MODE
-    mode_col = None
-    for col in ['decoded_payload.mode', 'eyon_metadata.decoded_payload.mode', 'mode']:
-        if col in df.columns:
-            mode_col = col
-            logger.info(f"🔍 MODE column found: {col}")
-            break
+    with pd.read_csv(filepath, chunksize=chunksize, **payload_read_options(schema)) as reader:
+        for chunk in reader:
+            chunk = _apply_payload_types(chunk, schema)
+            
+            initial_count += len(chunk)
+            if mode_col:
+                chunk = chunk[chunk[mode_col] == 'FIELD']
+            remaining += len(chunk)
+            
+            yield chunk
     
+    logger.info(f"✅ Lido: {initial_count:,} linhas")
     if mode_col:
-        initial_count = len(df)
-        df = df[df[mode_col] == 'FIELD'].copy()
-        factory_removed = initial_count - len(df)
-        factory_pct = (factory_removed / initial_count * 100) if initial_count > 0 else 0
+        _log_mode_filter(initial_count, remaining)
+
+
+def _group_layout(device_values: pd.Series):
+    """
+    Fatoriza device_id UMA vez e devolve o layout ordenado por grupo.
+    
+    Returns:
+        order: índices das linhas (device não-nulo) ordenadas por grupo
+        starts: início de cada grupo em `order` (para np.*.reduceat)
+        uniques: device_ids ordenados (mesma ordem do groupby)
+    """
+    codes, uniques = pd.factorize(device_values, sort=True)
+    if isinstance(uniques, pd.CategoricalIndex):
+        # device_id lido como category: devolve os valores, não o dtype
+        uniques = uniques.to_numpy()
+    valid_rows = np.flatnonzero(codes >= 0)
+    order = valid_rows[np.argsort(codes[valid_rows], kind='stable')]
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.diff(sorted_codes, prepend=-1))
+    return order, starts, uniques
+
+
+def _sensor_stats(values: np.ndarray, starts: np.ndarray, sizes: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Estado agregado NaN-aware por grupo sobre um array já ordenado por grupo.
+    
+    Devolve n, mean, M2 (soma dos quadrados centrados, em dois passos), min e max.
+    std = sqrt(M2 / (n - 1)) reproduz o groupby().std() (ddof=1).
+    """
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    
+    n = np.add.reduceat(present.astype(np.int64), starts)
+    total = np.add.reduceat(filled, starts)
+    mean = np.divide(total, n, out=np.full(len(n), np.nan), where=n > 0)
+    
+    centered = np.where(present, values - np.repeat(mean, sizes), 0.0)
+    m2 = np.add.reduceat(centered * centered, starts)
+    
+    return {
+        'n': n,
+        'mean': mean,
+        'm2': m2,
+        'min': np.fmin.reduceat(values, starts),
+        'max': np.fmax.reduceat(values, starts),
+    }
+
+
+def _count_column(counts: np.ndarray, has_data: np.ndarray) -> np.ndarray:
+    """
+    Contagens por device. Devices sem leituras ficam NaN (como no left merge
+    da versão anterior); se todos têm leituras, mantém int.
+    """
+    if has_data.all():
+        return counts.astype(np.int64)
+    return np.where(has_data, counts, np.nan)
+
+
+def compute_partial_aggregates(df: pd.DataFrame, schema: PayloadSchema = None) -> pd.DataFrame:
+    """
+    Calcula o estado agregado PARCIAL (mergeable) por device.
+    
+    Uma linha por device (ordenado por device_id) com colunas de estado:
+    - messages__n, frame__max, timestamp__last
+    - {sensor}__n, {sensor}__mean, {sensor}__m2, {sensor}__min, {sensor}__max
+    - {sensor}__crossed (optical, temp, battery)
+    
+    Estados de partes diferentes do mesmo payload podem ser combinados com
+    merge_partial_aggregates() e convertidos em features com
+    finalize_partial_aggregates().
+    
+    Args:
+        df: Mensagens raw (já filtradas)
+        schema: Colunas do arquivo (default: resolvido a partir de df.columns)
+    """
+    if schema is None:
+        schema = resolve_payload_schema(df.columns)
+    device_col = schema.device_col
+    
+    order, starts, devices = _group_layout(df[device_col])
+    sizes = np.diff(np.append(starts, len(order)))
+    
+    def sorted_values(col: str) -> np.ndarray:
+        return df[col].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+    
+    columns = {
+        'device_id': devices,
+        'messages__n': sizes.astype(np.int64),
+    }
+    
+    frame_col = schema.frame_col
+    if frame_col and frame_col in df.columns:
+        columns['frame__max'] = np.fmax.reduceat(sorted_values(frame_col), starts)
+    
+    timestamp_col = schema.timestamp_col
+    if timestamp_col and timestamp_col in df.columns:
+        # NaT vira int64 mínimo, então o máximo por grupo ignora NaT
+        ts = pd.to_datetime(df[timestamp_col]).to_numpy(dtype='datetime64[ns]')
+        last_ns = np.maximum.reduceat(ts.view(np.int64)[order], starts)
+        columns['timestamp__last'] = last_ns.view('datetime64[ns]')
+    
+    for sensor, _, threshold_name, threshold_rule in SENSOR_AGGREGATIONS:
+        sensor_col = schema.sensor_col(sensor)
+        if sensor_col is None or sensor_col not in df.columns:
+            continue
         
-        logger.info(f"🔧 MODE Filter Applied:")
-        logger.info(f"   - Removed {factory_removed:,} FACTORY+NaN entries ({factory_pct:.1f}%)")
-        logger.info(f"   - Remaining: {len(df):,} FIELD messages ({100-factory_pct:.1f}%)")
+        values = sorted_values(sensor_col)
+        for stat, result in _sensor_stats(values, starts, sizes).items():
+            columns[f'{sensor}__{stat}'] = result
         
-        if factory_removed == 0:
-            logger.warning("⚠️  No FACTORY entries found - all messages already FIELD")
-    else:
-        logger.warning("⚠️  MODE column not found - skipping MODE filter")
-        logger.warning("     Consider adding MODE column to distinguish FACTORY vs FIELD")
+        if threshold_rule is not None:
+            # Threshold: comparação com NaN é False, então NaN não conta
+            compare, threshold = threshold_rule
+            columns[f'{sensor}__crossed'] = np.add.reduceat(
+                compare(values, threshold).astype(np.int64), starts
+            )
     
-    return df
+    return pd.DataFrame(columns)
 
 
-def aggregate_by_device(df: pd.DataFrame) -> pd.DataFrame:
+def merge_partial_aggregates(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
     """
-    Agrega mensagens por device_id calculando estatísticas.
+    Combina dois estados parciais (ex: dois chunks do mesmo payload).
     
-    Padrão baseado em notebooks/old/02_correlacao_telemetrias_msg6.ipynb:
-    - GroupBy device_id
-    - Agg: mean, std, min, max para sensores
-    - Count para total_messages/readings
-    - Thresholds customizados
+    Média/M2 combinadas pela fórmula paralela de Chan (Welford), então o
+    resultado é o mesmo de agregar as mensagens de ambos de uma vez.
     """
-    device_col = AWS_COLUMN_MAPPING['device_id']
+    if left is None or len(left) == 0:
+        return right
+    if right is None or len(right) == 0:
+        return left
     
-    logger.info(f"📊 Agregando por {device_col}...")
+    a = left.set_index('device_id')
+    b = right.set_index('device_id')
+    index = a.index.union(b.index)
+    a = a.reindex(index)
+    b = b.reindex(index)
     
-    aggregated = {}
+    def counts(frame: pd.DataFrame, col: str) -> np.ndarray:
+        if col not in frame.columns:
+            return np.zeros(len(index), dtype=np.int64)
+        return frame[col].fillna(0).to_numpy(dtype=np.int64)
     
-    # 1. OPTICAL POWER
-    optical_col = AWS_COLUMN_MAPPING['optical']
-    if optical_col in df.columns:
-        logger.info("   Processando optical power...")
-        
-        # Remover NaN antes de agregar
-        df_optical = df[df[optical_col].notna()].copy()
+    def values(frame: pd.DataFrame, col: str) -> np.ndarray:
+        if col not in frame.columns:
+            return np.full(len(index), np.nan)
+        return frame[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    merged = {'messages__n': counts(a, 'messages__n') + counts(b, 'messages__n')}
+    
+    if 'frame__max' in a.columns or 'frame__max' in b.columns:
+        merged['frame__max'] = np.fmax(values(a, 'frame__max'), values(b, 'frame__max'))
+    
+    if 'timestamp__last' in a.columns or 'timestamp__last' in b.columns:
+        # NaT (int64 mínimo) nunca vence o máximo
+        last = [
+            frame['timestamp__last'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            if 'timestamp__last' in frame.columns
+            else np.full(len(index), np.iinfo(np.int64).min)
+            for frame in (a, b)
+        ]
+        merged['timestamp__last'] = np.maximum(*last).view('datetime64[ns]')
+    
+    for sensor, _, _, threshold_rule in SENSOR_AGGREGATIONS:
+        if f'{sensor}__n' not in a.columns and f'{sensor}__n' not in b.columns:
+            continue
         
-        optical_stats = df_optical.groupby(device_col)[optical_col].agg([
-            ('optical_mean', 'mean'),
-            ('optical_std', 'std'),
-            ('optical_min', 'min'),
-            ('optical_max', 'max'),
-            ('optical_readings', 'count')
-        ]).reset_index()
+        n_a, n_b = counts(a, f'{sensor}__n'), counts(b, f'{sensor}__n')
+        mean_a = np.nan_to_num(values(a, f'{sensor}__mean'))
+        mean_b = np.nan_to_num(values(b, f'{sensor}__mean'))
+        m2_a = np.nan_to_num(values(a, f'{sensor}__m2'))
+        m2_b = np.nan_to_num(values(b, f'{sensor}__m2'))
         
-        # Calcular range
-        optical_stats['optical_range'] = optical_stats['optical_max'] - optical_stats['optical_min']
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        weight_b = np.divide(n_b, n, out=np.zeros(len(n)), where=n > 0)
         
-        # Threshold: quantidade de readings abaixo de -28 dBm
-        optical_below = df_optical[df_optical[optical_col] < OPTICAL_THRESHOLD].groupby(device_col).size()
-        optical_stats['optical_below_threshold'] = optical_stats[device_col].map(optical_below).fillna(0).astype(int)
+        merged[f'{sensor}__n'] = n
+        merged[f'{sensor}__mean'] = np.where(n > 0, mean_a + delta * weight_b, np.nan)
+        merged[f'{sensor}__m2'] = m2_a + m2_b + delta * delta * n_a * weight_b
+        merged[f'{sensor}__min'] = np.fmin(values(a, f'{sensor}__min'), values(b, f'{sensor}__min'))
+        merged[f'{sensor}__max'] = np.fmax(values(a, f'{sensor}__max'), values(b, f'{sensor}__max'))
         
-        aggregated['optical'] = optical_stats
+        if threshold_rule is not None:
+            merged[f'{sensor}__crossed'] = counts(a, f'{sensor}__crossed') + counts(b, f'{sensor}__crossed')
+    
+    result = pd.DataFrame(merged, index=index)
+    result.index.name = 'device_id'
+    return result.reset_index()
+
+
+def finalize_partial_aggregates(partial: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte o estado parcial nas features por device (mesmo formato de
+    aggregate_by_device: device_id + 30 features).
+    """
+    n_devices = len(partial)
+    columns = {
+        'device_id': partial['device_id'].to_numpy(),
+        'total_messages': partial['messages__n'].to_numpy(dtype=np.int64),
+    }
+    
+    # max_frame_count (int quando todos os devices têm frame count)
+    if 'frame__max' in partial.columns:
+        frame_max = partial['frame__max'].to_numpy(dtype=np.float64, na_value=np.nan)
+        columns['max_frame_count'] = frame_max if np.isnan(frame_max).any() else frame_max.astype(np.int64)
     else:
-        logger.warning(f"⚠️  Coluna {optical_col} não encontrada!")
+        columns['max_frame_count'] = np.full(n_devices, np.nan)
     
-    # 2. TEMPERATURE
-    temp_col = AWS_COLUMN_MAPPING['temp']
-    if temp_col in df.columns:
-        logger.info("   Processando temperature...")
-        
-        df_temp = df[df[temp_col].notna()].copy()
-        
-        temp_stats = df_temp.groupby(device_col)[temp_col].agg([
-            ('temp_mean', 'mean'),
-            ('temp_std', 'std'),
-            ('temp_min', 'min'),
-            ('temp_max', 'max')
-        ]).reset_index()
-        
-        # Calcular range
-        temp_stats['temp_range'] = temp_stats['temp_max'] - temp_stats['temp_min']
+    # ⭐ days_since_last_message (temporal context)
+    if 'timestamp__last' in partial.columns:
+        last_timestamps = pd.DatetimeIndex(partial['timestamp__last'])
+        days_since = (pd.Timestamp(datetime.now()) - last_timestamps).days
+        columns['days_since_last_message'] = pd.Series(days_since).fillna(-1).astype(int).to_numpy()
         
-        # Threshold: quantidade de readings acima de 70°C
-        temp_above = df_temp[df_temp[temp_col] > TEMP_THRESHOLD].groupby(device_col).size()
-        temp_stats['temp_above_threshold'] = temp_stats[device_col].map(temp_above).fillna(0).astype(int)
-        
-        aggregated['temp'] = temp_stats
+        logger.info(f"   ✅ days_since_last_message calculated (range: {days_since.min()}-{days_since.max()} days)")
     else:
-        logger.warning(f"⚠️  Coluna {temp_col} não encontrada!")
+        logger.warning("⚠️  Column '@timestamp' not found - days_since_last_message set to -1")
+        columns['days_since_last_message'] = np.full(n_devices, -1, dtype=int)
     
-    # 3. BATTERY
-    battery_col = AWS_COLUMN_MAPPING['battery']
-    if battery_col in df.columns:
-        logger.info("   Processando battery...")
+    for sensor, with_range, threshold_name, threshold_rule in SENSOR_AGGREGATIONS:
+        if f'{sensor}__n' not in partial.columns:
+            logger.warning(f"⚠️  Coluna {AWS_COLUMN_MAPPING[sensor]} não encontrada!")
+            continue
         
-        df_battery = df[df[battery_col].notna()].copy()
+        n = partial[f'{sensor}__n'].to_numpy(dtype=np.int64)
+        m2 = partial[f'{sensor}__m2'].to_numpy(dtype=np.float64)
+        sensor_min = partial[f'{sensor}__min'].to_numpy(dtype=np.float64)
+        sensor_max = partial[f'{sensor}__max'].to_numpy(dtype=np.float64)
+        has_data = n > 0
         
-        battery_stats = df_battery.groupby(device_col)[battery_col].agg([
-            ('battery_mean', 'mean'),
-            ('battery_std', 'std'),
-            ('battery_min', 'min'),
-            ('battery_max', 'max')
-        ]).reset_index()
+        columns[f'{sensor}_mean'] = partial[f'{sensor}__mean'].to_numpy(dtype=np.float64)
+        columns[f'{sensor}_std'] = np.sqrt(np.divide(m2, n - 1, out=np.full(n_devices, np.nan), where=n > 1))
+        columns[f'{sensor}_min'] = sensor_min
         
-        # Threshold: quantidade de readings abaixo de 2.5V
-        battery_below = df_battery[df_battery[battery_col] < BATTERY_THRESHOLD].groupby(device_col).size()
-        battery_stats['battery_below_threshold'] = battery_stats[device_col].map(battery_below).fillna(0).astype(int)
+        # Conectividade (SNR, RSRP, RSRQ): apenas mean/std/min
+        if threshold_rule is None:
+            continue
         
-        aggregated['battery'] = battery_stats
-    else:
-        logger.warning(f"⚠️  Coluna {battery_col} não encontrada!")
+        columns[f'{sensor}_max'] = sensor_max
+        if sensor == 'optical':
+            columns['optical_readings'] = _count_column(n, has_data)
+        if with_range:
+            columns[f'{sensor}_range'] = sensor_max - sensor_min
+        columns[threshold_name] = _count_column(
+            partial[f'{sensor}__crossed'].to_numpy(dtype=np.int64), has_data
+        )
     
-    # 4. CONNECTIVITY (SNR, RSRP, RSRQ)
-    for signal in ['snr', 'rsrp', 'rsrq']:
-        signal_col = AWS_COLUMN_MAPPING[signal]
-        if signal_col in df.columns:
-            logger.info(f"   Processando {signal.upper()}...")
-            
-            df_signal = df[df[signal_col].notna()].copy()
-            
-            signal_stats = df_signal.groupby(device_col)[signal_col].agg([
-                (f'{signal}_mean', 'mean'),
-                (f'{signal}_std', 'std'),
-                (f'{signal}_min', 'min')
-            ]).reset_index()
-            
-            aggregated[signal] = signal_stats
-        else:
-            logger.warning(f"⚠️  Coluna {signal_col} não encontrada!")
+    return pd.DataFrame(columns)
+
+
+def aggregate_by_device(df: pd.DataFrame, schema: PayloadSchema = None) -> pd.DataFrame:
+    """
+    Agrega mensagens por device_id calculando estatísticas.
     
-    # 5. MESSAGING (total_messages, max_frame_count, days_since_last_message)
-    logger.info("   Processando messaging...")
+    Padrão baseado em notebooks/old/02_correlacao_telemetrias_msg6.ipynb:
+    - GroupBy device_id
+    - Agg: mean, std, min, max para sensores
+    - Count para total_messages/readings
+    - Thresholds customizados
     
-    messaging_stats = df.groupby(device_col).agg(
-        total_messages=('device_id', 'count')  # Conta linhas por device
-    ).reset_index()
+    Engine vetorizado: device_id é fatorizado uma única vez e todas as
+    agregações de todos os sensores saem de reduções por grupo (np.*.reduceat)
+    sobre arrays NumPy, sem cópias por sensor nem merges.
+    """
+    if schema is None:
+        schema = resolve_payload_schema(df.columns)
     
-    # max_frame_count
-    frame_col = AWS_COLUMN_MAPPING.get('frame_count')
-    if frame_col and frame_col in df.columns:
-        frame_max = df.groupby(device_col)[frame_col].max().reset_index(name='max_frame_count')
-        messaging_stats = messaging_stats.merge(frame_max, on=device_col)
-    else:
-        messaging_stats['max_frame_count'] = np.nan
-    
-    # ⭐ NOVO: days_since_last_message (temporal context)
-    # Calcular quantos dias desde última mensagem de cada device
-    timestamp_col = '@timestamp'  # Coluna padrão AWS
-    if timestamp_col in df.columns:
-        # Obter timestamp da última mensagem por device
-        last_timestamps = df.groupby(device_col)[timestamp_col].max()
-        
-        # Converter para datetime se ainda não estiver
-        last_timestamps = pd.to_datetime(last_timestamps)
-        
-        # Calcular dias desde última mensagem até agora
-        now = datetime.now()
-        days_since = (now - last_timestamps).dt.days
-        
-        # Adicionar à messaging_stats
-        messaging_stats['days_since_last_message'] = messaging_stats[device_col].map(days_since).fillna(-1).astype(int)
-        
-        logger.info(f"   ✅ days_since_last_message calculated (range: {days_since.min()}-{days_since.max()} days)")
-    else:
-        logger.warning(f"⚠️  Column '{timestamp_col}' not found - days_since_last_message set to -1")
-        messaging_stats['days_since_last_message'] = -1
+    logger.info(f"📊 Agregando por {schema.device_col}...")
     
-    aggregated['messaging'] = messaging_stats
+    final_df = finalize_partial_aggregates(compute_partial_aggregates(df, schema))
     
-    # 6. MERGE TODOS OS DataFrames
-    logger.info("🔗 Juntando todas as agregações...")
+    logger.info(f"✅ Agregação completa: {len(final_df)} devices, {len(final_df.columns)} colunas")
     
-    final_df = aggregated['messaging']  # Começa com messaging (tem todos devices)
+    return final_df
+
+
+def aggregate_aws_payload_streaming(filepath: str, chunksize: int = DEFAULT_CHUNKSIZE):
+    """
+    Modo streaming: lê o CSV em chunks e acumula o estado parcial por device.
+    
+    Pico de memória depende do chunk e do número de devices, não do tamanho
+    do arquivo. Resultado igual a aggregate_by_device(load_aws_payload(...)).
+    
+    Returns:
+        (df_aggregated, total de mensagens FIELD processadas)
+    """
+    return aggregate_partials_streaming(iter_aws_payload_chunks(filepath, chunksize=chunksize))
+
+
+def fold_partial_aggregates(chunks):
+    """
+    Acumula o estado parcial por device sobre um iterador de chunks de
+    mensagens (CSV em chunks, batches Parquet, ...).
+    
+    Returns:
+        (estado parcial ou None se não houve chunks, total de mensagens)
+    """
+    partial = None
+    total_messages = 0
+    
+    for chunk in chunks:
+        total_messages += len(chunk)
+        partial = merge_partial_aggregates(partial, compute_partial_aggregates(chunk))
+    
+    return partial, total_messages
+
+
+def aggregate_partials_streaming(chunks):
+    """
+    Acumula o estado parcial por device sobre um iterador de chunks de
+    mensagens (CSV em chunks, batches Parquet, ...) e finaliza as features.
     
-    for key, df_agg in aggregated.items():
-        if key != 'messaging':
-            final_df = final_df.merge(df_agg, on=device_col, how='left')
+    Returns:
+        (df_aggregated, total de mensagens processadas)
+    """
+    partial, total_messages = fold_partial_aggregates(chunks)
     
-    # Renomear device_id para padrão
-    final_df = final_df.rename(columns={device_col: 'device_id'})
+    if partial is None:
+        raise ValueError("❌ Nenhuma mensagem lida - input vazio")
     
+    logger.info("📊 Agregando por device_id...")
+    final_df = finalize_partial_aggregates(partial)
     logger.info(f"✅ Agregação completa: {len(final_df)} devices, {len(final_df.columns)} colunas")
     
-    return final_df
+    return final_df, total_messages
+
+
+def compute_payload_partial(input_filepath: str, chunksize: int = None):
+    """
+    Estado parcial por device de um input (CSV AWS raw ou dataset Parquet).
+    
+    Args:
+        input_filepath: CSV AWS raw ou diretório de dataset Parquet
+        chunksize: Se definido, lê em chunks/batches desse tamanho
+    
+    Returns:
+        (estado parcial, total de mensagens FIELD)
+    """
+    if Path(input_filepath).is_dir():
+        # Dataset Parquet: só colunas mapeadas + filtro FIELD no scan
+        from payload_parquet_cache import iter_aws_payload_parquet_batches, load_aws_payload_parquet
+        
+        if chunksize:
+            chunks = iter_aws_payload_parquet_batches(input_filepath, batch_size=chunksize)
+        else:
+            chunks = [load_aws_payload_parquet(input_filepath)]
+    elif chunksize:
+        chunks = iter_aws_payload_chunks(input_filepath, chunksize=chunksize)
+    else:
+        chunks = [load_aws_payload(input_filepath)]
+    
+    partial, n_messages = fold_partial_aggregates(chunks)
+    if partial is None:
+        raise ValueError(f"❌ Nenhuma mensagem lida de {input_filepath}")
+    
+    return partial, n_messages
 
 
 def validate_output(df: pd.DataFrame) -> Dict:
@@ -339,56 +733,84 @@ def validate_output(df: pd.DataFrame) -> Dict:
     return result
 
 
-def transform_aws_to_model_format(input_filepath: str, output_dir: str = "payloads_processed"):
+def save_transformed_output(df_aggregated: pd.DataFrame, n_messages: int, input_label: str,
+                            output_file: Path) -> Dict:
+    """
+    Valida, salva (device_id + 30 features) e loga o sumário da transformação.
+    
+    Returns:
+        Resultado de validate_output
+    """
+    # 3. Validate
+    validation = validate_output(df_aggregated)
+    
+    # 4. Save
+    output_file.parent.mkdir(exist_ok=True)
+    
+    # Salvar APENAS as 30 features + device_id
+    output_columns = ['device_id'] + REQUIRED_FEATURES
+    df_output = df_aggregated[output_columns].copy()
+    
+    df_output.to_csv(output_file, index=False)
+    logger.info(f"💾 Salvo: {output_file}")
+    logger.info(f"   {len(df_output)} devices, {len(df_output.columns)} colunas")
+    
+    # 5. Summary
+    logger.info("\n" + "="*60)
+    logger.info("📊 SUMÁRIO DA TRANSFORMAÇÃO")
+    logger.info("="*60)
+    logger.info(f"Input:  {input_label}")
+    logger.info(f"        {n_messages:,} mensagens")
+    logger.info(f"Output: {output_file}")
+    logger.info(f"        {len(df_output)} devices")
+    logger.info(f"        {validation['present']}/{validation['total_required']} features")
+    
+    if validation['valid']:
+        logger.info("Status: ✅ COMPATÍVEL com batch upload")
+    else:
+        logger.warning(f"Status: ⚠️  {len(validation['missing'])} features faltando")
+    
+    logger.info("="*60 + "\n")
+    
+    return validation
+
+
+def _transform_file(input_filepath: str, output_dir: str, chunksize: int = None):
+    """
+    Transforma um input e devolve também o estado parcial (para combinar
+    arquivos em um output de frota).
+    
+    Returns:
+        (output_file, validation, partial, n_messages)
+    """
+    # 1+2. Load + Aggregate (estado parcial por device)
+    partial, n_messages = compute_payload_partial(input_filepath, chunksize=chunksize)
+    
+    logger.info("📊 Agregando por device_id...")
+    df_aggregated = finalize_partial_aggregates(partial)
+    logger.info(f"✅ Agregação completa: {len(df_aggregated)} devices, {len(df_aggregated.columns)} colunas")
+    
+    input_name = Path(input_filepath).stem
+    output_file = Path(output_dir) / f"{input_name}_transformed.csv"
+    validation = save_transformed_output(df_aggregated, n_messages, input_filepath, output_file)
+    
+    return output_file, validation, partial, n_messages
+
+
+def transform_aws_to_model_format(input_filepath: str, output_dir: str = "payloads_processed",
+                                  chunksize: int = None):
     """
     Pipeline completo: AWS raw → Model format.
     
     Args:
-        input_filepath: Caminho para CSV AWS raw
+        input_filepath: Caminho para CSV AWS raw, ou diretório de um dataset
+                        Parquet gerado por scripts/payload_parquet_cache.py
         output_dir: Diretório para salvar output
+        chunksize: Se definido, usa o modo streaming (memória limitada)
+                   lendo o CSV em chunks desse tamanho
     """
     try:
-        # 1. Load
-        df_raw = load_aws_payload(input_filepath)
-        
-        # 2. Aggregate
-        df_aggregated = aggregate_by_device(df_raw)
-        
-        # 3. Validate
-        validation = validate_output(df_aggregated)
-        
-        # 4. Save
-        output_path = Path(output_dir)
-        output_path.mkdir(exist_ok=True)
-        
-        input_name = Path(input_filepath).stem
-        output_file = output_path / f"{input_name}_transformed.csv"
-        
-        # Salvar APENAS as 30 features + device_id
-        output_columns = ['device_id'] + REQUIRED_FEATURES
-        df_output = df_aggregated[output_columns].copy()
-        
-        df_output.to_csv(output_file, index=False)
-        logger.info(f"💾 Salvo: {output_file}")
-        logger.info(f"   {len(df_output)} devices, {len(df_output.columns)} colunas")
-        
-        # 5. Summary
-        logger.info("\n" + "="*60)
-        logger.info("📊 SUMÁRIO DA TRANSFORMAÇÃO")
-        logger.info("="*60)
-        logger.info(f"Input:  {input_filepath}")
-        logger.info(f"        {len(df_raw):,} mensagens")
-        logger.info(f"Output: {output_file}")
-        logger.info(f"        {len(df_output)} devices")
-        logger.info(f"        {validation['present']}/{validation['total_required']} features")
-        
-        if validation['valid']:
-            logger.info("Status: ✅ COMPATÍVEL com batch upload")
-        else:
-            logger.warning(f"Status: ⚠️  {len(validation['missing'])} features faltando")
-        
-        logger.info("="*60 + "\n")
-        
+        output_file, validation, _, _ = _transform_file(input_filepath, output_dir, chunksize=chunksize)
         return output_file, validation
         
     except Exception as e:
@@ -396,21 +818,167 @@ def transform_aws_to_model_format(input_filepath: str, output_dir: str = "payloa
         raise
 
 
-def main():
+def transform_file_job(input_filepath: str, output_dir: str = "payloads_processed",
+                       chunksize: int = None, keep_partial: bool = False) -> Dict:
+    """
+    Unidade de trabalho do pool de processos (um arquivo por job).
+    
+    Erros são capturados e devolvidos no resultado para o resumo final.
+    
+    Returns:
+        dict com 'input', 'output', 'valid', 'devices', 'messages' (ou 'error')
+        e, se keep_partial, 'partial' com o estado por device do arquivo
+    """
+    input_name = Path(input_filepath).name
+    try:
+        output_file, validation, partial, n_messages = _transform_file(
+            input_filepath, output_dir, chunksize=chunksize
+        )
+    except Exception as e:
+        logger.error(f"❌ Falha ao processar {input_name}: {e}")
+        return {'input': input_name, 'output': None, 'valid': False, 'error': str(e)}
+    
+    result = {
+        'input': input_name,
+        'output': output_file.name,
+        'valid': validation['valid'],
+        'devices': validation['num_devices'],
+        'messages': n_messages
+    }
+    if keep_partial:
+        result['partial'] = partial
+    return result
+
+
+def run_transform_jobs(input_files: List[Path], output_dir: str = "payloads_processed",
+                       chunksize: int = None, workers: int = 1, keep_partial: bool = False) -> List[Dict]:
+    """
+    Transforma os arquivos em série (workers=1) ou em um pool de processos.
+    
+    Returns:
+        Resultados por arquivo, na mesma ordem de input_files
+    """
+    if workers <= 1 or len(input_files) <= 1:
+        results = []
+        for input_file in input_files:
+            logger.info(f"\n{'='*60}")
+            logger.info(f"📄 Processando: {input_file.name}")
+            logger.info(f"{'='*60}\n")
+            results.append(transform_file_job(str(input_file), output_dir, chunksize, keep_partial))
+        return results
+    
+    logger.info(f"⚙️  Pool de {workers} processos para {len(input_files)} arquivo(s)")
+    results = [None] * len(input_files)
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(transform_file_job, str(input_file), output_dir, chunksize, keep_partial): i
+            for i, input_file in enumerate(input_files)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                # Falha do próprio worker (ex: processo morto por OOM)
+                logger.error(f"❌ Falha ao processar {input_files[i].name}: {e}")
+                results[i] = {'input': input_files[i].name, 'output': None, 'valid': False, 'error': str(e)}
+            logger.info(f"   ✓ {input_files[i].name} ({sum(r is not None for r in results)}/{len(input_files)})")
+    
+    return results
+
+
+def combine_fleet_output(results: List[Dict], output_dir: str = "payloads_processed",
+                         output_name: str = "fleet_combined") -> Dict:
+    """
+    Reduz os estados parciais por arquivo em um único output de frota.
+    
+    Devices cujas mensagens estão em vários arquivos recebem estatísticas
+    calculadas sobre TODAS as mensagens (não a média das médias).
+    
+    Returns:
+        Resultado no mesmo formato dos arquivos individuais
+    """
+    partials = [r.pop('partial') for r in results if r.get('partial') is not None]
+    
+    if not partials:
+        logger.error("❌ Nenhum estado parcial para combinar")
+        return {'input': f"{len(results)} arquivo(s)", 'output': None, 'valid': False,
+                'error': 'Nenhum arquivo transformado com sucesso'}
+    
+    logger.info(f"🔗 Combinando {len(partials)} arquivo(s) em um output de frota...")
+    
+    combined = None
+    for partial in partials:
+        combined = merge_partial_aggregates(combined, partial)
+    
+    df_aggregated = finalize_partial_aggregates(combined)
+    n_messages = sum(r.get('messages', 0) for r in results)
+    output_file = Path(output_dir) / f"{output_name}_transformed.csv"
+    validation = save_transformed_output(
+        df_aggregated, n_messages, f"{len(partials)} arquivo(s) combinados", output_file
+    )
+    
+    return {
+        'input': f"{len(partials)} arquivo(s) combinados",
+        'output': output_file.name,
+        'valid': validation['valid'],
+        'devices': validation['num_devices'],
+        'messages': n_messages
+    }
+
+
+def parse_args(argv=None):
+    """Argumentos de linha de comando."""
+    parser = argparse.ArgumentParser(
+        description='Transforma payloads AWS (message-level) em features por device'
+    )
+    parser.add_argument(
+        '--parquet',
+        default=None,
+        help='Transforma um dataset Parquet (scripts/payload_parquet_cache.py) '
+             'em vez dos CSVs de payloads_aws/'
+    )
+    parser.add_argument(
+        '--chunksize',
+        type=int,
+        default=None,
+        help=f'Modo streaming: lê cada CSV em chunks de N linhas (ex: {DEFAULT_CHUNKSIZE}) '
+             'com memória limitada (default: carrega o arquivo inteiro)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Número de processos para transformar arquivos em paralelo (default: 1)'
+    )
+    parser.add_argument(
+        '--combine',
+        action='store_true',
+        help='Além dos outputs por arquivo, gera fleet_combined_transformed.csv '
+             'combinando devices cujas mensagens estão em vários arquivos'
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """
     Processa todos os CSVs em payloads_aws/.
     """
+    args = parse_args(argv)
+    
     logger.info("="*60)
     logger.info("🚀 TRANSFORM AWS PAYLOAD → MODEL FORMAT")
     logger.info("="*60 + "\n")
     
-    payloads_dir = Path("payloads_aws")
+    payloads_dir = Path(args.parquet) if args.parquet else Path("payloads_aws")
     
     if not payloads_dir.exists():
         logger.error(f"❌ Diretório {payloads_dir} não encontrado!")
         return
     
-    csv_files = list(payloads_dir.glob("*.csv"))
+    # Dataset Parquet é transformado como uma unidade (o diretório inteiro)
+    csv_files = [payloads_dir] if args.parquet else sorted(payloads_dir.glob("*.csv"))
     
     if not csv_files:
         logger.error(f"❌ Nenhum CSV encontrado em {payloads_dir}")
@@ -421,29 +989,15 @@ def main():
         logger.info(f"   - {f.name}")
     logger.info("")
     
-    results = []
+    results = run_transform_jobs(
+        csv_files,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        keep_partial=args.combine
+    )
     
-    for csv_file in csv_files:
-        logger.info(f"\n{'='*60}")
-        logger.info(f"📄 Processando: {csv_file.name}")
-        logger.info(f"{'='*60}\n")
-        
-        try:
-            output_file, validation = transform_aws_to_model_format(str(csv_file))
-            results.append({
-                'input': csv_file.name,
-                'output': output_file.name,
-                'valid': validation['valid'],
-                'devices': validation['num_devices']
-            })
-        except Exception as e:
-            logger.error(f"❌ Falha ao processar {csv_file.name}: {e}")
-            results.append({
-                'input': csv_file.name,
-                'output': None,
-                'valid': False,
-                'error': str(e)
-            })
+    if args.combine:
+        results.append(combine_fleet_output(results))
     
     # RESUMO FINAL
     logger.info("\n" + "="*60)
@@ -0,0 +1,236 @@
+"""
+Unit tests for models/audit_log.py - Buffered asynchronous JSONL audit trail
+
+Tests cover:
+1. JSONL entry format for single and bulk logging
+2. Daily rotation and gzip of closed files
+3. Non-blocking enqueue (full queue drops instead of blocking)
+4. NumPy device ids and serialization errors (writer thread stays alive)
+5. log_prediction / log_predictions in models/inference.py
+"""
+
+import gzip
+import json
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import audit_log
+from models.audit_log import AuditLogWriter, configure_audit_writer
+from models.inference import log_prediction, log_predictions
+
+
+def read_jsonl(path):
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def writer(tmp_path):
+    w = AuditLogWriter(tmp_path / 'predictions', flush_interval=0.05)
+    yield w
+    w.close()
+
+
+class TestEntries:
+    """Entry format and batching."""
+
+    def test_single_entry_format(self, writer):
+        """Same fields as the original log_prediction entry."""
+        ts = datetime(2025, 11, 20, 10, 30)
+        writer.log('861275072000001', 1, 0.876543, model_version='v2.0.0', timestamp=ts)
+        assert writer.flush(timeout=5)
+
+        entries = read_jsonl(writer.log_dir / '2025-11-20.jsonl')
+        assert entries == [{
+            'timestamp': ts.isoformat(),
+            'device_id': '861275072000001',
+            'prediction': 'CRITICAL',
+            'probability': 0.8765,
+            'model_version': 'v2.0.0'
+        }]
+
+    def test_bulk_is_one_queue_item(self, writer):
+        """100k predictions are enqueued as one item and all written."""
+        n = 100_000
+        rng = np.random.default_rng(0)
+        probabilities = rng.random(n)
+
+        start = time.perf_counter()
+        writer.log_many(np.arange(n), (probabilities >= 0.5).astype(int), probabilities,
+                        timestamp=datetime(2025, 11, 20, 12))
+        enqueue_seconds = time.perf_counter() - start
+        assert writer.flush(timeout=30)
+
+        entries = read_jsonl(writer.log_dir / '2025-11-20.jsonl')
+        assert enqueue_seconds < 0.5
+        assert len(entries) == n == writer.written
+        assert entries[7]['device_id'] == 7
+        assert entries[7]['probability'] == round(probabilities[7], 4)
+        assert entries[7]['prediction'] == ('CRITICAL' if probabilities[7] >= 0.5 else 'NORMAL')
+
+    def test_length_mismatch(self, writer):
+        """Misaligned bulk inputs are rejected in the caller's thread."""
+        with pytest.raises(ValueError):
+            writer.log_many([1, 2], [0], [0.1, 0.2])
+
+    def test_time_based_flush(self, writer):
+        """Pending lines reach the disk after flush_interval without an explicit flush."""
+        writer.log('dev', 0, 0.1, timestamp=datetime(2025, 11, 20))
+        path = writer.log_dir / '2025-11-20.jsonl'
+
+        deadline = time.monotonic() + 5
+        while not (path.exists() and path.read_text()) and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        assert len(read_jsonl(path)) == 1
+
+
+class TestRotation:
+    """One file per day; closed days optionally gzipped."""
+
+    def test_daily_files(self, writer):
+        """Entries go to the file of their own date."""
+        writer.log('a', 0, 0.1, timestamp=datetime(2025, 11, 20, 23, 59))
+        writer.log('b', 1, 0.9, timestamp=datetime(2025, 11, 21, 0, 1))
+        writer.close()
+
+        assert [e['device_id'] for e in read_jsonl(writer.log_dir / '2025-11-20.jsonl')] == ['a']
+        assert [e['device_id'] for e in read_jsonl(writer.log_dir / '2025-11-21.jsonl')] == ['b']
+
+    def test_closed_days_compressed(self, tmp_path):
+        """compress=True gzips the previous day on rotation; the current day stays plain."""
+        w = AuditLogWriter(tmp_path, compress=True)
+        w.log_many(['a', 'b'], [0, 1], [0.1, 0.9], timestamp=datetime(2025, 11, 20))
+        w.log('c', 0, 0.2, timestamp=datetime(2025, 11, 21))
+        w.close()
+
+        assert not (tmp_path / '2025-11-20.jsonl').exists()
+        assert [e['device_id'] for e in read_jsonl(tmp_path / '2025-11-20.jsonl.gz')] == ['a', 'b']
+        assert [e['device_id'] for e in read_jsonl(tmp_path / '2025-11-21.jsonl')] == ['c']
+        assert w.files_compressed == 1
+
+
+class TestNonBlocking:
+    """Scoring threads never wait on the writer."""
+
+    def test_full_queue_drops(self, tmp_path, monkeypatch):
+        """With the writer stalled and the queue full, log() returns and counts drops."""
+        release = threading.Event()
+        original = AuditLogWriter._lines
+
+        def stalled_lines(item):
+            release.wait(10)
+            return original(item)
+
+        monkeypatch.setattr(AuditLogWriter, '_lines', staticmethod(stalled_lines))
+        w = AuditLogWriter(tmp_path, queue_size=2)
+
+        start = time.perf_counter()
+        for i in range(10):
+            w.log(str(i), 0, 0.1, timestamp=datetime(2025, 11, 20))
+        elapsed = time.perf_counter() - start
+        release.set()
+        w.close()
+
+        assert elapsed < 1
+        assert w.dropped > 0
+        assert w.written + w.dropped == 10
+
+    def test_closed_writer_rejects(self, tmp_path):
+        """Logging after close is an error, not a silent loss."""
+        w = AuditLogWriter(tmp_path)
+        w.close()
+        with pytest.raises(RuntimeError):
+            w.log('a', 0, 0.1)
+
+
+class TestRobustness:
+    """Odd device ids and failures never kill the writer thread."""
+
+    def test_numpy_device_ids(self, writer):
+        """NumPy scalars and object arrays are converted by json_device_id (shared with shadow_scoring)."""
+        ts = datetime(2025, 11, 20)
+        writer.log(np.int64(123), 1, 0.9, timestamp=ts)
+        writer.log(np.float64('nan'), 0, 0.1, timestamp=ts)
+        writer.log_many(np.array([np.int64(7), 'dev', None], dtype=object), [0, 1, 0], [0.1, 0.9, 0.2], timestamp=ts)
+        writer.log_many(np.array([1.5, np.nan]), [0, 0], [0.1, 0.2], timestamp=ts)
+        assert writer.flush(timeout=5)
+
+        ids = [e['device_id'] for e in read_jsonl(writer.log_dir / '2025-11-20.jsonl')]
+        assert ids == [123, None, 7, 'dev', None, 1.5, None]
+        assert writer.errors == 0
+
+    def test_serialization_error_counted(self, writer, monkeypatch):
+        """A failing item is dropped and counted; later entries are still written and flush() returns."""
+        original = AuditLogWriter._lines
+
+        def failing_lines(item):
+            if item[2] == 'bad':
+                raise TypeError("not serializable")
+            return original(item)
+
+        monkeypatch.setattr(AuditLogWriter, '_lines', staticmethod(failing_lines))
+        ts = datetime(2025, 11, 20)
+        writer.log('bad', 0, 0.1, timestamp=ts)
+        writer.log('good', 1, 0.9, timestamp=ts)
+
+        assert writer.flush(timeout=5)
+        assert writer.errors == 1 and 'TypeError' in writer.last_error
+        assert [e['device_id'] for e in read_jsonl(writer.log_dir / '2025-11-20.jsonl')] == ['good']
+
+    def test_concurrent_drops_counted(self, tmp_path, monkeypatch):
+        """dropped is exact with several producer threads."""
+        release = threading.Event()
+        original = AuditLogWriter._lines
+
+        def stalled_lines(item):
+            release.wait(10)
+            return original(item)
+
+        monkeypatch.setattr(AuditLogWriter, '_lines', staticmethod(stalled_lines))
+        w = AuditLogWriter(tmp_path, queue_size=1)
+
+        def produce():
+            for _ in range(2000):
+                w.log('a', 0, 0.1, timestamp=datetime(2025, 11, 20))
+
+        threads = [threading.Thread(target=produce) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        release.set()
+        w.close()
+
+        assert w.written + w.dropped == 8000
+
+
+class TestInferenceIntegration:
+    """log_prediction / log_predictions use the default writer."""
+
+    def test_log_functions(self, tmp_path, monkeypatch):
+        """Both functions write to the configured directory, no per-row print."""
+        monkeypatch.setattr(audit_log, '_default_writer', None)
+        w = configure_audit_writer(log_dir=tmp_path)
+
+        log_prediction('dev-1', 1, 0.9)
+        log_predictions(['dev-2', 'dev-3'], np.array([0, 1]), np.array([0.2, 0.7]), model_version='v2.1.0')
+        w.close()
+
+        entries = read_jsonl(tmp_path / f"{datetime.now().date().isoformat()}.jsonl")
+        assert [e['device_id'] for e in entries] == ['dev-1', 'dev-2', 'dev-3']
+        assert [e['model_version'] for e in entries] == ['v2.0.0', 'v2.1.0', 'v2.1.0']
+        monkeypatch.setattr(audit_log, '_default_writer', None)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
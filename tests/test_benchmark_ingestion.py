@@ -0,0 +1,84 @@
+"""
+Unit tests for benchmark_ingestion.py - Ingestion throughput/memory benchmark
+
+Tests cover:
+1. Each case runs in a fresh process and reports rows/sec and peak RSS
+   (a process that dies without a result is reported as failed)
+2. Baseline comparison flags throughput and memory regressions
+"""
+
+import multiprocessing as mp
+import os
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from benchmark_ingestion import _collect_result, compare_with_baseline, run_benchmark
+
+
+def _result(mode='batch', rows=1_000_000, rows_per_sec=500_000.0, peak_rss_mb=800.0):
+    return {'mode': mode, 'rows': rows, 'seconds': rows / rows_per_sec,
+            'rows_per_sec': rows_per_sec, 'peak_rss_mb': peak_rss_mb, 'devices': rows // 100}
+
+
+class TestRunBenchmark:
+    """Small end-to-end run."""
+
+    def test_measures_each_mode(self, tmp_path):
+        """Every size x mode is measured on a generated payload."""
+        results = run_benchmark([2000], ['batch', 'streaming'], tmp_path, chunksize=500)
+
+        assert [r['mode'] for r in results] == ['batch', 'streaming']
+        for r in results:
+            assert 'error' not in r
+            assert r['rows'] == 2000
+            assert r['devices'] == 20
+            assert r['rows_per_sec'] > 0
+            assert r['peak_rss_mb'] > 0
+        assert (tmp_path / 'synthetic_2000_s42.csv').exists()
+
+    def test_killed_case_reported(self):
+        """A child that dies without a result (e.g. OOM kill) is reported instead of hanging."""
+        ctx = mp.get_context('spawn')
+        queue = ctx.Queue()
+        process = ctx.Process(target=os._exit, args=(137,))
+        process.start()
+
+        result = _collect_result(process, queue, poll_seconds=0.1)
+
+        assert result['exitcode'] == 137
+        assert '137' in result['error']
+
+
+class TestBaselineComparison:
+    """Regression gate against a previous run."""
+
+    def test_no_regression(self):
+        """Within tolerance: nothing reported."""
+        assert compare_with_baseline([_result(rows_per_sec=450_000)], [_result()], max_regression=0.2) == []
+
+    def test_throughput_regression(self):
+        """rows/sec drop beyond tolerance is reported."""
+        regressions = compare_with_baseline([_result(rows_per_sec=300_000)], [_result()], max_regression=0.2)
+
+        assert len(regressions) == 1
+        assert 'linhas/s' in regressions[0]
+
+    def test_memory_regression(self):
+        """Peak RSS growth beyond tolerance is reported."""
+        regressions = compare_with_baseline([_result(peak_rss_mb=1200)], [_result()], max_regression=0.2)
+
+        assert len(regressions) == 1
+        assert 'RSS' in regressions[0]
+
+    def test_new_cases_ignored(self):
+        """Sizes/modes absent from the baseline are not compared."""
+        assert compare_with_baseline([_result(mode='parquet', rows_per_sec=1.0)], [_result()]) == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,199 @@
+"""
+Unit tests for device_aggregate_store.py - Incremental per-device aggregate store
+
+Tests cover:
+1. Incremental ingestion matches a full recomputation over all files
+2. Watermark: the same file is never ingested twice, crash-safe and keyed by path
+3. Only devices present in a new file are updated
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import device_aggregate_store
+from device_aggregate_store import (
+    ingest_payload_file,
+    ingest_directory,
+    load_state,
+    load_watermark,
+    rebuild_store,
+    store_features,
+)
+from transform_aws_payload import aggregate_by_device
+from tests.test_transform_aws_payload import TYPED_READ_RTOL, make_raw_payload
+
+
+@pytest.fixture
+def payload_files(tmp_path):
+    """Three daily payload files; day 3 only touches a subset of devices."""
+    input_dir = tmp_path / 'payloads_aws'
+    input_dir.mkdir()
+
+    days = [
+        make_raw_payload(n_devices=20, n_messages=800, seed=1),
+        make_raw_payload(n_devices=20, n_messages=800, seed=2),
+        make_raw_payload(n_devices=5, n_messages=200, seed=3),
+    ]
+    paths = []
+    for i, df in enumerate(days, start=1):
+        path = input_dir / f'payload_day{i}.csv'
+        df.to_csv(path, index=False)
+        paths.append(path)
+
+    return {'dir': input_dir, 'paths': paths, 'frames': days}
+
+
+class TestIncrementalIngestion:
+    """Incremental store must match recomputing from scratch."""
+
+    def test_incremental_matches_full_recompute(self, tmp_path, payload_files):
+        """Ingesting files one by one gives the same features as one big aggregation."""
+        store_dir = tmp_path / 'store'
+        for path in payload_files['paths']:
+            ingest_payload_file(store_dir, path, chunksize=300)
+
+        full = pd.concat(
+            [pd.read_csv(path) for path in payload_files['paths']], ignore_index=True
+        )
+        expected = aggregate_by_device(full)
+        result = store_features(store_dir)
+
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=TYPED_READ_RTOL)
+
+    def test_only_touched_devices_change(self, tmp_path, payload_files):
+        """A file with a subset of devices leaves the other devices' state untouched."""
+        store_dir = tmp_path / 'store'
+        ingest_payload_file(store_dir, payload_files['paths'][0])
+        ingest_payload_file(store_dir, payload_files['paths'][1])
+        before = load_state(store_dir).set_index('device_id')
+
+        result = ingest_payload_file(store_dir, payload_files['paths'][2])
+        after = load_state(store_dir).set_index('device_id')
+
+        touched = set(payload_files['frames'][2]['device_id'])
+        untouched = [d for d in before.index if d not in touched]
+
+        assert result['devices_touched'] == len(touched)
+        pd.testing.assert_frame_equal(after.loc[untouched], before.loc[untouched])
+        assert (after.loc[list(touched), 'messages__n'] > before.loc[list(touched), 'messages__n']).all()
+
+
+class TestWatermark:
+    """The same file is never ingested twice."""
+
+    def test_reingest_same_file_skipped(self, tmp_path, payload_files):
+        """Second ingestion of an unchanged file is a no-op."""
+        store_dir = tmp_path / 'store'
+        path = payload_files['paths'][0]
+
+        first = ingest_payload_file(store_dir, path)
+        state_before = load_state(store_dir)
+        second = ingest_payload_file(store_dir, path)
+
+        assert first['status'] == 'ingested'
+        assert second['status'] == 'skipped'
+        pd.testing.assert_frame_equal(load_state(store_dir), state_before)
+        assert load_watermark(store_dir)[str(path.resolve())]['messages'] == len(payload_files['frames'][0])
+
+    def test_directory_ingests_only_new_files(self, tmp_path, payload_files):
+        """Nightly refresh only processes files missing from the watermark."""
+        store_dir = tmp_path / 'store'
+        ingest_payload_file(store_dir, payload_files['paths'][0])
+
+        results = ingest_directory(store_dir, payload_files['dir'])
+
+        statuses = {r['file']: r['status'] for r in results}
+        assert statuses == {
+            'payload_day1.csv': 'skipped',
+            'payload_day2.csv': 'ingested',
+            'payload_day3.csv': 'ingested',
+        }
+
+    def test_changed_file_not_merged(self, tmp_path, payload_files):
+        """A modified file is reported instead of double-counting its messages."""
+        store_dir = tmp_path / 'store'
+        path = payload_files['paths'][0]
+        ingest_payload_file(store_dir, path)
+        state_before = load_state(store_dir)
+
+        with open(path, 'a') as f:
+            f.write(pd.read_csv(path).head(1).to_csv(index=False, header=False))
+        result = ingest_payload_file(store_dir, path)
+
+        assert result['status'] == 'changed'
+        pd.testing.assert_frame_equal(load_state(store_dir), state_before)
+
+    def test_crash_during_commit_leaves_store_unchanged(self, tmp_path, payload_files, monkeypatch):
+        """A crash in the single os.replace keeps the old state and watermark; the retry ingests once."""
+        store_dir = tmp_path / 'store'
+        paths = payload_files['paths'][:2]
+        ingest_payload_file(store_dir, paths[0])
+        state_before, watermark_before = load_state(store_dir), load_watermark(store_dir)
+
+        def crash(src, dst):
+            raise OSError('simulated crash')
+
+        monkeypatch.setattr(device_aggregate_store.os, 'replace', crash)
+        with pytest.raises(OSError, match='simulated crash'):
+            ingest_payload_file(store_dir, paths[1])
+        monkeypatch.undo()
+
+        pd.testing.assert_frame_equal(load_state(store_dir), state_before)
+        assert load_watermark(store_dir) == watermark_before
+
+        assert ingest_payload_file(store_dir, paths[1])['status'] == 'ingested'
+        assert ingest_payload_file(store_dir, paths[1])['status'] == 'skipped'
+        expected = aggregate_by_device(pd.concat(payload_files['frames'][:2], ignore_index=True))
+        pd.testing.assert_frame_equal(store_features(store_dir), expected, check_exact=False, rtol=TYPED_READ_RTOL)
+
+    def test_same_name_in_other_directory_ingested(self, tmp_path, payload_files):
+        """Files sharing a name in different directories are distinct watermark entries."""
+        store_dir = tmp_path / 'store'
+        other_dir = tmp_path / 'other_source'
+        other_dir.mkdir()
+        other = other_dir / payload_files['paths'][0].name
+        payload_files['frames'][1].to_csv(other, index=False)
+
+        first = ingest_payload_file(store_dir, payload_files['paths'][0])
+        second = ingest_payload_file(store_dir, other)
+
+        assert (first['status'], second['status']) == ('ingested', 'ingested')
+        assert len(load_watermark(store_dir)) == 2
+        expected = aggregate_by_device(pd.concat(payload_files['frames'][:2], ignore_index=True))
+        pd.testing.assert_frame_equal(store_features(store_dir), expected, check_exact=False, rtol=TYPED_READ_RTOL)
+
+    def test_files_without_field_messages_watermarked(self, tmp_path, payload_files):
+        """All-FACTORY and header-only files are recorded and skipped on the next run."""
+        store_dir = tmp_path / 'store'
+        factory = payload_files['frames'][0].assign(mode='FACTORY')
+        factory.to_csv(tmp_path / 'factory.csv', index=False)
+        factory.head(0).to_csv(tmp_path / 'header_only.csv', index=False)
+
+        for name in ('header_only.csv', 'factory.csv'):
+            assert ingest_payload_file(store_dir, tmp_path / name)['messages'] == 0
+            assert ingest_payload_file(store_dir, tmp_path / name)['status'] == 'skipped'
+        assert len(load_watermark(store_dir)) == 2
+        assert len(load_state(store_dir)) == 0
+
+    def test_rebuild_resets_store(self, tmp_path, payload_files):
+        """rebuild_store discards the state and reingests every file."""
+        store_dir = tmp_path / 'store'
+        ingest_payload_file(store_dir, payload_files['paths'][0])
+
+        results = rebuild_store(store_dir, payload_files['paths'][:1])
+
+        assert results[0]['status'] == 'ingested'
+        expected = aggregate_by_device(payload_files['frames'][0])
+        pd.testing.assert_frame_equal(store_features(store_dir), expected, check_exact=False, rtol=TYPED_READ_RTOL)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,182 @@
+"""
+Unit tests for drift_bootstrap.py - Bootstrap confidence intervals for drift statistics
+
+Tests cover:
+1. Vectorized resamples match compute_ks_statistics on the same rows
+2. Deterministic seeding across worker counts
+3. Intervals and permutation p-values on drifted / stable features
+4. Lifecycle score intervals
+5. ReferenceProfile references and the --bootstrap CLI flag (in-process and as a script)
+"""
+
+import json
+import os
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+SCRIPTS_DIR = Path(__file__).parent.parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import drift_bootstrap
+import drift_monitor
+from drift_bootstrap import add_confidence_intervals, bootstrap_drift_statistics
+from drift_monitor import ALL_FEATURES, build_reference_profile, compute_ks_statistics, detect_lifecycle_drift
+
+
+@pytest.fixture(scope="module")
+def fleets():
+    """Small segment: temp_mean and total_messages drift, the rest does not."""
+    rng = np.random.default_rng(21)
+    reference = pd.DataFrame({feat: rng.normal(50, 10, 300) for feat in ALL_FEATURES})
+    production = pd.DataFrame({feat: rng.normal(50, 10, 150) for feat in ALL_FEATURES})
+    reference['total_messages'] = rng.poisson(20, 300)
+    production['total_messages'] = rng.poisson(30, 150)
+    production['temp_mean'] += 10
+    reference = reference.mask(rng.random(reference.shape) < 0.05)
+    return reference, production
+
+
+@pytest.fixture(scope="module")
+def distribution(fleets):
+    reference, production = fleets
+    return bootstrap_drift_statistics(reference, production, n_resamples=400, seed=0)
+
+
+class TestResamplingEngine:
+    """Blocks of resamples computed from per-device counts."""
+
+    def test_resample_matches_exact_engine(self, fleets):
+        reference, production = fleets
+        state = drift_bootstrap._prepare(reference, production, ALL_FEATURES, drift_bootstrap.DEFAULT_BIN_QUANTILES)
+        seed_sequence = np.random.SeedSequence(3)
+        drift_bootstrap._init_worker(state)
+        block = drift_bootstrap._bootstrap_block((seed_sequence, 2))
+        drift_bootstrap._init_worker(None)
+
+        rng = np.random.default_rng(seed_sequence)
+        ref_counts = drift_bootstrap._device_counts(rng, 2, len(reference))
+        prod_counts = drift_bootstrap._device_counts(rng, 2, len(production))
+        for i in range(2):
+            exact = compute_ks_statistics(reference.iloc[np.repeat(np.arange(len(reference)), ref_counts[i])],
+                                          production.iloc[np.repeat(np.arange(len(production)), prod_counts[i])])
+            for j, feat in enumerate(ALL_FEATURES):
+                assert block['ks_statistic'][i, j] == pytest.approx(exact[feat]['ks_statistic'], abs=1e-12)
+                assert block['wasserstein_std'][i, j] == pytest.approx(exact[feat]['wasserstein_std'], rel=1e-9)
+
+    def test_sketch_profile_uses_exact_std(self, fleets):
+        """Quantile-sketch profile: wasserstein_std divides by the profile's exact std, like the point estimate."""
+        reference, production = fleets
+        profile = build_reference_profile(reference, max_values=50)
+        state = drift_bootstrap._prepare(profile, production, ALL_FEATURES, drift_bootstrap.DEFAULT_BIN_QUANTILES)
+        seed_sequence = np.random.SeedSequence(4)
+        drift_bootstrap._init_worker(state)
+        block = drift_bootstrap._bootstrap_block((seed_sequence, 2))
+        drift_bootstrap._init_worker(None)
+
+        prod_counts = drift_bootstrap._device_counts(np.random.default_rng(seed_sequence), 2, len(production))
+        assert profile.is_sketch
+        for i in range(2):
+            exact = compute_ks_statistics(profile, production.iloc[np.repeat(np.arange(len(production)),
+                                                                             prod_counts[i])])
+            for j, feat in enumerate(ALL_FEATURES):
+                assert block['wasserstein_std'][i, j] == pytest.approx(exact[feat]['wasserstein_std'], rel=1e-9)
+
+    def test_deterministic_across_workers(self, fleets):
+        reference, production = fleets
+        single = bootstrap_drift_statistics(reference, production, n_resamples=250, seed=7, n_jobs=1)
+        pooled = bootstrap_drift_statistics(reference, production, n_resamples=250, seed=7, n_jobs=2)
+        other_seed = bootstrap_drift_statistics(reference, production, n_resamples=250, seed=8, n_jobs=1)
+
+        for metric in drift_bootstrap.BOOTSTRAP_METRICS:
+            assert single.samples[metric].shape == (250, len(ALL_FEATURES))
+            np.testing.assert_array_equal(single.samples[metric], pooled.samples[metric])
+        np.testing.assert_array_equal(single.permutation_p_values, pooled.permutation_p_values)
+        assert not np.array_equal(single.samples['ks_statistic'], other_seed.samples['ks_statistic'])
+
+
+class TestConfidenceIntervals:
+    """Intervals attached to compute_ks_statistics and detect_lifecycle_drift results."""
+
+    def test_intervals_and_permutation_p_values(self, fleets, distribution):
+        reference, production = fleets
+        results = add_confidence_intervals(compute_ks_statistics(reference, production), distribution)
+
+        drifted, stable = results['temp_mean'], results['battery_mean']
+        for metric in drift_bootstrap.BOOTSTRAP_METRICS:
+            low, high = drifted['confidence_intervals'][metric]
+            assert low <= drifted[metric] <= high
+        assert drifted['confidence_intervals']['ks_statistic'][0] > stable['confidence_intervals']['ks_statistic'][1]
+        assert drifted['permutation_p_value'] == pytest.approx(1 / 401)
+        assert stable['permutation_p_value'] > 0.01
+
+    def test_lifecycle_intervals(self, fleets, distribution):
+        reference, production = fleets
+        results = compute_ks_statistics(reference, production)
+        lifecycle = detect_lifecycle_drift(results, bootstrap=distribution, confidence=0.9)
+        intervals = lifecycle['confidence_intervals']
+
+        assert intervals['confidence'] == 0.9 and intervals['n_resamples'] == 400
+        low, high = intervals['activity_drift']
+        assert low <= lifecycle['activity_drift'] <= high
+        assert intervals['lifecycle_drift_score'][0] > 0.3
+        assert intervals['detection_rate'] == 1.0
+        assert 'confidence_intervals' not in detect_lifecycle_drift(results)
+
+    def test_profile_reference_is_fixed(self, fleets):
+        reference, production = fleets
+        distribution = bootstrap_drift_statistics(build_reference_profile(reference), production, n_resamples=100)
+        results = add_confidence_intervals(compute_ks_statistics(reference, production), distribution)
+
+        assert np.all(np.isnan(distribution.permutation_p_values))
+        assert results['temp_mean']['permutation_p_value'] is None
+        low, high = results['temp_mean']['confidence_intervals']['ks_statistic']
+        assert low <= results['temp_mean']['ks_statistic'] <= high
+
+    def test_bootstrap_flag(self, fleets, tmp_path):
+        reference, production = fleets
+        reference.to_csv(tmp_path / 'reference.csv', index=False)
+        production.to_csv(tmp_path / 'production.csv', index=False)
+
+        with pytest.raises(SystemExit):
+            drift_monitor.main(['--reference', str(tmp_path / 'reference.csv'),
+                                '--production', str(tmp_path / 'production.csv'),
+                                '--output', str(tmp_path / 'out'), '--bootstrap', '50', '--jobs', '1'])
+        report = json.loads((tmp_path / 'out' / 'drift_report.json').read_text())
+
+        assert set(report['feature_drift']['temp_mean']['confidence_intervals']) == set(
+            drift_bootstrap.BOOTSTRAP_METRICS)
+        assert report['lifecycle_drift']['confidence_intervals']['n_resamples'] == 50
+
+
+    def test_profile_bootstrap_script(self, fleets, tmp_path):
+        """Script run: build-reference, then --profile ... --bootstrap (profile class seen by drift_bootstrap)."""
+        reference, production = fleets
+        reference.to_csv(tmp_path / 'reference.csv', index=False)
+        production.to_csv(tmp_path / 'production.csv', index=False)
+        registry = tmp_path / 'registry.json'
+        registry.write_text(json.dumps({'models': [{'model_id': 'm', 'version': '1.0.0', 'status': 'active'}]}))
+        script = str(SCRIPTS_DIR / 'drift_monitor.py')
+        env = {**os.environ, 'MPLBACKEND': 'Agg'}
+
+        built = subprocess.run([sys.executable, script, 'build-reference', '--reference', str(tmp_path / 'reference.csv'),
+                                '--registry', str(registry), '--output', str(tmp_path / 'p.npz')],
+                               capture_output=True, text=True, env=env, timeout=300)
+        run = subprocess.run([sys.executable, script, '--profile', str(tmp_path / 'p.npz'),
+                              '--production', str(tmp_path / 'production.csv'), '--output', str(tmp_path / 'out'),
+                              '--bootstrap', '50', '--jobs', '1'],
+                             capture_output=True, text=True, env=env, timeout=300)
+        report = json.loads((tmp_path / 'out' / 'drift_report.json').read_text())
+
+        assert built.returncode == 0, built.stderr
+        assert run.returncode in (0, 1, 2), run.stderr
+        assert 'Traceback' not in run.stderr
+        assert report['feature_drift']['temp_mean']['permutation_p_value'] is None
+        assert report['lifecycle_drift']['confidence_intervals']['n_resamples'] == 50
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -7,8 +7,13 @@ Tests cover:
 3. Drift status classification
 4. Synthetic drift scenarios
 5. Real data integration
+6. Vectorized KS engine against scipy/pandas
+7. Persisted reference profiles (build-reference)
+8. PSI, Wasserstein and Jensen-Shannon metrics with per-metric thresholds
 """
 
+import json
+
 import numpy as np
 import pandas as pd
 import pytest
@@ -18,11 +23,25 @@ import sys
 # Add scripts directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
 
+from scipy import stats
+
+import drift_monitor
 from drift_monitor import (
+    build_reference_profile,
     compute_ks_statistics,
+    load_reference_profile,
+    reference_profile_path,
+    registry_model_entry,
+    save_reference_profile,
     detect_lifecycle_drift,
     classify_drift_status,
-    ALL_FEATURES
+    jensen_shannon_divergence,
+    ks_asymptotic_pvalues,
+    save_report,
+    DEFAULT_METRIC_THRESHOLDS,
+    sort_columns,
+    ALL_FEATURES,
+    KS_LIMITING_MIN_N
 )
 
 
@@ -436,5 +455,268 @@ class TestEdgeCases:
         assert status_lenient == 'OK', "Should be OK with lenient thresholds"
 
 
+class TestVectorizedKSEngine:
+    """Sorted-column engine matches the per-feature scipy/pandas computation."""
+    
+    @pytest.fixture
+    def mixed_data(self):
+        """Continuous and integer (tied) features, NaN, different sample sizes."""
+        rng = np.random.default_rng(7)
+        
+        def make(n, shift):
+            df = pd.DataFrame({
+                feat: (rng.normal(50 + shift, 10, n) if i % 2 else rng.poisson(5 + shift, n).astype(float))
+                for i, feat in enumerate(ALL_FEATURES)
+            })
+            return df.mask(rng.random(df.shape) < 0.1)
+        
+        return make(300, 0), make(120, 1)
+    
+    def test_matches_scipy_and_pandas(self, mixed_data):
+        reference, production = mixed_data
+        
+        results = compute_ks_statistics(reference, production)
+        
+        for feat in ALL_FEATURES:
+            ref_data, prod_data = reference[feat].dropna(), production[feat].dropna()
+            expected = stats.ks_2samp(ref_data, prod_data, method='asymp')
+            assert results[feat]['ks_statistic'] == pytest.approx(expected.statistic, abs=1e-12)
+            assert results[feat]['p_value'] == pytest.approx(expected.pvalue, abs=1e-12)
+            assert results[feat]['reference_mean'] == pytest.approx(ref_data.mean())
+            assert results[feat]['production_std'] == pytest.approx(prod_data.std())
+            assert results[feat]['reference_n'] == len(ref_data)
+    
+    def test_quantiles_match_numpy(self, mixed_data):
+        reference, production = mixed_data
+        
+        results = compute_ks_statistics(reference, production, quantiles=(0.1, 0.5, 0.9))
+        
+        for feat in ['total_messages', 'optical_mean']:
+            expected = np.quantile(production[feat].dropna(), [0.1, 0.5, 0.9])
+            assert list(results[feat]['production_quantiles']) == ['p10', 'p50', 'p90']
+            np.testing.assert_allclose(list(results[feat]['production_quantiles'].values()), expected)
+    
+    def test_feature_subset(self, mixed_data):
+        """Only the requested features are compared (e.g. data missing some columns)."""
+        reference, production = mixed_data
+        
+        results = compute_ks_statistics(reference.drop(columns='battery_range'), production,
+                                        features=['temp_mean', 'snr_std'])
+        
+        assert list(results) == ['temp_mean', 'snr_std']
+    
+    def test_sort_columns_puts_nan_last(self):
+        df = pd.DataFrame({'a': [3.0, np.nan, 1.0, 2.0], 'b': [np.nan, np.nan, 5.0, 4.0]})
+        
+        values, n = sort_columns(df, ['a', 'b'])
+        
+        assert list(n) == [3, 2]
+        np.testing.assert_array_equal(values[:3, 0], [1.0, 2.0, 3.0])
+        np.testing.assert_array_equal(values[:2, 1], [4.0, 5.0])
+        assert np.isnan(values[3, 0]) and np.isnan(values[2:, 1]).all()
+    
+    def test_large_samples_use_limiting_distribution(self):
+        """Above KS_LIMITING_MIN_N the p-value stays close to scipy's finite-n value."""
+        n = 4 * KS_LIMITING_MIN_N
+        d = np.array([0.005, 0.01, 0.02])
+        
+        p_values = ks_asymptotic_pvalues(d, np.array([n] * 3), np.array([n] * 3))
+        
+        np.testing.assert_allclose(p_values, stats.kstwo.sf(d, n // 2), atol=3e-3)
+
+
+class TestReferenceProfile:
+    """Reference profiles replace the training CSV in drift runs."""
+    
+    @pytest.fixture
+    def fleets(self):
+        rng = np.random.default_rng(3)
+        reference = pd.DataFrame({feat: rng.normal(50, 10, 2000) for feat in ALL_FEATURES})
+        reference = reference.mask(rng.random(reference.shape) < 0.05)
+        production = pd.DataFrame({feat: rng.normal(52, 10, 300) for feat in ALL_FEATURES})
+        return reference, production
+    
+    def test_profile_matches_dataframe(self, fleets, tmp_path):
+        """Full profile (no sketch) gives the same results as the DataFrame, after a save/load."""
+        reference, production = fleets
+        profile = build_reference_profile(reference, metadata={'model_id': 'm', 'version': '1.0.0'})
+        loaded = load_reference_profile(save_reference_profile(profile, tmp_path / 'profile.npz'))
+        
+        expected = compute_ks_statistics(reference, production)
+        results = compute_ks_statistics(loaded, production)
+        
+        assert not loaded.is_sketch
+        assert loaded.metadata['model_id'] == 'm' and loaded.metadata['devices'] == 2000
+        assert results == expected
+        assert results['temp_mean']['reference_nan_rate'] == pytest.approx(reference['temp_mean'].isna().mean())
+    
+    def test_quantile_sketch(self, fleets):
+        """Large features keep max_values points; KS error is bounded, moments and n stay exact."""
+        reference, production = fleets
+        profile = build_reference_profile(reference, max_values=101)
+        
+        expected = compute_ks_statistics(reference, production)
+        results = compute_ks_statistics(profile, production)
+        
+        assert profile.is_sketch
+        assert profile.sorted_values.shape == (101, len(ALL_FEATURES))
+        for feat in ALL_FEATURES:
+            assert abs(results[feat]['ks_statistic'] - expected[feat]['ks_statistic']) <= 1 / 100
+            assert results[feat]['reference_n'] == expected[feat]['reference_n']
+            assert results[feat]['reference_mean'] == pytest.approx(expected[feat]['reference_mean'])
+    
+    def test_missing_feature_raises(self, fleets):
+        reference, production = fleets
+        profile = build_reference_profile(reference, features=['temp_mean'])
+        
+        with pytest.raises(ValueError, match='battery_mean'):
+            compute_ks_statistics(profile, production, features=['temp_mean', 'battery_mean'])
+    
+    def test_registry_resolution(self, tmp_path):
+        registry = tmp_path / 'registry.json'
+        registry.write_text(json.dumps({'models': [
+            {'model_id': 'old', 'version': '1.0.0', 'status': 'deprecated'},
+            {'model_id': 'new', 'version': '2.0.0', 'status': 'active'},
+        ]}))
+        
+        assert registry_model_entry(registry)['model_id'] == 'new'
+        assert registry_model_entry(registry, 'old')['version'] == '1.0.0'
+        assert reference_profile_path(registry_model_entry(registry), tmp_path) == tmp_path / 'new_2.0.0.npz'
+        with pytest.raises(ValueError):
+            registry_model_entry(registry, 'missing')
+    
+    def test_build_reference_then_drift_run(self, fleets, tmp_path):
+        """CLI: build-reference once, then a run without --reference uses the profile."""
+        reference, production = fleets
+        reference.to_csv(tmp_path / 'reference.csv', index=False)
+        production.to_csv(tmp_path / 'production.csv', index=False)
+        registry = tmp_path / 'registry.json'
+        registry.write_text(json.dumps({'models': [{'model_id': 'm', 'version': '3.0.0', 'status': 'active'}]}))
+        common = ['--registry', str(registry), '--profile-dir', str(tmp_path / 'profiles')]
+        
+        with pytest.raises(SystemExit) as built:
+            drift_monitor.main(['build-reference', '--reference', str(tmp_path / 'reference.csv')] + common)
+        with pytest.raises(SystemExit):
+            drift_monitor.main(['--production', str(tmp_path / 'production.csv'),
+                                '--output', str(tmp_path / 'out')] + common)
+        
+        report = json.loads((tmp_path / 'out' / 'drift_report.json').read_text())
+        expected = compute_ks_statistics(reference, production)
+        
+        assert built.value.code == 0
+        assert (tmp_path / 'profiles' / 'm_3.0.0.npz').exists()
+        assert report['feature_drift']['temp_mean']['ks_statistic'] == expected['temp_mean']['ks_statistic']
+    
+    def test_unknown_model_id_is_usage_error(self, fleets, tmp_path, capsys):
+        """A --model-id missing from the registry exits with a usage error, not a traceback."""
+        reference, _ = fleets
+        reference.to_csv(tmp_path / 'reference.csv', index=False)
+        registry = tmp_path / 'registry.json'
+        registry.write_text(json.dumps({'models': [{'model_id': 'm', 'version': '3.0.0', 'status': 'active'}]}))
+        common = ['--registry', str(registry), '--model-id', 'missing']
+        
+        runs = [
+            ['build-reference', '--reference', str(tmp_path / 'reference.csv')],
+            ['--production', str(tmp_path / 'reference.csv'), '--output', str(tmp_path / 'out')],
+            ['stream', '--batches', str(tmp_path / 'reference.csv')],
+        ]
+        for run in runs:
+            with pytest.raises(SystemExit) as exited:
+                drift_monitor.main(run + common)
+            assert exited.value.code == 2
+            assert "Model 'missing' not found in registry" in capsys.readouterr().err
+
+
+class TestDriftMetrics:
+    """PSI, Wasserstein and Jensen-Shannon from the same sorted columns as KS."""
+    
+    @pytest.fixture
+    def fleets(self):
+        rng = np.random.default_rng(11)
+        reference = pd.DataFrame({feat: rng.normal(50, 10, 3000) for feat in ALL_FEATURES})
+        production = pd.DataFrame({feat: rng.normal(50, 10, 1500) for feat in ALL_FEATURES})
+        # Discrete feature (searchsorted path) and a continuous shift
+        reference['total_messages'] = rng.poisson(20, 3000)
+        production['total_messages'] = rng.poisson(23, 1500)
+        production['temp_mean'] += 4
+        return reference.mask(rng.random(reference.shape) < 0.05), production
+    
+    def test_wasserstein_matches_scipy(self, fleets):
+        reference, production = fleets
+        results = compute_ks_statistics(reference, production)
+        
+        for feat in ['total_messages', 'temp_mean', 'battery_min']:
+            ref, prod = reference[feat].dropna(), production[feat].dropna()
+            assert results[feat]['wasserstein'] == pytest.approx(stats.wasserstein_distance(ref, prod), rel=1e-9)
+            assert results[feat]['wasserstein_std'] == pytest.approx(results[feat]['wasserstein'] / ref.std())
+            assert results[feat]['ks_statistic'] == pytest.approx(stats.ks_2samp(ref, prod).statistic, abs=1e-12)
+    
+    def test_binned_metrics(self, fleets):
+        from scipy.spatial.distance import jensenshannon
+        
+        reference, production = fleets
+        results = compute_ks_statistics(reference, production, bin_quantiles=(0.25, 0.5, 0.75))
+        
+        ref, prod = reference['temp_mean'].dropna(), production['temp_mean'].dropna()
+        edges = np.quantile(ref, [0.25, 0.5, 0.75])
+        expected = np.diff(np.concatenate([[0], np.searchsorted(np.sort(ref), edges, side='right'), [len(ref)]])) / len(ref)
+        actual = np.diff(np.concatenate([[0], np.searchsorted(np.sort(prod), edges, side='right'), [len(prod)]])) / len(prod)
+        
+        assert results['temp_mean']['psi'] == pytest.approx(np.sum((actual - expected) * np.log(actual / expected)))
+        assert results['temp_mean']['js_divergence'] == pytest.approx(jensenshannon(expected, actual, base=2) ** 2)
+        assert jensen_shannon_divergence([1, 0], [0, 1]) == pytest.approx(1.0)
+        assert results['battery_mean']['psi'] < results['temp_mean']['psi']
+    
+    def test_tail_shift_caught_beyond_ks(self):
+        """Shift of the lowest 5% of battery_min: KS stays OK, PSI/Wasserstein flag it."""
+        rng = np.random.default_rng(12)
+        reference = pd.DataFrame({feat: rng.normal(50, 10, 5000) for feat in ALL_FEATURES})
+        production = pd.DataFrame({feat: rng.normal(50, 10, 5000) for feat in ALL_FEATURES})
+        low = production['battery_min'] < production['battery_min'].quantile(0.05)
+        production.loc[low, 'battery_min'] -= 60
+        
+        results = compute_ks_statistics(reference, production)
+        lifecycle = detect_lifecycle_drift(results)
+        ks_only, _ = classify_drift_status(results, lifecycle)
+        status, alerts = classify_drift_status(results, lifecycle, metric_thresholds=DEFAULT_METRIC_THRESHOLDS)
+        
+        assert results['battery_min']['ks_statistic'] < 0.2
+        assert ks_only == 'OK'
+        assert status == 'CRITICAL'
+        assert any('battery_min: Wasserstein/std=' in alert for alert in alerts)
+        assert all('battery_min' in alert for alert in alerts)
+    
+    def test_report_records_metric_thresholds(self, fleets, tmp_path):
+        reference, production = fleets
+        results = compute_ks_statistics(reference, production)
+        lifecycle = detect_lifecycle_drift(results)
+        status, alerts = classify_drift_status(results, lifecycle, metric_thresholds=DEFAULT_METRIC_THRESHOLDS)
+        
+        save_report(results, lifecycle, status, alerts, tmp_path, DEFAULT_METRIC_THRESHOLDS)
+        report = json.loads((tmp_path / 'drift_report.json').read_text())
+        
+        assert set(report['metrics']) == {'ks_statistic', 'psi', 'wasserstein_std', 'js_divergence'}
+        assert report['metrics']['psi']['warning_threshold'] == 0.1
+        assert report['metrics']['psi']['critical_threshold'] == 0.25
+        assert 'temp_mean' in report['metrics']['wasserstein_std']['warning_features']   # 0.4 std shift
+        assert report['metrics']['js_divergence']['max'] == pytest.approx(
+            max(r['js_divergence'] for r in results.values()))
+    
+    def test_report_summary_uses_ks_thresholds(self, fleets, tmp_path):
+        reference, production = fleets
+        results = compute_ks_statistics(reference, production)
+        lifecycle = detect_lifecycle_drift(results)
+        thresholds = {**DEFAULT_METRIC_THRESHOLDS, 'ks_statistic': (0.01, 0.02)}
+        
+        save_report(results, lifecycle, 'CRITICAL', [], tmp_path, thresholds)
+        summary = json.loads((tmp_path / 'drift_report.json').read_text())['summary']
+        ks = [r['ks_statistic'] for r in results.values() if not np.isnan(r['ks_statistic'])]
+        
+        assert summary['critical_features'] == sum(v >= 0.02 for v in ks)
+        assert summary['warning_features'] == sum(0.01 <= v < 0.02 for v in ks)
+        assert summary['critical_features'] + summary['warning_features'] + summary['ok_features'] == len(ks)
+        assert summary['critical_features'] > 1
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,207 @@
+"""
+Unit tests for models/explanations.py - Per-device SHAP explanations
+
+Tests cover:
+1. Exactness: base value + contributions = raw CatBoost score
+2. One batched ShapValues call per request, cache hits afterwards
+3. Cache keyed by model version + features
+4. Top-k ordering, imputed features, input formats
+5. Model unwrapping (pipeline, FastInferenceModel, CachedModel)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.explanations import ExplanationCache, ShapExplainer, explainable_model
+from models.inference import FastInferenceModel, compile_pipeline
+from models.prediction_cache import CachedModel, PredictionCache
+from models.scoring_metrics import disable_metrics, enable_metrics
+from tests.test_inference_pipeline import make_small_pipeline
+from utils.preprocessing import TRAINING_FEATURE_ORDER
+
+
+@pytest.fixture(scope="module")
+def small_pipeline():
+    return make_small_pipeline()
+
+
+@pytest.fixture
+def explainer(small_pipeline):
+    pipeline, _ = small_pipeline
+    return ShapExplainer(compile_pipeline(pipeline), model_version='test')
+
+
+def count_shap_calls(explainer, monkeypatch):
+    """Wrap get_feature_importance to count ShapValues calls."""
+    calls = []
+    classifier = explainer.model.classifier
+    original = classifier.get_feature_importance
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs.get('data').num_row())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(classifier, 'get_feature_importance', counting)
+    return calls
+
+
+class TestShapValues:
+    """Contributions are exact and computed in batch."""
+
+    def test_additivity(self, explainer, small_pipeline):
+        """base_value + Σ contributions = raw log-odds score of the imputed input"""
+        _, X = small_pipeline
+        model = explainer.model
+        raw = model.to_array(X)
+        expected = model.classifier.predict(np.where(np.isnan(raw), model.medians, raw),
+                                            prediction_type='RawFormulaVal')
+
+        values = explainer.shap_values(X)
+
+        assert values.shape == (len(X), len(TRAINING_FEATURE_ORDER))
+        np.testing.assert_allclose(explainer.base_value + values.sum(axis=1), expected, atol=1e-9)
+
+    def test_one_call_per_batch_then_cached(self, explainer, small_pipeline, monkeypatch):
+        _, X = small_pipeline
+        calls = count_shap_calls(explainer, monkeypatch)
+
+        first = explainer.shap_values(X.head(100))
+        second = explainer.shap_values(X.head(100))
+        explainer.shap_values(X.head(120))   # só os 20 novos
+
+        assert calls == [100, 20]
+        np.testing.assert_array_equal(first, second)
+        assert explainer.stats()['cache']['hits'] == 200
+
+    def test_cache_keyed_by_model_version(self, small_pipeline, monkeypatch):
+        pipeline, X = small_pipeline
+        fast_model = compile_pipeline(pipeline)
+        v1 = ShapExplainer(fast_model, 'v1')
+        v2 = ShapExplainer(fast_model, 'v2')
+        v2.cache = v1.cache   # mesmo cache, versões diferentes
+        calls = count_shap_calls(v1, monkeypatch)
+
+        v1.shap_values(X.head(10))
+        v2.shap_values(X.head(10))
+
+        assert calls == [10, 10]
+
+    def test_cache_disabled(self, small_pipeline, monkeypatch):
+        pipeline, X = small_pipeline
+        explainer = ShapExplainer(compile_pipeline(pipeline), 'v', cache_size=0)
+        calls = count_shap_calls(explainer, monkeypatch)
+
+        explainer.shap_values(X.head(5))
+        explainer.shap_values(X.head(5))
+
+        assert explainer.cache is None
+        assert calls == [5, 5]
+
+    def test_shap_stage_recorded(self, explainer, small_pipeline):
+        _, X = small_pipeline
+        metrics = enable_metrics()
+        try:
+            explainer.shap_values(X.head(10))
+            assert metrics.snapshot()['stages']['shap']['count'] == 1
+        finally:
+            disable_metrics()
+
+    def test_empty_batch(self, explainer):
+        values = explainer.shap_values(np.empty((0, len(TRAINING_FEATURE_ORDER))))
+        assert values.shape == (0, len(TRAINING_FEATURE_ORDER))
+
+
+class TestTopContributors:
+    """Per-device top-k summaries."""
+
+    def test_sorted_by_absolute_contribution(self, explainer, small_pipeline):
+        _, X = small_pipeline
+        values = explainer.shap_values(X.head(20))
+
+        top = explainer.top_contributors(X.head(20), k=5)
+
+        assert len(top) == 20
+        for i, device in enumerate(top):
+            contributions = [c['contribution'] for c in device]
+            assert len(device) == 5
+            assert [abs(c) for c in contributions] == sorted((abs(c) for c in contributions), reverse=True)
+            assert abs(contributions[0]) == pytest.approx(np.abs(values[i]).max())
+
+    def test_imputed_features_flagged(self, explainer, small_pipeline):
+        """NaN inputs report value=None, imputed=True"""
+        _, X = small_pipeline
+        device = X.iloc[0].to_dict()
+        for feature in TRAINING_FEATURE_ORDER:
+            device[feature] = np.nan
+
+        top = explainer.top_contributors(device, k=len(TRAINING_FEATURE_ORDER))[0]
+
+        assert all(c['imputed'] and c['value'] is None for c in top)
+
+    def test_input_formats_agree(self, explainer, small_pipeline):
+        """DataFrame (any column order), dict and array give the same explanation"""
+        _, X = small_pipeline
+        row = X.iloc[[3]]
+
+        expected = explainer.top_contributors(row, k=3)[0]
+
+        assert explainer.top_contributors(row[list(reversed(TRAINING_FEATURE_ORDER))], k=3)[0] == expected
+        assert explainer.top_contributors(row.iloc[0].to_dict(), k=3)[0] == expected
+        assert explainer.top_contributors(row.to_numpy(), k=3)[0] == expected
+
+    def test_k_larger_than_features(self, explainer, small_pipeline):
+        _, X = small_pipeline
+        assert len(explainer.top_contributors(X.head(1), k=100)[0]) == len(TRAINING_FEATURE_ORDER)
+
+    def test_frame_summary(self, explainer, small_pipeline):
+        _, X = small_pipeline
+        batch = X.head(4).set_index(pd.Index(['a', 'b', 'c', 'd']))
+
+        frame = explainer.top_contributors_frame(batch, k=2)
+        first = explainer.top_contributors(batch.head(1), k=2)[0]
+
+        assert list(frame.index) == ['a', 'b', 'c', 'd']
+        assert frame.loc['a', 'top_features'] == '; '.join(
+            f"{c['feature']} ({c['contribution']:+.2f})" for c in first
+        )
+
+
+class TestModelUnwrapping:
+    """The explainer accepts whatever the scoring path uses."""
+
+    def test_pipeline_fast_and_cached_models(self, small_pipeline):
+        pipeline, X = small_pipeline
+        fast_model = compile_pipeline(pipeline)
+        cached = CachedModel(fast_model, PredictionCache(), 'v')
+
+        assert explainable_model(cached) is fast_model
+        assert explainable_model(fast_model) is fast_model
+        assert isinstance(explainable_model(pipeline), FastInferenceModel)
+        np.testing.assert_allclose(ShapExplainer(pipeline, 'v').shap_values(X.head(5)),
+                                   ShapExplainer(cached, 'v').shap_values(X.head(5)))
+
+
+class TestExplanationCache:
+    """LRU of SHAP vectors."""
+
+    def test_lru_eviction(self):
+        cache = ExplanationCache(max_entries=2)
+        cache.put_many([b'a', b'b'], [np.ones(3), np.zeros(3)])
+        cache.get_many([b'a'])            # 'a' vira o mais recente
+        cache.put_many([b'c'], [np.ones(3)])
+
+        found = cache.get_many([b'a', b'b', b'c'])
+
+        assert found[1] is None
+        assert found[0] is not None and found[2] is not None
+        assert cache.stats()['evictions'] == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
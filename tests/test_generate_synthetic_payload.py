@@ -0,0 +1,111 @@
+"""
+Unit tests for generate_synthetic_payload.py - Synthetic AWS raw payloads
+
+Tests cover:
+1. AWS export format (resolvable schema, IMEI device IDs, ISO8601 timestamps)
+2. Configurable NaN rate and FACTORY fraction
+3. Block-wise CSV/Parquet writing feeds the transform unchanged
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from generate_synthetic_payload import (
+    MODE_COL,
+    generate_payload_frame,
+    write_synthetic_payload,
+)
+from payload_parquet_cache import load_aws_payload_parquet
+from transform_aws_payload import (
+    AWS_COLUMN_MAPPING,
+    aggregate_by_device,
+    load_aws_payload,
+    resolve_payload_schema,
+)
+
+
+class TestPayloadFrame:
+    """Generated block looks like an AWS export."""
+
+    def test_schema_resolves(self):
+        """Column names match what the transform expects."""
+        schema = resolve_payload_schema(generate_payload_frame(5, 20).columns)
+
+        assert schema.device_col == 'device_id'
+        assert schema.frame_col == 'f_cnt'
+        assert schema.mode_col == MODE_COL
+        assert len(schema.sensor_cols) == 6
+
+    def test_shape_and_devices(self):
+        """n_devices x messages_per_device rows with contiguous IDs."""
+        df = generate_payload_frame(7, 30, first_device=100)
+
+        assert len(df) == 210
+        assert df['device_id'].nunique() == 7
+        assert (df.groupby('device_id').size() == 30).all()
+        assert np.array_equal(np.sort(df['device_id'].unique()), df['device_id'].min() + np.arange(7))
+
+    def test_timestamps_iso8601(self):
+        """@timestamp is parseable with the transform's fixed format."""
+        df = generate_payload_frame(3, 10)
+
+        parsed = pd.to_datetime(df['@timestamp'], format='ISO8601')
+        assert parsed.notna().all()
+        assert parsed.is_monotonic_increasing
+
+    def test_nan_rate_and_factory_fraction(self):
+        """Sensor NaN rate and FACTORY share follow the parameters."""
+        df = generate_payload_frame(200, 50, nan_rate=0.2, factory_fraction=0.3)
+
+        nan_share = df[AWS_COLUMN_MAPPING['optical']].isna().mean()
+        factory_share = (df[MODE_COL] == 'FACTORY').mean()
+        assert nan_share == pytest.approx(0.2, abs=0.02)
+        assert factory_share == pytest.approx(0.3)
+
+    def test_deterministic(self):
+        """Same seed, same payload."""
+        pd.testing.assert_frame_equal(generate_payload_frame(10, 10, seed=1), generate_payload_frame(10, 10, seed=1))
+
+
+class TestWritePayload:
+    """Block-wise writing produces inputs for the transform."""
+
+    def test_csv_blocks_feed_transform(self, tmp_path):
+        """Blocks concatenate into one CSV with every device."""
+        path = tmp_path / 'synthetic.csv'
+        n_rows = write_synthetic_payload(path, 40, 25, fmt='csv', block_rows=300)
+
+        df = aggregate_by_device(load_aws_payload(str(path)))
+
+        assert n_rows == 1000
+        assert len(pd.read_csv(path)) == 1000
+        assert len(df) == 40
+        assert df['total_messages'].sum() == 40 * 25 - 40 * round(0.1 * 25)
+
+    def test_parquet_same_features_as_csv(self, tmp_path):
+        """Parquet dataset output aggregates to the CSV features."""
+        write_synthetic_payload(tmp_path / 'synthetic.csv', 20, 30, fmt='csv', block_rows=200)
+        write_synthetic_payload(tmp_path / 'synthetic_parquet', 20, 30, fmt='parquet', block_rows=200)
+
+        expected = aggregate_by_device(load_aws_payload(str(tmp_path / 'synthetic.csv')))
+        result = aggregate_by_device(load_aws_payload_parquet(tmp_path / 'synthetic_parquet'))
+
+        pd.testing.assert_frame_equal(
+            result, expected.assign(device_id=expected['device_id'].astype(str)),
+            check_exact=False, rtol=1e-6
+        )
+
+    def test_invalid_format(self, tmp_path):
+        """Unknown formats are rejected."""
+        with pytest.raises(ValueError, match='Formato'):
+            write_synthetic_payload(tmp_path / 'x.json', 1, 1, fmt='json')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -7,16 +7,49 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from unittest.mock import MagicMock
+import joblib
 import sys
 import os
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from models.inference import load_model, predict_device, predict_batch
+from models.inference import (
+    load_model, predict_device, predict_batch, compile_pipeline, FastInferenceModel,
+    derive_outcomes, score_devices, iter_feature_chunks, predict_batch_stream,
+    predict_batch_parallel, predict_batch_stream_parallel,
+    export_inference_artifact, load_inference_artifact, load_scorer
+)
 from utils.preprocessing import REQUIRED_FEATURES, TRAINING_FEATURE_ORDER, prepare_for_prediction
 
 
+def make_small_pipeline(n_devices=300, seed=0):
+    """Small fitted pipeline with the production structure (SimpleImputer → SMOTE → CatBoost)"""
+    from catboost import CatBoostClassifier
+    from imblearn.over_sampling import SMOTE
+    from imblearn.pipeline import Pipeline
+    from sklearn.impute import SimpleImputer
+    
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n_devices, len(TRAINING_FEATURE_ORDER))), columns=TRAINING_FEATURE_ORDER)
+    y = (X['optical_mean'] + 0.5 * X['temp_max'] + rng.normal(0, 0.5, n_devices) > 1.2).astype(int)
+    X = X.mask(rng.random(X.shape) < 0.2)
+    
+    pipeline = Pipeline([
+        ('imputer', SimpleImputer(strategy='median')),
+        ('smote', SMOTE(sampling_strategy=0.5, random_state=42)),
+        ('classifier', CatBoostClassifier(iterations=30, depth=4, random_state=42, verbose=0))
+    ])
+    pipeline.fit(X, y)
+    return pipeline, X
+
+
+@pytest.fixture(scope="module")
+def small_pipeline():
+    """Fitted small pipeline + its training features (shared by fast path/streaming tests)"""
+    return make_small_pipeline()
+
+
 class TestRealModelPipeline:
     """Integration tests using the actual production model"""
     
@@ -296,6 +329,309 @@ class TestProbabilityRanges:
         assert result.iloc[3]['risk_level'] == 'High'  # prob=0.95 >= 0.7
 
 
+class TestSharedScoring:
+    """Probabilities computed once; prediction/risk_level/verdict derived from them"""
+    
+    @pytest.fixture
+    def proba_only_pipeline(self):
+        """Mock pipeline whose predict() must never be called"""
+        pipeline = MagicMock()
+        probs = np.array([0.0, 0.29, 0.3, 0.5, 0.69, 0.7, 1.0])
+        pipeline.predict_proba = MagicMock(return_value=np.column_stack([1 - probs, probs]))
+        pipeline.predict = MagicMock(side_effect=AssertionError("predict() should not be called"))
+        return pipeline
+    
+    def test_single_model_pass(self, proba_only_pipeline):
+        """predict_batch runs predict_proba once and never predict"""
+        df = pd.DataFrame({feature: np.zeros(7) for feature in REQUIRED_FEATURES})
+        
+        result = predict_batch(df, proba_only_pipeline)
+        
+        assert proba_only_pipeline.predict_proba.call_count == 1
+        assert list(result['prediction']) == [0, 0, 0, 1, 1, 1, 1]
+        assert list(result['verdict']) == ['NORMAL'] * 3 + ['CRITICAL'] * 4
+    
+    def test_risk_level_boundaries(self):
+        """< 0.3 Low, < 0.7 Medium, >= 0.7 High (probability 0 included)"""
+        outcomes = derive_outcomes([0.0, 0.29, 0.3, 0.69, 0.7, 1.0])
+        
+        assert list(outcomes['risk_level']) == ['Low', 'Low', 'Medium', 'Medium', 'High', 'High']
+    
+    def test_configurable_threshold(self, proba_only_pipeline):
+        """Decision threshold changes prediction/verdict, not risk_level"""
+        df = pd.DataFrame({feature: np.zeros(7) for feature in REQUIRED_FEATURES}, index=range(10, 17))
+        
+        default = score_devices(df, proba_only_pipeline)
+        strict = score_devices(df, proba_only_pipeline, threshold=0.7)
+        
+        assert list(strict['prediction']) == [0, 0, 0, 0, 0, 1, 1]
+        assert list(strict.index) == list(df.index)
+        pd.testing.assert_series_equal(strict['risk_level'], default['risk_level'])
+    
+    def test_predict_device_threshold(self):
+        """predict_device applies the same threshold rule"""
+        pipeline = MagicMock()
+        pipeline.predict_proba = MagicMock(return_value=np.array([[0.4, 0.6]]))
+        
+        assert predict_device({}, pipeline)['verdict'] == 'CRITICAL'
+        assert predict_device({}, pipeline, threshold=0.65)['verdict'] == 'NORMAL'
+        assert predict_device({}, pipeline, threshold=0.65)['risk_level'] == 'Medium'
+
+
+class TestStreamingScoring:
+    """predict_batch_stream scores chunk by chunk with predict_batch results"""
+    
+    def test_same_results_as_predict_batch(self, small_pipeline):
+        """Concatenated stream output equals predict_batch on the whole frame"""
+        pipeline, X = small_pipeline
+        expected = predict_batch(X, pipeline)
+        
+        chunks = list(predict_batch_stream(iter_feature_chunks(X, chunksize=70), pipeline))
+        
+        assert [len(c) for c in chunks] == [70, 70, 70, 70, 20]
+        pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+    
+    def test_generator_source_and_feature_columns(self, small_pipeline):
+        """Generator chunks with extra columns/other order are scored on feature_columns"""
+        pipeline, X = small_pipeline
+        expected = predict_batch(X, pipeline)['probability'].to_numpy()
+        
+        def chunks():
+            for start in range(0, len(X), 100):
+                chunk = X.iloc[start:start + 100][list(reversed(TRAINING_FEATURE_ORDER))]
+                yield chunk.assign(device_id=np.arange(start, start + len(chunk)))
+        
+        scored = list(predict_batch_stream(chunks(), pipeline, feature_columns=TRAINING_FEATURE_ORDER))
+        result = pd.concat(scored)
+        
+        np.testing.assert_allclose(result['probability'].to_numpy(), expected)
+        assert list(result['device_id']) == list(range(len(X)))
+    
+    def test_input_chunks_not_modified(self, small_pipeline):
+        """Score columns are added to a shallow copy, not to the caller's chunk"""
+        pipeline, X = small_pipeline
+        chunk = X.head(10)
+        
+        next(predict_batch_stream([chunk], pipeline))
+        
+        assert list(chunk.columns) == TRAINING_FEATURE_ORDER
+    
+    @pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+    def test_file_sources(self, small_pipeline, tmp_path, suffix):
+        """CSV and Parquet files are read in chunks of at most chunksize devices"""
+        pipeline, X = small_pipeline
+        path = tmp_path / f"features{suffix}"
+        X.to_csv(path, index=False) if suffix == ".csv" else X.to_parquet(path, index=False)
+        
+        chunks = list(iter_feature_chunks(path, chunksize=64))
+        
+        assert max(len(c) for c in chunks) <= 64
+        assert sum(len(c) for c in chunks) == len(X)
+        np.testing.assert_allclose(
+            pd.concat(predict_batch_stream(chunks, pipeline))['probability'].to_numpy(),
+            predict_batch(X, pipeline)['probability'].to_numpy(), rtol=1e-9
+        )
+
+
+class TestParallelScoring:
+    """Multi-process scoring reassembles results in input order"""
+    
+    @pytest.fixture(scope="class")
+    def model_file(self, small_pipeline, tmp_path_factory):
+        """Small pipeline saved as .pkl (each worker loads it once)"""
+        pipeline, _ = small_pipeline
+        path = tmp_path_factory.mktemp("models") / "pipeline.pkl"
+        joblib.dump(pipeline, path)
+        return path
+    
+    @pytest.mark.parametrize("fast", [True, False])
+    def test_same_results_in_input_order(self, small_pipeline, model_file, fast):
+        """Shards scored by 2 workers match predict_batch row by row (non-default index)"""
+        pipeline, X = small_pipeline
+        X = X.sample(frac=1.0, random_state=1)
+        expected = predict_batch(X, pipeline)
+        
+        result = predict_batch_parallel(X, model_file, workers=2, shard_size=37, fast=fast)
+        
+        assert list(result.index) == list(X.index)
+        np.testing.assert_allclose(result['probability'], expected['probability'], rtol=1e-6)
+        assert list(result['verdict']) == list(expected['verdict'])
+        assert result['risk_level'].dtype == expected['risk_level'].dtype
+    
+    def test_bounded_in_flight(self, small_pipeline, model_file):
+        """The input iterator is only read max_in_flight chunks ahead"""
+        _, X = small_pipeline
+        consumed = []
+        
+        def chunks():
+            for start in range(0, len(X), 10):
+                consumed.append(start)
+                yield X.iloc[start:start + 10]
+        
+        stream = predict_batch_stream_parallel(chunks(), model_file, workers=2, max_in_flight=3)
+        first = next(stream)
+        
+        assert len(first) == 10
+        assert len(consumed) <= 4
+        assert sum(len(c) for c in stream) == len(X) - 10
+    
+    def test_extra_columns_kept(self, small_pipeline, model_file):
+        """Non-feature columns pass through; workers align chunks to the model features"""
+        pipeline, X = small_pipeline
+        devices = X[list(reversed(TRAINING_FEATURE_ORDER))].assign(device_id=np.arange(len(X)))
+        
+        result = pd.concat(predict_batch_stream_parallel(
+            iter_feature_chunks(devices, chunksize=100), model_file, workers=2
+        ))
+        
+        assert list(result['device_id']) == list(range(len(X)))
+        np.testing.assert_allclose(result['probability'], predict_batch(X, pipeline)['probability'], rtol=1e-6)
+    
+    def test_empty_input_from_artifact(self, small_pipeline, tmp_path):
+        """An empty batch scored from an inference artifact returns empty score columns"""
+        pipeline, X = small_pipeline
+        export_inference_artifact(pipeline, tmp_path / 'artifact')
+        
+        result = predict_batch_parallel(X.head(0), tmp_path / 'artifact', workers=2)
+        
+        assert len(result) == 0
+        assert {'prediction', 'probability', 'risk_level', 'verdict'} <= set(result.columns)
+
+
+class TestFastInference:
+    """Compiled fast path must reproduce the pipeline"""
+    
+    def test_probabilities_match_pipeline(self, small_pipeline):
+        """Same probabilities and labels as pipeline.predict_proba / predict"""
+        pipeline, X = small_pipeline
+        fast_model = compile_pipeline(pipeline)
+        
+        np.testing.assert_allclose(fast_model.predict_proba(X), pipeline.predict_proba(X), rtol=1e-6, atol=1e-9)
+        np.testing.assert_array_equal(fast_model.predict(X), pipeline.predict(X).astype(int))
+    
+    def test_column_order_and_inputs(self, small_pipeline):
+        """DataFrame (any column order), dict and float32 array give the same scores"""
+        pipeline, X = small_pipeline
+        fast_model = compile_pipeline(pipeline)
+        
+        expected = fast_model.predict_proba_critical(X.head(5))
+        shuffled = X.head(5)[list(reversed(TRAINING_FEATURE_ORDER))]
+        
+        np.testing.assert_array_equal(fast_model.predict_proba_critical(shuffled), expected)
+        np.testing.assert_array_equal(fast_model.predict_proba_critical(X.head(5).to_numpy(np.float32)), expected)
+        assert fast_model.predict_proba_critical(X.iloc[0].to_dict())[0] == expected[0]
+    
+    def test_predict_device_fast_path(self, small_pipeline):
+        """predict_device accepts the compiled model and returns the same result"""
+        pipeline, X = small_pipeline
+        features = X.iloc[3].to_dict()
+        
+        expected = predict_device(features, pipeline)
+        result = predict_device(features, compile_pipeline(pipeline))
+        
+        assert result['prediction'] == expected['prediction']
+        assert result['probability'] == pytest.approx(expected['probability'], rel=1e-6)
+        assert result['verdict'] == expected['verdict']
+    
+    def test_missing_feature_raises(self, small_pipeline):
+        """Missing features are an error, not silently imputed"""
+        pipeline, X = small_pipeline
+        fast_model = compile_pipeline(pipeline)
+        
+        with pytest.raises(ValueError, match='optical_mean'):
+            fast_model.predict_proba_critical(X.drop(columns=['optical_mean']))
+    
+    def test_production_model_compiles(self):
+        """Production pipeline compiles with TRAINING_FEATURE_ORDER"""
+        model_path = Path(__file__).parent.parent / "models" / "catboost_pipeline_v2_field_only.pkl"
+        if not model_path.exists():
+            pytest.skip(f"Model file not found: {model_path}")
+        
+        fast_model = compile_pipeline(load_model(str(model_path)))
+        
+        assert isinstance(fast_model, FastInferenceModel)
+        assert fast_model.feature_order == TRAINING_FEATURE_ORDER
+        assert fast_model.medians.dtype == np.float32
+
+
+class TestInferenceArtifact:
+    """.cbm + JSON artifact must reproduce the pipeline without imblearn/sklearn"""
+    
+    def test_export_load_parity(self, small_pipeline, tmp_path):
+        """Artifact gives the same probabilities as the pipeline and keeps the threshold"""
+        pipeline, X = small_pipeline
+        export_inference_artifact(pipeline, tmp_path / 'artifact', decision_threshold=0.3, source_model='x.pkl')
+        model = load_inference_artifact(tmp_path / 'artifact')
+        
+        assert model.feature_order == TRAINING_FEATURE_ORDER
+        assert model.decision_threshold == 0.3
+        np.testing.assert_allclose(model.predict_proba(X), pipeline.predict_proba(X), rtol=1e-6, atol=1e-9)
+    
+    def test_load_does_not_import_imblearn(self, small_pipeline, tmp_path):
+        """A fresh process scores from the artifact without importing imblearn or sklearn"""
+        import json
+        import subprocess
+        
+        pipeline, X = small_pipeline
+        export_inference_artifact(pipeline, tmp_path / 'artifact')
+        root = str(Path(__file__).parent.parent)
+        code = (
+            f"import sys, json; sys.path.insert(0, {root!r}); import numpy as np\n"
+            f"from models.inference import load_inference_artifact\n"
+            f"m = load_inference_artifact({str(tmp_path / 'artifact')!r})\n"
+            f"p = m.predict_proba_critical(np.zeros((1, len(m.feature_order))))\n"
+            f"print(json.dumps([float(p[0]), 'imblearn' in sys.modules, 'sklearn' in sys.modules]))"
+        )
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        probability, imblearn_loaded, sklearn_loaded = json.loads(output.stdout.strip().splitlines()[-1])
+        
+        assert 0 <= probability <= 1
+        assert not imblearn_loaded
+        assert not sklearn_loaded
+    
+    def test_unknown_format_version_raises(self, small_pipeline, tmp_path):
+        """Artifacts from another format version are rejected"""
+        import json
+        
+        pipeline, _ = small_pipeline
+        artifact = export_inference_artifact(pipeline, tmp_path / 'artifact')
+        preprocessing_path = artifact / 'preprocessing.json'
+        preprocessing = json.loads(preprocessing_path.read_text())
+        preprocessing['format_version'] = 99
+        preprocessing_path.write_text(json.dumps(preprocessing))
+        
+        with pytest.raises(ValueError, match='format_version'):
+            load_inference_artifact(artifact)
+    
+    def test_load_scorer_dir_and_pkl(self, small_pipeline, tmp_path):
+        """load_scorer: directory → artifact, .pkl → pipeline (compiled when fast=True)"""
+        pipeline, X = small_pipeline
+        joblib.dump(pipeline, tmp_path / 'pipeline.pkl')
+        export_inference_artifact(pipeline, tmp_path / 'artifact')
+        
+        from_dir = load_scorer(tmp_path / 'artifact')
+        from_pkl = load_scorer(tmp_path / 'pipeline.pkl')
+        from_pkl_fast = load_scorer(tmp_path / 'pipeline.pkl', fast=True)
+        
+        assert isinstance(from_dir, FastInferenceModel)
+        assert isinstance(from_pkl_fast, FastInferenceModel)
+        assert not isinstance(from_pkl, FastInferenceModel)
+        np.testing.assert_allclose(from_dir.predict_proba_critical(X), from_pkl_fast.predict_proba_critical(X), rtol=1e-6)
+    
+    def test_production_artifact_matches_registry(self):
+        """Registry points to a committed artifact with TRAINING_FEATURE_ORDER"""
+        import json
+        
+        root = Path(__file__).parent.parent
+        registry = json.loads((root / 'models' / 'registry.json').read_text())
+        active = next(m for m in registry['models'] if m['status'] == 'active')
+        artifact = root / active['inference_artifact_path']
+        if not artifact.exists():
+            pytest.skip(f"Artifact not found: {artifact}")
+        
+        assert load_inference_artifact(artifact).feature_order == TRAINING_FEATURE_ORDER
+
+
 @pytest.mark.slow
 class TestPerformance:
     """Performance tests for batch prediction"""
@@ -0,0 +1,313 @@
+"""
+Unit tests for models/model_manager.py - Registry-driven hot reload
+
+Tests cover:
+1. Active entry resolution (inference artifact preferred over .pkl)
+2. Reload only when the active model changes; atomic handle swap
+3. In-flight handles keep working after a swap
+4. Failed loads keep the current model
+5. Background watcher picks up registry edits
+6. Warm-up pre-fills the prediction cache for the new version
+7. Scoring service in registry mode (model decision_threshold unless --threshold)
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import joblib
+import numpy as np
+import pytest
+from pathlib import Path
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from models.inference import FastInferenceModel, export_inference_artifact
+from models.model_manager import ModelManager, active_registry_entry, resolve_model_path
+from models.prediction_cache import CachedModel, PredictionCache
+from tests.test_inference_pipeline import make_small_pipeline
+
+
+@pytest.fixture(scope="module")
+def models_dir(tmp_path_factory):
+    """Two small pipelines (v1 as .pkl, v2 as .pkl + inference artifact) and their features."""
+    directory = tmp_path_factory.mktemp("models")
+    pipeline_a, X = make_small_pipeline(seed=0)
+    pipeline_b, _ = make_small_pipeline(seed=1)
+    joblib.dump(pipeline_a, directory / "a.pkl")
+    joblib.dump(pipeline_b, directory / "b.pkl")
+    export_inference_artifact(pipeline_b, directory / "b_inference")
+    return directory, pipeline_a, pipeline_b, X
+
+
+def write_registry(path, model_path, version, artifact=None, metadata_path=None):
+    """Registry with a single active entry."""
+    entry = {'model_id': f"model_{version}", 'version': version, 'status': 'active', 'model_path': str(model_path)}
+    if artifact is not None:
+        entry['inference_artifact_path'] = str(artifact)
+    if metadata_path is not None:
+        entry['metadata_path'] = str(metadata_path)
+    path.write_text(json.dumps({'models': [{'model_id': 'old', 'status': 'deprecated', 'model_path': 'x.pkl'}, entry]}))
+    return path
+
+
+class TestRegistryResolution:
+    """Which entry and which file the manager loads."""
+
+    def test_active_entry(self):
+        registry = {'models': [{'model_id': 'a', 'status': 'deprecated'}, {'model_id': 'b', 'status': 'active'}]}
+        assert active_registry_entry(registry)['model_id'] == 'b'
+
+    def test_no_active_entry_raises(self):
+        with pytest.raises(ValueError, match='active'):
+            active_registry_entry({'models': [{'model_id': 'a', 'status': 'deprecated'}]})
+
+    def test_artifact_preferred_when_present(self, tmp_path):
+        (tmp_path / 'artifact').mkdir()
+        entry = {'model_path': 'model.pkl', 'inference_artifact_path': 'artifact'}
+
+        assert resolve_model_path(entry, tmp_path) == tmp_path / 'artifact'
+        assert resolve_model_path(entry, tmp_path, prefer_artifact=False) == tmp_path / 'model.pkl'
+        assert resolve_model_path({'model_path': 'model.pkl', 'inference_artifact_path': 'missing'},
+                                  tmp_path) == tmp_path / 'model.pkl'
+
+    def test_production_registry_loads(self):
+        """The repo's registry resolves to a loadable model with the training features."""
+        manager = ModelManager()
+        try:
+            handle = manager.start(watch=False).current()
+        except Exception as e:
+            pytest.skip(f"Production model not loadable here: {e}")
+
+        assert handle.model_id == 'catboost_v2_field_only'
+        assert len(handle.feature_order) == 30
+
+
+class TestReload:
+    """Synchronous reload and atomic swap."""
+
+    def test_start_loads_active_model(self, models_dir, tmp_path):
+        directory, pipeline_a, _, X = models_dir
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', '1.0.0')
+
+        manager = ModelManager(registry).start(watch=False)
+        handle = manager.current()
+
+        assert manager.ready
+        assert (handle.model_id, handle.version) == ('model_1.0.0', '1.0.0')
+        assert isinstance(handle.model, FastInferenceModel)
+        np.testing.assert_allclose(handle.model.predict_proba_critical(X), pipeline_a.predict_proba(X)[:, 1],
+                                   rtol=1e-6)
+
+    def test_current_before_start_raises(self, models_dir, tmp_path):
+        directory = models_dir[0]
+        manager = ModelManager(write_registry(tmp_path / 'registry.json', directory / 'a.pkl', '1.0.0'))
+
+        assert not manager.ready
+        with pytest.raises(RuntimeError):
+            manager.current()
+
+    def test_swap_on_registry_change(self, models_dir, tmp_path):
+        """New active version → new handle; the old handle still scores (in-flight requests)."""
+        directory, pipeline_a, pipeline_b, X = models_dir
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', '1.0.0')
+        manager = ModelManager(registry).start(watch=False)
+        old = manager.current()
+
+        assert manager.reload() is False   # nada mudou
+
+        write_registry(registry, directory / 'b.pkl', '2.0.0', artifact=directory / 'b_inference')
+        assert manager.reload() is True
+        new = manager.current()
+
+        assert new.version == '2.0.0'
+        assert new.model_path == directory / 'b_inference'
+        assert manager.swaps == 1
+        np.testing.assert_allclose(new.model.predict_proba_critical(X), pipeline_b.predict_proba(X)[:, 1], rtol=1e-6)
+        np.testing.assert_allclose(old.model.predict_proba_critical(X), pipeline_a.predict_proba(X)[:, 1], rtol=1e-6)
+
+    def test_failed_load_keeps_current_model(self, models_dir, tmp_path):
+        directory = models_dir[0]
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', '1.0.0')
+        manager = ModelManager(registry).start(watch=False)
+        handle = manager.current()
+
+        write_registry(registry, directory / 'missing.pkl', '2.0.0')
+        assert manager.reload() is False
+
+        assert manager.current() is handle
+        assert manager.failed_loads == 1
+        assert 'missing.pkl' in manager.last_error
+
+    def test_failed_initial_load_raises(self, tmp_path):
+        registry = write_registry(tmp_path / 'registry.json', tmp_path / 'missing.pkl', '1.0.0')
+        with pytest.raises(FileNotFoundError):
+            ModelManager(registry).start(watch=False)
+
+    def test_threshold_from_metadata(self, models_dir, tmp_path):
+        directory = models_dir[0]
+        metadata_path = tmp_path / 'metadata.json'
+        metadata_path.write_text(json.dumps({'decision_threshold': 0.3, 'feature_importance': {'a': 1}}))
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', '1.0.0',
+                                  metadata_path=metadata_path)
+
+        handle = ModelManager(registry).start(watch=False).current()
+
+        assert handle.decision_threshold == 0.3
+        assert handle.metadata['feature_importance'] == {'a': 1}
+
+    def test_threshold_from_inference_artifact(self, models_dir, tmp_path):
+        """Without a threshold in the registry metadata, the artifact's decision_threshold is used."""
+        directory, _, pipeline_b, _ = models_dir
+        export_inference_artifact(pipeline_b, tmp_path / 'artifact', decision_threshold=0.8)
+        registry = write_registry(tmp_path / 'registry.json', directory / 'b.pkl', '2.0.0',
+                                  artifact=tmp_path / 'artifact')
+
+        assert ModelManager(registry).start(watch=False).current().decision_threshold == 0.8
+
+    def test_fixed_model_path(self, models_dir):
+        """registry_path=None serves a fixed model without a watcher."""
+        directory, pipeline_a, _, X = models_dir
+        manager = ModelManager(None, model_path=directory / 'a.pkl', fast=False).start()
+
+        assert manager.stats()['watching'] is False
+        np.testing.assert_allclose(manager.current().model.predict_proba(X), pipeline_a.predict_proba(X), rtol=1e-6)
+
+
+class TestWatcher:
+    """Background polling of registry.json."""
+
+    def test_watcher_swaps_while_scoring(self, models_dir, tmp_path):
+        """Concurrent scorers never fail during a background swap; each batch is from one model."""
+        directory, pipeline_a, pipeline_b, X = models_dir
+        expected = {
+            'a': pipeline_a.predict_proba(X.head(20))[:, 1],
+            'b': pipeline_b.predict_proba(X.head(20))[:, 1],
+        }
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', '1.0.0')
+        manager = ModelManager(registry, poll_interval=0.02).start()
+
+        errors, seen = [], set()
+        stop = threading.Event()
+
+        def scorer():
+            while not stop.is_set():
+                try:
+                    probabilities = manager.current().model.predict_proba_critical(X.head(20))
+                    matches = [k for k, v in expected.items() if np.allclose(probabilities, v, rtol=1e-6)]
+                    assert len(matches) == 1
+                    seen.add(matches[0])
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=scorer) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        try:
+            time.sleep(0.05)
+            write_registry(registry, directory / 'b.pkl', '2.0.0', artifact=directory / 'b_inference')
+            deadline = time.monotonic() + 10
+            while manager.current().version != '2.0.0' and time.monotonic() < deadline:
+                time.sleep(0.02)
+            time.sleep(0.05)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            manager.stop()
+
+        assert manager.current().version == '2.0.0'
+        assert errors == []
+        assert seen == {'a', 'b'}
+
+
+class TestWarmup:
+    """Warm-up runs before the swap and fills the cache of the new version."""
+
+    def test_warmup_data_prefills_cache(self, models_dir, tmp_path):
+        directory, _, _, X = models_dir
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', '1.0.0')
+        cache = PredictionCache()
+
+        handle = ModelManager(registry, cache=cache, warmup_data=X.head(50)).start(watch=False).current()
+        handle.model.predict_proba_critical(X.head(50))
+
+        assert isinstance(handle.model, CachedModel)
+        assert handle.warmup_seconds > 0
+        assert cache.stats()['hits'] == 50
+        assert cache.stats()['misses'] == 50   # só o warm-up foi ao modelo
+
+    def test_synthetic_warmup_skips_cache(self, models_dir, tmp_path):
+        directory = models_dir[0]
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', '1.0.0')
+        cache = PredictionCache()
+
+        ModelManager(registry, cache=cache).start(watch=False)
+
+        assert cache.stats()['memory_entries'] == 0
+
+
+class TestScoringServiceRegistry:
+    """scoring_service.py with --registry follows deploys without restarting."""
+
+    def test_service_follows_registry(self, models_dir, tmp_path):
+        from load_test_scoring_service import ScoringClient
+        from scoring_service import ScoringService
+
+        directory, _, pipeline_b, X = models_dir
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', '1.0.0')
+        features = {k: (None if np.isnan(v) else float(v)) for k, v in X.iloc[0].items()}
+
+        async def runner():
+            service = ScoringService(registry=registry, poll_interval=0.02)
+            host, port = await service.start('127.0.0.1', 0)
+            client = ScoringClient(host, port)
+            try:
+                before = await client.request('GET', '/ready')
+                write_registry(registry, directory / 'b.pkl', '2.0.0', artifact=directory / 'b_inference')
+                deadline = time.monotonic() + 10
+                while service.manager.current().version != '2.0.0' and time.monotonic() < deadline:
+                    await asyncio.sleep(0.02)
+                after = await client.request('GET', '/ready')
+                prediction = await client.request('POST', '/predict', {'features': features})
+                _, stats = await client.request('GET', '/stats')
+                return before, after, prediction, stats
+            finally:
+                await client.close()
+                await service.stop()
+
+        before, after, prediction, stats = asyncio.run(runner())
+
+        assert before[1]['version'] == '1.0.0'
+        assert after[1]['version'] == '2.0.0'
+        assert prediction[1]['probability'] == pytest.approx(pipeline_b.predict_proba(X.head(1))[0, 1])
+        assert stats['model']['swaps'] == 1
+
+    def test_service_uses_registry_threshold(self, models_dir, tmp_path):
+        """Without --threshold the service decides with the model's decision_threshold."""
+        from scoring_service import ScoringService
+
+        directory, pipeline_a, _, X = models_dir
+        metadata_path = tmp_path / 'metadata.json'
+        metadata_path.write_text(json.dumps({'decision_threshold': 0.01}))
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', '1.0.0',
+                                  metadata_path=metadata_path)
+        devices = [{'device_id': i, 'features': X.iloc[i].to_dict()} for i in range(len(X))]
+        probabilities = pipeline_a.predict_proba(X)[:, 1]
+
+        default = ScoringService(registry=registry, cache_size=0)
+        default.manager.start(watch=False)
+        explicit = ScoringService(registry=registry, threshold=0.99, cache_size=0)
+        explicit.manager.start(watch=False)
+
+        assert default.decision_threshold(default.manager.current()) == 0.01
+        assert [r['prediction'] for r in default.score_records(devices)] == list((probabilities >= 0.01).astype(int))
+        assert [r['prediction'] for r in explicit.score_records(devices)] == list((probabilities >= 0.99).astype(int))
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
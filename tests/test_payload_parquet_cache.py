@@ -0,0 +1,133 @@
+"""
+Unit tests for payload_parquet_cache.py - Columnar Parquet cache of raw AWS payloads
+
+Tests cover:
+1. CSV → partitioned Parquet conversion (date/mode layout)
+2. Column pruning and MODE='FIELD' pushdown in the reader
+3. Same device features as the CSV path (batch and streaming)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from payload_parquet_cache import (
+    convert_csv_to_parquet,
+    iter_aws_payload_parquet_batches,
+    load_aws_payload_parquet,
+)
+from transform_aws_payload import (
+    AWS_COLUMN_MAPPING,
+    aggregate_by_device,
+    aggregate_partials_streaming,
+    load_aws_payload,
+    transform_aws_to_model_format,
+)
+from tests.test_transform_aws_payload import TYPED_READ_RTOL, make_raw_payload
+
+
+@pytest.fixture
+def payload_csv(tmp_path):
+    """Wide raw payload CSV with FIELD/FACTORY messages and unused nested columns."""
+    df = make_raw_payload(n_devices=25, n_messages=2500)
+    rng = np.random.default_rng(3)
+    df['eyon_metadata.decoded_payload.mode'] = np.where(rng.random(len(df)) < 0.25, 'FACTORY', 'FIELD')
+    df['eyon_metadata.gateway.name'] = rng.choice(['gw-a', 'gw-b', None], len(df))
+    df['eyon_metadata.decoded_payload.firmware'] = rng.choice(['1.0.3', '1.1.0'], len(df))
+    path = tmp_path / 'payload_aws_wide.csv'
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def dataset_dir(tmp_path, payload_csv):
+    """Parquet dataset converted from payload_csv in small chunks."""
+    dataset = tmp_path / 'payloads_parquet'
+    convert_csv_to_parquet(payload_csv, dataset, chunksize=700)
+    return dataset
+
+
+def _with_str_device_id(df: pd.DataFrame) -> pd.DataFrame:
+    """The Parquet dataset stores device IDs as strings."""
+    return df.assign(device_id=df['device_id'].astype(str)).reset_index(drop=True)
+
+
+class TestConversion:
+    """CSV → partitioned Parquet dataset."""
+
+    def test_partition_layout(self, payload_csv, dataset_dir):
+        """Dataset is partitioned by date and mode."""
+        raw = pd.read_csv(payload_csv)
+        dates = set(pd.to_datetime(raw['@timestamp']).dt.strftime('%Y-%m-%d'))
+
+        partitions = {p.name for p in dataset_dir.iterdir()}
+        assert partitions == {f'date={d}' for d in dates}
+
+        modes = {p.name for p in dataset_dir.glob('date=*/mode=*')}
+        assert modes == {'mode=FIELD', 'mode=FACTORY'}
+
+    def test_all_rows_converted(self, payload_csv, tmp_path):
+        """Every CSV row lands in the dataset."""
+        n_rows = convert_csv_to_parquet(payload_csv, tmp_path / 'ds', chunksize=1000)
+
+        assert n_rows == len(pd.read_csv(payload_csv))
+
+
+class TestPushdownReader:
+    """Reader only returns mapped columns and FIELD messages."""
+
+    def test_column_pruning(self, dataset_dir):
+        """Unused nested columns are not read."""
+        df = load_aws_payload_parquet(dataset_dir)
+
+        assert 'eyon_metadata.gateway.name' not in df.columns
+        assert 'eyon_metadata.decoded_payload.firmware' not in df.columns
+        assert AWS_COLUMN_MAPPING['optical'] in df.columns
+        assert 'device_id' in df.columns
+
+    def test_field_filter_pushed_down(self, payload_csv, dataset_dir):
+        """Only FIELD messages are returned (same count as the CSV path)."""
+        df_parquet = load_aws_payload_parquet(dataset_dir)
+        df_csv = load_aws_payload(str(payload_csv))
+
+        assert len(df_parquet) == len(df_csv)
+
+    def test_same_features_as_csv(self, payload_csv, dataset_dir):
+        """Aggregating from Parquet gives the CSV features."""
+        expected = _with_str_device_id(aggregate_by_device(load_aws_payload(str(payload_csv))))
+        result = aggregate_by_device(load_aws_payload_parquet(dataset_dir))
+
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=TYPED_READ_RTOL)
+
+    def test_streaming_batches_same_features(self, payload_csv, dataset_dir):
+        """Batch-wise Parquet scan folds to the same features."""
+        expected = _with_str_device_id(aggregate_by_device(load_aws_payload(str(payload_csv))))
+        result, n_messages = aggregate_partials_streaming(
+            iter_aws_payload_parquet_batches(dataset_dir, batch_size=300)
+        )
+
+        assert n_messages == expected['total_messages'].sum()
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=TYPED_READ_RTOL)
+
+
+class TestTransformIntegration:
+    """transform_aws_to_model_format accepts a dataset directory."""
+
+    def test_transform_from_dataset(self, dataset_dir, tmp_path):
+        """Output CSV is produced from the Parquet dataset."""
+        output_file, validation = transform_aws_to_model_format(
+            str(dataset_dir), output_dir=str(tmp_path / 'out')
+        )
+
+        assert output_file.exists()
+        assert validation['valid']
+        assert validation['num_devices'] == 25
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,222 @@
+"""
+Unit tests for models/prediction_cache.py - Prediction cache keyed by model version + features
+
+Tests cover:
+1. Cache keys (model version, feature values, canonical NaN/-0.0)
+2. LRU and TTL eviction, hit/miss counters
+3. SQLite disk tier across instances
+4. CachedModel: same scores as the model, only misses reach the model
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.inference import compile_pipeline, predict_batch, predict_device, score_devices
+from models.prediction_cache import CachedModel, PredictionCache, feature_keys, model_file_version
+from tests.test_inference_pipeline import make_small_pipeline
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CountingModel:
+    """Pipeline proxy counting how many devices reach predict_proba."""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.feature_names_in_ = pipeline.feature_names_in_
+        self.devices_scored = 0
+
+    def predict_proba(self, X):
+        self.devices_scored += len(X)
+        return self.pipeline.predict_proba(X)
+
+
+@pytest.fixture(scope="module")
+def small_pipeline():
+    return make_small_pipeline()
+
+
+class TestFeatureKeys:
+    """Key = model version + ordered feature vector."""
+
+    def test_same_vector_same_key(self):
+        X = np.array([[1.0, 2.0, np.nan], [1.0, 2.0, np.nan]])
+        keys = feature_keys(X, 'v1')
+        assert keys[0] == keys[1]
+        assert len(keys[0]) == 16
+
+    def test_version_and_values_change_key(self):
+        X = np.array([[1.0, 2.0, 3.0]])
+        assert feature_keys(X, 'v1') != feature_keys(X, 'v2')
+        assert feature_keys(X, 'v1') != feature_keys(X + 1e-9, 'v1')
+
+    def test_canonical_nan_and_zero(self):
+        """-0.0 equals 0.0 and any NaN payload equals np.nan."""
+        weird_nan = np.frombuffer(np.uint64(0x7ff8000000000001).tobytes(), dtype=np.float64)[0]
+        assert feature_keys([[0.0, np.nan]], 'v') == feature_keys([[-0.0, weird_nan]], 'v')
+
+    def test_model_file_version(self, tmp_path):
+        path = tmp_path / 'm.pkl'
+        path.write_bytes(b'model-a')
+        version_a = model_file_version(path)
+        path.write_bytes(b'model-b')
+        assert model_file_version(path) != version_a
+
+
+class TestEviction:
+    """LRU capacity and TTL expiry."""
+
+    def test_lru(self):
+        """The least recently used entry is evicted first."""
+        cache = PredictionCache(max_entries=2)
+        cache.put_many([b'a', b'b'], [0.1, 0.2])
+        cache.get_many([b'a'])                      # 'a' becomes most recent
+        cache.put_many([b'c'], [0.3])
+
+        probabilities, found = cache.get_many([b'a', b'b', b'c'])
+        assert list(found) == [True, False, True]
+        assert probabilities[[0, 2]].tolist() == [0.1, 0.3]
+        assert cache.stats()['evictions'] == 1
+
+    def test_ttl(self):
+        """Entries older than ttl_seconds are misses and removed."""
+        clock = FakeClock()
+        cache = PredictionCache(ttl_seconds=60, clock=clock)
+        cache.put_many([b'a'], [0.5])
+
+        clock.now += 59
+        assert cache.get_many([b'a'])[1].all()
+        clock.now += 2
+        assert not cache.get_many([b'a'])[1].any()
+
+        stats = cache.stats()
+        assert stats['expirations'] == 1
+        assert stats['memory_entries'] == 0
+        assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+class TestDiskTier:
+    """SQLite tier survives a new cache instance."""
+
+    def test_persists_and_promotes(self, tmp_path):
+        db = tmp_path / 'cache' / 'predictions.sqlite'
+        first = PredictionCache(disk_path=db)
+        first.put_many([b'a', b'b'], [0.1, 0.2])
+        first.close()
+
+        second = PredictionCache(disk_path=db)
+        probabilities, found = second.get_many([b'a', b'b', b'z'])
+
+        assert list(found) == [True, True, False]
+        assert probabilities[:2].tolist() == [0.1, 0.2]
+        assert second.stats()['disk_hits'] == 2
+        assert second.stats()['memory_entries'] == 2
+        second.close()
+
+    def test_expired_rows_purged(self, tmp_path):
+        """Rows older than the TTL are not returned and are deleted on open."""
+        clock = FakeClock()
+        db = tmp_path / 'predictions.sqlite'
+        cache = PredictionCache(ttl_seconds=100, disk_path=db, clock=clock)
+        cache.put_many([b'old'], [0.9])
+        cache.close()
+
+        clock.now += 500
+        reopened = PredictionCache(ttl_seconds=100, disk_path=db, clock=clock)
+        assert not reopened.get_many([b'old'])[1].any()
+        assert reopened._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] == 0
+        reopened.close()
+
+    def test_large_lookup(self, tmp_path):
+        """Lookups above the SQLite parameter limit are split."""
+        cache = PredictionCache(max_entries=10, disk_path=tmp_path / 'p.sqlite')
+        keys = [i.to_bytes(4, 'little') for i in range(2500)]
+        cache.put_many(keys, np.linspace(0, 1, 2500))
+
+        probabilities, found = cache.get_many(keys)
+        assert found.all()
+        np.testing.assert_allclose(probabilities, np.linspace(0, 1, 2500))
+        cache.close()
+
+
+class TestCachedModel:
+    """Drop-in model wrapper."""
+
+    def test_same_scores_and_cached_repeat(self, small_pipeline):
+        """Repeat scoring returns identical results without calling the model."""
+        pipeline, X = small_pipeline
+        counting = CountingModel(pipeline)
+        model = CachedModel(counting, PredictionCache(), 'v-test')
+
+        first = score_devices(X, model)
+        second = score_devices(X, model)
+
+        pd.testing.assert_frame_equal(first, second)
+        np.testing.assert_allclose(first['probability'], pipeline.predict_proba(X)[:, 1], rtol=1e-9)
+        assert counting.devices_scored == len(X)
+        assert model.cache.stats()['hits'] == len(X)
+
+    def test_only_misses_scored(self, small_pipeline):
+        """Changed devices are scored in one call; unchanged come from the cache."""
+        pipeline, X = small_pipeline
+        counting = CountingModel(pipeline)
+        model = CachedModel(counting, PredictionCache(), 'v-test')
+        score_devices(X, model)
+
+        changed = X.copy()
+        changed.iloc[:10, 0] = 1000.0 + np.arange(10)
+        result = predict_batch(changed, model)
+
+        assert counting.devices_scored == len(X) + 10
+        np.testing.assert_allclose(result['probability'], pipeline.predict_proba(changed)[:, 1], rtol=1e-9)
+
+    def test_column_order_and_dict(self, small_pipeline):
+        """Shuffled columns and the Single Predict dict hit the same entry."""
+        pipeline, X = small_pipeline
+        model = CachedModel(compile_pipeline(pipeline), PredictionCache(), 'v-test')
+        row = X.iloc[[0]]
+
+        score_devices(row[list(reversed(row.columns))], model)
+        result = predict_device(row.to_dict(orient='records')[0], model)
+
+        assert model.cache.stats()['hits'] == 1
+        assert result['probability'] == pytest.approx(pipeline.predict_proba(row)[0, 1])
+
+    def test_new_model_version_misses(self, small_pipeline):
+        """Another model version on the same cache never reuses entries."""
+        pipeline, X = small_pipeline
+        cache = PredictionCache()
+        score_devices(X.head(5), CachedModel(pipeline, cache, 'v1'))
+        score_devices(X.head(5), CachedModel(pipeline, cache, 'v2'))
+
+        assert cache.stats()['hits'] == 0
+        assert cache.stats()['misses'] == 10
+
+    def test_concurrent_scoring(self, small_pipeline):
+        """Threads sharing one cache get correct results."""
+        pipeline, X = small_pipeline
+        model = CachedModel(pipeline, PredictionCache(max_entries=50), 'v-test')
+        expected = pipeline.predict_proba(X)[:, 1]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda i: model.predict_proba_critical(X.iloc[i:i + 40]), range(0, 300, 20)))
+
+        for start, probabilities in zip(range(0, 300, 20), results):
+            np.testing.assert_allclose(probabilities, expected[start:start + 40], rtol=1e-9)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
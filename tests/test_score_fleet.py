@@ -0,0 +1,140 @@
+"""
+Unit tests for score_fleet.py - Streaming fleet scoring CLI
+
+Tests cover:
+1. CSV and Parquet output with the same scores as predict_batch
+2. Row order and extra columns (device_id) preserved (also with --workers)
+3. Throughput stats and CLI entry point
+"""
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from score_fleet import main, score_file
+from models.inference import compile_pipeline, predict_batch
+from tests.test_inference_pipeline import make_small_pipeline
+
+
+@pytest.fixture(scope="module")
+def pipeline_and_features():
+    """Small fitted pipeline + a device feature frame with a device_id column."""
+    pipeline, X = make_small_pipeline()
+    features = X.assign(device_id=np.arange(861275072000000, 861275072000000 + len(X)))
+    return pipeline, features
+
+
+@pytest.fixture
+def features_csv(tmp_path, pipeline_and_features):
+    """Features CSV with device_id first (not a model feature)."""
+    _, features = pipeline_and_features
+    path = tmp_path / 'fleet_features.csv'
+    features[['device_id'] + [c for c in features.columns if c != 'device_id']].to_csv(path, index=False)
+    return path
+
+
+class TestScoreFile:
+    """score_file writes the input + score columns chunk by chunk."""
+
+    @pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+    def test_same_scores_as_predict_batch(self, pipeline_and_features, features_csv, tmp_path, suffix):
+        """Output scores match predict_batch on the full frame, in input order."""
+        pipeline, features = pipeline_and_features
+        output = tmp_path / f'scores{suffix}'
+
+        stats = score_file(features_csv, output, pipeline, chunksize=45)
+
+        result = pd.read_csv(output) if suffix == '.csv' else pd.read_parquet(output)
+        expected = predict_batch(features.drop(columns='device_id'), pipeline)
+
+        assert stats['devices'] == len(features)
+        assert stats['chunks'] == 7
+        assert stats['critical'] == int(expected['prediction'].sum())
+        assert list(result['device_id']) == list(features['device_id'])
+        np.testing.assert_allclose(result['probability'], expected['probability'], rtol=1e-9)
+        assert list(result['verdict']) == list(expected['verdict'])
+        assert list(result['risk_level'].astype(str)) == list(expected['risk_level'].astype(str))
+
+    def test_fast_model(self, pipeline_and_features, features_csv, tmp_path):
+        """The compiled fast path scores the same file."""
+        pipeline, _ = pipeline_and_features
+        output = tmp_path / 'scores.csv'
+
+        score_file(features_csv, output, pipeline)
+        expected = pd.read_csv(output)['probability']
+        score_file(features_csv, output, compile_pipeline(pipeline))
+
+        np.testing.assert_allclose(pd.read_csv(output)['probability'], expected, rtol=1e-6)
+
+    def test_multiple_workers(self, pipeline_and_features, features_csv, tmp_path):
+        """workers > 1 writes the same rows, in input order, from a model path."""
+        pipeline, features = pipeline_and_features
+        model_path = tmp_path / 'model.pkl'
+        joblib.dump(pipeline, model_path)
+
+        score_file(features_csv, tmp_path / 'single.csv', pipeline, chunksize=40)
+        stats = score_file(features_csv, tmp_path / 'parallel.csv', model_path, chunksize=40, workers=2, fast=True)
+
+        single = pd.read_csv(tmp_path / 'single.csv')
+        parallel = pd.read_csv(tmp_path / 'parallel.csv')
+        assert stats['chunks'] == 8
+        assert list(parallel['device_id']) == list(features['device_id'])
+        np.testing.assert_allclose(parallel['probability'], single['probability'], rtol=1e-6)
+
+    def test_output_overwritten(self, pipeline_and_features, features_csv, tmp_path):
+        """Re-running does not append to a previous output."""
+        pipeline, features = pipeline_and_features
+        output = tmp_path / 'scores.csv'
+
+        score_file(features_csv, output, pipeline, chunksize=100)
+        score_file(features_csv, output, pipeline, chunksize=100)
+
+        assert len(pd.read_csv(output)) == len(features)
+
+
+class TestCache:
+    """--cache-db skips the model for devices seen in a previous run."""
+
+    def test_second_run_all_hits(self, pipeline_and_features, features_csv, tmp_path, caplog):
+        """Re-scoring the same file is served from the SQLite cache with identical output."""
+        pipeline, _ = pipeline_and_features
+        model_path = tmp_path / 'model.pkl'
+        joblib.dump(pipeline, model_path)
+        args = ['--input', str(features_csv), '--model', str(model_path),
+                '--cache-db', str(tmp_path / 'cache.sqlite'), '--chunksize', '100']
+
+        main(args + ['--output', str(tmp_path / 'first.csv')])
+        with caplog.at_level('INFO', logger='score_fleet'):
+            main(args + ['--output', str(tmp_path / 'second.csv')])
+
+        pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'first.csv'), pd.read_csv(tmp_path / 'second.csv'))
+        assert '300 hits, 0 misses' in caplog.text
+
+
+class TestCLI:
+    """Command line entry point."""
+
+    def test_main(self, pipeline_and_features, features_csv, tmp_path):
+        """main() loads the model and writes the scored file."""
+        pipeline, features = pipeline_and_features
+        model_path = tmp_path / 'model.pkl'
+        joblib.dump(pipeline, model_path)
+        output = tmp_path / 'out' / 'scores.parquet'
+
+        exit_code = main(['--input', str(features_csv), '--output', str(output),
+                          '--model', str(model_path), '--chunksize', '100', '--threshold', '0.7'])
+
+        result = pd.read_parquet(output)
+        assert exit_code == 0
+        assert len(result) == len(features)
+        assert ((result['probability'] >= 0.7) == (result['prediction'] == 1)).all()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,231 @@
+"""
+Unit tests for models/scoring_metrics.py - Per-stage scoring instrumentation
+
+Tests cover:
+1. Histogram buckets, cumulative counts and quantile estimates
+2. Disabled mode is a shared no-op (nothing recorded)
+3. Stages recorded by the fast path, the pipeline path, the prediction cache and pool workers
+4. Prometheus text exposition (in-process, standalone endpoint, scoring service)
+"""
+
+import asyncio
+import re
+import urllib.request
+
+import joblib
+import pytest
+from pathlib import Path
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import models.scoring_metrics as scoring_metrics
+from models.inference import compile_pipeline, predict_batch, predict_batch_parallel, predict_device, score_devices
+from models.prediction_cache import CachedModel, PredictionCache
+from models.scoring_metrics import (
+    Histogram, disable_metrics, enable_metrics, get_metrics, render_prometheus, serve_metrics, stage
+)
+from tests.test_inference_pipeline import make_small_pipeline
+
+
+@pytest.fixture(scope="module")
+def small_pipeline():
+    return make_small_pipeline()
+
+
+@pytest.fixture(autouse=True)
+def metrics_off():
+    """Every test starts and ends with instrumentation disabled."""
+    disable_metrics()
+    yield
+    disable_metrics()
+
+
+def parse_prometheus(text):
+    """{(metric, labels): value} from the exposition text."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        match = re.fullmatch(r'(\w+)(?:\{(.*)\})? (\S+)', line)
+        assert match, f"Invalid line: {line}"
+        samples[(match.group(1), match.group(2) or '')] = float(match.group(3))
+    return samples
+
+
+class TestHistogram:
+    """Fixed-bucket latency histogram."""
+
+    def test_buckets_and_quantiles(self):
+        histogram = Histogram(buckets=(0.001, 0.01, 0.1))
+        for value in [0.0005] * 50 + [0.005] * 45 + [0.05] * 4 + [5.0]:
+            histogram.observe(value)
+
+        assert histogram.cumulative() == [(0.001, 50), (0.01, 95), (0.1, 99), (float('inf'), 100)]
+        assert histogram.count == 100
+        assert histogram.sum == pytest.approx(0.025 + 0.225 + 0.2 + 5.0)
+        assert histogram.quantile(0.5) == pytest.approx(0.001)
+        assert 0.001 < histogram.quantile(0.9) <= 0.01
+        assert histogram.quantile(1.0) == 0.1   # +Inf bucket → último limite finito
+
+    def test_value_on_bound_goes_to_that_bucket(self):
+        """Prometheus buckets are 'less than or equal' (le)."""
+        histogram = Histogram(buckets=(0.001, 0.01))
+        histogram.observe(0.001)
+        assert histogram.cumulative()[0] == (0.001, 1)
+
+    def test_empty_quantile(self):
+        assert Histogram().quantile(0.5) is None
+
+
+class TestDisabled:
+    """Default: no recording, shared null timer."""
+
+    def test_noop_when_disabled(self, small_pipeline):
+        pipeline, X = small_pipeline
+        assert get_metrics() is None
+        assert stage('catboost') is stage('impute')   # mesmo objeto, sem alocação
+
+        score_devices(X, compile_pipeline(pipeline))
+
+        assert get_metrics() is None
+        assert render_prometheus() == ''
+
+    def test_enable_is_idempotent(self):
+        assert enable_metrics() is enable_metrics()
+
+
+class TestStages:
+    """Which stages each scoring path records."""
+
+    def test_fast_path_stages_and_rows(self, small_pipeline):
+        pipeline, X = small_pipeline
+        fast_model = compile_pipeline(pipeline)
+        metrics = enable_metrics()
+
+        predict_batch(X, fast_model)
+        predict_device(X.iloc[0].to_dict(), fast_model)
+        snapshot = metrics.snapshot()
+
+        assert list(snapshot['stages']) == ['to_array', 'impute', 'catboost', 'assemble']
+        assert snapshot['stages']['catboost']['count'] == 2
+        assert snapshot['rows'] == len(X) + 1
+        assert snapshot['calls'] == 2
+        assert snapshot['rows_per_second'] > 0
+        assert sum(s['share'] for s in snapshot['stages'].values()) == pytest.approx(1.0)
+
+    def test_pipeline_path_records_pipeline_stage(self, small_pipeline):
+        pipeline, X = small_pipeline
+        metrics = enable_metrics()
+
+        predict_device(X.iloc[0].to_dict(), pipeline)
+
+        assert set(metrics.snapshot()['stages']) == {'dataframe', 'pipeline', 'assemble'}
+
+    def test_cache_lookup_stage(self, small_pipeline):
+        pipeline, X = small_pipeline
+        model = CachedModel(compile_pipeline(pipeline), PredictionCache(), model_version='v')
+        metrics = enable_metrics()
+
+        score_devices(X, model)
+        score_devices(X, model)   # tudo hit: não chega ao CatBoost
+        stages = metrics.snapshot()['stages']
+
+        assert stages['cache_lookup']['count'] == 2
+        assert stages['catboost']['count'] == 1
+
+    def test_worker_stages_merged(self, small_pipeline, tmp_path):
+        """Stages measured in predict_batch_parallel workers are added to the parent's metrics."""
+        pipeline, X = small_pipeline
+        joblib.dump(pipeline, tmp_path / 'pipeline.pkl')
+        metrics = enable_metrics()
+
+        predict_batch_parallel(X, tmp_path / 'pipeline.pkl', workers=2, shard_size=100)
+        snapshot = metrics.snapshot()
+
+        assert list(snapshot['stages']) == ['to_array', 'impute', 'catboost', 'assemble']
+        assert all(s['count'] == 3 for s in snapshot['stages'].values())
+        assert snapshot['stages']['catboost']['total_seconds'] > 0
+        assert snapshot['rows'] == len(X)
+
+    def test_reset(self, small_pipeline):
+        pipeline, X = small_pipeline
+        metrics = enable_metrics()
+        score_devices(X, compile_pipeline(pipeline))
+        metrics.reset()
+
+        assert metrics.snapshot() == {
+            'rows': 0, 'calls': 0, 'instrumented_seconds': 0, 'rows_per_second': 0.0, 'stages': {}
+        }
+
+
+class TestPrometheusExport:
+    """Text exposition format and endpoints."""
+
+    def test_render_prometheus(self, small_pipeline):
+        pipeline, X = small_pipeline
+        enable_metrics()
+        score_devices(X, compile_pipeline(pipeline))
+
+        samples = parse_prometheus(render_prometheus())
+        buckets = [v for (name, labels), v in samples.items()
+                   if name == 'scoring_stage_seconds_bucket' and 'stage="catboost"' in labels]
+
+        assert buckets == sorted(buckets)
+        assert samples[('scoring_stage_seconds_bucket', 'stage="catboost",le="+Inf"')] == 1
+        assert samples[('scoring_stage_seconds_count', 'stage="catboost"')] == 1
+        assert samples[('scoring_rows_total', '')] == len(X)
+        assert samples[('scoring_calls_total', '')] == 1
+
+    def test_serve_metrics_endpoint(self, small_pipeline):
+        pipeline, X = small_pipeline
+        server = serve_metrics(port=0)
+        try:
+            score_devices(X.head(10), compile_pipeline(pipeline))
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:
+                content_type = response.headers['Content-Type']
+                samples = parse_prometheus(response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert content_type == scoring_metrics.PROMETHEUS_CONTENT_TYPE
+        assert samples[('scoring_rows_total', '')] == 10
+
+    def test_scoring_service_metrics_route(self, small_pipeline, tmp_path):
+        """/metrics is 404 unless the service runs with metrics=True."""
+        import joblib
+        from load_test_scoring_service import ScoringClient
+        from scoring_service import ScoringService
+
+        pipeline, X = small_pipeline
+        model_path = tmp_path / 'pipeline.pkl'
+        joblib.dump(pipeline, model_path)
+        features = {k: (None if v != v else float(v)) for k, v in X.iloc[0].items()}
+
+        async def scenario(metrics):
+            service = ScoringService(model_path, fast=True, cache_size=0, metrics=metrics)
+            host, port = await service.start('127.0.0.1', 0)
+            client = ScoringClient(host, port)
+            try:
+                await client.request('POST', '/predict', {'features': features})
+                return await client.request('GET', '/metrics')
+            finally:
+                await client.close()
+                await service.stop()
+
+        disabled = asyncio.run(scenario(False))
+        enabled = asyncio.run(scenario(True))
+        samples = parse_prometheus(enabled[1])
+
+        assert disabled[0] == 404
+        assert enabled[0] == 200
+        assert samples[('scoring_rows_total', '')] >= 1
+        assert ('scoring_stage_seconds_count', 'stage="coerce"') in samples
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,290 @@
+"""
+Unit tests for scoring_service.py - Local asyncio HTTP scoring service
+
+Tests cover:
+1. Health/readiness lifecycle (model preloaded once at startup)
+2. /predict and /predict/batch match predict_device / score_devices
+3. Micro-batching of concurrent single-device requests
+4. Request errors (missing features, invalid JSON, unknown route, wrong method)
+5. Load test script against a running service
+"""
+
+import asyncio
+
+import joblib
+import numpy as np
+import pytest
+from pathlib import Path
+import sys
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from load_test_scoring_service import ScoringClient, load_device_payloads, run_load_test
+from scoring_service import MicroBatcher, ScoringService
+from models.inference import predict_device
+from tests.test_inference_pipeline import make_small_pipeline
+
+
+@pytest.fixture(scope="module")
+def pipeline_and_features():
+    """Small fitted pipeline + its feature frame."""
+    return make_small_pipeline()
+
+
+@pytest.fixture(scope="module")
+def model_file(pipeline_and_features, tmp_path_factory):
+    """Pipeline saved as .pkl for the service to load."""
+    pipeline, _ = pipeline_and_features
+    path = tmp_path_factory.mktemp("models") / "pipeline.pkl"
+    joblib.dump(pipeline, path)
+    return path
+
+
+def device_payload(X, i):
+    """/predict payload for row i (NaN → null)."""
+    features = {k: (None if np.isnan(v) else float(v)) for k, v in X.iloc[i].items()}
+    return {'device_id': f"dev-{i}", 'features': features}
+
+
+def run_with_service(model_file, scenario, **service_kwargs):
+    """Start the service on a free port, run scenario(service, host, port), stop it."""
+    async def runner():
+        service = ScoringService(model_file, **service_kwargs)
+        host, port = await service.start('127.0.0.1', 0)
+        try:
+            return await scenario(service, host, port)
+        finally:
+            await service.stop()
+
+    return asyncio.run(runner())
+
+
+class TestLifecycle:
+    """Health is served before the model loads; readiness after."""
+
+    def test_health_and_ready(self, model_file):
+        """/ready is 503 until load() and 200 afterwards; /health always 200."""
+        async def scenario(service, host, port):
+            client = ScoringClient(host, port)
+            before = await client.request('GET', '/ready')
+            health = await client.request('GET', '/health')
+            predict_before = await client.request('POST', '/predict', {'features': {}})
+            await asyncio.get_running_loop().run_in_executor(None, service.load)
+            after = await client.request('GET', '/ready')
+            await client.close()
+            return before, health, predict_before, after
+
+        async def runner():
+            service = ScoringService(model_file)
+            host, port = await service.start('127.0.0.1', 0, preload=False)
+            try:
+                return await scenario(service, host, port)
+            finally:
+                await service.stop()
+
+        before, health, predict_before, after = asyncio.run(runner())
+
+        assert before[0] == 503
+        assert health == (200, {'status': 'ok'})
+        assert predict_before[0] == 503
+        assert after[0] == 200
+        assert after[1]['status'] == 'ready'
+
+
+class TestEndpoints:
+    """JSON scoring endpoints."""
+
+    def test_predict_matches_predict_device(self, pipeline_and_features, model_file):
+        """/predict returns the predict_device result plus device_id."""
+        pipeline, X = pipeline_and_features
+
+        async def scenario(service, host, port):
+            client = ScoringClient(host, port)
+            response = await client.request('POST', '/predict', device_payload(X, 3))
+            await client.close()
+            return response
+
+        status, result = run_with_service(model_file, scenario)
+        expected = predict_device(X.iloc[[3]].to_dict(orient='records')[0], pipeline)
+
+        assert status == 200
+        assert result['device_id'] == 'dev-3'
+        assert result['verdict'] == expected['verdict']
+        assert result['risk_level'] == expected['risk_level']
+        assert result['probability'] == pytest.approx(expected['probability'])
+
+    def test_batch_endpoint(self, pipeline_and_features, model_file):
+        """/predict/batch scores all devices in order with the given threshold."""
+        pipeline, X = pipeline_and_features
+
+        async def scenario(service, host, port):
+            client = ScoringClient(host, port)
+            response = await client.request(
+                'POST', '/predict/batch', {'devices': [device_payload(X, i) for i in range(50)]}
+            )
+            await client.close()
+            return response
+
+        status, result = run_with_service(model_file, scenario, threshold=0.7, fast=True)
+        probabilities = np.array([p['probability'] for p in result['predictions']])
+
+        assert status == 200
+        assert [p['device_id'] for p in result['predictions']] == [f"dev-{i}" for i in range(50)]
+        np.testing.assert_allclose(probabilities, pipeline.predict_proba(X.head(50))[:, 1], rtol=1e-6)
+        assert all((p['probability'] >= 0.7) == (p['prediction'] == 1) for p in result['predictions'])
+
+    def test_request_errors(self, pipeline_and_features, model_file):
+        """Missing features → 400, bad JSON → 400, unknown route → 404, wrong method → 405."""
+        _, X = pipeline_and_features
+        payload = device_payload(X, 0)
+        del payload['features']['optical_mean']
+
+        async def scenario(service, host, port):
+            client = ScoringClient(host, port)
+            responses = [
+                await client.request('POST', '/predict', payload),
+                await client.request('POST', '/nope', {}),
+                await client.request('GET', '/predict'),
+            ]
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"POST /predict HTTP/1.1\r\nConnection: close\r\nContent-Length: 5\r\n\r\n{bad}")
+            await writer.drain()
+            raw = await reader.read()
+            writer.close()
+            await client.close()
+            return responses, raw
+
+        responses, raw = run_with_service(model_file, scenario)
+
+        assert responses[0][0] == 400
+        assert 'optical_mean' in responses[0][1]['error']
+        assert responses[1][0] == 404
+        assert responses[2][0] == 405
+        assert raw.startswith(b"HTTP/1.1 400")
+
+
+class TestCache:
+    """Prediction cache in front of the model."""
+
+    def test_repeat_request_is_cache_hit(self, pipeline_and_features, model_file):
+        """The same features twice → one miss, one hit in /stats."""
+        _, X = pipeline_and_features
+
+        async def scenario(service, host, port):
+            client = ScoringClient(host, port)
+            first = await client.request('POST', '/predict', device_payload(X, 1))
+            second = await client.request('POST', '/predict', device_payload(X, 1))
+            _, stats = await client.request('GET', '/stats')
+            await client.close()
+            return first, second, stats
+
+        first, second, stats = run_with_service(model_file, scenario)
+
+        assert first == second
+        assert (stats['cache']['hits'], stats['cache']['misses']) == (1, 1)
+
+    def test_cache_disabled(self, model_file):
+        """--cache-size 0 → no cache stats."""
+        async def scenario(service, host, port):
+            client = ScoringClient(host, port)
+            _, stats = await client.request('GET', '/stats')
+            await client.close()
+            return stats
+
+        assert run_with_service(model_file, scenario, cache_size=0)['cache'] is None
+
+
+class TestMicroBatching:
+    """Concurrent /predict requests share vectorized model calls."""
+
+    def test_concurrent_requests_coalesced(self, pipeline_and_features, model_file):
+        """100 concurrent requests use far fewer model calls, each gets its own result."""
+        pipeline, X = pipeline_and_features
+
+        async def scenario(service, host, port):
+            clients = [ScoringClient(host, port) for _ in range(100)]
+            responses = await asyncio.gather(*(
+                client.request('POST', '/predict', device_payload(X, i)) for i, client in enumerate(clients)
+            ))
+            for client in clients:
+                await client.close()
+            return responses, service.batcher.stats()
+
+        responses, stats = run_with_service(model_file, scenario, max_wait_ms=50, max_batch_size=64)
+        expected = pipeline.predict_proba(X.head(100))[:, 1]
+
+        assert stats['requests'] == 100
+        assert stats['batches'] < 100
+        assert stats['largest_batch'] <= 64
+        for i, (status, result) in enumerate(responses):
+            assert status == 200
+            assert result['device_id'] == f"dev-{i}"
+            assert result['probability'] == pytest.approx(expected[i])
+
+    def test_max_batch_size_respected(self):
+        """Batches never exceed max_batch_size and results keep submission order."""
+        calls = []
+
+        def score_fn(items):
+            calls.append(len(items))
+            return [item * 2 for item in items]
+
+        async def scenario():
+            batcher = MicroBatcher(score_fn, max_batch_size=8, max_wait_ms=20)
+            batcher.start()
+            try:
+                return await asyncio.gather(*(batcher.submit(i) for i in range(30)))
+            finally:
+                await batcher.stop()
+
+        results = asyncio.run(scenario())
+
+        assert results == [i * 2 for i in range(30)]
+        assert max(calls) <= 8
+        assert sum(calls) == 30
+
+    def test_scoring_error_propagates(self):
+        """An exception in score_fn fails the waiting requests, not the batcher."""
+        def score_fn(items):
+            if any(item < 0 for item in items):
+                raise ValueError("boom")
+            return items
+
+        async def scenario():
+            batcher = MicroBatcher(score_fn, max_wait_ms=0)
+            batcher.start()
+            try:
+                with pytest.raises(ValueError):
+                    await batcher.submit(-1)
+                return await batcher.submit(5)
+            finally:
+                await batcher.stop()
+
+        assert asyncio.run(scenario()) == 5
+
+
+class TestLoadTest:
+    """load_test_scoring_service.py against a running service."""
+
+    def test_run_load_test(self, model_file):
+        """All requests succeed and micro-batch stats are reported."""
+        devices = load_device_payloads(None, n_devices=50)
+
+        async def scenario(service, host, port):
+            single = await run_load_test(host, port, devices, n_requests=200, concurrency=20)
+            batch = await run_load_test(host, port, devices, n_requests=10, concurrency=2,
+                                        endpoint='batch', batch_size=25)
+            return single, batch
+
+        single, batch = run_with_service(model_file, scenario, fast=True)
+
+        assert single['errors'] == 0
+        assert single['micro_batches'] >= 1
+        assert single['mean_micro_batch_size'] >= 1
+        assert batch['errors'] == 0
+        assert batch['devices_per_sec'] == pytest.approx(batch['requests_per_sec'] * 25)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
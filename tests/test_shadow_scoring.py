@@ -0,0 +1,288 @@
+"""
+Unit tests for models/shadow_scoring.py - Shadow models scored on the active model's feature matrix
+
+Tests cover:
+1. Shadow entries loaded from the registry alongside the active model
+2. Several models scored on one matrix (sequential, parallel, other column order)
+3. Disagreement logging and per-shadow stats (decisions at the primary's threshold)
+4. submit() never waits for shadow scoring; full queue drops
+5. Scoring service in shadow mode
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import joblib
+import numpy as np
+import pytest
+from pathlib import Path
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+from models.inference import compile_pipeline, score_devices
+from models.model_manager import ModelHandle, ModelManager, shadow_registry_entries
+from models.shadow_scoring import ShadowScorer, model_key, score_models
+from tests.test_inference_pipeline import make_small_pipeline
+
+
+@pytest.fixture(scope="module")
+def models_dir(tmp_path_factory):
+    """Two small pipelines saved as .pkl and their features."""
+    directory = tmp_path_factory.mktemp("shadow_models")
+    pipeline_a, X = make_small_pipeline(seed=0)
+    pipeline_b, _ = make_small_pipeline(seed=1)
+    joblib.dump(pipeline_a, directory / "a.pkl")
+    joblib.dump(pipeline_b, directory / "b.pkl")
+    return directory, pipeline_a, pipeline_b, X
+
+
+def make_handle(model, model_id, feature_order, version='1.0.0'):
+    return ModelHandle(model=model, model_id=model_id, version=version, model_path=Path(f"{model_id}.pkl"),
+                       model_version=model_id, feature_order=list(feature_order))
+
+
+def write_registry(path, active, shadows):
+    """Registry with one active entry and shadow entries {model_id: model_path}."""
+    models = [{'model_id': 'active', 'version': '1.0.0', 'status': 'active', 'model_path': str(active)}]
+    models += [{'model_id': model_id, 'version': '2.0.0', 'status': 'shadow', 'model_path': str(model_path)}
+               for model_id, model_path in shadows.items()]
+    path.write_text(json.dumps({'models': models}))
+    return path
+
+
+class SlowModel:
+    """Scores like `model` after sleeping `delay` seconds."""
+
+    def __init__(self, model, delay):
+        self.model = model
+        self.delay = delay
+        self.feature_order = model.feature_order
+
+    def predict_proba_critical(self, X):
+        time.sleep(self.delay)
+        return self.model.predict_proba_critical(X)
+
+
+class TestRegistryShadows:
+    """Shadow entries next to the active model."""
+
+    def test_shadow_entries(self):
+        registry = {'models': [{'model_id': 'a', 'status': 'active'}, {'model_id': 'b', 'status': 'shadow'},
+                               {'model_id': 'c', 'status': 'deprecated'}]}
+        assert [e['model_id'] for e in shadow_registry_entries(registry)] == ['b']
+
+    def test_manager_loads_shadows(self, models_dir, tmp_path):
+        directory, _, _, _ = models_dir
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl',
+                                  {'candidate': directory / 'b.pkl', 'broken': directory / 'missing.pkl'})
+
+        manager = ModelManager(registry, shadows=True).start(watch=False)
+        shadows = manager.shadow_handles()
+
+        assert manager.current().model_id == 'active'
+        assert [h.model_id for h in shadows] == ['candidate']
+        assert manager.failed_loads == 1   # shadow quebrado não derruba o ativo
+        assert manager.stats()['shadows'][0]['model_id'] == 'candidate'
+
+        manager.reload()   # registry igual: mesmos handles
+        assert manager.shadow_handles()[0] is shadows[0]
+
+    def test_shadows_off_by_default(self, models_dir, tmp_path):
+        directory, _, _, _ = models_dir
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', {'candidate': directory / 'b.pkl'})
+
+        assert ModelManager(registry).start(watch=False).shadow_handles() == ()
+
+    def test_shadows_require_registry(self, models_dir):
+        directory, _, _, _ = models_dir
+        with pytest.raises(ValueError, match='registry'):
+            ModelManager(None, model_path=directory / 'a.pkl', shadows=True)
+
+
+class TestScoreModels:
+    """One feature matrix, several models."""
+
+    def test_parallel_matches_sequential(self, models_dir):
+        _, pipeline_a, pipeline_b, X = models_dir
+        handles = [make_handle(compile_pipeline(pipeline_a), 'a', X.columns),
+                   make_handle(compile_pipeline(pipeline_b), 'b', X.columns)]
+
+        sequential = score_models(X, handles)
+        parallel = score_models(X, handles, parallel=True)
+
+        assert list(sequential) == ['a@1.0.0', 'b@1.0.0']
+        for key in sequential:
+            np.testing.assert_array_equal(sequential[key]['probability'], parallel[key]['probability'])
+        np.testing.assert_allclose(sequential['a@1.0.0']['probability'],
+                                   score_devices(X, pipeline_a)['probability'].to_numpy())
+
+    def test_reindexes_other_feature_order(self, models_dir):
+        _, pipeline_a, _, X = models_dir
+        reversed_columns = list(reversed(X.columns))
+        handle = make_handle(compile_pipeline(pipeline_a), 'a', X.columns)
+
+        result = score_models(X[reversed_columns], [handle])
+
+        np.testing.assert_allclose(result['a@1.0.0']['probability'],
+                                   score_devices(X, pipeline_a)['probability'].to_numpy())
+
+
+class TestShadowScorer:
+    """Background comparison against the active model."""
+
+    def test_identical_shadow_has_no_disagreements(self, models_dir, tmp_path):
+        _, pipeline_a, _, X = models_dir
+        model = compile_pipeline(pipeline_a)
+        primary = make_handle(model, 'active', X.columns)
+        shadow = ShadowScorer([make_handle(model, 'same', X.columns)], log_dir=tmp_path)
+
+        shadow.submit(X, score_devices(X, model), primary)
+        shadow.flush(timeout=10)
+        stats = shadow.stats()['models']['same@1.0.0']
+        shadow.close()
+
+        assert stats['devices'] == len(X)
+        assert stats['decision_flips'] == 0
+        assert stats['max_abs_probability_diff'] == 0
+        assert list(tmp_path.iterdir()) == []
+
+    def test_disagreements_logged(self, models_dir, tmp_path):
+        _, pipeline_a, pipeline_b, X = models_dir
+        primary = make_handle(compile_pipeline(pipeline_a), 'active', X.columns)
+        candidate = make_handle(compile_pipeline(pipeline_b), 'candidate', X.columns, version='2.1.0')
+        scores = score_devices(X, primary.model)
+        shadow_scores = score_devices(X, candidate.model)
+        device_ids = [f"dev{i}" for i in range(len(X))]
+        shadow = ShadowScorer([candidate], log_dir=tmp_path, probability_tolerance=0.05)
+
+        shadow.submit(X, scores, primary, device_ids)
+        shadow.flush(timeout=10)
+        stats = shadow.stats()['models']['candidate@2.1.0']
+        shadow.close()
+
+        diff = shadow_scores['probability'].to_numpy() - scores['probability'].to_numpy()
+        flips = shadow_scores['prediction'].to_numpy() != scores['prediction'].to_numpy()
+        expected = flips | (np.abs(diff) >= 0.05)
+        lines = [json.loads(line) for path in tmp_path.glob('*.jsonl') for line in path.read_text().splitlines()]
+
+        assert stats['decision_flips'] == flips.sum()
+        assert stats['disagreements'] == expected.sum() == len(lines) > 0
+        assert stats['mean_abs_probability_diff'] == pytest.approx(np.abs(diff).mean())
+        first = lines[0]
+        i = device_ids.index(first['device_id'])
+        assert first['primary_model'] == 'active@1.0.0'
+        assert first['shadow_model'] == 'candidate@2.1.0'
+        assert first['probability_diff'] == pytest.approx(diff[i], abs=1e-4)
+        assert first['decision_flip'] == bool(flips[i])
+
+    def test_shadow_decided_at_primary_threshold(self, models_dir):
+        """A shadow with another decision_threshold is compared at the primary's threshold."""
+        _, pipeline_a, _, X = models_dir
+        model = compile_pipeline(pipeline_a)
+        primary = make_handle(model, 'active', X.columns)
+        same = ModelHandle(model=model, model_id='same', version='1.0.0', model_path=Path('same.pkl'),
+                           model_version='same', feature_order=list(X.columns), decision_threshold=0.01)
+        shadow = ShadowScorer([same], log_dir=None)
+
+        shadow.submit(X, score_devices(X, model, 0.7), primary, threshold=0.7)
+        shadow.submit(X, score_devices(X, model), primary)
+        shadow.flush(timeout=10)
+        stats = shadow.stats()['models']['same@1.0.0']
+        shadow.close()
+
+        assert stats['batches'] == 2
+        assert stats['decision_flips'] == 0
+
+    def test_submit_does_not_wait_for_shadows(self, models_dir):
+        _, pipeline_a, _, X = models_dir
+        model = compile_pipeline(pipeline_a)
+        primary = make_handle(model, 'active', X.columns)
+        shadow = ShadowScorer([make_handle(SlowModel(model, 0.3), 'slow', X.columns)], log_dir=None, queue_size=1)
+        scores = score_devices(X, model)
+
+        start = time.perf_counter()
+        results = [shadow.submit(X, scores, primary) for _ in range(5)]
+        elapsed = time.perf_counter() - start
+        shadow.flush(timeout=10)
+        stats = shadow.stats()
+        shadow.close()
+
+        assert elapsed < 0.1
+        assert results[0] and not all(results)   # fila de 1: o excesso é descartado
+        assert stats['dropped'] == results.count(False)
+        assert stats['models']['slow@1.0.0']['batches'] == stats['submitted']
+
+    def test_no_shadows_is_noop(self, models_dir):
+        _, pipeline_a, _, X = models_dir
+        model = compile_pipeline(pipeline_a)
+        shadow = ShadowScorer(lambda: (), log_dir=None)
+
+        assert shadow.submit(X, score_devices(X, model), make_handle(model, 'active', X.columns)) is False
+        assert shadow.stats()['submitted'] == 0
+        shadow.close()
+
+    def test_shadow_error_is_contained(self, models_dir):
+        _, pipeline_a, _, X = models_dir
+        model = compile_pipeline(pipeline_a)
+        broken = make_handle(model, 'broken', ['not_a_feature'])
+        shadow = ShadowScorer([broken], log_dir=None)
+
+        shadow.submit(X, score_devices(X, model), make_handle(model, 'active', X.columns))
+        shadow.flush(timeout=10)
+        stats = shadow.stats()
+        shadow.close()
+
+        assert stats['errors'] == 1
+        assert stats['last_error']
+
+
+class TestScoringServiceShadow:
+    """Shadow mode in the scoring API."""
+
+    def test_shadow_mode(self, models_dir, tmp_path):
+        from load_test_scoring_service import ScoringClient
+        from scoring_service import ScoringService
+
+        directory, pipeline_a, _, X = models_dir
+        registry = write_registry(tmp_path / 'registry.json', directory / 'a.pkl', {'candidate': directory / 'b.pkl'})
+        devices = [{'device_id': f"dev{i}", 'features': {k: (None if v != v else float(v)) for k, v in row.items()}}
+                   for i, (_, row) in enumerate(X.head(50).iterrows())]
+
+        async def scenario():
+            service = ScoringService(registry=registry, fast=True, cache_size=0, poll_interval=60,
+                                     shadow=True, shadow_log_dir=tmp_path / 'shadow')
+            host, port = await service.start('127.0.0.1', 0)
+            client = ScoringClient(host, port)
+            try:
+                _, predictions = await client.request('POST', '/predict/batch', {'devices': devices})
+                await asyncio.get_running_loop().run_in_executor(None, service.shadow.flush, 10)
+                _, stats = await client.request('GET', '/stats')
+                return predictions, stats
+            finally:
+                await client.close()
+                await service.stop()
+
+        predictions, stats = asyncio.run(scenario())
+        expected = score_devices(X.head(50), pipeline_a)['probability'].to_numpy()
+
+        np.testing.assert_allclose([p['probability'] for p in predictions['predictions']], expected, rtol=1e-6)
+        assert stats['shadow']['shadows'] == ['candidate@2.0.0']
+        assert stats['shadow']['models']['candidate@2.0.0']['devices'] == 50
+        assert stats['model']['shadows'][0]['model_id'] == 'candidate'
+
+    def test_shadow_off(self, models_dir):
+        from scoring_service import ScoringService
+
+        directory, _, _, _ = models_dir
+        service = ScoringService(directory / 'a.pkl', cache_size=0)
+
+        assert service.shadow is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,203 @@
+"""
+Unit tests for streaming_drift.py - Online drift detection over rolling windows
+
+Tests cover:
+1. KLL sketch accuracy and merges
+2. Mergeable running moments
+3. Approximate KS/PSI against the exact engine
+4. Daily/weekly windows, bucket eviction and bounded memory
+5. Status output (KS and PSI thresholds) and the `drift_monitor.py stream` CLI
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import drift_monitor
+from drift_monitor import (
+    ALL_FEATURES,
+    DEFAULT_METRIC_THRESHOLDS,
+    build_reference_profile,
+    classify_drift_status,
+    compute_ks_statistics,
+    detect_lifecycle_drift,
+)
+from streaming_drift import (
+    KLLSketch,
+    RunningMoments,
+    StreamingDriftMonitor,
+    ks_against_sketch,
+    population_stability_index,
+)
+
+
+def make_fleet(n, seed, shift=0.0, features=ALL_FEATURES):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({feat: rng.normal(50 + shift, 10, n) for feat in features})
+
+
+class TestKLLSketch:
+    """Mergeable quantile sketch."""
+
+    def test_rank_error_and_size(self):
+        values = np.random.default_rng(0).normal(0, 1, 200_000)
+        sketch = KLLSketch(k=200, rng=np.random.default_rng(1))
+        for chunk in np.array_split(values, 40):
+            sketch.update(chunk)
+
+        grid = np.quantile(values, np.linspace(0.01, 0.99, 99))
+        exact = np.searchsorted(np.sort(values), grid, side='right') / len(values)
+
+        assert sketch.n == len(values)
+        assert sketch.size < 1000
+        assert np.abs(sketch.cdf(grid) - exact).max() < 0.02
+        assert sketch.quantile(0.5) == pytest.approx(0.0, abs=0.05)
+
+    def test_merge_matches_single_stream(self):
+        rng = np.random.default_rng(2)
+        a_values, b_values = rng.normal(0, 1, 50_000), rng.normal(1, 1, 50_000)
+        merged = KLLSketch(rng=np.random.default_rng(3)).update(a_values)
+        merged.merge(KLLSketch(rng=np.random.default_rng(4)).update(b_values))
+
+        all_values = np.sort(np.concatenate([a_values, b_values]))
+        grid = np.linspace(-2, 3, 51)
+
+        assert merged.n == 100_000
+        assert np.abs(merged.cdf(grid) - np.searchsorted(all_values, grid, side='right') / 100_000).max() < 0.02
+
+    def test_nan_ignored_and_empty(self):
+        sketch = KLLSketch().update([1.0, np.nan, 3.0])
+
+        assert sketch.n == 2
+        assert sketch.cdf(2.0) == pytest.approx(0.5)
+        assert np.isnan(KLLSketch().cdf(0.0))
+
+    def test_running_moments_merge(self):
+        rng = np.random.default_rng(5)
+        values = rng.normal(10, 3, 1000)
+        moments = RunningMoments().update(values[:300]).merge(RunningMoments().update(values[300:]))
+
+        assert moments.n == 1000
+        assert moments.mean == pytest.approx(values.mean())
+        assert moments.std == pytest.approx(values.std(ddof=1))
+
+
+class TestApproximateStatistics:
+    """Sketch-based KS and PSI."""
+
+    def test_ks_close_to_exact(self):
+        reference, production = make_fleet(5000, 0, features=['temp_mean']), make_fleet(50_000, 1, 3.0, ['temp_mean'])
+        sketch = KLLSketch(rng=np.random.default_rng(0)).update(production['temp_mean'].to_numpy())
+
+        approx = ks_against_sketch(np.sort(reference['temp_mean'].to_numpy()), sketch)
+        exact = compute_ks_statistics(reference, production, features=['temp_mean'])['temp_mean']['ks_statistic']
+
+        assert approx == pytest.approx(exact, abs=0.02)
+
+    def test_psi(self):
+        assert population_stability_index([0.5, 0.5], [0.5, 0.5]) == 0
+        assert population_stability_index([0.5, 0.5], [0.9, 0.1]) == pytest.approx(
+            0.4 * np.log(0.9 / 0.5) - 0.4 * np.log(0.1 / 0.5))
+
+
+class TestStreamingDriftMonitor:
+    """Rolling windows over streamed batches."""
+
+    @pytest.fixture
+    def reference(self):
+        return build_reference_profile(make_fleet(5000, 0))
+
+    def test_statuses_follow_drift(self, reference):
+        monitor = StreamingDriftMonitor(reference)
+        days = pd.date_range('2025-11-01', periods=7)
+
+        for i, day in enumerate(days[:-1]):
+            statuses = monitor.update(make_fleet(2000, i + 1), day)
+        assert statuses['weekly']['status'] == 'OK'
+
+        statuses = monitor.update(make_fleet(2000, 99, shift=8.0), days[-1])
+        daily, weekly = statuses['daily'], statuses['weekly']
+
+        assert daily['devices'] == 2000 and weekly['devices'] == 14_000
+        assert daily['status'] == 'CRITICAL'
+        assert daily['max_ks_statistic'] > weekly['max_ks_statistic']
+        assert daily['feature_drift']['temp_mean']['psi'] > 0.25
+        assert daily['start'] == daily['end'] == '2025-11-07'
+
+    def test_psi_tail_shift_matches_batch_status(self, reference):
+        """A tail shift KS misses is flagged by PSI, as in batch mode; --psi-thresholds moves the levels."""
+        production = make_fleet(5000, 1)
+        shifted = np.random.default_rng(2).random(len(production)) < 0.08
+        production.loc[shifted, 'optical_min'] -= 40
+        results = compute_ks_statistics(reference, production)
+        batch_status, _ = classify_drift_status(results, detect_lifecycle_drift(results), 0.2, 0.4,
+                                                DEFAULT_METRIC_THRESHOLDS)
+
+        daily = StreamingDriftMonitor(reference).update(production, '2025-11-01')['daily']
+        relaxed = StreamingDriftMonitor(reference, psi_thresholds=(1.0, 2.0)).update(production, '2025-11-01')
+
+        assert daily['max_ks_statistic'] < 0.2
+        assert daily['status'] == batch_status == 'WARNING'
+        assert any('PSI' in alert and 'optical_min' in alert for alert in daily['alerts'])
+        assert relaxed['daily']['status'] == 'OK'
+
+    def test_window_matches_exact_engine(self, reference):
+        monitor = StreamingDriftMonitor(reference)
+        batches = [make_fleet(3000, seed, shift=1.0) for seed in range(1, 5)]
+        for batch in batches:
+            monitor.update(batch, '2025-11-03', evaluate=False)
+
+        results, devices = monitor.window_results('weekly')
+        exact = compute_ks_statistics(reference, pd.concat(batches))
+
+        assert devices == 12_000
+        for feat in ALL_FEATURES:
+            assert results[feat]['ks_statistic'] == pytest.approx(exact[feat]['ks_statistic'], abs=0.02)
+            assert results[feat]['production_mean'] == pytest.approx(exact[feat]['production_mean'])
+            assert results[feat]['production_std'] == pytest.approx(exact[feat]['production_std'])
+
+    def test_memory_bounded(self, reference):
+        monitor = StreamingDriftMonitor(reference, features=['temp_mean', 'battery_mean'])
+        memory = []
+        for i, day in enumerate(pd.date_range('2025-11-01', periods=21)):
+            monitor.update(make_fleet(20_000, i, features=['temp_mean', 'battery_mean']), day, evaluate=False)
+            memory.append(monitor.memory_items())
+
+        assert monitor.devices_seen == 420_000
+        assert len(monitor._buckets) == 7
+        assert max(memory[7:]) <= 1.2 * memory[6]
+        assert memory[-1] < 10_000
+
+    def test_missing_feature_raises(self, reference):
+        with pytest.raises(ValueError, match='temp_mean'):
+            StreamingDriftMonitor(reference).update(pd.DataFrame({'battery_mean': [1.0]}))
+
+    def test_stream_cli(self, tmp_path):
+        reference = make_fleet(3000, 0)
+        reference.to_csv(tmp_path / 'reference.csv', index=False)
+        batch = make_fleet(2000, 1, shift=8.0)
+        batch['scored_at'] = np.repeat(['2025-11-01T10:00', '2025-11-02T10:00'], 1000)
+        batch.to_csv(tmp_path / 'batch.csv', index=False)
+
+        with pytest.raises(SystemExit) as exited:
+            drift_monitor.main(['stream', '--batches', str(tmp_path / 'batch.csv'),
+                                '--reference', str(tmp_path / 'reference.csv'),
+                                '--timestamp-column', 'scored_at', '--chunksize', '1500',
+                                '--output', str(tmp_path / 'stream.jsonl')])
+
+        records = [json.loads(line) for line in (tmp_path / 'stream.jsonl').read_text().splitlines()]
+
+        assert exited.value.code == 2
+        assert [r['batch_devices'] for r in records] == [1000, 500, 500]
+        assert records[-1]['windows']['weekly']['devices'] == 2000
+        assert records[-1]['windows']['daily']['end'] == '2025-11-02'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,429 @@
+"""
+Unit tests for transform_aws_payload.py - AWS message-level → device-level features
+
+Tests cover:
+1. Equivalence of the vectorized aggregation engine with the previous
+   groupby/merge implementation
+2. Edge cases (devices without readings, single reading, empty input)
+3. Mergeable partial aggregates and chunked streaming ingestion
+4. Parallel multi-file transform and fleet-level combination
+5. Per-file, concurrency-safe column schema resolution
+6. Typed, column-pruned CSV reader
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
+
+import transform_aws_payload
+
+from transform_aws_payload import (
+    aggregate_by_device,
+    aggregate_aws_payload_streaming,
+    compute_partial_aggregates,
+    merge_partial_aggregates,
+    finalize_partial_aggregates,
+    load_aws_payload,
+    run_transform_jobs,
+    combine_fleet_output,
+    resolve_payload_schema,
+    AWS_COLUMN_MAPPING,
+    OPTICAL_THRESHOLD,
+    TEMP_THRESHOLD,
+    BATTERY_THRESHOLD,
+    REQUIRED_FEATURES
+)
+
+# Telemetry is read from CSV as float32: compare against float64 references
+# with float32 precision
+TYPED_READ_RTOL = 1e-6
+
+
+def legacy_aggregate_by_device(df: pd.DataFrame) -> pd.DataFrame:
+    """Previous implementation (one filter + groupby per sensor, chained merges)."""
+    device_col = AWS_COLUMN_MAPPING['device_id']
+    aggregated = {}
+
+    sensor_specs = {
+        'optical': ['mean', 'std', 'min', 'max', 'count'],
+        'temp': ['mean', 'std', 'min', 'max'],
+        'battery': ['mean', 'std', 'min', 'max'],
+        'snr': ['mean', 'std', 'min'],
+        'rsrp': ['mean', 'std', 'min'],
+        'rsrq': ['mean', 'std', 'min'],
+    }
+    thresholds = {
+        'optical': ('optical_below_threshold', lambda s: s < OPTICAL_THRESHOLD),
+        'temp': ('temp_above_threshold', lambda s: s > TEMP_THRESHOLD),
+        'battery': ('battery_below_threshold', lambda s: s < BATTERY_THRESHOLD),
+    }
+
+    for sensor, aggs in sensor_specs.items():
+        col = AWS_COLUMN_MAPPING[sensor]
+        if col not in df.columns:
+            continue
+        df_sensor = df[df[col].notna()].copy()
+        names = [(f'{sensor}_{a}' if a != 'count' else f'{sensor}_readings', a) for a in aggs]
+        stats = df_sensor.groupby(device_col)[col].agg(names).reset_index()
+        if sensor in ('optical', 'temp'):
+            stats[f'{sensor}_range'] = stats[f'{sensor}_max'] - stats[f'{sensor}_min']
+        if sensor in thresholds:
+            name, rule = thresholds[sensor]
+            crossed = df_sensor[rule(df_sensor[col])].groupby(device_col).size()
+            stats[name] = stats[device_col].map(crossed).fillna(0).astype(int)
+        aggregated[sensor] = stats
+
+    messaging = df.groupby(device_col).size().reset_index(name='total_messages')
+    frame_max = df.groupby(device_col)[AWS_COLUMN_MAPPING['frame_count']].max().reset_index(name='max_frame_count')
+    messaging = messaging.merge(frame_max, on=device_col)
+    last = pd.to_datetime(df.groupby(device_col)['@timestamp'].max())
+    days = (pd.Timestamp.now() - last).dt.days
+    messaging['days_since_last_message'] = messaging[device_col].map(days).fillna(-1).astype(int)
+
+    final_df = messaging
+    for df_agg in aggregated.values():
+        final_df = final_df.merge(df_agg, on=device_col, how='left')
+
+    return final_df.rename(columns={device_col: 'device_id'})
+
+
+def make_raw_payload(n_devices=40, n_messages=2000, nan_rate=0.15, seed=42) -> pd.DataFrame:
+    """Synthetic AWS message-level payload with NaNs and threshold crossings."""
+    rng = np.random.default_rng(seed)
+
+    def with_nans(values):
+        values = values.astype(float)
+        values[rng.random(len(values)) < nan_rate] = np.nan
+        return values
+
+    start = pd.Timestamp('2025-10-01')
+    df = pd.DataFrame({
+        'device_id': rng.integers(861275072300000, 861275072300000 + n_devices, n_messages),
+        'f_cnt': rng.integers(0, 500, n_messages),
+        '@timestamp': (start + pd.to_timedelta(rng.integers(0, 40 * 86400, n_messages), unit='s')).astype(str),
+        AWS_COLUMN_MAPPING['optical']: with_nans(rng.normal(-20, 6, n_messages)),
+        AWS_COLUMN_MAPPING['temp']: with_nans(rng.normal(40, 15, n_messages)),
+        AWS_COLUMN_MAPPING['battery']: with_nans(rng.normal(3.4, 0.4, n_messages)),
+        AWS_COLUMN_MAPPING['snr']: with_nans(rng.normal(10, 4, n_messages)),
+        AWS_COLUMN_MAPPING['rsrp']: with_nans(rng.normal(-90, 10, n_messages)),
+        AWS_COLUMN_MAPPING['rsrq']: with_nans(rng.normal(-10, 3, n_messages)),
+    })
+    return df
+
+
+class TestAggregationEquivalence:
+    """Vectorized engine must reproduce the groupby/merge output."""
+
+    def test_matches_legacy_output(self):
+        """Same 31 columns (device_id + 30 features), same values, same order."""
+        df = make_raw_payload()
+
+        expected = legacy_aggregate_by_device(df)
+        result = aggregate_by_device(df)
+
+        assert list(result.columns) == list(expected.columns)
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+
+    def test_all_required_features_present(self):
+        """Output has every feature expected by the model."""
+        result = aggregate_by_device(make_raw_payload())
+
+        assert set(REQUIRED_FEATURES).issubset(result.columns)
+
+    def test_device_without_sensor_readings(self):
+        """Devices with only NaN readings get NaN stats (left-merge semantics)."""
+        df = make_raw_payload(n_devices=5, n_messages=200)
+        optical_col = AWS_COLUMN_MAPPING['optical']
+        silent_device = df['device_id'].iloc[0]
+        df.loc[df['device_id'] == silent_device, optical_col] = np.nan
+
+        expected = legacy_aggregate_by_device(df)
+        result = aggregate_by_device(df)
+
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+        row = result[result['device_id'] == silent_device].iloc[0]
+        assert np.isnan(row['optical_mean'])
+        assert np.isnan(row['optical_readings'])
+        assert np.isnan(row['optical_below_threshold'])
+
+    def test_single_reading_std_is_nan(self):
+        """std with one reading is NaN (pandas ddof=1 semantics)."""
+        df = make_raw_payload(n_devices=3, n_messages=30, nan_rate=0.0)
+        lonely = pd.DataFrame({col: [df[col].iloc[0]] for col in df.columns})
+        lonely['device_id'] = 1
+        df = pd.concat([df, lonely], ignore_index=True)
+
+        result = aggregate_by_device(df)
+        row = result[result['device_id'] == 1].iloc[0]
+
+        assert row['total_messages'] == 1
+        assert np.isnan(row['temp_std'])
+        assert row['temp_min'] == row['temp_max']
+
+    def test_missing_sensor_column_skipped(self):
+        """A missing sensor column is skipped instead of failing."""
+        df = make_raw_payload().drop(columns=[AWS_COLUMN_MAPPING['rsrq']])
+
+        expected = legacy_aggregate_by_device(df)
+        result = aggregate_by_device(df)
+
+        assert 'rsrq_mean' not in result.columns
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+
+    def test_empty_input(self):
+        """Empty payload yields an empty frame instead of raising."""
+        df = make_raw_payload().iloc[:0]
+
+        result = aggregate_by_device(df)
+
+        assert len(result) == 0
+        assert 'total_messages' in result.columns
+
+
+class TestTypedReader:
+    """load_aws_payload reads only schema columns with compact dtypes."""
+
+    @pytest.fixture(autouse=True, params=[True, False], ids=['pyarrow', 'c'])
+    def csv_engine(self, request, monkeypatch):
+        """Same result with the pyarrow engine and the default C parser."""
+        monkeypatch.setattr(transform_aws_payload, 'HAS_PYARROW', request.param)
+
+    @pytest.fixture
+    def wide_csv(self, tmp_path):
+        """Payload with a MODE column and unused nested columns."""
+        df = make_raw_payload(n_devices=30, n_messages=1500)
+        df['eyon_metadata.decoded_payload.mode'] = np.where(np.arange(len(df)) % 4 == 0, 'FACTORY', 'FIELD')
+        df['eyon_metadata.gateway.name'] = 'gw-a'
+        df['eyon_metadata.decoded_payload.firmware'] = '1.1.0'
+        path = tmp_path / 'payload_wide.csv'
+        df.to_csv(path, index=False)
+        return path
+
+    def test_unused_columns_not_read(self, wide_csv):
+        """Columns outside the schema are pruned at parse time."""
+        df = load_aws_payload(str(wide_csv))
+
+        assert 'eyon_metadata.gateway.name' not in df.columns
+        assert 'eyon_metadata.decoded_payload.firmware' not in df.columns
+
+    def test_dtype_map(self, wide_csv):
+        """float32 telemetry, Int32 f_cnt, categorical IDs/MODE, parsed timestamps."""
+        df = load_aws_payload(str(wide_csv))
+
+        assert df[AWS_COLUMN_MAPPING['optical']].dtype == np.float32
+        assert df[AWS_COLUMN_MAPPING['rsrq']].dtype == np.float32
+        assert df['f_cnt'].dtype == 'Int32'
+        assert isinstance(df['device_id'].dtype, pd.CategoricalDtype)
+        assert isinstance(df['eyon_metadata.decoded_payload.mode'].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_datetime64_any_dtype(df['@timestamp'])
+
+    def test_numeric_device_ids_preserved(self, wide_csv):
+        """Aggregated device IDs keep the same values/order as an untyped read."""
+        result = aggregate_by_device(load_aws_payload(str(wide_csv)))
+
+        raw = pd.read_csv(wide_csv)
+        expected_ids = np.sort(raw.loc[raw['eyon_metadata.decoded_payload.mode'] == 'FIELD', 'device_id'].unique())
+        np.testing.assert_array_equal(result['device_id'].to_numpy(), expected_ids)
+        assert result['device_id'].dtype == np.int64
+
+    def test_features_match_untyped_read(self, wide_csv):
+        """Features are the untyped ones within float32 precision."""
+        raw = pd.read_csv(wide_csv)
+        expected = aggregate_by_device(raw[raw['eyon_metadata.decoded_payload.mode'] == 'FIELD'])
+        result = aggregate_by_device(load_aws_payload(str(wide_csv)))
+
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=TYPED_READ_RTOL)
+
+
+class TestPartialAggregates:
+    """Partial state must merge to the same features as a single pass."""
+
+    def test_merge_of_splits_matches_full(self):
+        """Merging partials of random row splits reproduces the full aggregation."""
+        df = make_raw_payload()
+        expected = aggregate_by_device(df)
+
+        rng = np.random.default_rng(0)
+        part_of_row = rng.integers(0, 4, len(df))
+        partial = None
+        for part in range(4):
+            partial = merge_partial_aggregates(
+                partial, compute_partial_aggregates(df[part_of_row == part])
+            )
+        result = finalize_partial_aggregates(partial)
+
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+
+    def test_merge_disjoint_devices(self):
+        """Devices present in only one partial keep their own state."""
+        df = make_raw_payload(n_devices=6, n_messages=300)
+        devices = sorted(df['device_id'].unique())
+        first = df[df['device_id'].isin(devices[:3])]
+        second = df[df['device_id'].isin(devices[3:])]
+
+        merged = merge_partial_aggregates(
+            compute_partial_aggregates(second), compute_partial_aggregates(first)
+        )
+        result = finalize_partial_aggregates(merged)
+
+        assert list(result['device_id']) == devices
+        pd.testing.assert_frame_equal(result, aggregate_by_device(df), check_exact=False, rtol=1e-9)
+
+
+class TestStreamingIngestion:
+    """Chunked reading must give the same features as loading the whole file."""
+
+    @pytest.fixture
+    def payload_csv(self, tmp_path):
+        """Raw payload CSV with FIELD and FACTORY messages."""
+        df = make_raw_payload(n_devices=30, n_messages=3000)
+        rng = np.random.default_rng(7)
+        df['eyon_metadata.decoded_payload.mode'] = np.where(rng.random(len(df)) < 0.2, 'FACTORY', 'FIELD')
+        path = tmp_path / 'payload_aws_test.csv'
+        df.to_csv(path, index=False)
+        return path
+
+    @pytest.mark.parametrize('chunksize', [7, 250, 1000, 100_000])
+    def test_streaming_matches_full_load(self, payload_csv, chunksize):
+        """Same features for any chunk size (tiny chunks to one chunk)."""
+        expected = aggregate_by_device(load_aws_payload(str(payload_csv)))
+        result, n_messages = aggregate_aws_payload_streaming(str(payload_csv), chunksize=chunksize)
+
+        assert n_messages == expected['total_messages'].sum()
+        pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+
+    def test_factory_messages_filtered_per_chunk(self, payload_csv):
+        """FACTORY messages never reach the aggregates."""
+        raw = pd.read_csv(payload_csv)
+        field_count = (raw['eyon_metadata.decoded_payload.mode'] == 'FIELD').sum()
+
+        result, n_messages = aggregate_aws_payload_streaming(str(payload_csv), chunksize=500)
+
+        assert n_messages == field_count
+        assert result['total_messages'].sum() == field_count
+
+
+class TestPayloadSchema:
+    """Per-file column resolution (no shared mutable mapping)."""
+
+    @staticmethod
+    def _rename(df, device_col, frame_col):
+        return df.rename(columns={'device_id': device_col, 'f_cnt': frame_col})
+
+    def test_resolves_column_variants(self):
+        """sn_fkw / f_count headers resolve without touching AWS_COLUMN_MAPPING."""
+        before = dict(AWS_COLUMN_MAPPING)
+        df = self._rename(make_raw_payload(n_messages=50), 'sn_fkw', 'f_count')
+
+        schema = resolve_payload_schema(df.columns)
+
+        assert schema.device_col == 'sn_fkw'
+        assert schema.frame_col == 'f_count'
+        assert schema.mode_col is None
+        assert dict(AWS_COLUMN_MAPPING) == before
+
+    def test_mapping_is_read_only(self):
+        """The default mapping cannot be mutated at runtime."""
+        with pytest.raises(TypeError):
+            AWS_COLUMN_MAPPING['device_id'] = 'sn_fkw'
+
+    def test_same_header_resolved_once(self):
+        """Identical headers reuse the cached schema object."""
+        columns = make_raw_payload(n_messages=10).columns
+
+        assert resolve_payload_schema(columns) is resolve_payload_schema(list(columns))
+
+    def test_missing_device_column_raises(self):
+        """Files without any device ID candidate are rejected."""
+        with pytest.raises(ValueError, match='device_id'):
+            resolve_payload_schema(['foo', 'bar'])
+
+    def test_concurrent_files_with_different_schemas(self):
+        """Threads aggregating differently named files do not see each other's columns."""
+        variants = [('device_id', 'f_cnt'), ('sn_fkw', 'f_count'), ('identificator_in_network', 'eyon_metadata.f_count')]
+        frames = [
+            self._rename(make_raw_payload(n_devices=10, n_messages=400, seed=seed), device_col, frame_col)
+            for seed, (device_col, frame_col) in enumerate(variants * 4)
+        ]
+        expected = [
+            aggregate_by_device(make_raw_payload(n_devices=10, n_messages=400, seed=seed))
+            for seed in range(len(frames))
+        ]
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(aggregate_by_device, frames))
+
+        for result, exp in zip(results, expected):
+            pd.testing.assert_frame_equal(result, exp)
+
+
+class TestParallelTransform:
+    """Multi-file transform in a process pool."""
+
+    @pytest.fixture
+    def payload_dir(self, tmp_path):
+        """Three payload files sharing devices, plus one broken file."""
+        input_dir = tmp_path / 'payloads_aws'
+        input_dir.mkdir()
+        frames = [make_raw_payload(n_devices=15, n_messages=600, seed=s) for s in (11, 12, 13)]
+        for i, df in enumerate(frames):
+            df.to_csv(input_dir / f'payload_{i}.csv', index=False)
+        (input_dir / 'payload_broken.csv').write_text('foo,bar\n1,2\n')
+        return {'dir': input_dir, 'frames': frames}
+
+    def test_parallel_matches_serial(self, payload_dir, tmp_path):
+        """Per-file outputs and summary are identical with 1 or 3 workers."""
+        files = sorted(payload_dir['dir'].glob('*.csv'))
+
+        serial = run_transform_jobs(files, output_dir=str(tmp_path / 'serial'), workers=1)
+        parallel = run_transform_jobs(files, output_dir=str(tmp_path / 'parallel'), workers=3)
+
+        assert serial == parallel
+        for r in parallel:
+            if r['output']:
+                pd.testing.assert_frame_equal(
+                    pd.read_csv(tmp_path / 'parallel' / r['output']).drop(columns='days_since_last_message'),
+                    pd.read_csv(tmp_path / 'serial' / r['output']).drop(columns='days_since_last_message')
+                )
+
+    def test_errors_collected_per_file(self, payload_dir, tmp_path):
+        """A broken file is reported in the results instead of aborting the pool."""
+        files = sorted(payload_dir['dir'].glob('*.csv'))
+
+        results = run_transform_jobs(files, output_dir=str(tmp_path / 'out'), workers=2)
+
+        by_input = {r['input']: r for r in results}
+        assert [r['input'] for r in results] == [f.name for f in files]
+        assert not by_input['payload_broken.csv']['valid']
+        assert 'device_id' in by_input['payload_broken.csv']['error']
+        assert all(by_input[f'payload_{i}.csv']['valid'] for i in range(3))
+
+    def test_combined_fleet_output(self, payload_dir, tmp_path):
+        """Combined output aggregates devices over all files' messages."""
+        files = sorted(payload_dir['dir'].glob('payload_[0-9].csv'))
+        output_dir = tmp_path / 'out'
+
+        results = run_transform_jobs(files, output_dir=str(output_dir), workers=2, keep_partial=True)
+        combined = combine_fleet_output(results, output_dir=str(output_dir))
+
+        expected = aggregate_by_device(pd.concat(payload_dir['frames'], ignore_index=True))
+        result = pd.read_csv(output_dir / combined['output'])
+
+        assert combined['valid']
+        assert combined['messages'] == sum(len(df) for df in payload_dir['frames'])
+        assert all('partial' not in r for r in results)
+        pd.testing.assert_frame_equal(
+            result[['device_id'] + REQUIRED_FEATURES],
+            expected[['device_id'] + REQUIRED_FEATURES],
+            check_exact=False, rtol=TYPED_READ_RTOL, check_dtype=False
+        )
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
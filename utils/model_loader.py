@@ -78,3 +78,77 @@ def load_metadata(metadata_path: str = None):
     except Exception as e:
         st.warning(f"⚠️ Error loading metadata: {e}")
         return {}
+
+
+@st.cache_resource
+def get_model_manager(registry_path: str = None, poll_interval: float = 5.0,
+                      max_entries: int = 10_000, ttl_seconds: float = 24 * 3600):
+    """
+    Registry-driven model manager shared across sessions (hot reload)
+    
+    Loads the model marked "active" in models/registry.json (inference
+    artifact when available) and watches the registry in a background
+    thread. A deploy (editing registry.json) loads and warms the new model
+    off the request path and swaps it atomically: no app restart, and
+    sessions mid-prediction finish on the model they started with.
+    
+    Parameters
+    ----------
+    registry_path : str, optional
+        Path to registry.json. If None, uses models/registry.json.
+    poll_interval : float
+        Seconds between registry checks
+    max_entries : int
+        In-memory LRU capacity of the prediction cache
+    ttl_seconds : float
+        Cache entry lifetime in seconds
+    
+    Returns
+    -------
+    manager : ModelManager
+        Call ``manager.current()`` once per prediction and use the returned
+        handle (``.model``, ``.decision_threshold``, ``.metadata``)
+    """
+    import pandas as pd
+    from models.model_manager import DEFAULT_REGISTRY_PATH, ModelManager
+    from models.prediction_cache import PredictionCache
+    
+    base_dir = Path(__file__).parent.parent
+    warmup_path = base_dir / "data" / "device_features_test_stratified.csv"
+    # Realistic sample batch: warms the model and pre-fills the cache for the new version
+    warmup_data = pd.read_csv(warmup_path) if warmup_path.exists() else None
+    
+    manager = ModelManager(
+        registry_path or DEFAULT_REGISTRY_PATH,
+        poll_interval=poll_interval,
+        cache=PredictionCache(max_entries=max_entries, ttl_seconds=ttl_seconds),
+        warmup_data=warmup_data
+    )
+    return manager.start()
+
+
+@st.cache_resource(max_entries=2)
+def load_explainer(model_version: str, _model, cache_size: int = 10_000):
+    """
+    Per-device SHAP explainer for the active model (shared across sessions)
+    
+    Keyed by ``model_version``: after a hot reload the next call builds an
+    explainer for the new model, and cached explanations never cross versions.
+    
+    Parameters
+    ----------
+    model_version : str
+        Version hash of the active model (``handle.model_version``)
+    _model : CachedModel | FastInferenceModel | Pipeline
+        Scoring model of the same handle (not hashed by Streamlit)
+    cache_size : int
+        Explanations kept in memory
+    
+    Returns
+    -------
+    explainer : ShapExplainer
+        ``top_contributors(X, k)`` / ``top_contributors_frame(X, k)``
+    """
+    from models.explanations import ShapExplainer
+    
+    return ShapExplainer(_model, model_version, cache_size=cache_size)
@@ -6,6 +6,8 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
+from models.scoring_metrics import stage
+
 
 # 30 required features for model v2 (alphabetical/grouped for validation)
 REQUIRED_FEATURES = [
@@ -86,17 +88,18 @@ def check_feature_types(df: pd.DataFrame, show_info: bool = True) -> pd.DataFram
     df : pd.DataFrame
         DataFrame with converted types
     """
-    df = df.copy()
-    non_numeric = []
-    
-    for feature in REQUIRED_FEATURES:
-        if feature in df.columns:
-            if not pd.api.types.is_numeric_dtype(df[feature]):
-                non_numeric.append(feature)
-                try:
-                    df[feature] = pd.to_numeric(df[feature], errors='coerce')
-                except:
-                    pass
+    with stage('coerce'):
+        df = df.copy()
+        non_numeric = []
+        
+        for feature in REQUIRED_FEATURES:
+            if feature in df.columns:
+                if not pd.api.types.is_numeric_dtype(df[feature]):
+                    non_numeric.append(feature)
+                    try:
+                        df[feature] = pd.to_numeric(df[feature], errors='coerce')
+                    except:
+                        pass
     
     if non_numeric and show_info:
         st.info(f"ℹ️ Converted {len(non_numeric)} features to numeric: {', '.join(non_numeric[:5])}")
@@ -173,7 +176,8 @@ def prepare_for_prediction(df: pd.DataFrame) -> pd.DataFrame:
         Clean DataFrame with 29 features in correct training order
     """
     # Extract required features in TRAINING ORDER
-    features_df = df[TRAINING_FEATURE_ORDER].copy()
+    with stage('dataframe'):
+        features_df = df[TRAINING_FEATURE_ORDER].copy()
     
     # Convert to numeric (pipeline expects float64)
     features_df = check_feature_types(features_df, show_info=False)
@@ -173,7 +173,7 @@ TRANSLATIONS = {
             'rec_normal_2': '📊 Schedule routine inspection according to standard maintenance calendar',
             'rec_normal_3': '📈 Monitor trends over time - watch for degradation patterns',
             'top_features_title': '🎯 Top Contributing Features',
-            'top_features_help': 'Features most influential for this prediction (based on global importance)',
+            'top_features_help': 'Features that moved THIS prediction the most (per-device SHAP values from CatBoost)',
         },
         
         # Insights Page
@@ -461,7 +461,7 @@ enabling **preventive maintenance** and **resource optimization**.""",
             'rec_normal_2': '📊 Agende inspeção de rotina conforme calendário padrão de manutenção',
             'rec_normal_3': '📈 Monitore tendências ao longo do tempo - observe padrões de degradação',
             'top_features_title': '🎯 Características Principais Contribuintes',
-            'top_features_help': 'Características mais influentes para esta predição (baseado em importância global)',
+            'top_features_help': 'Características que mais moveram ESTA predição (valores SHAP por device do CatBoost)',
         },
         
         # Insights Page